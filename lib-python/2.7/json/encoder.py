@@ -4,6 +4,14 @@ import re
 
 from __pypy__.builders import StringBuilder, UnicodeBuilder
 
+try:
+    from _pypyjson import make_encoder as c_make_encoder
+    from _pypyjson import (raw_encode_basestring_ascii as
+                           c_raw_encode_basestring_ascii)
+except ImportError:
+    c_make_encoder = None
+    c_raw_encode_basestring_ascii = None
+
 ESCAPE = re.compile(r'[\x00-\x1f\\"\b\f\n\r\t]')
 ESCAPE_ASCII = re.compile(r'([\\"]|[^\ -~])')
 HAS_UTF8 = re.compile(r'[\x80-\xff]')
@@ -32,7 +40,7 @@ def raw_encode_basestring(s):
     return ESCAPE.sub(replace, s)
 encode_basestring = lambda s: '"' + raw_encode_basestring(s) + '"'
 
-def raw_encode_basestring_ascii(s):
+def py_raw_encode_basestring_ascii(s):
     """Return an ASCII-only JSON representation of a Python string
 
     """
@@ -55,6 +63,8 @@ def raw_encode_basestring_ascii(s):
     if ESCAPE_ASCII.search(s):
         return str(ESCAPE_ASCII.sub(replace, s))
     return s
+raw_encode_basestring_ascii = (c_raw_encode_basestring_ascii or
+                               py_raw_encode_basestring_ascii)
 encode_basestring_ascii = lambda s: '"' + raw_encode_basestring_ascii(s) + '"'
 
 
@@ -185,6 +195,9 @@ class JSONEncoder(object):
         '{"foo": ["bar", "baz"]}'
 
         """
+        c_encoder = self.__make_c_encoder()
+        if c_encoder is not None:
+            return c_encoder.encode(o)
         if self.check_circular:
             markers = {}
         else:
@@ -196,6 +209,27 @@ class JSONEncoder(object):
         self.__encode(o, markers, builder, 0)
         return builder.build()
 
+    def __make_c_encoder(self):
+        # the interp-level encoder only produces ascii output, and it
+        # does not know about non-default encodings or a monkeypatched
+        # FLOAT_REPR: use the pure Python version in these cases
+        if (c_make_encoder is None or not self.ensure_ascii or
+                self.encoding != 'utf-8' or FLOAT_REPR is not repr):
+            return None
+        if self.indent is None:
+            indent = -1
+        elif isinstance(self.indent, (int, long)) and self.indent >= 0:
+            indent = self.indent
+        else:
+            return None
+        if (type(self.key_separator) is not str or
+                type(self.item_separator) is not str):
+            return None
+        return c_make_encoder(self.default, indent, self.key_separator,
+                              self.item_separator, bool(self.sort_keys),
+                              bool(self.skipkeys), bool(self.allow_nan),
+                              bool(self.check_circular))
+
     def __emit_indent(self, builder, _current_indent_level):
         if self.indent is not None:
             _current_indent_level += 1
@@ -316,6 +350,10 @@ class JSONEncoder(object):
                 mysocket.write(chunk)
 
         """
+        if _one_shot:
+            c_encoder = self.__make_c_encoder()
+            if c_encoder is not None:
+                return iter([c_encoder.encode(o)])
         if self.check_circular:
             markers = {}
         else:
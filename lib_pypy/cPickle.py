@@ -12,6 +12,11 @@ import marshal, struct, sys
 try: from __pypy__ import builtinify
 except ImportError: builtinify = lambda f: f
 
+try:
+    import _pypypickle
+except ImportError:
+    _pypypickle = None
+
 # These are purely informational; no code uses these.
 format_version = "2.0"                  # File format version we write
 compatible_formats = ["1.0",            # Original protocol 0
@@ -114,12 +119,32 @@ class Pickler(PythonPickler):
     def getvalue(self):
         return self.__f and self.__f.getvalue()
 
+def _fast_dumps(obj, protocol):
+    # returns None if _pypypickle cannot pickle obj
+    if _pypypickle is None or type(protocol) is not int:
+        return None
+    try:
+        return _pypypickle.dumps(obj, protocol)
+    except _pypypickle.Unsupported:
+        return None
+
 @builtinify
 def dump(obj, file, protocol=None):
+    if protocol is None:
+        protocol = 0
+    s = _fast_dumps(obj, protocol)
+    if s is not None:
+        file.write(s)
+        return
     Pickler(file, protocol).dump(obj)
 
 @builtinify
 def dumps(obj, protocol=None):
+    if protocol is None:
+        protocol = 0
+    s = _fast_dumps(obj, protocol)
+    if s is not None:
+        return s
     file = StringIO()
     Pickler(file, protocol).dump(obj)
     return file.getvalue()
@@ -596,5 +621,10 @@ def load(f):
     return Unpickler(f).load()
 
 def loads(str):
+    if _pypypickle is not None:
+        try:
+            return _pypypickle.loads(str)
+        except _pypypickle.Unsupported:
+            pass
     f = StringIO(str)
     return Unpickler(f).load()
@@ -21,6 +21,11 @@ import time as _time
 import math as _math
 import struct as _struct
 
+try:
+    import _pypydatetime
+except ImportError:
+    _pypydatetime = None
+
 def _cmp(x, y):
     return 0 if x == y else 1 if x > y else -1
 
@@ -175,6 +180,13 @@ def _format_time(hh, mm, ss, us):
         result += ".%06d" % us
     return result
 
+def _format_date(y, m, d):
+    return "%04d-%02d-%02d" % (y, m, d)
+
+if _pypydatetime is not None:
+    _format_time = _pypydatetime.format_time
+    _format_date = _pypydatetime.format_date
+
 # Correctly substitute for %z and %Z escapes in strftime formats.
 def _wrap_strftime(object, format, timetuple):
     year = timetuple[0]
@@ -360,6 +372,11 @@ class _tmxxx:
     def __init__(self, year, month, day, hour=0, minute=0, second=0,
                  microsecond=0):
         # Normalize all the inputs, and store the normalized values.
+        if _pypydatetime is not None:
+            (self.year, self.month, self.day, self.hour, self.minute,
+             self.second, self.microsecond) = _pypydatetime.normalize(
+                year, month, day, hour, minute, second, microsecond)
+            return
         if not 0 <= microsecond <= 999999:
             carry, microsecond = divmod(microsecond, 1000000)
             second += carry
@@ -835,7 +852,7 @@ class date(object):
         - http://www.w3.org/TR/NOTE-datetime
         - http://www.cl.cam.ac.uk/~mgk25/iso-time.html
         """
-        return "%04d-%02d-%02d" % (self._year, self._month, self._day)
+        return _format_date(self._year, self._month, self._day)
 
     __str__ = isoformat
 
@@ -1694,6 +1711,10 @@ class datetime(date):
     @classmethod
     def strptime(cls, date_string, format):
         'string, format -> new datetime parsed from a string (like time.strptime()).'
+        if _pypydatetime is not None:
+            fields = _pypydatetime.strptime(date_string, format)
+            if fields is not None:
+                return cls(*fields)
         from _strptime import _strptime
         # _strptime._strptime returns a two-element tuple.  The first
         # element is a time.struct_time object.  The second is the
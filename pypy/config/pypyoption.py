@@ -35,7 +35,8 @@ working_modules.update(dict.fromkeys(
      "thread", "itertools", "pyexpat", "_ssl", "cpyext", "array",
      "binascii", "_multiprocessing", '_warnings',
      "_collections", "_multibytecodec", "micronumpy", "_ffi",
-     "_continuation", "_cffi_backend", "_csv", "cppyy", "_pypyjson"]
+     "_continuation", "_cffi_backend", "_csv", "cppyy", "_pypyjson",
+     "_pypypickle", "_pypydatetime", "_sampleprof"]
 ))
 
 translation_modules = default_modules.copy()
@@ -65,6 +66,7 @@ if sys.platform == "win32":
     del working_modules["pwd"]
     del working_modules["termios"]
     del working_modules["_minimal_curses"]
+    del working_modules["_sampleprof"]   # needs setitimer()
 
     if "cppyy" in working_modules:
         del working_modules["cppyy"]  # not tested on win32
@@ -76,6 +78,7 @@ if sys.platform == "sunos5":
     del working_modules['mmap']   # depend on ctypes, can't get at c-level 'errono'
     del working_modules['rctime'] # depend on ctypes, missing tm_zone/tm_gmtoff
     del working_modules['signal'] # depend on ctypes, can't get at c-level 'errono'
+    del working_modules['_sampleprof'] # depends on signal
     del working_modules['fcntl']  # LOCK_NB not defined
     del working_modules["_minimal_curses"]
     del working_modules["termios"]
@@ -89,6 +92,7 @@ module_dependencies = {
                          ('objspace.usemodules.thread', True)],
     'cpyext': [('objspace.usemodules.array', True)],
     'cppyy': [('objspace.usemodules.cpyext', True)],
+    '_sampleprof': [('objspace.usemodules.signal', True)],
     }
 module_suggests = {
     # the reason you want _rawffi is for ctypes, which
@@ -190,6 +194,14 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                "make sure that all calls go through space.call_args",
                default=False),
 
+    OptionDescription("micronumpy", "Options of the micronumpy module", [
+        BoolOption("simdufuncs",
+                   "use SSE2 loops for add, subtract and multiply of "
+                   "contiguous float64 and int arrays in numpypy",
+                   default=False,
+                   requires=[("objspace.usemodules.micronumpy", True)]),
+        ]),
+
     OptionDescription("std", "Standard Object Space Options", [
         BoolOption("withtproxy", "support transparent proxies",
                    default=True),
@@ -209,6 +221,14 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
         BoolOption("withstrbuf", "use strings optimized for addition (ver 2)",
                    default=False),
 
+        BoolOption("withstrslice", "use strings optimized for slicing",
+                   default=False),
+
+        BoolOption("withrope", "use ropes for long strings built by "
+                               "concatenation",
+                   default=False,
+                   requires=[("objspace.std.withstrbuf", False)]),
+
         BoolOption("withprebuiltchar",
                    "use prebuilt single-character string objects",
                    default=False),
@@ -222,11 +242,33 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                    "use specialised tuples",
                    default=False),
 
+        BoolOption("withbitmapset",
+                   "store sets of dense ints as bitmaps",
+                   default=False),
+
+        BoolOption("withtypedtuple",
+                   "store tuples of only ints, floats or strings unboxed",
+                   default=False),
+
+        BoolOption("withnarrowintlist",
+                   "store lists of small ints in 8, 16 or 32 bits per item",
+                   default=False),
+
         BoolOption("withcelldict",
                    "use dictionaries that are optimized for being used as module dicts",
                    default=False,
                    requires=[("objspace.honor__builtins__", False)]),
 
+        BoolOption("withordereddict",
+                   "store the items of the generic dict strategies in a "
+                   "compact, insertion-ordered table",
+                   default=False),
+
+        BoolOption("withtypedkeydict",
+                   "use special dict strategies for float keys and for "
+                   "small tuples of ints and strings",
+                   default=False),
+
         BoolOption("withmapdict",
                    "make instances really small but slow without the JIT",
                    default=False,
@@ -234,6 +276,17 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                              ("objspace.std.withmethodcache", True),
                        ]),
 
+        BoolOption("withunboxedattrs",
+                   "store the int and float attributes of instances unboxed",
+                   default=False,
+                   requires=[("objspace.std.withmapdict", True)]),
+
+        BoolOption("withshareddict",
+                   "make the string-keyed dicts with the same keys share "
+                   "their keys, like instances do",
+                   default=False,
+                   requires=[("objspace.std.withmapdict", True)]),
+
         BoolOption("withrangelist",
                    "enable special range list implementation that does not "
                    "actually create the full list until the resulting "
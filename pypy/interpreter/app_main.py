@@ -35,6 +35,8 @@ PYTHONSTARTUP: file executed on interactive startup (no default)
 PYTHONPATH   : %r-separated list of directories prefixed to the
                default module search path.  The result is sys.path.
 PYTHONIOENCODING: Encoding[:errors] used for stdin/stdout/stderr.
+PYPY_JIT_WARMUP_CACHE: file where the JIT remembers the hot loops from one
+               run to the next.
 """
 
 import sys
@@ -515,6 +517,12 @@ def run_command_line(interactive,
     mainmodule = type(sys)('__main__')
     sys.modules['__main__'] = mainmodule
 
+    jit_warmup_cache = not ignore_environment and os.getenv(
+        'PYPY_JIT_WARMUP_CACHE')
+    if jit_warmup_cache and 'pypyjit' in sys.builtin_module_names:
+        import pypyjit
+        pypyjit.enable_warmup_cache(jit_warmup_cache)
+
     if not no_site:
         try:
             import site
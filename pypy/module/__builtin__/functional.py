@@ -9,7 +9,7 @@ from pypy.interpreter.gateway import interp2app, unwrap_spec, WrappedDefault
 from pypy.interpreter.typedef import TypeDef
 from rpython.rlib import jit
 from rpython.rlib.objectmodel import specialize
-from rpython.rlib.rarithmetic import r_uint, intmask
+from rpython.rlib.rarithmetic import r_uint, intmask, ovfcheck
 from rpython.rlib.rbigint import rbigint
 
 
@@ -200,8 +200,25 @@ def make_min_max(unroll):
 min_max_unroll = make_min_max(True)
 min_max_normal = make_min_max(False)
 
+@specialize.arg(1)
+def min_max_ints(intlist, implementation_of):
+    result = intlist[0]
+    for intval in intlist:
+        if implementation_of == "max":
+            if intval > result:
+                result = intval
+        else:
+            if intval < result:
+                result = intval
+    return result
+
 @specialize.arg(2)
 def min_max(space, args, implementation_of):
+    if len(args.arguments_w) == 1 and not args.keywords:
+        # fast path for lists, tuples and sets of unwrapped ints
+        intlist = space.listview_int(args.arguments_w[0])
+        if intlist:
+            return space.wrap(min_max_ints(intlist, implementation_of))
     if not jit.we_are_jitted() or len(args.arguments_w) != 1 and \
             jit.loop_unrolling_heuristic(args.arguments_w, len(args.arguments_w)):
         return min_max_unroll(space, args, implementation_of)
@@ -227,6 +244,47 @@ def min(space, __args__):
     """
     return min_max(space, __args__, "min")
 
+sum_jitdriver = jit.JitDriver(name='sum', greens=['w_type'], reds='auto')
+
+@unwrap_spec(w_start=WrappedDefault(0))
+def sum(space, w_sequence, w_start):
+    """sum(sequence[, start]) -> value
+
+Returns the sum of a sequence of numbers (NOT strings) plus the value
+of parameter 'start' (which defaults to 0).  When the sequence is
+empty, returns start."""
+    if space.is_w(space.type(w_start), space.w_int):
+        # fast path for lists, tuples and sets of unwrapped ints
+        intlist = space.listview_int(w_sequence)
+        if intlist is not None:
+            try:
+                return space.wrap(sum_ints(space.int_w(w_start), intlist))
+            except OverflowError:
+                pass     # redo it with the generic loop, giving a long
+    if space.isinstance_w(w_start, space.w_basestring):
+        msg = "sum() can't sum strings"
+        raise OperationError(space.w_TypeError, space.wrap(msg))
+    w_iter = space.iter(w_sequence)
+    w_type = space.type(w_iter)
+    w_last = w_start
+    while True:
+        sum_jitdriver.jit_merge_point(w_type=w_type)
+        try:
+            w_item = space.next(w_iter)
+        except OperationError, e:
+            if not e.match(space, space.w_StopIteration):
+                raise
+            break
+        # Very intentionally *not* inplace_add, that would have different
+        # semantics if start was a mutable type, such as a list
+        w_last = space.add(w_last, w_item)
+    return w_last
+
+def sum_ints(result, intlist):
+    for intval in intlist:
+        result = ovfcheck(result + intval)
+    return result
+
 
 class W_Enumerate(W_Root):
     def __init__(self, w_iter, w_start):
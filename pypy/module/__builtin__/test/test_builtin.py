@@ -183,6 +183,17 @@ class AppTestBuiltinApp:
                 return 42
         assert sum([Foo()], None) == 42
 
+    def test_sum_ints(self):
+        import sys
+        assert sum((1, 2, 3)) == 6
+        assert sum(set([1, 2, 3]), 10) == 16
+        assert sum([sys.maxint, 1]) == sys.maxint + 1
+        assert sum([-sys.maxint, -5], -sys.maxint) == -2 * sys.maxint - 5
+        assert sum([1, 2], 0.5) == 3.5
+        assert sum([[1], [2]], []) == [1, 2]
+        raises(TypeError, sum, [1, 2], '')
+        raises(TypeError, sum, [1, 'a'])
+
     def test_type_selftest(self):
         assert type(type) is type
 
@@ -275,3 +275,14 @@ class AppTestMinMax:
         assert max([1, 2, 3]) == 3
         raises(TypeError, max, 1, 2, bar=2)
         raises(TypeError, max, 1, 2, key=lambda x: x, bar=2)
+
+    def test_min_max_ints(self):
+        import sys
+        for seq in [[5, -3, 12, 0], (5, -3, 12, 0), set([5, -3, 12, 0])]:
+            assert min(seq) == -3
+            assert max(seq) == 12
+        assert max([sys.maxint, -sys.maxint-1]) == sys.maxint
+        assert min([sys.maxint, -sys.maxint-1]) == -sys.maxint-1
+        assert max([3, True, 7]) == 7
+        raises(ValueError, min, [])
+        raises(ValueError, max, ())
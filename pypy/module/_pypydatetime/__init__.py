@@ -0,0 +1,14 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """fast paths for the datetime module"""
+
+    appleveldefs = {
+        }
+
+    interpleveldefs = {
+        'normalize' : 'interp_datetime.normalize',
+        'format_date' : 'interp_datetime.format_date',
+        'format_time' : 'interp_datetime.format_time',
+        'strptime' : 'interp_datetime.strptime',
+        }
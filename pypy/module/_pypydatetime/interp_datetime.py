@@ -0,0 +1,264 @@
+from rpython.rlib.rstring import StringBuilder
+from pypy.interpreter.gateway import unwrap_spec
+
+DAYS_IN_MONTH = [-1, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31]
+
+DAYS_BEFORE_MONTH = [-1] + [sum(DAYS_IN_MONTH[1:_m]) for _m in range(1, 13)]
+
+def is_leap(year):
+    return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+
+def days_before_year(year):
+    y = year - 1
+    return y * 365 + y // 4 - y // 100 + y // 400
+
+def days_in_month(year, month):
+    if month == 2 and is_leap(year):
+        return 29
+    return DAYS_IN_MONTH[month]
+
+def days_before_month(year, month):
+    result = DAYS_BEFORE_MONTH[month]
+    if month > 2 and is_leap(year):
+        result += 1
+    return result
+
+def ymd2ord(year, month, day):
+    return days_before_year(year) + days_before_month(year, month) + day
+
+DI400Y = days_before_year(401)
+DI100Y = days_before_year(101)
+DI4Y = days_before_year(5)
+
+def ord2ymd(n):
+    # see _ord2ymd() in lib_pypy/datetime.py for the explanations
+    n -= 1
+    n400 = n // DI400Y
+    n = n % DI400Y
+    year = n400 * 400 + 1
+    n100 = n // DI100Y
+    n = n % DI100Y
+    n4 = n // DI4Y
+    n = n % DI4Y
+    n1 = n // 365
+    n = n % 365
+    year += n100 * 100 + n4 * 4 + n1
+    if n1 == 4 or n100 == 4:
+        return year - 1, 12, 31
+    leapyear = n1 == 3 and (n4 != 24 or n100 == 3)
+    month = (n + 50) >> 5
+    preceding = DAYS_BEFORE_MONTH[month]
+    if month > 2 and leapyear:
+        preceding += 1
+    if preceding > n:
+        month -= 1
+        preceding -= DAYS_IN_MONTH[month]
+        if month == 2 and leapyear:
+            preceding -= 1
+    n -= preceding
+    return year, month, n + 1
+
+
+@unwrap_spec(year=int, month=int, day=int, hour=int, minute=int, second=int,
+             microsecond=int)
+def normalize(space, year, month, day, hour, minute, second, microsecond):
+    """normalize(year, month, day, hour, minute, second, microsecond) -> tuple
+
+Carry the out-of-range fields into the next larger ones, like the _tmxxx
+class of the datetime module."""
+    if not 0 <= microsecond <= 999999:
+        second += microsecond // 1000000
+        microsecond = microsecond % 1000000
+    if not 0 <= second <= 59:
+        minute += second // 60
+        second = second % 60
+    if not 0 <= minute <= 59:
+        hour += minute // 60
+        minute = minute % 60
+    if not 0 <= hour <= 23:
+        day += hour // 24
+        hour = hour % 24
+    if not 1 <= month <= 12:
+        year += (month - 1) // 12
+        month = (month - 1) % 12 + 1
+    dim = days_in_month(year, month)
+    if not 1 <= day <= dim:
+        if day == 0:
+            month -= 1
+            if month > 0:
+                day = days_in_month(year, month)
+            else:
+                year, month, day = year - 1, 12, 31
+        elif day == dim + 1:
+            month += 1
+            day = 1
+            if month > 12:
+                month = 1
+                year += 1
+        else:
+            year, month, day = ord2ymd(ymd2ord(year, month, 1) + (day - 1))
+    return space.newtuple([space.wrap(year), space.wrap(month),
+                           space.wrap(day), space.wrap(hour),
+                           space.wrap(minute), space.wrap(second),
+                           space.wrap(microsecond)])
+
+
+def append_padded(builder, x, width):
+    # like "%0*d" % (width, x)
+    if x < 0:
+        builder.append('-')
+        width -= 1
+        x = -x
+    s = str(x)
+    if len(s) < width:
+        builder.append_multiple_char('0', width - len(s))
+    builder.append(s)
+
+@unwrap_spec(year=int, month=int, day=int)
+def format_date(space, year, month, day):
+    """format_date(year, month, day) -> 'YYYY-MM-DD'"""
+    builder = StringBuilder(10)
+    append_padded(builder, year, 4)
+    builder.append('-')
+    append_padded(builder, month, 2)
+    builder.append('-')
+    append_padded(builder, day, 2)
+    return space.wrap(builder.build())
+
+@unwrap_spec(hour=int, minute=int, second=int, microsecond=int)
+def format_time(space, hour, minute, second, microsecond):
+    """format_time(hour, minute, second, microsecond) -> 'HH:MM:SS[.ffffff]'
+"""
+    builder = StringBuilder(15)
+    append_padded(builder, hour, 2)
+    builder.append(':')
+    append_padded(builder, minute, 2)
+    builder.append(':')
+    append_padded(builder, second, 2)
+    if microsecond:
+        builder.append('.')
+        append_padded(builder, microsecond, 6)
+    return space.wrap(builder.build())
+
+
+class DateParser(object):
+    """ Parses the strings whose format only uses the numeric directives
+    %Y %m %d %H %M %S %f.  The _strptime module builds a regular expression
+    for the format; here each directive takes the whole run of digits at
+    its position, which gives the same result as long as no directive is
+    directly followed by a digit.  parse() returns False for all the other
+    formats, and for the strings that don't match, so that the caller can
+    let _strptime handle them and produce the error message. """
+
+    def __init__(self, s, fmt):
+        self.s = s
+        self.fmt = fmt
+        self.year = 1900
+        self.month = 1
+        self.day = 1
+        self.hour = 0
+        self.minute = 0
+        self.second = 0
+        self.fraction = 0
+
+    def parse(self):
+        s = self.s
+        fmt = self.fmt
+        i = 0
+        j = 0
+        while j < len(fmt):
+            c = fmt[j]
+            if c == '%' and j + 1 < len(fmt) and fmt[j + 1] != '%':
+                directive = fmt[j + 1]
+                j += 2
+                if j < len(fmt) and (fmt[j].isdigit() or fmt[j] == '%'):
+                    # could be ambiguous
+                    return False
+                start = i
+                while i < len(s) and s[i].isdigit():
+                    i += 1
+                if not self.store(directive, start, i):
+                    return False
+            elif c.isspace():
+                # any run of whitespace in the format matches '\s+'
+                while j < len(fmt) and fmt[j].isspace():
+                    j += 1
+                if i == len(s) or not s[i].isspace():
+                    return False
+                while i < len(s) and s[i].isspace():
+                    i += 1
+            else:
+                if c == '%':
+                    if j + 1 == len(fmt):
+                        return False    # stray %
+                    j += 1    # '%%'
+                if i == len(s) or s[i].lower() != c.lower():
+                    return False
+                i += 1
+                j += 1
+        return i == len(s)
+
+    def store(self, directive, start, end):
+        ndigits = end - start
+        if ndigits == 0 or ndigits > 6:
+            return False
+        value = 0
+        for i in range(start, end):
+            value = value * 10 + (ord(self.s[i]) - ord('0'))
+        if directive == 'Y':
+            if ndigits != 4:
+                return False
+            self.year = value
+        elif directive == 'm':
+            if not check_field(ndigits, value, 1, 12):
+                return False
+            self.month = value
+        elif directive == 'd':
+            if not check_field(ndigits, value, 1, 31):
+                return False
+            self.day = value
+        elif directive == 'H':
+            if not check_field(ndigits, value, 0, 23):
+                return False
+            self.hour = value
+        elif directive == 'M':
+            if not check_field(ndigits, value, 0, 59):
+                return False
+            self.minute = value
+        elif directive == 'S':
+            if not check_field(ndigits, value, 0, 61):
+                return False
+            self.second = value
+        elif directive == 'f':
+            for k in range(6 - ndigits):
+                value *= 10
+            self.fraction = value
+        else:
+            return False
+        return True
+
+def check_field(ndigits, value, minimum, maximum):
+    # the regular expressions of _strptime accept one digit or two digits
+    # for these fields, e.g. '1[0-2]|0[1-9]|[1-9]' for the month
+    if ndigits == 1:
+        return value >= minimum
+    return ndigits == 2 and minimum <= value <= maximum
+
+
+def strptime(space, w_string, w_format):
+    """strptime(string, format) -> tuple or None
+
+Return (year, month, day, hour, minute, second, microsecond) like
+datetime.strptime() for the simple numeric formats, or None if the
+_strptime module should be used instead."""
+    if not (space.is_w(space.type(w_string), space.w_str) and
+            space.is_w(space.type(w_format), space.w_str)):
+        return space.w_None
+    parser = DateParser(space.str_w(w_string), space.str_w(w_format))
+    if not parser.parse():
+        return space.w_None
+    return space.newtuple([space.wrap(parser.year), space.wrap(parser.month),
+                           space.wrap(parser.day), space.wrap(parser.hour),
+                           space.wrap(parser.minute),
+                           space.wrap(parser.second),
+                           space.wrap(parser.fraction)])
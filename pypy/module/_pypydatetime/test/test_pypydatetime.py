@@ -0,0 +1,87 @@
+class AppTest(object):
+    spaceconfig = {"usemodules": ['_pypydatetime', 'rctime', 'struct',
+                                  '_sre', 'binascii']}
+
+    def test_normalize(self):
+        import datetime, _pypydatetime
+        cases = [(2000, 1, 1, 0, 0, 0, 0),
+                 (2000, 1, 1, 0, 0, 0, -1),
+                 (2000, 1, 1, 0, 0, 0, 10**12),
+                 (2000, 1, 1, 0, 0, 59 + 3600 * 24, 0),
+                 (2000, 3, 0, 23, 59, 59, 999999),
+                 (2000, 12, 32, 0, 0, 0, 0),
+                 (2000, 1, 0, 0, 0, 0, 0),
+                 (1999, 2, 29, 0, 0, 0, 0),
+                 (2000, 2, 30, 0, 0, 0, 0),
+                 (2000, 14, 1, 0, 0, 0, 0),
+                 (2000, -11, 1, 0, 0, 0, 0),
+                 (2000, 1, 1, -25, -61, -61, 0),
+                 (2000, 1, 1 + 10**6, 0, 0, 0, 0),
+                 (2000, 1, 1 - 10**6, 0, 0, 0, 0),
+                 (1, 1, 1, 0, -1, 0, 0),
+                 (9999, 12, 31, 23, 59, 60, 0)]
+        for args in cases:
+            datetime._pypydatetime = None
+            try:
+                t = datetime._tmxxx(*args)
+            finally:
+                datetime._pypydatetime = _pypydatetime
+            expected = (t.year, t.month, t.day, t.hour, t.minute, t.second,
+                        t.microsecond)
+            assert _pypydatetime.normalize(*args) == expected
+
+    def test_format(self):
+        import _pypydatetime
+        assert _pypydatetime.format_date(1, 2, 3) == '0001-02-03'
+        assert _pypydatetime.format_date(2013, 12, 31) == '2013-12-31'
+        assert _pypydatetime.format_time(1, 2, 3, 0) == '01:02:03'
+        assert _pypydatetime.format_time(23, 59, 59, 4) == '23:59:59.000004'
+        assert _pypydatetime.format_time(0, 0, 0, 999999) == '00:00:00.999999'
+
+    def test_strptime(self):
+        import _pypydatetime
+        from _strptime import _strptime
+        cases = [('2013-04-05 06:07:08', '%Y-%m-%d %H:%M:%S'),
+                 ('2013-04-05  \t6:7:8', '%Y-%m-%d %H:%M:%S'),
+                 ('2013-04-05t06:07:08.1', '%Y-%m-%dT%H:%M:%S.%f'),
+                 ('2013-04-05T06:07:08.123456', '%Y-%m-%dT%H:%M:%S.%f'),
+                 ('5/4/2013', '%d/%m/%Y'),
+                 ('23:59:61', '%H:%M:%S'),
+                 ('%2013', '%%%Y'),
+                 ('12', '%m'),
+                 ('', '')]
+        for s, fmt in cases:
+            struct, micros = _strptime(s, fmt)
+            expected = tuple(struct[0:6]) + (micros,)
+            assert _pypydatetime.strptime(s, fmt) == expected
+
+    def test_strptime_not_handled(self):
+        import _pypydatetime
+        cases = [('20130405', '%Y%m%d'),        # ambiguous
+                 ('2013-04-05', '%Y-%m-%d %H'), # no match
+                 ('2013-04-05 ', '%Y-%m-%d'),   # unconverted data
+                 ('2013-13-05', '%Y-%m-%d'),
+                 ('2013-00-05', '%Y-%m-%d'),
+                 ('2013-1-0', '%Y-%m-%d'),
+                 ('24:00', '%H:%M'),
+                 ('13-04-05', '%Y-%m-%d'),
+                 ('2013-04- 5', '%Y-%m-%d'),
+                 ('Apr 5', '%b %d'),
+                 ('12%', '%d%'),
+                 (u'2013', '%Y'),
+                 ('2013', u'%Y')]
+        for s, fmt in cases:
+            assert _pypydatetime.strptime(s, fmt) is None
+
+    def test_datetime_uses_it(self):
+        import datetime
+        d = datetime.datetime.strptime('2013-04-05 06:07:08.5',
+                                       '%Y-%m-%d %H:%M:%S.%f')
+        assert d == datetime.datetime(2013, 4, 5, 6, 7, 8, 500000)
+        assert d.isoformat() == '2013-04-05T06:07:08.500000'
+        assert str(d.date()) == '2013-04-05'
+        assert d + datetime.timedelta(days=300, seconds=-7) == (
+            datetime.datetime(2014, 1, 30, 6, 7, 1, 500000))
+        raises(ValueError, datetime.datetime.strptime, '2013-02-29',
+               '%Y-%m-%d')
+        raises(OverflowError, "datetime.date.max + datetime.timedelta(1)")
@@ -0,0 +1,15 @@
+import _pypyjson
+
+def iterload(f, items=False, chunksize=65536, shared_keys=False):
+    """Decode the utf8-encoded JSON text read from the file-like object f,
+    yielding each value as soon as it is complete.  See IncrementalDecoder
+    for the meaning of items and shared_keys."""
+    decoder = _pypyjson.IncrementalDecoder(items, shared_keys)
+    while True:
+        chunk = f.read(chunksize)
+        if not chunk:
+            break
+        for value in decoder.feed(chunk):
+            yield value
+    for value in decoder.close():
+        yield value
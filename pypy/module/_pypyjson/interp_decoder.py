@@ -2,10 +2,13 @@ import sys
 import math
 from rpython.rlib.rstring import StringBuilder
 from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rarithmetic import intmask
 from rpython.rlib import rfloat
 from rpython.rtyper.lltypesystem import lltype, rffi
 from pypy.interpreter.error import OperationError, operationerrfmt
-from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
 from pypy.interpreter import unicodehelper
 from rpython.rtyper.annlowlevel import llstr, hlunicode
 
@@ -45,12 +48,20 @@ def strslice2unicode_latin1(s, start, end):
         ll_res.chars[i] = cast_primitive(UniChar, ch)
     return hlunicode(ll_res)
 
-TYPE_UNKNOWN = 0
-TYPE_STRING = 1
+# size of the cache of the keys of the objects, must be a power of two
+KEY_CACHE_SIZE = 64
+
 class JSONDecoder(object):
-    def __init__(self, space, s):
+    def __init__(self, space, s, root_map=None):
         self.space = space
         self.s = s
+        # maps the raw text of the recently seen keys to their decoded
+        # W_UnicodeObject, indexed by a hash of the text.  Allocated lazily
+        self.key_cache_raw = None
+        self.key_cache_w = None
+        # if root_map is not None, all the objects with the same keys in the
+        # same order share their layout, see pypy/objspace/std/jsondict.py
+        self.root_map = root_map
         # we put our string in a raw buffer so:
         # 1) we automatically get the '\0' sentinel at the end of the string,
         #    which means that we never have to check for the "end of string"
@@ -58,7 +69,6 @@ class JSONDecoder(object):
         self.ll_chars = rffi.str2charp(s)
         self.end_ptr = lltype.malloc(rffi.CCHARPP.TO, 1, flavor='raw')
         self.pos = 0
-        self.last_type = TYPE_UNKNOWN
 
     def close(self):
         rffi.free_charp(self.ll_chars)
@@ -252,19 +262,17 @@ class JSONDecoder(object):
 
     def decode_object(self, i):
         start = i
-        w_dict = self.space.newdict()
         #
         i = self.skip_whitespace(i)
         if self.ll_chars[i] == '}':
             self.pos = i+1
-            return w_dict
+            return self.space.newdict()
         #
+        keys_w = []
+        values_w = []
         while True:
             # parse a key: value
-            self.last_type = TYPE_UNKNOWN
-            w_name = self.decode_any(i)
-            if self.last_type != TYPE_STRING:
-                self._raise("Key name must be string for object starting at char %d", start)
+            w_name = self.decode_key(i, start)
             i = self.skip_whitespace(self.pos)
             ch = self.ll_chars[i]
             if ch != ':':
@@ -273,13 +281,14 @@ class JSONDecoder(object):
             i = self.skip_whitespace(i)
             #
             w_value = self.decode_any(i)
-            self.space.setitem(w_dict, w_name, w_value)
+            keys_w.append(w_name)
+            values_w.append(w_value)
             i = self.skip_whitespace(self.pos)
             ch = self.ll_chars[i]
             i += 1
             if ch == '}':
                 self.pos = i
-                return w_dict
+                return self.make_dict(keys_w, values_w)
             elif ch == ',':
                 pass
             elif ch == '\0':
@@ -288,6 +297,60 @@ class JSONDecoder(object):
                 self._raise("Unexpected '%s' when decoding object (char %d)",
                             ch, self.pos)
 
+    def make_dict(self, keys_w, values_w):
+        if self.root_map is not None:
+            from pypy.objspace.std.jsondict import from_jsonmap_and_values
+            jsonmap = self.root_map
+            for w_name in keys_w:
+                jsonmap = jsonmap.get_next(w_name)
+                if jsonmap is None:
+                    break
+            else:
+                return from_jsonmap_and_values(self.space, jsonmap, values_w)
+        w_dict = self.space.newdict()
+        for i in range(len(keys_w)):
+            self.space.setitem(w_dict, keys_w[i], values_w[i])
+        return w_dict
+
+    def decode_key(self, i, objstart):
+        """Decode the key of an object. The keys which contain only ascii
+        chars and no escapes are looked up in the key cache first, so that
+        repeated keys are decoded only once."""
+        i = self.skip_whitespace(i)
+        if self.ll_chars[i] != '"':
+            self._raise("Key name must be string for object starting at char %d", objstart)
+        i += 1
+        start = i
+        h = 0
+        while True:
+            ch = self.ll_chars[i]
+            if ch == '"':
+                break
+            elif ch == '\\' or ch == '\0' or ord(ch) >= 0x80:
+                return self.decode_string(start)
+            h = intmask((h * 1000003) ^ ord(ch))
+            i += 1
+        index = h & (KEY_CACHE_SIZE - 1)
+        if self.key_cache_raw is None:
+            self.key_cache_raw = [None] * KEY_CACHE_SIZE
+            self.key_cache_w = [None] * KEY_CACHE_SIZE
+        else:
+            raw = self.key_cache_raw[index]
+            if raw is not None and self.samechars(raw, start, i):
+                self.pos = i + 1
+                return self.key_cache_w[index]
+        w_name = self.decode_string(start)
+        self.key_cache_raw[index] = self.getslice(start, i)
+        self.key_cache_w[index] = w_name
+        return w_name
+
+    def samechars(self, raw, start, end):
+        if len(raw) != end - start:
+            return False
+        for j in range(len(raw)):
+            if raw[j] != self.ll_chars[start + j]:
+                return False
+        return True
 
     def decode_string(self, i):
         start = i
@@ -308,7 +371,6 @@ class JSONDecoder(object):
                     # latin1, and we already checked that all the chars are <
                     # 128)
                     content_unicode = strslice2unicode_latin1(self.s, start, i-1)
-                self.last_type = TYPE_STRING
                 self.pos = i
                 return self.space.wrap(content_unicode)
             elif ch == '\\':
@@ -329,7 +391,6 @@ class JSONDecoder(object):
             if ch == '"':
                 content_utf8 = builder.build()
                 content_unicode = unicodehelper.decode_utf8(self.space, content_utf8)
-                self.last_type = TYPE_STRING
                 self.pos = i
                 return self.space.wrap(content_unicode)
             elif ch == '\\':
@@ -386,12 +447,12 @@ class JSONDecoder(object):
         lowsurr = int(hexdigits, 16) # the possible ValueError is caugth by the caller
         return 0x10000 + (((highsurr - 0xd800) << 10) | (lowsurr - 0xdc00))
 
-def loads(space, w_s):
-    if space.isinstance_w(w_s, space.w_unicode):
-        raise OperationError(space.w_TypeError,
-                             space.wrap("Expected utf8-encoded str, got unicode"))
-    s = space.str_w(w_s)
-    decoder = JSONDecoder(space, s)
+def new_root_map(space):
+    from pypy.objspace.std.jsondict import JSONMap
+    return JSONMap(space, None, None)
+
+def _decode_whole(space, s, root_map=None):
+    decoder = JSONDecoder(space, s, root_map)
     try:
         w_res = decoder.decode_any(0)
         i = decoder.skip_whitespace(decoder.pos)
@@ -402,3 +463,207 @@ def loads(space, w_s):
         return w_res
     finally:
         decoder.close()
+
+@unwrap_spec(shared_keys=bool)
+def loads(space, w_s, shared_keys=False):
+    """loads(s, shared_keys=False) -> decoded object
+
+    If shared_keys is true, all the objects of the document which have the
+    same keys in the same order share the memory used for the keys."""
+    if space.isinstance_w(w_s, space.w_unicode):
+        raise OperationError(space.w_TypeError,
+                             space.wrap("Expected utf8-encoded str, got unicode"))
+    s = space.str_w(w_s)
+    root_map = None
+    if shared_keys:
+        root_map = new_root_map(space)
+    return _decode_whole(space, s, root_map)
+
+
+# states of the scanner of W_IncrementalDecoder, when it is not inside a value
+ARRAY_START = 0     # items mode: waiting for the opening '['
+ARRAY_FIRST = 1     # items mode: waiting for the first item or ']'
+ARRAY_COMMA = 2     # items mode: waiting for ',' or ']'
+ARRAY_ITEM = 3      # items mode: waiting for an item after a ','
+ARRAY_DONE = 4      # items mode: after the closing ']'
+TOPLEVEL = 5        # stream mode: waiting for the next top-level value
+
+def is_scalar_end(ch):
+    return (is_whitespace(ch) or ch == ',' or ch == ']' or ch == '}' or
+            ch == '[' or ch == '{' or ch == '"')
+
+class W_IncrementalDecoder(W_Root):
+    """Decode a JSON stream which is fed chunk by chunk.
+
+    A small scanner finds where each value ends, keeping track only of the
+    nesting depth and of strings; the text of a value is kept only until it
+    is complete, and then it is decoded by a normal JSONDecoder.  This means
+    that the memory needed is bounded by the size of the largest value, not
+    by the size of the whole input.
+
+    In stream mode the input is a sequence of whitespace-separated values
+    (e.g. newline-delimited JSON); in items mode the input is a single
+    array, and its items are returned one by one.
+    """
+
+    def __init__(self, space, items, shared_keys):
+        self.space = space
+        self.items = items
+        self.root_map = None
+        if shared_keys:
+            self.root_map = new_root_map(space)
+        if items:
+            self.state = ARRAY_START
+        else:
+            self.state = TOPLEVEL
+        self.parts = []         # text of the current value, if incomplete
+        self.in_value = False
+        self.in_scalar = False
+        self.in_string = False
+        self.escaped = False
+        self.depth = 0
+        self.consumed = 0       # number of chars fed before the current chunk
+
+    @specialize.arg(1)
+    def _raise(self, msg, *args):
+        raise operationerrfmt(self.space.w_ValueError, msg, *args)
+
+    def _value_done(self, s, start, end, result_w):
+        self.parts.append(s[start:end])
+        text = ''.join(self.parts)
+        self.parts = []
+        self.in_value = False
+        self.in_scalar = False
+        if self.items:
+            self.state = ARRAY_COMMA
+        result_w.append(_decode_whole(self.space, text, self.root_map))
+
+    def _start_value(self, ch):
+        self.in_value = True
+        if ch == '[' or ch == '{':
+            self.depth = 1
+        elif ch == '"':
+            self.depth = 0
+            self.in_string = True
+        else:
+            self.in_scalar = True
+
+    def _outside_value(self, ch, i):
+        """Process the non-whitespace char ch which is not part of a value.
+        Return True if ch is the first char of a new value."""
+        state = self.state
+        if state == TOPLEVEL:
+            return True
+        if state == ARRAY_START:
+            if ch != '[':
+                self._raise("Expected '[' at char %d", self.consumed + i)
+            self.state = ARRAY_FIRST
+        elif state == ARRAY_COMMA:
+            if ch == ',':
+                self.state = ARRAY_ITEM
+            elif ch == ']':
+                self.state = ARRAY_DONE
+            else:
+                self._raise("Unexpected '%s' when decoding array (char %d)",
+                            ch, self.consumed + i)
+        elif state == ARRAY_FIRST and ch == ']':
+            self.state = ARRAY_DONE
+        elif state == ARRAY_DONE:
+            self._raise("Extra data: char %d", self.consumed + i)
+        elif ch == ']' or ch == ',':
+            self._raise("Unexpected '%s' when decoding array (char %d)",
+                        ch, self.consumed + i)
+        else:
+            return True
+        return False
+
+    def feed(self, space, s):
+        result_w = []
+        start = 0     # where the text of the current value starts in s
+        i = 0
+        length = len(s)
+        while i < length:
+            ch = s[i]
+            if not self.in_value:
+                if not is_whitespace(ch) and self._outside_value(ch, i):
+                    self._start_value(ch)
+                    start = i
+                i += 1
+            elif self.in_scalar:
+                if is_scalar_end(ch):
+                    # the char is not part of the scalar: process it again
+                    self._value_done(s, start, i, result_w)
+                else:
+                    i += 1
+            elif self.in_string:
+                i += 1
+                if self.escaped:
+                    self.escaped = False
+                elif ch == '\\':
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.depth == 0:
+                        self._value_done(s, start, i, result_w)
+            else:
+                i += 1
+                if ch == '"':
+                    self.in_string = True
+                elif ch == '[' or ch == '{':
+                    self.depth += 1
+                elif ch == ']' or ch == '}':
+                    self.depth -= 1
+                    if self.depth == 0:
+                        self._value_done(s, start, i, result_w)
+        if self.in_value:
+            self.parts.append(s[start:])
+        self.consumed += length
+        return result_w
+
+    def descr_feed(self, space, w_s):
+        """feed(s) -> list of the values which have been completed by s"""
+        if space.isinstance_w(w_s, space.w_unicode):
+            raise OperationError(space.w_TypeError,
+                                 space.wrap("Expected utf8-encoded str, got unicode"))
+        return space.newlist(self.feed(space, space.str_w(w_s)))
+
+    def descr_close(self, space):
+        """close() -> list of the values still pending at the end of the
+        input.  Raise ValueError if the input is incomplete."""
+        result_w = []
+        if self.in_value:
+            if self.in_scalar:
+                self._value_done('', 0, 0, result_w)
+            else:
+                # let the decoder report the proper error
+                text = ''.join(self.parts)
+                self.parts = []
+                self.in_value = False
+                result_w.append(_decode_whole(space, text))
+        if self.items and self.state != ARRAY_DONE:
+            if self.state == ARRAY_START:
+                self._raise("No JSON object could be decoded")
+            self._raise("Unterminated array")
+        return space.newlist(result_w)
+
+@unwrap_spec(items=bool, shared_keys=bool)
+def W_IncrementalDecoder___new__(space, w_subtype, items=False,
+                                 shared_keys=False):
+    w_dec = space.allocate_instance(W_IncrementalDecoder, w_subtype)
+    W_IncrementalDecoder.__init__(space.interp_w(W_IncrementalDecoder, w_dec),
+                                  space, items, shared_keys)
+    return w_dec
+
+W_IncrementalDecoder.typedef = TypeDef(
+    'IncrementalDecoder',
+    __module__ = '_pypyjson',
+    __new__ = interp2app(W_IncrementalDecoder___new__),
+    feed = interp2app(W_IncrementalDecoder.descr_feed),
+    close = interp2app(W_IncrementalDecoder.descr_close),
+    __doc__ = """IncrementalDecoder(items=False, shared_keys=False)
+
+Decode utf8-encoded JSON text which is passed in chunks to feed(). If items
+is false, the text is a sequence of whitespace-separated values and each of
+them is returned as soon as it is complete; if items is true, the text is a
+single array and its items are returned one by one. shared_keys has the
+same meaning as for loads(), for all the values of the stream.""")
@@ -0,0 +1,341 @@
+from rpython.rlib.rstring import StringBuilder
+from rpython.rlib.rfloat import isnan, isinf
+from rpython.rlib.listsort import make_timsort_class
+from pypy.interpreter.baseobjspace import W_Root
+from pypy.interpreter.error import OperationError, operationerrfmt
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.interpreter.typedef import TypeDef
+from pypy.interpreter import unicodehelper
+from pypy.objspace.std.floatobject import float2string
+
+HEX = '0123456789abcdef'
+
+ESCAPE_DICT = {
+    '\b': '\\b',
+    '\f': '\\f',
+    '\n': '\\n',
+    '\r': '\\r',
+    '\t': '\\t',
+}
+ESCAPE_BEFORE_SPACE = [ESCAPE_DICT.get(chr(_i), '\\u%04x' % _i)
+                       for _i in range(32)]
+
+StringKeySort = make_timsort_class()
+
+
+def first_char_to_escape(s):
+    """Return the index of the first char of s which cannot be copied
+    verbatim into an ascii-only JSON string, or -1 if there is none.
+    """
+    for i in range(len(s)):
+        ch = s[i]
+        if ch < ' ' or ch > '~' or ch == '"' or ch == '\\':
+            return i
+    return -1
+
+def append_u4(builder, x):
+    builder.append('\\u')
+    builder.append(HEX[(x >> 12) & 0xf])
+    builder.append(HEX[(x >> 8) & 0xf])
+    builder.append(HEX[(x >> 4) & 0xf])
+    builder.append(HEX[x & 0xf])
+
+def append_unicode_escaped(builder, u, start):
+    for i in range(start, len(u)):
+        c = ord(u[i])
+        if c <= ord('~'):
+            if c == ord('"') or c == ord('\\'):
+                builder.append('\\')
+            elif c < ord(' '):
+                builder.append(ESCAPE_BEFORE_SPACE[c])
+                continue
+            builder.append(chr(c))
+        else:
+            if c >= 0x10000:
+                # surrogate pair
+                n = c - 0x10000
+                append_u4(builder, 0xd800 | ((n >> 10) & 0x3ff))
+                c = 0xdc00 | (n & 0x3ff)
+            append_u4(builder, c)
+
+def append_str_escaped(space, builder, s):
+    """Append the utf-8 string s to builder, escaped as the body of an
+    ascii-only JSON string.
+    """
+    first = first_char_to_escape(s)
+    if first == -1:
+        builder.append(s)
+        return
+    for i in range(first, len(s)):
+        if ord(s[i]) >= 0x80:
+            # not ascii: decode it, the prefix does not change
+            builder.append_slice(s, 0, first)
+            u = unicodehelper.decode_utf8(space, s)
+            append_unicode_escaped(builder, u, first)
+            return
+    builder.append_slice(s, 0, first)
+    for i in range(first, len(s)):
+        ch = s[i]
+        if ch == '"' or ch == '\\':
+            builder.append('\\')
+        elif ch < ' ':
+            builder.append(ESCAPE_BEFORE_SPACE[ord(ch)])
+            continue
+        elif ch > '~':
+            append_u4(builder, ord(ch))
+            continue
+        builder.append(ch)
+
+def append_basestring_escaped(space, builder, w_string):
+    if space.isinstance_w(w_string, space.w_str):
+        append_str_escaped(space, builder, space.str_w(w_string))
+    else:
+        append_unicode_escaped(builder, space.unicode_w(w_string), 0)
+
+
+def raw_encode_basestring_ascii(space, w_string):
+    if space.isinstance_w(w_string, space.w_str):
+        s = space.str_w(w_string)
+        if first_char_to_escape(s) == -1:
+            # the input is a string with only non-special ascii chars
+            return w_string
+        builder = StringBuilder(len(s) + 16)
+        append_str_escaped(space, builder, s)
+    else:
+        u = space.unicode_w(w_string)
+        builder = StringBuilder(len(u) + 16)
+        append_unicode_escaped(builder, u, 0)
+    return space.wrap(builder.build())
+
+
+class W_JSONEncoder(W_Root):
+    """Interp-level equivalent of the C encoder of CPython's _json: it
+    walks dicts, lists and tuples directly, looking at the unwrapped
+    storage of the strategies whenever possible, and writes everything
+    into a single StringBuilder.  The output is always ascii-only.
+    """
+
+    def __init__(self, space, w_default, indent, key_separator,
+                 item_separator, sort_keys, skipkeys, allow_nan,
+                 check_circular):
+        self.space = space
+        self.w_default = w_default
+        self.indent = indent    # -1 means no indentation
+        self.key_separator = key_separator
+        self.item_separator = item_separator
+        self.sort_keys = sort_keys
+        self.skipkeys = skipkeys
+        self.allow_nan = allow_nan
+        self.check_circular = check_circular
+
+    def descr_encode(self, space, w_obj):
+        """encode(obj) -> str: return the JSON representation of obj"""
+        builder = StringBuilder()
+        if self.check_circular:
+            markers = {}
+        else:
+            markers = None
+        self.encode_any(builder, w_obj, markers, 0)
+        return space.wrap(builder.build())
+
+    def mark(self, markers, w_obj):
+        if markers is not None:
+            if w_obj in markers:
+                raise OperationError(self.space.w_ValueError,
+                                     self.space.wrap("Circular reference detected"))
+            markers[w_obj] = None
+
+    def unmark(self, markers, w_obj):
+        if markers is not None:
+            del markers[w_obj]
+
+    def floatstr(self, x, w_obj):
+        if isnan(x):
+            text = 'NaN'
+        elif isinf(x):
+            if x > 0.0:
+                text = 'Infinity'
+            else:
+                text = '-Infinity'
+        elif w_obj is None or self.space.is_w(self.space.type(w_obj),
+                                              self.space.w_float):
+            return float2string(x, 'r', 0)
+        else:
+            return self.space.str_w(self.space.repr(w_obj))
+        if not self.allow_nan:
+            raise operationerrfmt(self.space.w_ValueError,
+                "Out of range float values are not JSON compliant: %s",
+                float2string(x, 'r', 0))
+        return text
+
+    def newline_indent(self, builder, level):
+        builder.append('\n')
+        builder.append_multiple_char(' ', self.indent * level)
+
+    def encode_any(self, builder, w_obj, markers, level):
+        space = self.space
+        if space.isinstance_w(w_obj, space.w_basestring):
+            builder.append('"')
+            append_basestring_escaped(space, builder, w_obj)
+            builder.append('"')
+        elif space.is_w(w_obj, space.w_None):
+            builder.append('null')
+        elif space.is_w(w_obj, space.w_True):
+            builder.append('true')
+        elif space.is_w(w_obj, space.w_False):
+            builder.append('false')
+        elif space.is_w(space.type(w_obj), space.w_int):
+            builder.append(str(space.int_w(w_obj)))
+        elif (space.isinstance_w(w_obj, space.w_int) or
+              space.isinstance_w(w_obj, space.w_long)):
+            builder.append(space.str_w(space.str(w_obj)))
+        elif space.isinstance_w(w_obj, space.w_float):
+            builder.append(self.floatstr(space.float_w(w_obj), w_obj))
+        elif (space.isinstance_w(w_obj, space.w_list) or
+              space.isinstance_w(w_obj, space.w_tuple)):
+            self.encode_list(builder, w_obj, markers, level)
+        elif space.isinstance_w(w_obj, space.w_dict):
+            self.encode_dict(builder, w_obj, markers, level)
+        else:
+            self.mark(markers, w_obj)
+            w_res = space.call_function(self.w_default, w_obj)
+            self.encode_any(builder, w_res, markers, level)
+            self.unmark(markers, w_obj)
+
+    def encode_list(self, builder, w_list, markers, level):
+        space = self.space
+        if space.len_w(w_list) == 0:
+            builder.append('[]')
+            return
+        self.mark(markers, w_list)
+        builder.append('[')
+        if self.indent >= 0:
+            level += 1
+            self.newline_indent(builder, level)
+        intlist = space.listview_int(w_list)
+        if intlist is not None:
+            for i in range(len(intlist)):
+                if i > 0:
+                    self.item_separator_indent(builder, level)
+                builder.append(str(intlist[i]))
+        else:
+            floatlist = space.listview_float(w_list)
+            if floatlist is not None:
+                for i in range(len(floatlist)):
+                    if i > 0:
+                        self.item_separator_indent(builder, level)
+                    builder.append(self.floatstr(floatlist[i], None))
+            else:
+                items_w = space.fixedview(w_list)
+                for i in range(len(items_w)):
+                    if i > 0:
+                        self.item_separator_indent(builder, level)
+                    self.encode_any(builder, items_w[i], markers, level)
+        if self.indent >= 0:
+            level -= 1
+            self.newline_indent(builder, level)
+        builder.append(']')
+        self.unmark(markers, w_list)
+
+    def item_separator_indent(self, builder, level):
+        builder.append(self.item_separator)
+        if self.indent >= 0:
+            self.newline_indent(builder, level)
+
+    def encode_dict(self, builder, w_dict, markers, level):
+        space = self.space
+        if space.len_w(w_dict) == 0:
+            builder.append('{}')
+            return
+        self.mark(markers, w_dict)
+        builder.append('{')
+        if self.indent >= 0:
+            level += 1
+            self.newline_indent(builder, level)
+        keys, values_w = space.view_as_kwargs(w_dict)
+        if keys is not None:
+            # string-keyed dict: the keys are never boxed
+            if self.sort_keys:
+                keys = keys[:]
+                StringKeySort(keys, len(keys)).sort()
+                values_w = [space.finditem_str(w_dict, key) for key in keys]
+            for i in range(len(keys)):
+                if i > 0:
+                    self.item_separator_indent(builder, level)
+                builder.append('"')
+                append_str_escaped(space, builder, keys[i])
+                builder.append('"')
+                builder.append(self.key_separator)
+                self.encode_any(builder, values_w[i], markers, level)
+        else:
+            self.encode_generic_dict_items(builder, w_dict, markers, level)
+        if self.indent >= 0:
+            level -= 1
+            self.newline_indent(builder, level)
+        builder.append('}')
+        self.unmark(markers, w_dict)
+
+    def encode_generic_dict_items(self, builder, w_dict, markers, level):
+        space = self.space
+        if self.sort_keys:
+            w_keys = space.call_method(w_dict, 'keys')
+            space.call_method(w_keys, 'sort')
+            keys_w = space.fixedview(w_keys)
+            values_w = [space.getitem(w_dict, w_key) for w_key in keys_w]
+        else:
+            items_w = space.fixedview(space.call_method(w_dict, 'items'))
+            keys_w = [None] * len(items_w)
+            values_w = [None] * len(items_w)
+            for i in range(len(items_w)):
+                keys_w[i], values_w[i] = space.fixedview(items_w[i], 2)
+        first = True
+        for i in range(len(keys_w)):
+            w_key = keys_w[i]
+            if space.isinstance_w(w_key, space.w_basestring):
+                key = None
+            elif space.isinstance_w(w_key, space.w_float):
+                key = self.floatstr(space.float_w(w_key), w_key)
+            elif space.is_w(w_key, space.w_True):
+                key = 'true'
+            elif space.is_w(w_key, space.w_False):
+                key = 'false'
+            elif space.is_w(w_key, space.w_None):
+                key = 'null'
+            elif (space.isinstance_w(w_key, space.w_int) or
+                  space.isinstance_w(w_key, space.w_long)):
+                key = space.str_w(space.str(w_key))
+            elif self.skipkeys:
+                continue
+            else:
+                raise operationerrfmt(space.w_TypeError,
+                                      "key %s is not a string",
+                                      space.str_w(space.repr(w_key)))
+            if first:
+                first = False
+            else:
+                self.item_separator_indent(builder, level)
+            builder.append('"')
+            if key is None:
+                append_basestring_escaped(space, builder, w_key)
+            else:
+                append_str_escaped(space, builder, key)
+            builder.append('"')
+            builder.append(self.key_separator)
+            self.encode_any(builder, values_w[i], markers, level)
+
+
+@unwrap_spec(indent=int, key_separator=str, item_separator=str,
+             sort_keys=bool, skipkeys=bool, allow_nan=bool,
+             check_circular=bool)
+def make_encoder(space, w_default, indent, key_separator, item_separator,
+                 sort_keys, skipkeys, allow_nan, check_circular):
+    return W_JSONEncoder(space, w_default, indent, key_separator,
+                         item_separator, sort_keys, skipkeys, allow_nan,
+                         check_circular)
+
+W_JSONEncoder.typedef = TypeDef(
+    'Encoder',
+    __module__ = '_pypyjson',
+    encode = interp2app(W_JSONEncoder.descr_encode),
+)
+W_JSONEncoder.typedef.acceptable_as_base_class = False
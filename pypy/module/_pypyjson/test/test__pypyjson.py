@@ -14,7 +14,8 @@ def test_skip_whitespace():
     
 
 class AppTest(object):
-    spaceconfig = {"objspace.usemodules._pypyjson": True}
+    spaceconfig = {"usemodules": ["_pypyjson", "struct", "binascii", "_sre",
+                                  "__pypy__"]}
 
     def test_raise_on_unicode(self):
         import _pypyjson
@@ -186,3 +187,210 @@ class AppTest(object):
         assert res == expected
 
 
+
+    def test_keys_are_cached(self):
+        import _pypyjson
+        l = _pypyjson.loads('[{"a": 1, "b\\n": 2}, {"a": 3, "b\\n": 4}]')
+        assert l == [{u'a': 1, u'b\n': 2}, {u'a': 3, u'b\n': 4}]
+        assert type(l[0].keys()[0]) is unicode
+        ka = [k for k in l[0] if k == u'a'][0]
+        kb = [k for k in l[1] if k == u'a'][0]
+        assert ka is kb
+
+    def test_decode_object_duplicate_keys(self):
+        import _pypyjson
+        for shared in [False, True]:
+            d = _pypyjson.loads('{"a": 1, "b": 2, "a": 3}', shared_keys=shared)
+            assert d == {u'a': 3, u'b': 2}
+
+    def test_shared_keys(self):
+        import _pypyjson, __pypy__
+        s = '[{"a": 1, "b": [2]}, {"a": 3, "b": 4}, {"b": 5, "a": 6}]'
+        l = _pypyjson.loads(s, shared_keys=True)
+        assert l == [{u'a': 1, u'b': [2]}, {u'a': 3, u'b': 4},
+                     {u'a': 6, u'b': 5}]
+        assert 'JSONDictStrategy' in __pypy__.dictstrategy(l[0])
+        assert l[0].keys() == [u'a', u'b']
+        assert l[2].keys() == [u'b', u'a']
+        assert l[1].items() == [(u'a', 3), (u'b', 4)]
+        assert l[1][u'b'] == 4
+        assert u'c' not in l[1]
+        assert 42 not in l[1]
+        l[1][u'a'] = 7
+        assert l[1] == {u'a': 7, u'b': 4}
+        assert l[0] == {u'a': 1, u'b': [2]}
+        assert 'JSONDictStrategy' in __pypy__.dictstrategy(l[1])
+        l[1][u'c'] = 8
+        assert l[1] == {u'a': 7, u'b': 4, u'c': 8}
+        assert 'JSONDictStrategy' not in __pypy__.dictstrategy(l[1])
+        assert l[0].keys() == [u'a', u'b']
+        del l[2][u'a']
+        assert l[2] == {u'b': 5}
+        assert l[0] == {u'a': 1, u'b': [2]}
+        assert l[0]['a'] == 1
+
+    def test_shared_keys_incremental(self):
+        import _pypyjson, __pypy__
+        dec = _pypyjson.IncrementalDecoder(shared_keys=True)
+        res = dec.feed('{"x": 1, "y": 2}\n{"x": 3, "y": 4}\n')
+        assert res == [{u'x': 1, u'y': 2}, {u'x': 3, u'y': 4}]
+        assert 'JSONDictStrategy' in __pypy__.dictstrategy(res[1])
+
+    def test_shared_keys_many_layouts(self):
+        import _pypyjson, __pypy__
+        dec = _pypyjson.IncrementalDecoder(shared_keys=True)
+        for i in range(100):
+            [d] = dec.feed('{"k%d": %d}\n' % (i, i))
+            assert d == {u'k%d' % i: i}
+        assert 'JSONDictStrategy' not in __pypy__.dictstrategy(d)
+        [d] = dec.feed('{"k0": 5}\n')
+        assert d == {u'k0': 5}
+        assert 'JSONDictStrategy' in __pypy__.dictstrategy(d)
+
+    def test_incremental_decoder(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder()
+        assert dec.feed('{"a": [1, "x]') == []
+        assert dec.feed('"]} 42 ') == [{u'a': [1, u'x]']}, 42]
+        assert dec.feed('"hel') == []
+        assert dec.feed('lo\\"" [') == [u'hello"']
+        assert dec.feed('') == []
+        assert dec.feed(']\n1') == [[]]
+        assert dec.feed('2') == []
+        assert dec.close() == [12]
+
+    def test_incremental_decoder_byte_by_byte(self):
+        import _pypyjson
+        s = '{"a": {"b": [1, 2.5, "c\\\\"]}} null true\n"\xc3\xa9" [3]'
+        dec = _pypyjson.IncrementalDecoder()
+        res = []
+        for ch in s:
+            res.extend(dec.feed(ch))
+        res.extend(dec.close())
+        assert res == [{u'a': {u'b': [1, 2.5, u'c\\']}}, None, True,
+                       u'\xe9', [3]]
+
+    def test_incremental_decoder_items(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        assert dec.feed(' [1, {"a"') == [1]
+        assert dec.feed(': [2]}, "x"') == [{u'a': [2]}, u'x']
+        assert dec.feed(', 3') == []
+        assert dec.feed(']  ') == [3]
+        assert dec.close() == []
+        #
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        assert dec.feed('[ ]') == []
+        assert dec.close() == []
+
+    def test_incremental_decoder_errors(self):
+        import _pypyjson
+        dec = _pypyjson.IncrementalDecoder()
+        dec.feed('[1, 2')
+        raises(ValueError, dec.close)
+        dec = _pypyjson.IncrementalDecoder()
+        raises(ValueError, dec.feed, '[1}')
+        raises(TypeError, dec.feed, u'[1]')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '{}')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '[1 2]')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '[1,,2]')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        raises(ValueError, dec.feed, '[1] 2')
+        dec = _pypyjson.IncrementalDecoder(items=True)
+        dec.feed('[1, 2')
+        raises(ValueError, dec.close)
+
+    def test_iterload(self):
+        import _pypyjson, StringIO
+        f = StringIO.StringIO('{"a": 1}\n{"a": 2}\n')
+        assert list(_pypyjson.iterload(f, chunksize=3)) == [{u'a': 1},
+                                                            {u'a': 2}]
+        f = StringIO.StringIO('[1, [2], "3"]')
+        assert list(_pypyjson.iterload(f, items=True, chunksize=2)) == [
+            1, [2], u'3']
+
+    def test_raw_encode_basestring_ascii(self):
+        import _pypyjson
+        def check(s):
+            s = _pypyjson.raw_encode_basestring_ascii(s)
+            assert type(s) is str
+            return s
+        assert check("") == ""
+        assert check(u"") == ""
+        assert check("abc ") == "abc "
+        assert check(u"abc ") == "abc "
+        raises(UnicodeDecodeError, check, "\xc0")
+        assert check("\xc2\x84") == "\\u0084"
+        assert check("\xf0\x92\x8d\x85") == "\\ud808\\udf45"
+        assert check(u"\U00012345") == "\\ud808\\udf45"
+        assert check("a\"c") == "a\\\"c"
+        assert check("\\\"\b\f\n\r\t") == '\\\\\\"\\b\\f\\n\\r\\t'
+        assert check("\x07") == "\\u0007"
+        assert check("\x7f") == "\\u007f"
+
+    def test_make_encoder(self):
+        import _pypyjson
+        def encode(obj, default=None, indent=-1, key_separator=': ',
+                   item_separator=', ', sort_keys=False, skipkeys=False,
+                   allow_nan=True, check_circular=True):
+            enc = _pypyjson.make_encoder(default, indent, key_separator,
+                                         item_separator, sort_keys, skipkeys,
+                                         allow_nan, check_circular)
+            return enc.encode(obj)
+        assert encode(None) == 'null'
+        assert encode(True) == 'true'
+        assert encode(False) == 'false'
+        assert encode(42) == '42'
+        assert encode(1 << 70) == str(1 << 70)
+        assert encode(1.5) == '1.5'
+        assert encode(float('inf')) == 'Infinity'
+        assert encode(float('-inf')) == '-Infinity'
+        assert encode(float('nan')) == 'NaN'
+        raises(ValueError, encode, float('nan'), allow_nan=False)
+        assert encode(u'\u1234"') == '"\\u1234\\""'
+        assert encode([]) == '[]'
+        assert encode({}) == '{}'
+        assert encode([1, 2, 3]) == '[1, 2, 3]'
+        assert encode([1.5, -2.0]) == '[1.5, -2.0]'
+        assert encode(["a", None, 1.5, (2,)]) == '["a", null, 1.5, [2]]'
+        assert encode({"a": [1, 2]}) == '{"a": [1, 2]}'
+        assert encode({"b": 1, "a": 2, "c": 3},
+                      sort_keys=True) == '{"a": 2, "b": 1, "c": 3}'
+        assert encode({2: 1, 1: 2}, sort_keys=True) == '{"1": 2, "2": 1}'
+        assert encode({1.5: 1, None: 2, True: 3}, sort_keys=True) == (
+            '{"null": 2, "true": 3, "1.5": 1}')
+        raises(TypeError, encode, {(1, 2): 3})
+        assert encode({(1, 2): 3, "a": 4}, skipkeys=True) == '{"a": 4}'
+        assert encode([1, {"a": 2}], indent=2) == (
+            '[\n  1, \n  {\n    "a": 2\n  }\n]')
+        assert encode([1, 2], item_separator=',') == '[1,2]'
+        assert encode({"a": 1}, key_separator=':') == '{"a":1}'
+
+    def test_make_encoder_default_and_circular(self):
+        import _pypyjson
+        def default(o):
+            if isinstance(o, set):
+                return sorted(o)
+            raise TypeError(repr(o) + " is not JSON serializable")
+        enc = _pypyjson.make_encoder(default, -1, ': ', ', ',
+                                     False, False, True, True)
+        assert enc.encode({"s": set([2, 1])}) == '{"s": [1, 2]}'
+        raises(TypeError, enc.encode, object())
+        l = []
+        l.append(l)
+        raises(ValueError, enc.encode, l)
+        d = {}
+        d["d"] = [d]
+        raises(ValueError, enc.encode, d)
+        x = [1]
+        assert enc.encode([x, x]) == '[[1], [1]]'
+
+    def test_json_dumps_uses_encoder(self):
+        import json
+        assert json.dumps({"a": [1, 2.5, u"\xe9"]}) == (
+            '{"a": [1, 2.5, "\\u00e9"]}')
+        assert json.dumps([1, 2], indent=1) == '[\n 1, \n 2\n]'
+        assert json.dumps(u"\xe9", ensure_ascii=False) == u'"\xe9"'
@@ -0,0 +1,13 @@
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    """fast paths for the cPickle module"""
+
+    appleveldefs = {
+        }
+
+    interpleveldefs = {
+        'dumps' : 'interp_pickle.dumps',
+        'loads' : 'interp_pickle.loads',
+        'Unsupported' : 'space.fromcache(interp_pickle.Cache).w_unsupported',
+        }
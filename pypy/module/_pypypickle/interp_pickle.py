@@ -0,0 +1,726 @@
+from rpython.rlib.rstring import StringBuilder, ParseStringError
+from rpython.rlib.rstring import replace
+from rpython.rlib.objectmodel import compute_unique_id
+from rpython.rlib.rbigint import rbigint
+from rpython.rlib.rfloat import string_to_float
+from rpython.rlib.rstruct.ieee import pack_float, unpack_float
+from rpython.rlib import runicode
+from pypy.interpreter.error import OperationError
+from pypy.interpreter.gateway import unwrap_spec
+from pypy.interpreter import unicodehelper
+from pypy.interpreter.pyparser.parsestring import PyString_DecodeEscape
+from pypy.objspace.std.floatobject import float2string
+from pypy.objspace.std.inttype import string_to_int_or_long
+from pypy.objspace.std.stringobject import string_escape_encode
+
+# the opcodes, see lib-python/2.7/pickle.py
+MARK            = '('
+STOP            = '.'
+POP             = '0'
+POP_MARK        = '1'
+DUP             = '2'
+FLOAT           = 'F'
+INT             = 'I'
+BININT          = 'J'
+BININT1         = 'K'
+LONG            = 'L'
+BININT2         = 'M'
+NONE            = 'N'
+STRING          = 'S'
+BINSTRING       = 'T'
+SHORT_BINSTRING = 'U'
+UNICODE         = 'V'
+BINUNICODE      = 'X'
+APPEND          = 'a'
+DICT            = 'd'
+EMPTY_DICT      = '}'
+APPENDS         = 'e'
+GET             = 'g'
+BINGET          = 'h'
+LONG_BINGET     = 'j'
+LIST            = 'l'
+EMPTY_LIST      = ']'
+PUT             = 'p'
+BINPUT          = 'q'
+LONG_BINPUT     = 'r'
+SETITEM         = 's'
+TUPLE           = 't'
+EMPTY_TUPLE     = ')'
+SETITEMS        = 'u'
+BINFLOAT        = 'G'
+PROTO           = '\x80'
+TUPLE1          = '\x85'
+TUPLE2          = '\x86'
+TUPLE3          = '\x87'
+NEWTRUE         = '\x88'
+NEWFALSE        = '\x89'
+LONG1           = '\x8a'
+LONG4           = '\x8b'
+
+TUPLESIZE2CODE = [EMPTY_TUPLE, TUPLE1, TUPLE2, TUPLE3]
+
+HIGHEST_PROTOCOL = 2
+
+# must be the same as pickle.Pickler._BATCHSIZE
+BATCHSIZE = 1000
+
+
+class Unsupported(Exception):
+    """ Raised when the input contains something that only the app-level
+    Pickler or Unpickler of lib_pypy/cPickle.py knows how to handle.  The
+    caller then starts again from scratch at app-level. """
+
+
+class Cache:
+    def __init__(self, space):
+        self.w_unsupported = space.new_exception_class(
+            "_pypypickle.Unsupported")
+
+def unsupported(space):
+    return OperationError(space.fromcache(Cache).w_unsupported, space.w_None)
+
+
+def append_int4(builder, x):
+    # struct.pack("<i", x)
+    builder.append(chr(x & 0xff))
+    builder.append(chr((x >> 8) & 0xff))
+    builder.append(chr((x >> 16) & 0xff))
+    builder.append(chr((x >> 24) & 0xff))
+
+def unpack_int4(s, pos):
+    # struct.unpack("<i", s[pos:pos+4])[0]
+    high = ord(s[pos + 3])
+    if high >= 0x80:
+        high -= 0x100
+    return (ord(s[pos]) | (ord(s[pos + 1]) << 8) | (ord(s[pos + 2]) << 16) |
+            (high << 24))
+
+
+class Pickler(object):
+    """ Produces exactly the same output as dumps() in lib_pypy/cPickle.py,
+    for the objects of the builtin types None, bool, int, long, float, str,
+    unicode, tuple, list and dict.  Like the memo of the app-level Pickler,
+    the memo is keyed by what id() returns: for str and unicode this is the
+    identity of the unwrapped string, which means that the unwrapped items
+    of the lists and dicts with a str or unicode strategy can be written
+    without being boxed.  Raises Unsupported for anything else. """
+
+    def __init__(self, space, proto):
+        self.space = space
+        self.proto = proto
+        self.bin = proto >= 1
+        self.builder = StringBuilder()
+        self.memo = {}       # unique id -> memo index
+        self.memo_len = 1    # cPickle starts counting at one
+
+    def dump(self, w_obj):
+        if self.proto >= 2:
+            self.builder.append(PROTO)
+            self.builder.append(chr(self.proto))
+        self.save(w_obj)
+        self.builder.append(STOP)
+        return self.builder.build()
+
+    # ____________________________________________________________
+    # memo
+
+    def put_next(self):
+        i = self.memo_len
+        self.memo_len = i + 1
+        if self.bin:
+            if i < 256:
+                self.builder.append(BINPUT)
+                self.builder.append(chr(i))
+            else:
+                self.builder.append(LONG_BINPUT)
+                append_int4(self.builder, i)
+        else:
+            self.builder.append(PUT)
+            self.builder.append(str(i))
+            self.builder.append('\n')
+
+    def memoize(self, uid):
+        self.memo[uid] = self.memo_len
+        self.put_next()
+
+    def get(self, i):
+        if self.bin:
+            if i < 256:
+                self.builder.append(BINGET)
+                self.builder.append(chr(i))
+            else:
+                self.builder.append(LONG_BINGET)
+                append_int4(self.builder, i)
+        else:
+            self.builder.append(GET)
+            self.builder.append(str(i))
+            self.builder.append('\n')
+
+    def save_memo_get(self, uid):
+        i = self.memo.get(uid, 0)
+        if i == 0:
+            return False
+        self.get(i)
+        return True
+
+    # ____________________________________________________________
+    # saving
+
+    def save(self, w_obj):
+        space = self.space
+        w_type = space.type(w_obj)
+        if space.is_w(w_obj, space.w_None):
+            self.builder.append(NONE)
+        elif space.is_w(w_type, space.w_bool):
+            self.save_bool(space.is_true(w_obj))
+        elif space.is_w(w_type, space.w_int):
+            self.save_int(space.int_w(w_obj))
+        elif space.is_w(w_type, space.w_long):
+            self.save_long(space.bigint_w(w_obj))
+        elif space.is_w(w_type, space.w_float):
+            self.save_float(space.float_w(w_obj))
+        elif space.is_w(w_type, space.w_str):
+            self.save_str(space.str_w(w_obj))
+        elif space.is_w(w_type, space.w_unicode):
+            self.save_unicode(space.unicode_w(w_obj))
+        elif space.is_w(w_type, space.w_tuple):
+            self.save_tuple(w_obj)
+        elif space.is_w(w_type, space.w_list):
+            self.save_list(w_obj)
+        elif space.is_w(w_type, space.w_dict):
+            self.save_dict(w_obj)
+        else:
+            raise Unsupported
+
+    def save_bool(self, value):
+        if self.proto >= 2:
+            self.builder.append(NEWTRUE if value else NEWFALSE)
+        else:
+            self.builder.append('I01\n' if value else 'I00\n')
+
+    def save_int(self, x):
+        builder = self.builder
+        if self.bin:
+            if x >= 0:
+                if x <= 0xff:
+                    builder.append(BININT1)
+                    builder.append(chr(x))
+                    return
+                if x <= 0xffff:
+                    builder.append(BININT2)
+                    builder.append(chr(x & 0xff))
+                    builder.append(chr(x >> 8))
+                    return
+            high_bits = x >> 31
+            if high_bits == 0 or high_bits == -1:
+                builder.append(BININT)
+                append_int4(builder, x)
+                return
+        builder.append(INT)
+        builder.append(str(x))
+        builder.append('\n')
+
+    def save_long(self, big):
+        builder = self.builder
+        if self.proto >= 2:
+            # same as pickle.encode_long(): the shortest two's complement
+            if big.sign == 0:
+                nbytes = 0
+                data = ''
+            else:
+                if big.sign > 0:
+                    nbits = big.bit_length()
+                else:
+                    nbits = big.invert().bit_length()
+                nbytes = (nbits + 8) >> 3
+                data = big.tobytes(nbytes, 'little', True)
+            if nbytes < 256:
+                builder.append(LONG1)
+                builder.append(chr(nbytes))
+            else:
+                builder.append(LONG4)
+                append_int4(builder, nbytes)
+            builder.append(data)
+        else:
+            builder.append(LONG)
+            builder.append(big.repr())
+            builder.append('\n')
+
+    def save_float(self, x):
+        builder = self.builder
+        if self.bin:
+            builder.append(BINFLOAT)
+            pack_float(builder, x, 8, True)    # struct.pack('>d', x)
+        else:
+            builder.append(FLOAT)
+            builder.append(float2string(x, 'r', 0))
+            builder.append('\n')
+
+    def save_str(self, s):
+        uid = compute_unique_id(s)
+        if self.save_memo_get(uid):
+            return
+        builder = self.builder
+        if self.bin:
+            n = len(s)
+            if n < 256:
+                builder.append(SHORT_BINSTRING)
+                builder.append(chr(n))
+            else:
+                builder.append(BINSTRING)
+                append_int4(builder, n)
+            builder.append(s)
+        else:
+            # repr(s)
+            quote = "'"
+            if quote in s and '"' not in s:
+                quote = '"'
+            builder.append(STRING)
+            builder.append(string_escape_encode(s, quote))
+            builder.append('\n')
+        self.memoize(uid)
+
+    def save_unicode(self, u):
+        uid = compute_unique_id(u)
+        if self.save_memo_get(uid):
+            return
+        builder = self.builder
+        if self.bin:
+            encoded = unicodehelper.encode_utf8(self.space, u)
+            builder.append(BINUNICODE)
+            append_int4(builder, len(encoded))
+            builder.append(encoded)
+            self.memoize(uid)
+        else:
+            unchanged = u"\\" not in u and u"\n" not in u
+            if not unchanged:
+                u = replace(u, u"\\", u"\\u005c")
+                u = replace(u, u"\n", u"\\u000a")
+            builder.append(UNICODE)
+            builder.append(runicode.unicode_encode_raw_unicode_escape(
+                u, len(u), 'strict'))
+            builder.append('\n')
+            # pickle.py memoizes the result of the replace() calls: either
+            # u itself or a new object that can never be seen again
+            if unchanged:
+                self.memoize(uid)
+            else:
+                self.put_next()
+
+    def save_tuple(self, w_tuple):
+        uid = compute_unique_id(w_tuple)
+        if self.save_memo_get(uid):
+            return
+        builder = self.builder
+        items_w = self.space.fixedview(w_tuple)
+        n = len(items_w)
+        if n == 0:
+            if self.proto:
+                builder.append(EMPTY_TUPLE)
+            else:
+                builder.append(MARK)
+                builder.append(TUPLE)
+            return
+        if n <= 3 and self.proto >= 2:
+            for w_item in items_w:
+                self.save(w_item)
+            i = self.memo.get(uid, 0)
+            if i != 0:
+                # the tuple is recursive, see pickle.Pickler.save_tuple()
+                builder.append_multiple_char(POP, n)
+                self.get(i)
+            else:
+                builder.append(TUPLESIZE2CODE[n])
+                self.memoize(uid)
+            return
+        builder.append(MARK)
+        for w_item in items_w:
+            self.save(w_item)
+        i = self.memo.get(uid, 0)
+        if i != 0:
+            if self.proto:
+                builder.append(POP_MARK)
+            else:
+                builder.append_multiple_char(POP, n + 1)
+            self.get(i)
+            return
+        builder.append(TUPLE)
+        self.memoize(uid)
+
+    def begin_batch_item(self, i, n):
+        # write the MARK of the batch that item i starts, if any
+        if self.bin and i % BATCHSIZE == 0 and n - i > 1:
+            self.builder.append(MARK)
+
+    def end_batch_item(self, i, n, single, multiple):
+        if not self.bin:
+            self.builder.append(single)
+            return
+        start = i - i % BATCHSIZE
+        size = min(BATCHSIZE, n - start)
+        if i == start + size - 1:
+            self.builder.append(multiple if size > 1 else single)
+
+    def save_list(self, w_list):
+        space = self.space
+        uid = compute_unique_id(w_list)
+        if self.save_memo_get(uid):
+            return
+        if self.bin:
+            self.builder.append(EMPTY_LIST)
+        else:
+            self.builder.append(MARK)
+            self.builder.append(LIST)
+        self.memoize(uid)
+        intlist = space.listview_int(w_list)
+        if intlist is not None:
+            n = len(intlist)
+            for i in range(n):
+                self.begin_batch_item(i, n)
+                self.save_int(intlist[i])
+                self.end_batch_item(i, n, APPEND, APPENDS)
+            return
+        floatlist = space.listview_float(w_list)
+        if floatlist is not None:
+            n = len(floatlist)
+            for i in range(n):
+                self.begin_batch_item(i, n)
+                self.save_float(floatlist[i])
+                self.end_batch_item(i, n, APPEND, APPENDS)
+            return
+        strlist = space.listview_str(w_list)
+        if strlist is not None:
+            n = len(strlist)
+            for i in range(n):
+                self.begin_batch_item(i, n)
+                self.save_str(strlist[i])
+                self.end_batch_item(i, n, APPEND, APPENDS)
+            return
+        unicodelist = space.listview_unicode(w_list)
+        if unicodelist is not None:
+            n = len(unicodelist)
+            for i in range(n):
+                self.begin_batch_item(i, n)
+                self.save_unicode(unicodelist[i])
+                self.end_batch_item(i, n, APPEND, APPENDS)
+            return
+        items_w = space.listview(w_list)
+        n = len(items_w)
+        for i in range(n):
+            self.begin_batch_item(i, n)
+            self.save(items_w[i])
+            self.end_batch_item(i, n, APPEND, APPENDS)
+
+    def save_dict(self, w_dict):
+        space = self.space
+        uid = compute_unique_id(w_dict)
+        if self.save_memo_get(uid):
+            return
+        if space.finditem_str(w_dict, '__name__') is not None:
+            # maybe the __dict__ of a module, which pickle.py saves by
+            # reference
+            raise Unsupported
+        if self.bin:
+            self.builder.append(EMPTY_DICT)
+        else:
+            self.builder.append(MARK)
+            self.builder.append(DICT)
+        self.memoize(uid)
+        keys, values_w = space.view_as_kwargs(w_dict)
+        if keys is not None:
+            # string-keyed dict: the keys are never boxed
+            n = len(keys)
+            for i in range(n):
+                self.begin_batch_item(i, n)
+                self.save_str(keys[i])
+                self.save(values_w[i])
+                self.end_batch_item(i, n, SETITEM, SETITEMS)
+            return
+        items_w = space.fixedview(space.call_method(w_dict, 'items'))
+        n = len(items_w)
+        for i in range(n):
+            w_key, w_value = space.fixedview(items_w[i], 2)
+            self.begin_batch_item(i, n)
+            self.save(w_key)
+            self.save(w_value)
+            self.end_batch_item(i, n, SETITEM, SETITEMS)
+
+
+class Unpickler(object):
+    """ Loads the pickles that only contain the opcodes needed for the
+    objects of the builtin types, see Pickler.  The mark objects are not
+    pushed on the stack: self.marks is the stack of their positions.
+    Raises Unsupported for any other opcode and for anything that the
+    app-level Unpickler would complain about, so that the latter gets to
+    produce the exact same error. """
+
+    def __init__(self, space, s):
+        self.space = space
+        self.s = s
+        self.pos = 0
+        self.stack_w = []
+        self.marks = []
+        self.memo = {}      # str(index) -> object
+
+    def read(self, n):
+        pos = self.pos
+        if n < 0 or pos + n > len(self.s):
+            raise Unsupported
+        self.pos = pos + n
+        return self.s[pos:pos + n]
+
+    def read_byte(self):
+        pos = self.pos
+        if pos >= len(self.s):
+            raise Unsupported
+        self.pos = pos + 1
+        return ord(self.s[pos])
+
+    def read_int4(self):
+        pos = self.pos
+        if pos + 4 > len(self.s):
+            raise Unsupported
+        self.pos = pos + 4
+        return unpack_int4(self.s, pos)
+
+    def readline(self):
+        # like file.readline(): includes the '\n', if any
+        pos = self.pos
+        end = self.s.find('\n', pos)
+        if end < 0:
+            end = len(self.s)
+        else:
+            end += 1
+        self.pos = end
+        return self.s[pos:end]
+
+    def readline_strip(self):
+        # readline()[:-1]
+        line = self.readline()
+        end = len(line) - 1
+        if end < 0:
+            raise Unsupported
+        return line[:end]
+
+    def top_mark(self):
+        if self.marks:
+            return self.marks[-1]
+        return 0
+
+    def push(self, w_obj):
+        self.stack_w.append(w_obj)
+
+    def pop(self):
+        if len(self.stack_w) <= self.top_mark():
+            raise Unsupported
+        return self.stack_w.pop()
+
+    def peek(self):
+        if len(self.stack_w) <= self.top_mark():
+            raise Unsupported
+        return self.stack_w[-1]
+
+    def pop_mark(self):
+        if not self.marks:
+            raise Unsupported
+        k = self.marks.pop()
+        items_w = self.stack_w[k:]
+        del self.stack_w[k:]
+        return items_w
+
+    def memo_get(self, key):
+        w_obj = self.memo.get(key, None)
+        if w_obj is None:
+            raise Unsupported
+        self.push(w_obj)
+
+    def load(self):
+        space = self.space
+        while True:
+            key = self.read(1)[0]
+            if key == STOP:
+                return self.pop()
+            elif key == MARK:
+                self.marks.append(len(self.stack_w))
+            elif key == PROTO:
+                proto = self.read_byte()
+                if proto > HIGHEST_PROTOCOL:
+                    raise Unsupported
+            elif key == NONE:
+                self.push(space.w_None)
+            elif key == NEWTRUE:
+                self.push(space.w_True)
+            elif key == NEWFALSE:
+                self.push(space.w_False)
+            elif key == INT:
+                self.load_int()
+            elif key == BININT:
+                self.push(space.wrap(self.read_int4()))
+            elif key == BININT1:
+                self.push(space.wrap(self.read_byte()))
+            elif key == BININT2:
+                lo = self.read_byte()
+                hi = self.read_byte()
+                self.push(space.wrap(lo | (hi << 8)))
+            elif key == LONG:
+                w_s = space.wrap(self.readline_strip())
+                self.push(space.call_function(space.w_long, w_s,
+                                              space.wrap(0)))
+            elif key == LONG1:
+                self.load_long_bytes(self.read_byte())
+            elif key == LONG4:
+                self.load_long_bytes(self.read_int4())
+            elif key == FLOAT:
+                try:
+                    x = string_to_float(self.readline_strip())
+                except ParseStringError:
+                    raise Unsupported
+                self.push(space.wrap(x))
+            elif key == BINFLOAT:
+                self.load_binfloat()
+            elif key == STRING:
+                self.load_string()
+            elif key == BINSTRING:
+                self.push(space.wrap(self.read(self.read_int4())))
+            elif key == SHORT_BINSTRING:
+                self.push(space.wrap(self.read(self.read_byte())))
+            elif key == UNICODE:
+                u = unicodehelper.decode_raw_unicode_escape(
+                    space, self.readline_strip())
+                self.push(space.wrap(u))
+            elif key == BINUNICODE:
+                s = self.read(self.read_int4())
+                self.push(space.wrap(unicodehelper.decode_utf8(space, s)))
+            elif key == EMPTY_TUPLE:
+                self.push(space.newtuple([]))
+            elif key == TUPLE:
+                self.push(space.newtuple(self.pop_mark()))
+            elif key == TUPLE1:
+                w_0 = self.pop()
+                self.push(space.newtuple([w_0]))
+            elif key == TUPLE2:
+                w_1 = self.pop()
+                w_0 = self.pop()
+                self.push(space.newtuple([w_0, w_1]))
+            elif key == TUPLE3:
+                w_2 = self.pop()
+                w_1 = self.pop()
+                w_0 = self.pop()
+                self.push(space.newtuple([w_0, w_1, w_2]))
+            elif key == EMPTY_LIST:
+                self.push(space.newlist([]))
+            elif key == LIST:
+                self.push(space.newlist(self.pop_mark()))
+            elif key == APPEND:
+                w_item = self.pop()
+                self.list_extend(self.peek(), [w_item])
+            elif key == APPENDS:
+                items_w = self.pop_mark()
+                self.list_extend(self.peek(), items_w)
+            elif key == EMPTY_DICT:
+                self.push(space.newdict())
+            elif key == DICT:
+                w_dict = space.newdict()
+                self.set_items(w_dict, self.pop_mark())
+                self.push(w_dict)
+            elif key == SETITEM:
+                w_value = self.pop()
+                w_key = self.pop()
+                space.setitem(self.peek(), w_key, w_value)
+            elif key == SETITEMS:
+                items_w = self.pop_mark()
+                self.set_items(self.peek(), items_w)
+            elif key == POP:
+                self.pop()
+            elif key == POP_MARK:
+                self.pop_mark()
+            elif key == DUP:
+                self.push(self.peek())
+            elif key == GET:
+                self.memo_get(self.readline_strip())
+            elif key == BINGET:
+                self.memo_get(str(self.read_byte()))
+            elif key == LONG_BINGET:
+                self.memo_get(str(self.read_int4()))
+            elif key == PUT:
+                key = self.readline_strip()
+                self.memo[key] = self.peek()
+            elif key == BINPUT:
+                self.memo[str(self.read_byte())] = self.peek()
+            elif key == LONG_BINPUT:
+                self.memo[str(self.read_int4())] = self.peek()
+            else:
+                raise Unsupported
+
+    def load_int(self):
+        space = self.space
+        data = self.readline()
+        if data == '00\n':
+            self.push(space.w_False)
+        elif data == '01\n':
+            self.push(space.w_True)
+        else:
+            value, w_longval = string_to_int_or_long(space, data)
+            if w_longval is None:
+                self.push(space.wrap(value))
+            else:
+                self.push(w_longval)
+
+    def load_long_bytes(self, n):
+        data = self.read(n)
+        self.push(self.space.newlong_from_rbigint(
+            rbigint.frombytes(data, 'little', True)))
+
+    def load_binfloat(self):
+        self.push(self.space.wrap(unpack_float(self.read(8), True)))
+
+    def load_string(self):
+        rep = self.readline()
+        end = len(rep) - 2
+        if end < 1 or rep[0] != rep[end] or (rep[0] != "'" and
+                                              rep[0] != '"'):
+            raise Unsupported
+        s = PyString_DecodeEscape(self.space, rep[1:end], None)
+        self.push(self.space.wrap(s))
+
+    def list_extend(self, w_list, items_w):
+        space = self.space
+        if not space.is_w(space.type(w_list), space.w_list):
+            raise Unsupported
+        if len(items_w) == 1:
+            space.call_method(w_list, 'append', items_w[0])
+        else:
+            space.call_method(w_list, 'extend', space.newlist(items_w))
+
+    def set_items(self, w_dict, items_w):
+        if len(items_w) & 1:
+            raise Unsupported
+        for i in range(0, len(items_w), 2):
+            self.space.setitem(w_dict, items_w[i], items_w[i + 1])
+
+
+@unwrap_spec(protocol=int)
+def dumps(space, w_obj, protocol=0):
+    """dumps(obj, protocol=0) -> string
+
+Pickle obj like cPickle.dumps(), or raise Unsupported."""
+    if protocol < 0:
+        protocol = HIGHEST_PROTOCOL
+    elif protocol > HIGHEST_PROTOCOL:
+        raise unsupported(space)
+    try:
+        s = Pickler(space, protocol).dump(w_obj)
+    except Unsupported:
+        raise unsupported(space)
+    return space.wrap(s)
+
+def loads(space, w_s):
+    """loads(string) -> object
+
+Unpickle the string like cPickle.loads(), or raise Unsupported."""
+    if not space.is_w(space.type(w_s), space.w_str):
+        raise unsupported(space)
+    try:
+        return Unpickler(space, space.str_w(w_s)).load()
+    except Unsupported:
+        raise unsupported(space)
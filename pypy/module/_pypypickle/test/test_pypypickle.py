@@ -0,0 +1,105 @@
+class AppTest(object):
+    spaceconfig = {"usemodules": ['_pypypickle', 'struct', 'binascii']}
+
+    def setup_class(cls):
+        cls.w_slow_dumps = cls.space.appexec([], """():
+            from cPickle import Pickler
+            from StringIO import StringIO
+            def slow_dumps(obj, protocol):
+                f = StringIO()
+                Pickler(f, protocol).dump(obj)
+                return f.getvalue()
+            return slow_dumps
+        """)
+
+    def test_same_as_app_level(self):
+        import _pypypickle
+        s = 'abc'
+        u = u'x\\y\nz\u1234'
+        t = (s, s)
+        l = [1, 2]
+        objects = [None, True, False, 0, 1, -1, 255, 256, 65535, 65536,
+                   -2**31, 2**31 - 1, 2**31, -2**31 - 1, 2**62, 0L, 1L,
+                   -1L, 127L, 128L, -128L, -129L, 255L, -256L, 2**100,
+                   -2**100, 0.0, -1.5, 1e300, float('inf'),
+                   '', 'abc', "it's", 'a"b\'c\\\n\x00\xff', 'x' * 300,
+                   u'', u'abc', u, u'\U00012345',
+                   (), (1,), (1, 2), (1, 2, 3), (1, 2, 3, 4), t,
+                   [], [s, s, t, t, l, l], [1, 2, 3], [1.5, 2.5],
+                   ['a', 'b', 'a'], [u'a', u'b'], range(2500),
+                   {}, {'a': 1, 'b': s}, {1: 2, (3, 4): [5]},
+                   {u'a': {u'b': [u'c']}},
+                   dict.fromkeys(range(1001))]
+        for obj in objects:
+            for proto in range(3):
+                assert _pypypickle.dumps(obj, proto) == self.slow_dumps(obj,
+                                                                        proto)
+        for proto in range(3):
+            assert _pypypickle.dumps(objects, proto) == self.slow_dumps(
+                objects, proto)
+
+    def test_recursive(self):
+        import _pypypickle
+        l = []
+        l.append(l)
+        t = (l,)
+        l.append(t)
+        d = {}
+        d['d'] = d
+        for obj in [l, t, d]:
+            for proto in range(3):
+                assert _pypypickle.dumps(obj, proto) == self.slow_dumps(obj,
+                                                                        proto)
+        l2 = _pypypickle.loads(_pypypickle.dumps(l, 2))
+        assert l2[0] is l2
+        assert l2[1][0] is l2
+
+    def test_negative_protocol(self):
+        import _pypypickle
+        assert _pypypickle.dumps([1], -1) == self.slow_dumps([1], 2)
+
+    def test_unsupported_dumps(self):
+        import _pypypickle
+        class A(object):
+            pass
+        class MyInt(int):
+            pass
+        for obj in [A(), [1, A()], MyInt(5), {'__name__': 'x'}, len]:
+            raises(_pypypickle.Unsupported, _pypypickle.dumps, obj, 2)
+        raises(_pypypickle.Unsupported, _pypypickle.dumps, 1, 3)
+
+    def test_loads(self):
+        import _pypypickle
+        objects = [None, True, False, 0, -1, 70000, 2**31, 2**100, -2**100,
+                   1.5, float('inf'), '', "it's", 'a"b\'c\\\n\x00\xff',
+                   u'', u'x\\y\nz\u1234', (), (1,), (1, 2, 3, 4), [],
+                   range(2500), {'a': [1, 2]}, {(1, 2): u'a'}]
+        for obj in objects:
+            for proto in range(3):
+                s = self.slow_dumps(obj, proto)
+                res = _pypypickle.loads(s)
+                assert res == obj
+                assert type(res) is type(obj)
+
+    def test_loads_memo(self):
+        import _pypypickle
+        l = [1]
+        res = _pypypickle.loads(self.slow_dumps([l, l, (l,)], 0))
+        assert res[0] is res[1] is res[2][0]
+
+    def test_unsupported_loads(self):
+        import _pypypickle
+        for s in [self.slow_dumps(ValueError, 2), 'N', ']a.', 'K\x01K\x02s.',
+                  'h\x05.', u'N.', 'I1\nI2\n\x85\x00.']:
+            raises(_pypypickle.Unsupported, _pypypickle.loads, s)
+
+    def test_cpickle_uses_it(self):
+        import cPickle
+        d = {'a': [1, 2.5, u'b', ('c', None)]}
+        for proto in range(3):
+            s = cPickle.dumps(d, proto)
+            assert s == self.slow_dumps(d, proto)
+            assert cPickle.loads(s) == d
+        a = cPickle.loads(cPickle.dumps([ValueError], 2))
+        assert a == [ValueError]
+        raises(ValueError, cPickle.dumps, 1, 3)
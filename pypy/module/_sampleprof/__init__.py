@@ -0,0 +1,23 @@
+""" _sampleprof module: a sampling profiler driven by SIGPROF
+"""
+
+from pypy.interpreter.mixedmodule import MixedModule
+
+class Module(MixedModule):
+    interpleveldefs = {
+        'enable':     'interp_sampleprof.enable',
+        'disable':    'interp_sampleprof.disable',
+        'is_enabled': 'interp_sampleprof.is_enabled',
+    }
+
+    appleveldefs = {}
+
+    def __init__(self, space, *args):
+        "NOT_RPYTHON"
+        from pypy.module._sampleprof import interp_sampleprof
+        MixedModule.__init__(self, space, *args)
+        # the C-level handler of SIGPROF makes the ticker negative, which
+        # calls the periodic actions
+        space.actionflag.register_periodic_action(
+            interp_sampleprof.SampleAction(space),
+            use_bytecode_counter=False)
@@ -0,0 +1,213 @@
+""" A sampling profiler.  Each time the process has used 'period' seconds
+of CPU, SIGPROF is delivered; the C-level handler only counts it and
+makes the ticker negative, so that the running thread calls
+SampleAction.perform() at its next bytecode, or at the end of the loop
+for JIT-compiled code.  perform() records the Python stack of the thread,
+walking the chain of frames, which forces the frames that were virtual
+in the JIT-compiled code.
+
+The log file starts with the magic "PYPYSAMP", a version byte and the
+period in microseconds, followed by records that start with a tag byte:
+
+    CODE    varint code_id, string name, string filename, varint firstlineno
+    SAMPLE  varint count, varint depth, depth * (varint code_id,
+            varint lineno), innermost frame first
+    END
+
+A CODE record comes before the first SAMPLE that uses its code_id.
+'count' is the number of SIGPROF received since the previous sample.
+varints are unsigned LEB128, strings are a varint length followed by the
+bytes.  pypy/tool/sampleprof.py decodes it.
+"""
+
+from __future__ import with_statement
+
+import os
+
+from pypy.interpreter.error import OperationError, wrap_oserror
+from pypy.interpreter.executioncontext import AsyncAction, PeriodicAsyncAction
+from pypy.interpreter.gateway import unwrap_spec
+from rpython.rlib import jit, rsignal
+from rpython.rlib.rstring import StringBuilder
+from rpython.rtyper.lltypesystem import lltype, rffi
+
+
+MAGIC = "PYPYSAMP"
+VERSION = 1
+
+TAG_CODE = '\x01'
+TAG_SAMPLE = '\x02'
+TAG_END = '\x03'
+
+MAX_DEPTH = 1000        # deeper stacks are truncated
+FLUSH_SIZE = 65536
+
+
+def write_varint(builder, n):
+    assert n >= 0
+    while n >= 0x80:
+        builder.append(chr((n & 0x7f) | 0x80))
+        n >>= 7
+    builder.append(chr(n))
+
+def write_string(builder, s):
+    write_varint(builder, len(s))
+    builder.append(s)
+
+def set_itimer(period):
+    with lltype.scoped_alloc(rsignal.itimervalP.TO, 1) as new:
+        for timeval in [new[0].c_it_value, new[0].c_it_interval]:
+            seconds = int(period)
+            rffi.setintfield(timeval, 'c_tv_sec', seconds)
+            rffi.setintfield(timeval, 'c_tv_usec',
+                             int((period - seconds) * 1000000))
+        rsignal.c_setitimer(rsignal.ITIMER_PROF, new,
+                            lltype.nullptr(rsignal.itimervalP.TO))
+
+
+class SamplingProfiler(object):
+    def __init__(self, space):
+        self.space = space
+        self.fileno = -1
+        self.builder = None
+        self.code_ids = {}
+        self.write_error = None
+
+    def is_enabled(self):
+        return self.fileno >= 0
+
+    def enable(self, fileno, period):
+        self.fileno = fileno
+        self.code_ids = {}
+        self.write_error = None
+        self.builder = StringBuilder()
+        self.builder.append(MAGIC)
+        self.builder.append(chr(VERSION))
+        write_varint(self.builder, int(period * 1000000))
+        self.flush()
+        rsignal.pypysig_poll_counted()     # forget older signals
+        rsignal.pypysig_setcounted(rsignal.SIGPROF)
+        set_itimer(period)
+
+    def disable(self):
+        set_itimer(0.0)
+        # ignore a SIGPROF that would still be pending: its default
+        # action is to kill the process
+        rsignal.pypysig_ignore(rsignal.SIGPROF)
+        try:
+            if self.write_error is None:
+                self.builder.append(TAG_END)
+                self.flush()
+        finally:
+            self.fileno = -1
+            self.builder = None
+            self.code_ids = {}
+
+    def flush(self):
+        data = self.builder.build()
+        self.builder = StringBuilder()
+        while data:
+            count = os.write(self.fileno, data)
+            assert count >= 0
+            data = data[count:]
+
+    def get_code_id(self, pycode):
+        try:
+            return self.code_ids[pycode]
+        except KeyError:
+            code_id = len(self.code_ids)
+            self.code_ids[pycode] = code_id
+            builder = self.builder
+            builder.append(TAG_CODE)
+            write_varint(builder, code_id)
+            write_string(builder, pycode.co_name)
+            write_string(builder, pycode.co_filename)
+            write_varint(builder, max(pycode.co_firstlineno, 0))
+            return code_id
+
+    def record_sample(self, ec, count):
+        code_ids = []
+        linenos = []
+        frame = ec.gettopframe_nohidden()
+        while frame is not None and len(code_ids) < MAX_DEPTH:
+            code_ids.append(self.get_code_id(frame.pycode))
+            linenos.append(max(frame.get_last_lineno(), 0))
+            frame = ec.getnextframe_nohidden(frame)
+        builder = self.builder
+        builder.append(TAG_SAMPLE)
+        write_varint(builder, count)
+        write_varint(builder, len(code_ids))
+        for i in range(len(code_ids)):
+            write_varint(builder, code_ids[i])
+            write_varint(builder, linenos[i])
+        if builder.getlength() >= FLUSH_SIZE:
+            try:
+                self.flush()
+            except OSError, e:
+                # stop sampling; disable() reports the error
+                set_itimer(0.0)
+                self.write_error = e
+
+
+class SampleAction(PeriodicAsyncAction):
+    """Records a sample for each SIGPROF received, if the profiler is
+    enabled."""
+
+    def __init__(self, space):
+        "NOT_RPYTHON"
+        AsyncAction.__init__(self, space)
+
+    @jit.dont_look_inside
+    def perform(self, executioncontext, frame):
+        count = rsignal.pypysig_poll_counted()
+        if count > 0:
+            profiler = self.space.fromcache(SamplingProfiler)
+            if profiler.is_enabled() and profiler.write_error is None:
+                profiler.record_sample(executioncontext, count)
+
+
+@unwrap_spec(fileno=int, period=float)
+def enable(space, fileno, period=0.001):
+    """enable(fileno, period=0.001)
+
+    Start sampling the Python stack every 'period' seconds of CPU time,
+    writing the samples to the file descriptor 'fileno'.
+    """
+    profiler = space.fromcache(SamplingProfiler)
+    if profiler.is_enabled():
+        raise OperationError(space.w_ValueError,
+                             space.wrap("the sampling profiler is already "
+                                        "enabled"))
+    if not (0.0 < period < 1000000.0):
+        raise OperationError(space.w_ValueError,
+                             space.wrap("period must be positive"))
+    try:
+        profiler.enable(fileno, period)
+    except OSError, e:
+        profiler.fileno = -1
+        raise wrap_oserror(space, e)
+
+def disable(space):
+    """disable()
+
+    Stop sampling and write the rest of the samples to the file.
+    """
+    profiler = space.fromcache(SamplingProfiler)
+    if not profiler.is_enabled():
+        raise OperationError(space.w_ValueError,
+                             space.wrap("the sampling profiler is not "
+                                        "enabled"))
+    write_error = profiler.write_error
+    try:
+        profiler.disable()
+    except OSError, e:
+        raise wrap_oserror(space, e)
+    if write_error is not None:
+        raise wrap_oserror(space, write_error)
+
+def is_enabled(space):
+    """is_enabled()
+
+    Return True if the sampling profiler is running.
+    """
+    return space.wrap(space.fromcache(SamplingProfiler).is_enabled())
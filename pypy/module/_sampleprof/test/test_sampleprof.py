@@ -0,0 +1,86 @@
+from rpython.tool.udir import udir
+from rpython.rlib.rstring import StringBuilder
+from pypy.module._sampleprof import interp_sampleprof
+from pypy.tool import sampleprof
+
+
+def test_varint():
+    for n in [0, 1, 127, 128, 300, 2**31, 2**62]:
+        builder = StringBuilder()
+        interp_sampleprof.write_varint(builder, n)
+        interp_sampleprof.write_string(builder, "abc")
+        reader = sampleprof.Reader(builder.build())
+        assert reader.read_varint() == n
+        assert reader.read_string() == "abc"
+
+
+class AppTestSampleProf(object):
+    spaceconfig = {"usemodules": ['_sampleprof', 'signal']}
+
+    def setup_class(cls):
+        cls.w_filename = cls.space.wrap(str(udir.join('test_sampleprof.1')))
+
+    def test_errors(self):
+        import _sampleprof
+        assert not _sampleprof.is_enabled()
+        raises(ValueError, _sampleprof.disable)
+        raises(ValueError, _sampleprof.enable, 1, 0.0)
+        raises(OSError, _sampleprof.enable, -5)
+        assert not _sampleprof.is_enabled()
+
+    def test_enable_disable(self):
+        import _sampleprof, os
+        fd = os.open(self.filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+        _sampleprof.enable(fd, 0.002)
+        assert _sampleprof.is_enabled()
+        raises(ValueError, _sampleprof.enable, fd)
+        _sampleprof.disable()
+        assert not _sampleprof.is_enabled()
+        os.close(fd)
+        with open(self.filename, 'rb') as f:
+            data = f.read()
+        assert data.startswith('PYPYSAMP\x01')
+        assert data.endswith('\x03')
+
+
+class TestSampleProf(object):
+    spaceconfig = {"usemodules": ['_sampleprof', 'signal', 'rctime']}
+
+    def test_samples(self):
+        filename = str(udir.join('test_sampleprof.2'))
+        space = self.space
+        space.appexec([space.wrap(filename)], """(filename):
+            import _sampleprof, os, time
+            def inner(n):
+                total = 0
+                for i in range(n):
+                    total += i
+                return total
+            def outer():
+                end = time.clock() + 0.5
+                while time.clock() < end:
+                    inner(100)
+            fd = os.open(filename, os.O_WRONLY | os.O_CREAT | os.O_TRUNC)
+            _sampleprof.enable(fd, 0.005)
+            try:
+                outer()
+            finally:
+                _sampleprof.disable()
+                os.close(fd)
+        """)
+        profile = sampleprof.read_file(filename)
+        assert profile.complete
+        assert profile.period == 0.005
+        assert profile.total_count() > 10
+        names = [code.name for code, self_count, total in profile.summary()]
+        assert 'outer' in names
+        for count, stack in profile.samples:
+            assert count >= 1
+            stack_names = [code.name for code, lineno in stack]
+            assert 'outer' in stack_names
+            if 'inner' in stack_names:
+                assert stack_names.index('inner') < stack_names.index('outer')
+        # 'outer' is in every sample
+        for code, self_count, total in profile.summary():
+            if code.name == 'outer':
+                assert total == profile.total_count()
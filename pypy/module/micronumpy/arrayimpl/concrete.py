@@ -317,7 +317,13 @@ class ConcreteArrayNotOwning(BaseConcreteArray):
 
     def create_iter(self, shape=None, backward_broadcast=False):
         if shape is None or shape == self.get_shape():
-            return iter.ConcreteArrayIterator(self)
+            if self.order == 'C' or len(self.get_shape()) <= 1:
+                return iter.ConcreteArrayIterator(self)
+            # a Fortran-ordered array is not iterated in memory order
+            return iter.MultiDimViewIterator(self, self.dtype, 0,
+                                             self.get_strides(),
+                                             self.get_backstrides(),
+                                             self.get_shape())
         r = calculate_broadcast_strides(self.get_strides(),
                                         self.get_backstrides(),
                                         self.get_shape(), shape, backward_broadcast)
@@ -68,6 +68,11 @@ class FakeSpace(object):
     w_complex = W_TypeObject("complex")
     w_dict = W_TypeObject("dict")
 
+    class config:
+        class objspace:
+            class micronumpy:
+                simdufuncs = False
+
     def __init__(self):
         """NOT_RPYTHON"""
         self.fromcache = InternalSpaceCache(self).getorbuild
@@ -2,7 +2,7 @@ from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.interpreter.gateway import interp2app, unwrap_spec
 from pypy.interpreter.typedef import TypeDef, GetSetProperty, interp_attrproperty
-from pypy.module.micronumpy import interp_boxes, interp_dtype, loop
+from pypy.module.micronumpy import interp_boxes, interp_dtype, loop, simd
 from rpython.rlib import jit
 from rpython.rlib.rarithmetic import LONG_BIT
 from rpython.tool.sourcetools import func_with_new_name
@@ -228,7 +228,7 @@ class W_Ufunc(W_Root):
                               " dimensions",self.name)
             dtype = out.get_dtype()
         res = loop.compute_reduce(obj, dtype, self.func, self.done_func,
-                                  self.identity)
+                                  self.identity, self.vector_op)
         if out:
             out.set_scalar_value(res)
             return out
@@ -301,17 +301,19 @@ class W_Ufunc1(W_Ufunc):
 
 
 class W_Ufunc2(W_Ufunc):
-    _immutable_fields_ = ["comparison_func", "func", "name", "int_only"]
+    _immutable_fields_ = ["comparison_func", "func", "name", "int_only",
+                          "vector_op"]
     argcount = 2
 
     def __init__(self, func, name, promote_to_float=False, promote_bools=False,
         identity=None, comparison_func=False, int_only=False,
-        allow_complex=True, complex_to_float=False):
+        allow_complex=True, complex_to_float=False, vector_op=simd.NO_OP):
 
         W_Ufunc.__init__(self, name, promote_to_float, promote_bools, identity,
                          int_only, allow_complex, complex_to_float)
         self.func = func
         self.comparison_func = comparison_func
+        self.vector_op = vector_op
         if name == 'logical_and':
             self.done_func = done_if_false
         elif name == 'logical_or':
@@ -372,7 +374,7 @@ class W_Ufunc2(W_Ufunc):
         new_shape = shape_agreement(space, w_lhs.get_shape(), w_rhs)
         new_shape = shape_agreement(space, new_shape, out, broadcast_down=False)
         return loop.call2(space, new_shape, self.func, calc_dtype,
-                          res_dtype, w_lhs, w_rhs, out)
+                          res_dtype, w_lhs, w_rhs, out, self.vector_op)
 
 
 W_Ufunc.typedef = TypeDef("ufunc",
@@ -690,7 +692,9 @@ class UfuncState(object):
         if argcount == 1:
             ufunc = W_Ufunc1(func, ufunc_name, **extra_kwargs)
         elif argcount == 2:
-            ufunc = W_Ufunc2(func, ufunc_name, **extra_kwargs)
+            ufunc = W_Ufunc2(func, ufunc_name,
+                             vector_op=simd.get_vector_op(space, ufunc_name),
+                             **extra_kwargs)
         setattr(self, ufunc_name, ufunc)
 
 def get(space):
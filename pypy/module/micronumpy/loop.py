@@ -19,7 +19,8 @@ call2_driver = jit.JitDriver(name='numpy_call2',
                              reds = ['shape', 'w_lhs', 'w_rhs', 'out',
                                      'left_iter', 'right_iter', 'out_iter'])
 
-def call2(space, shape, func, calc_dtype, res_dtype, w_lhs, w_rhs, out):
+def call2(space, shape, func, calc_dtype, res_dtype, w_lhs, w_rhs, out,
+          vector_op=0):
     # handle array_priority
     # w_lhs and w_rhs could be of different ndarray subtypes. Numpy does:
     # 1. if __array_priorities__ are equal and one is an ndarray and the
@@ -47,6 +48,10 @@ def call2(space, shape, func, calc_dtype, res_dtype, w_lhs, w_rhs, out):
     if out is None:
         out = W_NDimArray.from_shape(space, shape, res_dtype,
                                      w_instance=lhs_for_subtype)
+    if vector_op:
+        from pypy.module.micronumpy import simd
+        if simd.call2(vector_op, calc_dtype, res_dtype, w_lhs, w_rhs, out):
+            return out
     left_iter = w_lhs.create_iter(shape)
     right_iter = w_rhs.create_iter(shape)
     out_iter = out.create_iter(shape)
@@ -135,7 +140,12 @@ reduce_driver = jit.JitDriver(name='numpy_reduce',
                                         'calc_dtype', 'identity'],
                               reds = 'auto')
 
-def compute_reduce(obj, calc_dtype, func, done_func, identity):
+def compute_reduce(obj, calc_dtype, func, done_func, identity, vector_op=0):
+    if vector_op:
+        from pypy.module.micronumpy import simd
+        res = simd.reduce(vector_op, obj, calc_dtype, identity)
+        if res is not None:
+            return res
     obj_iter = obj.create_iter()
     if identity is None:
         cur_value = obj_iter.getitem().convert_to(calc_dtype)
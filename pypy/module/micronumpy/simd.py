@@ -0,0 +1,215 @@
+""" Element-wise loops of some ufuncs over contiguous float64 and long arrays,
+written in C with SSE2 packed operations, see
+rpython/translator/c/src/simd_ufuncs.c.  loop.call2() and
+loop.compute_reduce() use them instead of their generic loops when all the
+operands have exactly the dtype of the computation and are contiguous.
+Enabled by the objspace.micronumpy.simdufuncs option.
+"""
+
+import py
+
+from rpython.conftest import cdir
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
+from pypy.module.micronumpy import types
+from pypy.module.micronumpy.support import calc_strides
+from pypy.module.micronumpy.arrayimpl.concrete import (BaseConcreteArray,
+    ConcreteArrayNotOwning, SliceArray)
+from pypy.module.micronumpy.interp_boxes import W_Float64Box, W_LongBox
+
+srcdir = py.path.local(cdir)
+eci = ExternalCompilationInfo(
+    includes=['src/simd_ufuncs.h'],
+    include_dirs=[str(srcdir)],
+    separate_module_files=[srcdir.join('src', 'simd_ufuncs.c')],
+)
+
+def llexternal(*args, **kwds):
+    kwds['compilation_info'] = eci
+    kwds['_nowrapper'] = True
+    return rffi.llexternal(*args, **kwds)
+
+# the ufuncs that have loops here
+NO_OP = 0
+OP_ADD = 1
+OP_SUB = 2
+OP_MUL = 3
+
+_ufunc_ops = {'add': OP_ADD, 'subtract': OP_SUB, 'multiply': OP_MUL}
+
+def get_vector_op(space, ufunc_name):
+    "NOT_RPYTHON"
+    if not space.config.objspace.micronumpy.simdufuncs:
+        return NO_OP
+    return _ufunc_ops.get(ufunc_name, NO_OP)
+
+def _make_kernels(name, T, TP):
+    return (llexternal('pypy_simd_%s_aa' % name, [TP, TP, TP, lltype.Signed],
+                       lltype.Void),
+            llexternal('pypy_simd_%s_as' % name, [TP, TP, T, lltype.Signed],
+                       lltype.Void),
+            llexternal('pypy_simd_%s_sa' % name, [TP, T, TP, lltype.Signed],
+                       lltype.Void))
+
+f64_add_aa, f64_add_as, f64_add_sa = _make_kernels('add_f64', rffi.DOUBLE,
+                                                   rffi.DOUBLEP)
+f64_sub_aa, f64_sub_as, f64_sub_sa = _make_kernels('sub_f64', rffi.DOUBLE,
+                                                   rffi.DOUBLEP)
+f64_mul_aa, f64_mul_as, f64_mul_sa = _make_kernels('mul_f64', rffi.DOUBLE,
+                                                   rffi.DOUBLEP)
+long_add_aa, long_add_as, long_add_sa = _make_kernels('add_long', rffi.LONG,
+                                                      rffi.LONGP)
+long_sub_aa, long_sub_as, long_sub_sa = _make_kernels('sub_long', rffi.LONG,
+                                                      rffi.LONGP)
+long_mul_aa, long_mul_as, long_mul_sa = _make_kernels('mul_long', rffi.LONG,
+                                                      rffi.LONGP)
+f64_sum = llexternal('pypy_simd_sum_f64',
+                     [rffi.DOUBLEP, lltype.Signed, rffi.DOUBLE], rffi.DOUBLE)
+long_sum = llexternal('pypy_simd_sum_long',
+                      [rffi.LONGP, lltype.Signed, rffi.LONG], rffi.LONG)
+
+# ____________________________________________________________
+
+def _get_kind(dtype):
+    itemtype = dtype.itemtype
+    if isinstance(itemtype, types.Float64):
+        return 'f'
+    elif isinstance(itemtype, types.Long):
+        return 'l'
+    return '?'
+
+def _get_address(w_arr, dtype, shape):
+    """ The address of the items of w_arr, if it is a contiguous array of
+    the given dtype and shape, which is iterated in the order of its items
+    in memory.  Returns 0 otherwise. """
+    impl = w_arr.implementation
+    if not isinstance(impl, BaseConcreteArray):
+        return 0
+    if impl.dtype is not dtype or impl.get_shape() != shape:
+        return 0
+    if isinstance(impl, ConcreteArrayNotOwning):
+        # the items of a Fortran-ordered array are not in the order in
+        # which the generic loops iterate over them
+        if impl.order != 'C':
+            return 0
+        strides, _ = calc_strides(shape, dtype, 'C')
+        if impl.get_strides() != strides:
+            return 0
+    elif isinstance(impl, SliceArray):
+        if (len(shape) != 1 or
+                impl.get_strides()[0] != dtype.itemtype.get_element_size()):
+            return 0
+    else:
+        return 0
+    address = rffi.cast(lltype.Signed, impl.storage) + impl.start
+    if address % dtype.itemtype.get_element_size() != 0:
+        return 0
+    return address
+
+def _overlaps(address, out_address, nbytes):
+    return (address != out_address and address < out_address + nbytes and
+            out_address < address + nbytes)
+
+def call2(vector_op, calc_dtype, res_dtype, w_lhs, w_rhs, out):
+    """ Computes 'out = w_lhs OP w_rhs' if the operands allow it, where
+    either w_lhs or w_rhs may be a scalar.  Returns False if they don't. """
+    kind = _get_kind(calc_dtype)
+    if kind == '?' or res_dtype is not calc_dtype:
+        return False
+    shape = out.get_shape()
+    out_address = _get_address(out, calc_dtype, shape)
+    if out_address == 0:
+        return False
+    size = out.get_size()
+    nbytes = size * calc_dtype.itemtype.get_element_size()
+    lhs_address = rhs_address = 0
+    if not w_lhs.is_scalar():
+        lhs_address = _get_address(w_lhs, calc_dtype, shape)
+        if lhs_address == 0 or _overlaps(lhs_address, out_address, nbytes):
+            return False
+    if not w_rhs.is_scalar():
+        rhs_address = _get_address(w_rhs, calc_dtype, shape)
+        if rhs_address == 0 or _overlaps(rhs_address, out_address, nbytes):
+            return False
+    if lhs_address == 0 and rhs_address == 0:
+        return False
+    if kind == 'f':
+        _call2_f64(vector_op, calc_dtype, w_lhs, w_rhs, lhs_address,
+                   rhs_address, out_address, size)
+    else:
+        _call2_long(vector_op, calc_dtype, w_lhs, w_rhs, lhs_address,
+                    rhs_address, out_address, size)
+    return True
+
+def _scalar_f64(w_arr, dtype):
+    box = w_arr.get_scalar_value().convert_to(dtype)
+    assert isinstance(box, W_Float64Box)
+    return box.value
+
+def _scalar_long(w_arr, dtype):
+    box = w_arr.get_scalar_value().convert_to(dtype)
+    assert isinstance(box, W_LongBox)
+    return box.value
+
+def _call2_f64(vector_op, dtype, w_lhs, w_rhs, lhs_address, rhs_address,
+               out_address, size):
+    if vector_op == OP_ADD:
+        kernels = f64_add_aa, f64_add_as, f64_add_sa
+    elif vector_op == OP_SUB:
+        kernels = f64_sub_aa, f64_sub_as, f64_sub_sa
+    else:
+        assert vector_op == OP_MUL
+        kernels = f64_mul_aa, f64_mul_as, f64_mul_sa
+    out = rffi.cast(rffi.DOUBLEP, out_address)
+    if lhs_address == 0:
+        kernels[2](out, _scalar_f64(w_lhs, dtype),
+                   rffi.cast(rffi.DOUBLEP, rhs_address), size)
+    elif rhs_address == 0:
+        kernels[1](out, rffi.cast(rffi.DOUBLEP, lhs_address),
+                   _scalar_f64(w_rhs, dtype), size)
+    else:
+        kernels[0](out, rffi.cast(rffi.DOUBLEP, lhs_address),
+                   rffi.cast(rffi.DOUBLEP, rhs_address), size)
+
+def _call2_long(vector_op, dtype, w_lhs, w_rhs, lhs_address, rhs_address,
+                out_address, size):
+    if vector_op == OP_ADD:
+        kernels = long_add_aa, long_add_as, long_add_sa
+    elif vector_op == OP_SUB:
+        kernels = long_sub_aa, long_sub_as, long_sub_sa
+    else:
+        assert vector_op == OP_MUL
+        kernels = long_mul_aa, long_mul_as, long_mul_sa
+    out = rffi.cast(rffi.LONGP, out_address)
+    if lhs_address == 0:
+        kernels[2](out, _scalar_long(w_lhs, dtype),
+                   rffi.cast(rffi.LONGP, rhs_address), size)
+    elif rhs_address == 0:
+        kernels[1](out, rffi.cast(rffi.LONGP, lhs_address),
+                   _scalar_long(w_rhs, dtype), size)
+    else:
+        kernels[0](out, rffi.cast(rffi.LONGP, lhs_address),
+                   rffi.cast(rffi.LONGP, rhs_address), size)
+
+def reduce(vector_op, obj, calc_dtype, identity):
+    """ Returns the sum of the items of obj as a box of calc_dtype if
+    vector_op is OP_ADD and obj allows it, or None. """
+    if vector_op != OP_ADD or identity is None:
+        return None
+    kind = _get_kind(calc_dtype)
+    if kind == '?':
+        return None
+    address = _get_address(obj, calc_dtype, obj.get_shape())
+    if address == 0:
+        return None
+    start = identity.convert_to(calc_dtype)
+    if kind == 'f':
+        assert isinstance(start, W_Float64Box)
+        res = f64_sum(rffi.cast(rffi.DOUBLEP, address), obj.get_size(),
+                      start.value)
+        return calc_dtype.box(res)
+    else:
+        assert isinstance(start, W_LongBox)
+        res = long_sum(rffi.cast(rffi.LONGP, address), obj.get_size(),
+                       rffi.cast(rffi.LONG, start.value))
+        return calc_dtype.box(res)
@@ -0,0 +1,189 @@
+from rpython.rtyper.lltypesystem import lltype, rffi
+from pypy.module.micronumpy import simd
+from pypy.module.micronumpy.test.test_base import BaseNumpyAppTest
+
+
+class TestKernels(object):
+    def check_kernels(self, aa, as_, sa, T, op, items_a, items_b):
+        n = len(items_a)
+        a = lltype.malloc(rffi.CArray(T), n, flavor='raw')
+        b = lltype.malloc(rffi.CArray(T), n, flavor='raw')
+        out = lltype.malloc(rffi.CArray(T), n + 1, flavor='raw')
+        try:
+            for i in range(n):
+                a[i] = rffi.cast(T, items_a[i])
+                b[i] = rffi.cast(T, items_b[i])
+            # also try with an 'out' that is not aligned like a and b
+            for shift in [0, 1]:
+                outp = rffi.ptradd(out, shift)
+                aa(outp, a, b, n)
+                for i in range(n):
+                    assert outp[i] == op(a[i], b[i])
+                as_(outp, a, b[0], n)
+                for i in range(n):
+                    assert outp[i] == op(a[i], b[0])
+                sa(outp, a[0], b, n)
+                for i in range(n):
+                    assert outp[i] == op(a[0], b[i])
+        finally:
+            lltype.free(a, flavor='raw')
+            lltype.free(b, flavor='raw')
+            lltype.free(out, flavor='raw')
+
+    def test_f64(self):
+        for n in [1, 3, 4, 7, 8, 13]:
+            items_a = [i * 1.5 for i in range(n)]
+            items_b = [7.25 - i for i in range(n)]
+            self.check_kernels(simd.f64_add_aa, simd.f64_add_as,
+                               simd.f64_add_sa, rffi.DOUBLE,
+                               lambda x, y: x + y, items_a, items_b)
+            self.check_kernels(simd.f64_sub_aa, simd.f64_sub_as,
+                               simd.f64_sub_sa, rffi.DOUBLE,
+                               lambda x, y: x - y, items_a, items_b)
+            self.check_kernels(simd.f64_mul_aa, simd.f64_mul_as,
+                               simd.f64_mul_sa, rffi.DOUBLE,
+                               lambda x, y: x * y, items_a, items_b)
+
+    def test_long(self):
+        import sys
+        from rpython.rlib.rarithmetic import intmask
+        for n in [1, 3, 4, 7, 8, 13]:
+            items_a = [i * 3 - 5 for i in range(n)]
+            items_b = [sys.maxint - i for i in range(n)]
+            self.check_kernels(simd.long_add_aa, simd.long_add_as,
+                               simd.long_add_sa, rffi.LONG,
+                               lambda x, y: intmask(x + y), items_a, items_b)
+            self.check_kernels(simd.long_sub_aa, simd.long_sub_as,
+                               simd.long_sub_sa, rffi.LONG,
+                               lambda x, y: intmask(x - y), items_a, items_b)
+            self.check_kernels(simd.long_mul_aa, simd.long_mul_as,
+                               simd.long_mul_sa, rffi.LONG,
+                               lambda x, y: intmask(x * y), items_a, items_b)
+
+    def test_sum(self):
+        for n in [0, 1, 7, 8, 9, 100]:
+            a = lltype.malloc(rffi.CArray(rffi.DOUBLE), n, flavor='raw')
+            b = lltype.malloc(rffi.CArray(rffi.LONG), n, flavor='raw')
+            for i in range(n):
+                a[i] = i * 0.5
+                b[i] = i - 3
+            assert simd.f64_sum(a, n, 1.0) == 1.0 + sum([i * 0.5
+                                                         for i in range(n)])
+            assert simd.long_sum(b, n, 2) == 2 + sum([i - 3
+                                                      for i in range(n)])
+            lltype.free(a, flavor='raw')
+            lltype.free(b, flavor='raw')
+
+
+class AppTestSimdUfuncs(BaseNumpyAppTest):
+    spaceconfig = {"usemodules": ["micronumpy"],
+                   "objspace.micronumpy.simdufuncs": True}
+
+    def test_float64(self):
+        from numpypy import array, add, subtract, multiply
+        for n in [1, 2, 3, 5, 8, 13]:
+            l1 = [i * 1.5 for i in range(n)]
+            l2 = [3.25 - i for i in range(n)]
+            a = array(l1)
+            b = array(l2)
+            assert list(add(a, b)) == [x + y for x, y in zip(l1, l2)]
+            assert list(subtract(a, b)) == [x - y for x, y in zip(l1, l2)]
+            assert list(multiply(a, b)) == [x * y for x, y in zip(l1, l2)]
+            assert list(a + 2.5) == [x + 2.5 for x in l1]
+            assert list(2.5 - a) == [2.5 - x for x in l1]
+            assert list(a * 3) == [x * 3 for x in l1]
+
+    def test_int(self):
+        import sys
+        from numpypy import array, add, subtract, multiply
+        for n in [1, 2, 3, 5, 8, 13]:
+            l1 = [i * 3 - 7 for i in range(n)]
+            l2 = [i + 11 for i in range(n)]
+            a = array(l1)
+            b = array(l2)
+            assert list(add(a, b)) == [x + y for x, y in zip(l1, l2)]
+            assert list(subtract(a, b)) == [x - y for x, y in zip(l1, l2)]
+            assert list(multiply(a, b)) == [x * y for x, y in zip(l1, l2)]
+            assert list(a - 4) == [x - 4 for x in l1]
+            assert list(4 * a) == [4 * x for x in l1]
+        a = array([sys.maxint] * 5)
+        assert list(a + 1) == [-sys.maxint - 1] * 5
+
+    def test_mixed_dtypes(self):
+        from numpypy import array
+        a = array(range(7))
+        b = array([0.5] * 7)
+        assert list(a + b) == [i + 0.5 for i in range(7)]
+        c = array(range(7), dtype='int32')
+        assert list(a * c) == [i * i for i in range(7)]
+
+    def test_out(self):
+        from numpypy import array, zeros, add, multiply
+        a = array([1.0, 2.0, 3.0, 4.0, 5.0])
+        b = array([10.0, 20.0, 30.0, 40.0, 50.0])
+        out = zeros(5)
+        res = add(a, b, out)
+        assert res is out
+        assert list(out) == [11.0, 22.0, 33.0, 44.0, 55.0]
+        multiply(a, a, a)
+        assert list(a) == [1.0, 4.0, 9.0, 16.0, 25.0]
+        a += 1
+        assert list(a) == [2.0, 5.0, 10.0, 17.0, 26.0]
+
+    def test_fortran_order(self):
+        from numpypy import ndarray, zeros, add
+        a = ndarray((2, 3), dtype=float, order='F')
+        for i in range(2):
+            for j in range(3):
+                a[i, j] = i * 10 + j
+        b = zeros((2, 3))
+        c = add(a, b)
+        assert c.tolist() == [[0, 1, 2], [10, 11, 12]]
+        c = add(b, a)
+        assert c.tolist() == [[0, 1, 2], [10, 11, 12]]
+        out = ndarray((2, 3), dtype=float, order='F')
+        add(b, 1.5, out=out)
+        assert out.tolist() == [[1.5] * 3] * 2
+        add(a, a, out=b)
+        assert b.tolist() == [[0, 2, 4], [20, 22, 24]]
+
+    def test_overlap(self):
+        from numpypy import arange, add
+        a = arange(10.0)
+        add(a[:-1], a[1:], out=a[1:])
+        expected = [0.0]
+        for i in range(1, 10):
+            expected.append(expected[-1] + i)
+        assert list(a) == expected
+        b = arange(10)
+        add(b[1:], 1, out=b[:-1])
+        assert list(b) == [2, 3, 4, 5, 6, 7, 8, 9, 10, 9]
+
+    def test_not_contiguous(self):
+        from numpypy import arange
+        a = arange(20.0)
+        assert list(a[::2] + a[1::2]) == [4.0 * i + 1 for i in range(10)]
+        assert list(a[::-1] * 2) == [2.0 * (19 - i) for i in range(20)]
+        b = arange(12).reshape(3, 4)
+        assert (b + b == b * 2).all()
+        assert (b.T + 1 == (b + 1).T).all()
+        assert list(b[:, 1] - b[:, 0]) == [1, 1, 1]
+
+    def test_broadcast(self):
+        from numpypy import arange
+        a = arange(6.0).reshape(2, 3)
+        b = arange(3.0)
+        assert (a + b == [[0.0, 2.0, 4.0], [3.0, 5.0, 7.0]]).all()
+
+    def test_sum(self):
+        from numpypy import arange, add
+        for n in [0, 1, 7, 8, 9, 100]:
+            assert arange(n).sum() == sum(range(n))
+            assert arange(n, dtype=float).sum() == float(sum(range(n)))
+            assert add.reduce(arange(n)) == sum(range(n))
+        a = arange(20)
+        assert a[3:17].sum() == sum(range(3, 17))
+        assert a[::3].sum() == sum(range(0, 20, 3))
+        assert arange(12).reshape(3, 4).sum() == 66
+        assert a.prod() == 0
+        assert arange(1, 6).prod() == 120
@@ -2,6 +2,7 @@ from pypy.interpreter.mixedmodule import MixedModule
 
 class Module(MixedModule):
     appleveldefs = {
+        'enable_warmup_cache': 'app_warmup.enable_warmup_cache',
     }
 
     interpleveldefs = {
@@ -11,6 +12,8 @@ class Module(MixedModule):
         'set_optimize_hook': 'interp_resop.set_optimize_hook',
         'set_abort_hook': 'interp_resop.set_abort_hook',
         'get_stats_snapshot': 'interp_resop.get_stats_snapshot',
+        'get_warmup_profile': 'interp_warmup.get_warmup_profile',
+        'set_warmup_profile': 'interp_warmup.set_warmup_profile',
         'enable_debug': 'interp_resop.enable_debug',
         'disable_debug': 'interp_resop.disable_debug',
         'ResOperation': 'interp_resop.WrappedOp',
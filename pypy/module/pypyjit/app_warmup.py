@@ -0,0 +1,44 @@
+
+CACHE_FORMAT = 1
+
+def enable_warmup_cache(filename):
+    """Load the warm-up profile saved in 'filename' by a previous process,
+    if any, and save the updated profile there when this process exits.
+    This is done at startup if the PYPY_JIT_WARMUP_CACHE environment
+    variable is set.
+
+    The profile lists the loops that got compiled, so that they start
+    tracing the first time they are reached instead of after 'threshold'
+    iterations.  It is discarded when the PyPy executable changes, and
+    the loops of a function are ignored when its bytecode changes."""
+    import sys, marshal, pypyjit
+    try:
+        f = open(filename, 'rb')
+        try:
+            data = marshal.load(f)
+        finally:
+            f.close()
+        format, version, profile = data
+        if format != CACHE_FORMAT or version != sys.version:
+            profile = []
+        pypyjit.set_warmup_profile(profile)
+    except Exception:
+        # a missing or corrupt file is ignored
+        pypyjit.set_warmup_profile([])
+    #
+    def save():
+        import os
+        tmpname = '%s.%d.tmp' % (filename, os.getpid())
+        try:
+            f = open(tmpname, 'wb')
+            try:
+                marshal.dump((CACHE_FORMAT, sys.version,
+                              pypyjit.get_warmup_profile()), f)
+            finally:
+                f.close()
+            # atomic, in case several processes exit at the same time
+            os.rename(tmpname, filename)
+        except (IOError, OSError):
+            pass
+    import atexit
+    atexit.register(save)
@@ -13,6 +13,7 @@ from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.interpreter.pycode import PyCode, CO_GENERATOR
 from pypy.interpreter.pyframe import PyFrame
 from pypy.interpreter.pyopcode import ExitFrame
+from pypy.module.pypyjit.interp_warmup import WarmupProfile
 from opcode import opmap
 
 PyFrame._virtualizable2_ = ['last_instr', 'pycode',
@@ -46,6 +47,11 @@ def set_jitcell_at(newcell, next_instr, is_being_profiled, bytecode):
 def should_unroll_one_iteration(next_instr, is_being_profiled, bytecode):
     return (bytecode.co_flags & CO_GENERATOR) != 0
 
+def is_hot_at(next_instr, is_being_profiled, bytecode):
+    # the loops listed in the warm-up profile (see interp_warmup.py)
+    positions = bytecode.jit_warmup_positions
+    return positions is not None and intmask(next_instr) in positions
+
 class PyPyJitDriver(JitDriver):
     reds = ['frame', 'ec']
     greens = ['next_instr', 'is_being_profiled', 'pycode']
@@ -56,6 +62,7 @@ pypyjitdriver = PyPyJitDriver(get_printable_location = get_printable_location,
                               set_jitcell_at = set_jitcell_at,
                               should_unroll_one_iteration =
                               should_unroll_one_iteration,
+                              is_hot_at = is_hot_at,
                               name='pypyjit')
 
 class __extend__(PyFrame):
@@ -117,9 +124,12 @@ class __extend__(PyCode):
     def _initialize(self):
         PyCode__initialize(self)
         self.jit_cells = {}
+        profile = self.space.fromcache(WarmupProfile)
+        self.jit_warmup_positions = profile.get_positions(self)
 
     def _cleanup_(self):
         self.jit_cells = {}
+        self.jit_warmup_positions = None
 
 # ____________________________________________________________
 #
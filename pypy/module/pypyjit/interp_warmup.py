@@ -0,0 +1,114 @@
+""" The warm-up profile: which loops of which code objects got compiled.
+
+Saved by a process and loaded by the next one (see app_warmup.py), it lets
+the new code objects start tracing these loops the first time they are
+reached, instead of after 'threshold' iterations.  The profile is only a
+hint for the JIT counters: a stale or wrong entry costs at most a trace.
+"""
+
+from rpython.rlib.objectmodel import compute_hash
+from rpython.rtyper.annlowlevel import cast_base_ptr_to_instance
+from rpython.rtyper.lltypesystem import lltype
+from rpython.rtyper.lltypesystem.rclass import OBJECT
+from pypy.interpreter.error import OperationError
+from pypy.interpreter.pycode import PyCode
+
+
+def make_key(filename, name, firstlineno):
+    return '%s\x00%s\x00%d' % (filename, name, firstlineno)
+
+def code_key(code):
+    return make_key(code.co_filename, code.co_name, code.co_firstlineno)
+
+def code_hash(code):
+    # changes when the source changes, in which case the positions of the
+    # loops recorded for the old version are meaningless
+    return compute_hash(code.co_code)
+
+
+class WarmupEntry(object):
+    def __init__(self, filename, name, firstlineno, code_hash):
+        self.filename = filename
+        self.name = name
+        self.firstlineno = firstlineno
+        self.code_hash = code_hash
+        self.positions = {}     # {next_instr: None}
+
+
+class WarmupProfile(object):
+    def __init__(self, space):
+        self.space = space
+        self.enabled = False
+        self.entries = {}       # {code_key: WarmupEntry}
+
+    def get_positions(self, code):
+        """ Return the dict of the positions of the loops to trace early
+        in 'code', or None. """
+        if not self.enabled:
+            return None
+        entry = self.entries.get(code_key(code), None)
+        if entry is None or entry.code_hash != code_hash(code):
+            return None
+        return entry.positions
+
+    def add(self, filename, name, firstlineno, hash, next_instr):
+        key = make_key(filename, name, firstlineno)
+        entry = self.entries.get(key, None)
+        if entry is None or entry.code_hash != hash:
+            entry = WarmupEntry(filename, name, firstlineno, hash)
+            self.entries[key] = entry
+        entry.positions[next_instr] = None
+
+    def record(self, code, next_instr):
+        self.add(code.co_filename, code.co_name, code.co_firstlineno,
+                 code_hash(code), next_instr)
+
+
+def record_compiled_loop(space, debug_info):
+    profile = space.fromcache(WarmupProfile)
+    if not profile.enabled or debug_info.get_jitdriver().name != 'pypyjit':
+        return
+    greenkey = debug_info.greenkey
+    ll_code = lltype.cast_opaque_ptr(lltype.Ptr(OBJECT),
+                                     greenkey[2].getref_base())
+    pycode = cast_base_ptr_to_instance(PyCode, ll_code)
+    profile.record(pycode, greenkey[0].getint())
+
+
+def get_warmup_profile(space):
+    """ get_warmup_profile()
+
+    Return the warm-up profile as a list of tuples
+    (co_filename, co_name, co_firstlineno, code_hash, position): the loops
+    given to set_warmup_profile(), plus the ones compiled since then.
+    """
+    profile = space.fromcache(WarmupProfile)
+    items_w = []
+    for entry in profile.entries.values():
+        for next_instr in entry.positions:
+            items_w.append(space.newtuple([space.wrap(entry.filename),
+                                           space.wrap(entry.name),
+                                           space.wrap(entry.firstlineno),
+                                           space.wrap(entry.code_hash),
+                                           space.wrap(next_instr)]))
+    return space.newlist(items_w)
+
+def set_warmup_profile(space, w_profile):
+    """ set_warmup_profile(profile)
+
+    Start recording the compiled loops, and trace early the loops of the
+    profile (a list as returned by get_warmup_profile()) in the code objects
+    created from now on.  The entries for a code object whose bytecode
+    changed are ignored.
+    """
+    profile = space.fromcache(WarmupProfile)
+    profile.entries = {}
+    for w_item in space.listview(w_profile):
+        items_w = space.fixedview(w_item)
+        if len(items_w) != 5:
+            raise OperationError(space.w_ValueError, space.wrap(
+                "expected tuples of length 5 in the warm-up profile"))
+        profile.add(space.str_w(items_w[0]), space.str_w(items_w[1]),
+                    space.int_w(items_w[2]), space.int_w(items_w[3]),
+                    space.int_w(items_w[4]))
+    profile.enabled = True
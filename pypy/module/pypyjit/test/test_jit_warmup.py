@@ -0,0 +1,114 @@
+
+import py
+from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.module.pypyjit.interp_jit import is_hot_at
+from pypy.module.pypyjit.policy import pypy_hooks
+from rpython.jit.metainterp.history import JitCellToken, ConstInt, ConstPtr
+from rpython.rlib.jit import JitDebugInfo
+from rpython.rlib.rarithmetic import r_uint
+from rpython.rtyper.annlowlevel import cast_instance_to_base_ptr
+from rpython.rtyper.lltypesystem import lltype, llmemory
+from pypy.module.pypyjit.test.test_jit_hook import MockJitDriverSD
+
+
+class AppTestJitWarmup(object):
+    spaceconfig = dict(usemodules=('pypyjit',))
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("Can't run this test with -A")
+        space = cls.space
+
+        @unwrap_spec(next_instr=int)
+        def interp_on_compile(w_func, next_instr):
+            code = w_func.code
+            ll_code = cast_instance_to_base_ptr(code)
+            code_gcref = lltype.cast_opaque_ptr(llmemory.GCREF, ll_code)
+            greenkey = [ConstInt(next_instr), ConstInt(0),
+                        ConstPtr(code_gcref)]
+            di_loop = JitDebugInfo(MockJitDriverSD, None, JitCellToken(), [],
+                                   'loop', greenkey)
+            pypy_hooks.after_compile(di_loop)
+
+        @unwrap_spec(next_instr=int)
+        def interp_is_hot_at(w_func, next_instr):
+            return space.newbool(is_hot_at(r_uint(next_instr), False,
+                                           w_func.code))
+
+        cls.w_on_compile = space.wrap(interp2app(interp_on_compile))
+        cls.w_is_hot_at = space.wrap(interp2app(interp_is_hot_at))
+        cls.w_tmpfile = space.wrap(str(py.test.ensuretemp('jit_warmup')
+                                       .join('cache')))
+
+    def test_record(self):
+        import pypyjit
+        def f():
+            pass
+        self.on_compile(f, 12)
+        assert pypyjit.get_warmup_profile() == []
+        pypyjit.set_warmup_profile([])
+        self.on_compile(f, 12)
+        self.on_compile(f, 20)
+        profile = pypyjit.get_warmup_profile()
+        assert len(profile) == 2
+        code = f.__code__
+        for filename, name, firstlineno, hash, next_instr in profile:
+            assert filename == code.co_filename
+            assert name == 'f'
+            assert firstlineno == code.co_firstlineno
+            assert isinstance(hash, int)
+        assert sorted([item[4] for item in profile]) == [12, 20]
+
+    def test_hot_at(self):
+        import pypyjit
+        src = "def f():\n    pass\n"
+        d = {}
+        exec compile(src, 'test_hot_at', 'exec') in d
+        f = d['f']
+        pypyjit.set_warmup_profile([])
+        self.on_compile(f, 12)
+        assert not self.is_hot_at(f, 12)   # only for new code objects
+        profile = pypyjit.get_warmup_profile()
+        pypyjit.set_warmup_profile(profile)
+        d = {}
+        exec compile(src, 'test_hot_at', 'exec') in d
+        assert self.is_hot_at(d['f'], 12)
+        assert not self.is_hot_at(d['f'], 13)
+        # the source changed: the profile is ignored
+        d = {}
+        exec compile("def f():\n    return 42\n", 'test_hot_at', 'exec') in d
+        assert not self.is_hot_at(d['f'], 12)
+        pypyjit.set_warmup_profile([])
+        d = {}
+        exec compile(src, 'test_hot_at', 'exec') in d
+        assert not self.is_hot_at(d['f'], 12)
+
+    def test_set_invalid(self):
+        import pypyjit
+        raises(ValueError, pypyjit.set_warmup_profile, [('a', 'b', 1)])
+        raises(TypeError, pypyjit.set_warmup_profile, [('a', 'b', 1, 2, 'x')])
+
+    def test_enable_warmup_cache(self):
+        import pypyjit, marshal, sys
+        f = open(self.tmpfile, 'wb')
+        f.write('garbage')
+        f.close()
+        pypyjit.enable_warmup_cache(self.tmpfile)
+        assert pypyjit.get_warmup_profile() == []
+        profile = [('x.py', 'f', 1, 1234, 10)]
+        f = open(self.tmpfile, 'wb')
+        marshal.dump((1, sys.version, profile), f)
+        f.close()
+        pypyjit.enable_warmup_cache(self.tmpfile)
+        assert pypyjit.get_warmup_profile() == profile
+        f = open(self.tmpfile, 'wb')
+        marshal.dump((1, 'some other version', profile), f)
+        f.close()
+        pypyjit.enable_warmup_cache(self.tmpfile)
+        assert pypyjit.get_warmup_profile() == []
+        for bad in [[('x.py', 'f', 1)], [('x.py', 'f', 1, 1234, 'x')], 42]:
+            f = open(self.tmpfile, 'wb')
+            marshal.dump((1, sys.version, bad), f)
+            f.close()
+            pypyjit.enable_warmup_cache(self.tmpfile)
+            assert pypyjit.get_warmup_profile() == []
@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, operationerrfmt
 from pypy.interpreter.gateway import (
@@ -9,7 +11,8 @@ from pypy.objspace.std.util import negate
 
 from rpython.rlib import jit, rerased
 from rpython.rlib.debug import mark_dict_non_null
-from rpython.rlib.objectmodel import newlist_hint, r_dict, specialize
+from rpython.rlib.objectmodel import (newlist_hint, r_dict, r_ordereddict,
+    specialize)
 from rpython.tool.sourcetools import func_renamer, func_with_new_name
 
 
@@ -503,7 +506,7 @@ class EmptyDictStrategy(DictStrategy):
     def switch_to_correct_strategy(self, w_dict, w_key):
         withidentitydict = self.space.config.objspace.std.withidentitydict
         if type(w_key) is self.space.StringObjectCls:
-            self.switch_to_string_strategy(w_dict)
+            self.switch_to_string_strategy(w_dict, self.space.str_w(w_key))
             return
         elif type(w_key) is self.space.UnicodeObjectCls:
             self.switch_to_unicode_strategy(w_dict)
@@ -511,13 +514,22 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif (self.space.config.objspace.std.withtypedkeydict and
+                self.switch_to_typed_key_strategy(w_dict, w_key)):
+            pass
         elif withidentitydict and w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
             self.switch_to_object_strategy(w_dict)
 
-    def switch_to_string_strategy(self, w_dict):
+    def switch_to_string_strategy(self, w_dict, key):
+        # 'key' is the first key that the dict gets
         strategy = self.space.fromcache(StringDictStrategy)
+        if self.space.config.objspace.std.withshareddict:
+            from pypy.objspace.std.mapdict import SharedDictStrategy
+            shared_strategy = self.space.fromcache(SharedDictStrategy)
+            if shared_strategy.can_start_with_key(key):
+                strategy = shared_strategy
         storage = strategy.get_empty_storage()
         w_dict.strategy = strategy
         w_dict.dstorage = storage
@@ -534,6 +546,21 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.strategy = strategy
         w_dict.dstorage = storage
 
+    def switch_to_typed_key_strategy(self, w_dict, w_key):
+        """ Switches to the strategy for float keys or for small tuples of
+        ints and strings, if w_key is such a key.  Returns False if not. """
+        from pypy.objspace.std.typedkeydict import (FloatDictStrategy,
+            get_tuple_strategy)
+        strategy = self.space.fromcache(FloatDictStrategy)
+        if not strategy.is_correct_type(w_key):
+            strategy = get_tuple_strategy(self.space, w_key)
+            if strategy is None:
+                return False
+        storage = strategy.get_empty_storage()
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+        return True
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -569,7 +596,7 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.setitem(w_key, w_value)
 
     def setitem_str(self, w_dict, key, w_value):
-        self.switch_to_string_strategy(w_dict)
+        self.switch_to_string_strategy(w_dict, key)
         w_dict.setitem_str(key, w_value)
 
     def delitem(self, w_dict, w_key):
@@ -852,8 +879,12 @@ class ObjectDictStrategy(AbstractTypedStrategy, DictStrategy):
         return True
 
     def get_empty_storage(self):
-        new_dict = r_dict(self.space.eq_w, self.space.hash_w,
-                          force_non_null=True)
+        if self.space.config.objspace.std.withordereddict:
+            new_dict = r_ordereddict(self.space.eq_w, self.space.hash_w,
+                                     force_non_null=True)
+        else:
+            new_dict = r_dict(self.space.eq_w, self.space.hash_w,
+                              force_non_null=True)
         return self.erase(new_dict)
 
     def _never_equal_to(self, w_lookup_type):
@@ -887,7 +918,10 @@ class StringDictStrategy(AbstractTypedStrategy, DictStrategy):
         return space.is_w(space.type(w_obj), space.w_str)
 
     def get_empty_storage(self):
-        res = {}
+        if self.space.config.objspace.std.withordereddict:
+            res = OrderedDict()
+        else:
+            res = {}
         mark_dict_non_null(res)
         return self.erase(res)
 
@@ -951,7 +985,10 @@ class UnicodeDictStrategy(AbstractTypedStrategy, DictStrategy):
         return space.is_w(space.type(w_obj), space.w_unicode)
 
     def get_empty_storage(self):
-        res = {}
+        if self.space.config.objspace.std.withordereddict:
+            res = OrderedDict()
+        else:
+            res = {}
         mark_dict_non_null(res)
         return self.erase(res)
 
@@ -1013,6 +1050,8 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
         return self.space.int_w(wrapped)
 
     def get_empty_storage(self):
+        if self.space.config.objspace.std.withordereddict:
+            return self.erase(OrderedDict())
         return self.erase({})
 
     def is_correct_type(self, w_obj):
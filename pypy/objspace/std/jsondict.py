@@ -0,0 +1,234 @@
+## ----------------------------------------------------------------------------
+## dict strategy (see dictmultiobject.py)
+
+from rpython.rlib import rerased
+from pypy.objspace.std.dictmultiobject import (DictStrategy,
+                                               create_iterator_classes,
+                                               ObjectDictStrategy,
+                                               UnicodeDictStrategy,
+                                               W_DictMultiObject,
+                                               _never_equal_to_string)
+
+
+# objects with more keys than this get a normal dict
+MAX_SHARED_KEYS = 64
+
+# a map has at most this many transitions: the objects whose keys would
+# need more get a normal dict, so that the tree of maps of a long-lived
+# decoder does not grow without bound
+MAX_TRANSITIONS = 16
+
+# above this number of keys, JSONMap.index() uses a dict instead of walking
+# the chain of maps
+INDEX_DICT_CUTOFF = 8
+
+
+class JSONMap(object):
+    """ A sequence of distinct unicode keys, used to share the layout of all
+    the dicts that have exactly these keys in this order, as is typical of
+    the objects in a JSON document.  The maps form a tree: each map knows
+    the maps that extend it with one more key.
+    """
+
+    def __init__(self, space, prev, w_key):
+        self.space = space
+        self.prev = prev
+        self.w_key = w_key
+        if prev is None:
+            self.length = 0
+            self.key = None
+        else:
+            self.length = prev.length + 1
+            self.key = space.unicode_w(w_key)
+        self.transitions = {}
+        self.keys_w = None
+        self.index_dict = None
+        self.strategy = None
+
+    def get_next(self, w_key):
+        """ Return the map with w_key added at the end, or None if w_key is
+        already in the map or if the map is too long or has too many
+        transitions. """
+        key = self.space.unicode_w(w_key)
+        jsonmap = self.transitions.get(key, None)
+        if jsonmap is not None:
+            return jsonmap
+        if (self.length >= MAX_SHARED_KEYS or
+                len(self.transitions) >= MAX_TRANSITIONS or
+                self.index(key) >= 0):
+            return None
+        jsonmap = JSONMap(self.space, self, w_key)
+        self.transitions[key] = jsonmap
+        return jsonmap
+
+    def index(self, key):
+        if self.length > INDEX_DICT_CUTOFF:
+            index_dict = self.index_dict
+            if index_dict is None:
+                index_dict = {}
+                jsonmap = self
+                while jsonmap.prev is not None:
+                    index_dict[jsonmap.key] = jsonmap.length - 1
+                    jsonmap = jsonmap.prev
+                self.index_dict = index_dict
+            return index_dict.get(key, -1)
+        jsonmap = self
+        while jsonmap.prev is not None:
+            if jsonmap.key == key:
+                return jsonmap.length - 1
+            jsonmap = jsonmap.prev
+        return -1
+
+    def get_keys_w(self):
+        keys_w = self.keys_w
+        if keys_w is None:
+            keys_w = [None] * self.length
+            jsonmap = self
+            while jsonmap.prev is not None:
+                keys_w[jsonmap.length - 1] = jsonmap.w_key
+                jsonmap = jsonmap.prev
+            self.keys_w = keys_w
+        return keys_w
+
+    def get_strategy(self):
+        strategy = self.strategy
+        if strategy is None:
+            strategy = self.strategy = JSONDictStrategy(self.space, self)
+        return strategy
+
+
+def from_jsonmap_and_values(space, jsonmap, values_w):
+    """ Make a new dict with the keys of jsonmap and the values values_w. """
+    assert len(values_w) == jsonmap.length
+    strategy = jsonmap.get_strategy()
+    storage = strategy.erase(values_w)
+    return W_DictMultiObject(space, strategy, storage)
+
+
+class JSONDictStrategy(DictStrategy):
+    """ The keys are stored once in the JSONMap, each dict only has the list
+    of its values.  Any change to the set of keys switches the dict to the
+    UnicodeDictStrategy. """
+
+    erase, unerase = rerased.new_erasing_pair("jsondict")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def __init__(self, space, jsonmap):
+        self.space = space
+        self.jsonmap = jsonmap
+
+    def is_correct_type(self, w_obj):
+        return type(w_obj) is self.space.UnicodeObjectCls
+
+    def _never_equal_to(self, w_lookup_type):
+        return _never_equal_to_string(self.space, w_lookup_type)
+
+    def length(self, w_dict):
+        return self.jsonmap.length
+
+    def getitem(self, w_dict, w_key):
+        space = self.space
+        if self.is_correct_type(w_key):
+            index = self.jsonmap.index(space.unicode_w(w_key))
+            if index < 0:
+                return None
+            return self.unerase(w_dict.dstorage)[index]
+        elif self._never_equal_to(space.type(w_key)):
+            return None
+        else:
+            self.switch_to_object_strategy(w_dict)
+            return w_dict.getitem(w_key)
+
+    def getitem_str(self, w_dict, key):
+        return self.getitem(w_dict, self.space.wrap(key))
+
+    def setitem(self, w_dict, w_key, w_value):
+        if self.is_correct_type(w_key):
+            index = self.jsonmap.index(self.space.unicode_w(w_key))
+            if index >= 0:
+                self.unerase(w_dict.dstorage)[index] = w_value
+                return
+        self.switch_to_unicode_strategy(w_dict)
+        w_dict.setitem(w_key, w_value)
+
+    def setitem_str(self, w_dict, key, w_value):
+        self.switch_to_unicode_strategy(w_dict)
+        w_dict.setitem_str(key, w_value)
+
+    def setdefault(self, w_dict, w_key, w_default):
+        if self.is_correct_type(w_key):
+            w_result = self.getitem(w_dict, w_key)
+            if w_result is not None:
+                return w_result
+        self.switch_to_unicode_strategy(w_dict)
+        return w_dict.setdefault(w_key, w_default)
+
+    def delitem(self, w_dict, w_key):
+        self.switch_to_unicode_strategy(w_dict)
+        return w_dict.delitem(w_key)
+
+    def popitem(self, w_dict):
+        self.switch_to_unicode_strategy(w_dict)
+        return w_dict.popitem()
+
+    def w_keys(self, w_dict):
+        return self.space.newlist(self.jsonmap.get_keys_w()[:])
+
+    def values(self, w_dict):
+        return self.unerase(w_dict.dstorage)[:]
+
+    def items(self, w_dict):
+        space = self.space
+        keys_w = self.jsonmap.get_keys_w()
+        values_w = self.unerase(w_dict.dstorage)
+        return [space.newtuple([keys_w[i], values_w[i]])
+                for i in range(len(keys_w))]
+
+    def listview_unicode(self, w_dict):
+        space = self.space
+        return [space.unicode_w(w_key) for w_key in self.jsonmap.get_keys_w()]
+
+    def switch_to_unicode_strategy(self, w_dict):
+        strategy = self.space.fromcache(UnicodeDictStrategy)
+        storage = strategy.get_empty_storage()
+        d_new = strategy.unerase(storage)
+        keys_w = self.jsonmap.get_keys_w()
+        values_w = self.unerase(w_dict.dstorage)
+        for i in range(len(keys_w)):
+            d_new[self.space.unicode_w(keys_w[i])] = values_w[i]
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
+    def switch_to_object_strategy(self, w_dict):
+        strategy = self.space.fromcache(ObjectDictStrategy)
+        storage = strategy.get_empty_storage()
+        d_new = strategy.unerase(storage)
+        keys_w = self.jsonmap.get_keys_w()
+        values_w = self.unerase(w_dict.dstorage)
+        for i in range(len(keys_w)):
+            d_new[keys_w[i]] = values_w[i]
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
+    def getiterkeys(self, w_dict):
+        return iter(self.jsonmap.get_keys_w())
+    def getitervalues(self, w_dict):
+        return iter(self.unerase(w_dict.dstorage))
+    def getiteritems(self, w_dict):
+        return iter(range(self.jsonmap.length))
+
+def next_item(self):
+    strategy = self.strategy
+    assert isinstance(strategy, JSONDictStrategy)
+    for i in self.iterator:
+        w_key = strategy.jsonmap.get_keys_w()[i]
+        w_dict = self.dictimplementation
+        if w_dict.strategy is not strategy:
+            # the dict was changed: the caller looks up the key again
+            return w_key, None
+        return w_key, strategy.unerase(w_dict.dstorage)[i]
+    else:
+        return None, None
+
+create_iterator_classes(JSONDictStrategy, override_next_item=next_item)
@@ -10,7 +10,7 @@ from pypy.objspace.std.dictmultiobject import (DictStrategy,
 
 
 class EmptyKwargsDictStrategy(EmptyDictStrategy):
-    def switch_to_string_strategy(self, w_dict):
+    def switch_to_string_strategy(self, w_dict, key):
         strategy = self.space.fromcache(KwargsDictStrategy)
         storage = strategy.get_empty_storage()
         w_dict.strategy = strategy
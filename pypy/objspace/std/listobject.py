@@ -32,6 +32,8 @@ from rpython.rlib import debug, jit, rerased
 from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.objectmodel import (
     instantiate, newlist_hint, resizelist_hint, specialize)
+from rpython.rlib.rarithmetic import LONG_BIT, widen
+from rpython.rtyper.lltypesystem import rffi
 from rpython.tool.sourcetools import func_with_new_name
 
 __all__ = ['W_ListObject', 'make_range_list', 'make_empty_list_with_size']
@@ -75,6 +77,15 @@ def get_strategy_from_list_objects(space, list_w, sizehint):
         if not type(w_obj) is W_IntObject:
             break
     else:
+        if space.config.objspace.std.withnarrowintlist:
+            minval = maxval = space.int_w(list_w[0])
+            for w_obj in list_w:
+                intval = space.int_w(w_obj)
+                if intval < minval:
+                    minval = intval
+                elif intval > maxval:
+                    maxval = intval
+            return get_int_strategy_for_range(space, minval, maxval)
         return space.fromcache(IntegerListStrategy)
 
     # check for strings
@@ -291,6 +302,11 @@ class W_ListObject(W_Root):
         """Return the items in the list as unwrapped ints. If the list does not
         use the list strategy, return None."""
         return self.strategy.getitems_int(self)
+
+    def getitems_float(self):
+        """Return the items in the list as unwrapped floats. If the list does
+        not use the list strategy, return None."""
+        return self.strategy.getitems_float(self)
     # ___________________________________________________
 
     def mul(self, times):
@@ -662,24 +678,20 @@ class W_ListObject(W_Root):
             # core-dump factory, since the storage may change).
             self.__init__(space, [])
 
-            # wrap each item in a KeyContainer if needed
+            # compute the keys; if possible, sort by the unwrapped keys,
+            # or else wrap each item in a KeyContainer
             if has_key:
+                keys_w = [None] * sorter.listlength
                 for i in range(sorter.listlength):
-                    w_item = sorter.list[i]
-                    w_keyitem = space.call_function(w_key, w_item)
-                    sorter.list[i] = KeyContainer(w_keyitem, w_item)
-
-            # Reverse sort stability achieved by initially reversing the list,
-            # applying a stable forward sort, then reversing the final result.
-            if reverse:
-                sorter.list.reverse()
-
-            # perform the sort
-            sorter.sort()
-
-            # reverse again
-            if reverse:
-                sorter.list.reverse()
+                    keys_w[i] = space.call_function(w_key, sorter.list[i])
+                if has_cmp or not _sort_by_unwrapped_keys(
+                        space, sorter.list, keys_w, reverse):
+                    for i in range(sorter.listlength):
+                        sorter.list[i] = KeyContainer(keys_w[i],
+                                                      sorter.list[i])
+                    _sort(sorter, reverse)
+            else:
+                _sort(sorter, reverse)
 
         finally:
             # unwrap each item if needed
@@ -699,6 +711,52 @@ class W_ListObject(W_Root):
             raise OperationError(space.w_ValueError,
                                  space.wrap("list modified during sort"))
 
+@specialize.argtype(0)
+def _sort(sorter, reverse):
+    # Reverse sort stability achieved by initially reversing the list,
+    # applying a stable forward sort, then reversing the final result.
+    if reverse:
+        sorter.list.reverse()
+
+    # perform the sort
+    sorter.sort()
+
+    # reverse again
+    if reverse:
+        sorter.list.reverse()
+
+def _sort_by_unwrapped_keys(space, list_w, keys_w, reverse):
+    """ Sorts list_w in place if the keys are all ints, all floats or all
+    strings, comparing the unwrapped keys.  Returns False if they are not.
+    """
+    if not keys_w:
+        return True
+    w_type = space.type(keys_w[0])
+    for w_key in keys_w:
+        if space.type(w_key) is not w_type:
+            return False
+    if w_type is space.w_int:
+        _sort_by_keys(IntKeySort, [(space.int_w(keys_w[i]), list_w[i])
+                                   for i in range(len(list_w))],
+                      list_w, reverse)
+    elif w_type is space.w_float:
+        _sort_by_keys(FloatKeySort, [(space.float_w(keys_w[i]), list_w[i])
+                                     for i in range(len(list_w))],
+                      list_w, reverse)
+    elif w_type is space.w_str:
+        _sort_by_keys(StringKeySort, [(space.str_w(keys_w[i]), list_w[i])
+                                      for i in range(len(list_w))],
+                      list_w, reverse)
+    else:
+        return False
+    return True
+
+@specialize.arg(0)
+def _sort_by_keys(sorterclass, pairs, list_w, reverse):
+    _sort(sorterclass(pairs, len(pairs)), reverse)
+    for i in range(len(pairs)):
+        list_w[i] = pairs[i][1]
+
 find_jmp = jit.JitDriver(greens = [], reds = 'auto', name = 'list.find')
 
 class ListStrategy(object):
@@ -754,6 +812,9 @@ class ListStrategy(object):
     def getitems_int(self, w_list):
         return None
 
+    def getitems_float(self, w_list):
+        return None
+
     def getstorage_copy(self, w_list):
         raise NotImplementedError
 
@@ -884,7 +945,8 @@ class EmptyListStrategy(ListStrategy):
 
     def switch_to_correct_strategy(self, w_list, w_item):
         if type(w_item) is W_IntObject:
-            strategy = self.space.fromcache(IntegerListStrategy)
+            intval = self.space.int_w(w_item)
+            strategy = get_int_strategy_for_range(self.space, intval, intval)
         elif type(w_item) is W_StringObject:
             strategy = self.space.fromcache(StringListStrategy)
         elif type(w_item) is W_UnicodeObject:
@@ -934,15 +996,13 @@ class EmptyListStrategy(ListStrategy):
 
     def _extend_from_iterable(self, w_list, w_iterable):
         space = self.space
-        if isinstance(w_iterable, W_AbstractTupleObject):
-            w_list.__init__(space, w_iterable.getitems_copy())
-            return
-
         intlist = space.listview_int(w_iterable)
         if intlist is not None:
-            w_list.strategy = strategy = space.fromcache(IntegerListStrategy)
-            # need to copy because intlist can share with w_iterable
-            w_list.lstorage = strategy.erase(intlist[:])
+            w_list.strategy = strategy = get_int_strategy_for_list(space,
+                                                                   intlist)
+            # storage_from_ints() copies, because intlist can share with
+            # w_iterable
+            w_list.lstorage = strategy.storage_from_ints(intlist)
             return
 
         strlist = space.listview_str(w_iterable)
@@ -952,6 +1012,17 @@ class EmptyListStrategy(ListStrategy):
             w_list.lstorage = strategy.erase(strlist[:])
             return
 
+        floatlist = space.listview_float(w_iterable)
+        if floatlist is not None:
+            w_list.strategy = strategy = space.fromcache(FloatListStrategy)
+            # need to copy because floatlist can share with w_iterable
+            w_list.lstorage = strategy.erase(floatlist[:])
+            return
+
+        if isinstance(w_iterable, W_AbstractTupleObject):
+            w_list.__init__(space, w_iterable.getitems_copy())
+            return
+
         unilist = space.listview_unicode(w_iterable)
         if unilist is not None:
             w_list.strategy = strategy = space.fromcache(UnicodeListStrategy)
@@ -1280,12 +1351,25 @@ class AbstractUnwrappedStrategy(object):
             return W_ListObject.from_storage_and_strategy(
                     self.space, storage, self)
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        """ Switches w_list to a more general strategy that can also store
+        w_sample_item. """
+        w_list.switch_to_object_strategy()
+
+    def switch_to_next_strategy_for_list(self, w_list, w_other):
+        """ Switches w_list to a more general strategy that can also store
+        the items of w_other.  Returns w_other, or a copy of it that uses
+        the new strategy of w_list. """
+        w_other = w_other._temporarily_as_objects()
+        w_list.switch_to_object_strategy()
+        return w_other
+
     def append(self, w_list, w_item):
         if self.is_correct_type(w_item):
             self.unerase(w_list.lstorage).append(self.unwrap(w_item))
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.append(w_item)
 
     def insert(self, w_list, index, w_item):
@@ -1295,7 +1379,7 @@ class AbstractUnwrappedStrategy(object):
             l.insert(index, self.unwrap(w_item))
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.insert(index, w_item)
 
     def _extend_from_list(self, w_list, w_other):
@@ -1306,8 +1390,7 @@ class AbstractUnwrappedStrategy(object):
         elif w_other.strategy.is_empty_strategy():
             return
 
-        w_other = w_other._temporarily_as_objects()
-        w_list.switch_to_object_strategy()
+        w_other = self.switch_to_next_strategy_for_list(w_list, w_other)
         w_list.extend(w_other)
 
     def setitem(self, w_list, index, w_item):
@@ -1320,7 +1403,7 @@ class AbstractUnwrappedStrategy(object):
                 raise
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.setitem(index, w_item)
 
     def setslice(self, w_list, start, step, slicelength, w_other):
@@ -1330,11 +1413,8 @@ class AbstractUnwrappedStrategy(object):
         if self is self.space.fromcache(ObjectListStrategy):
             w_other = w_other._temporarily_as_objects()
         elif not self.list_is_correct_type(w_other) and w_other.length() != 0:
-            w_list.switch_to_object_strategy()
-            w_other_as_object = w_other._temporarily_as_objects()
-            assert (w_other_as_object.strategy is
-                    self.space.fromcache(ObjectListStrategy))
-            w_list.setslice(start, step, slicelength, w_other_as_object)
+            w_other = self.switch_to_next_strategy_for_list(w_list, w_other)
+            w_list.setslice(start, step, slicelength, w_other)
             return
 
         oldsize = len(items)
@@ -1488,6 +1568,8 @@ class ObjectListStrategy(AbstractUnwrappedStrategy, ListStrategy):
 class IntegerListStrategy(AbstractUnwrappedStrategy, ListStrategy):
     _none_value = 0
     _applevel_repr = "int"
+    minval = -sys.maxint - 1
+    maxval = sys.maxint
 
     def wrap(self, intval):
         return self.space.wrap(intval)
@@ -1505,6 +1587,9 @@ class IntegerListStrategy(AbstractUnwrappedStrategy, ListStrategy):
     def list_is_correct_type(self, w_list):
         return w_list.strategy is self.space.fromcache(IntegerListStrategy)
 
+    def switch_to_next_strategy_for_list(self, w_list, w_other):
+        return _switch_to_int_strategy_for_list(self, w_list, w_other)
+
     def sort(self, w_list, reverse):
         l = self.unerase(w_list.lstorage)
         sorter = IntSort(l, len(l))
@@ -1515,6 +1600,165 @@ class IntegerListStrategy(AbstractUnwrappedStrategy, ListStrategy):
     def getitems_int(self, w_list):
         return self.unerase(w_list.lstorage)
 
+    def storage_from_ints(self, intlist):
+        return self.erase(intlist[:])
+
+
+def make_narrow_integer_strategy(name, TYPE, bits):
+    """ Makes a strategy for lists of ints that fit in 'bits' bits, stored
+    as a list of TYPE.  Storing an int that does not fit switches the list
+    to the narrowest integer strategy in which it fits. """
+    minval = -(1 << (bits - 1))
+    maxval = (1 << (bits - 1)) - 1
+
+    def fits(intval):
+        return minval <= intval <= maxval
+
+    BaseSort = make_timsort_class()
+
+    # the rtyper only supports comparisons of full-word ints
+    class NarrowIntSort(BaseSort):
+        def lt(self, a, b):
+            return widen(a) < widen(b)
+
+    # for 8 and 16 bits, sorting long lists is done by counting the
+    # occurrences of each value
+    COUNTING_SORT_MIN_LENGTH = (1 << bits) >> 4
+
+    def counting_sort(l):
+        counts = [0] * (maxval - minval + 1)
+        for item in l:
+            counts[widen(item) - minval] += 1
+        i = 0
+        for index in range(len(counts)):
+            item = rffi.cast(TYPE, index + minval)
+            for j in range(counts[index]):
+                l[i] = item
+                i += 1
+
+    class NarrowIntegerListStrategy(AbstractUnwrappedStrategy, ListStrategy):
+        _none_value = rffi.cast(TYPE, 0)
+
+        def wrap(self, item):
+            return self.space.wrap(widen(item))
+
+        def unwrap(self, w_int):
+            return rffi.cast(TYPE, self.space.int_w(w_int))
+
+        erase, unerase = rerased.new_erasing_pair(name)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def is_correct_type(self, w_obj):
+            return type(w_obj) is W_IntObject and fits(self.space.int_w(w_obj))
+
+        def list_is_correct_type(self, w_list):
+            return w_list.strategy is self
+
+        def switch_to_next_strategy(self, w_list, w_sample_item):
+            if type(w_sample_item) is W_IntObject:
+                intval = self.space.int_w(w_sample_item)
+                strategy = get_int_strategy_for_range(
+                    self.space, min(intval, minval), max(intval, maxval))
+                _switch_to_int_strategy(w_list, strategy)
+            else:
+                w_list.switch_to_object_strategy()
+
+        def switch_to_next_strategy_for_list(self, w_list, w_other):
+            return _switch_to_int_strategy_for_list(self, w_list, w_other)
+
+        def find(self, w_list, w_obj, start, stop):
+            if type(w_obj) is W_IntObject:
+                intval = self.space.int_w(w_obj)
+                if not fits(intval):
+                    raise ValueError
+                return self._safe_find(w_list, rffi.cast(TYPE, intval),
+                                       start, stop)
+            return ListStrategy.find(self, w_list, w_obj, start, stop)
+
+        def _safe_find(self, w_list, obj, start, stop):
+            l = self.unerase(w_list.lstorage)
+            intval = widen(obj)
+            for i in range(start, min(stop, len(l))):
+                if widen(l[i]) == intval:
+                    return i
+            raise ValueError
+
+        def sort(self, w_list, reverse):
+            l = self.unerase(w_list.lstorage)
+            if bits <= 16 and len(l) >= COUNTING_SORT_MIN_LENGTH:
+                counting_sort(l)
+            else:
+                sorter = NarrowIntSort(l, len(l))
+                sorter.sort()
+            if reverse:
+                l.reverse()
+
+        def getitems_int(self, w_list):
+            return [widen(item) for item in self.unerase(w_list.lstorage)]
+
+        def storage_from_ints(self, intlist):
+            return self.erase([rffi.cast(TYPE, intval) for intval in intlist])
+
+    NarrowIntegerListStrategy.__name__ = name.capitalize() + 'ListStrategy'
+    NarrowIntegerListStrategy._applevel_repr = name
+    NarrowIntegerListStrategy.minval = minval
+    NarrowIntegerListStrategy.maxval = maxval
+    return NarrowIntegerListStrategy
+
+Int8ListStrategy = make_narrow_integer_strategy('int8', rffi.SIGNEDCHAR, 8)
+Int16ListStrategy = make_narrow_integer_strategy('int16', rffi.SHORT, 16)
+Int32ListStrategy = make_narrow_integer_strategy('int32', rffi.INT, 32)
+
+
+def get_int_strategy_for_range(space, minval, maxval):
+    """ Returns the narrowest list strategy that can store all the ints
+    between minval and maxval. """
+    if space.config.objspace.std.withnarrowintlist:
+        if Int8ListStrategy.minval <= minval and maxval <= Int8ListStrategy.maxval:
+            return space.fromcache(Int8ListStrategy)
+        if Int16ListStrategy.minval <= minval and maxval <= Int16ListStrategy.maxval:
+            return space.fromcache(Int16ListStrategy)
+        if (LONG_BIT > 32 and Int32ListStrategy.minval <= minval and
+                maxval <= Int32ListStrategy.maxval):
+            return space.fromcache(Int32ListStrategy)
+    return space.fromcache(IntegerListStrategy)
+
+def get_int_strategy_for_list(space, intlist):
+    if not space.config.objspace.std.withnarrowintlist or not intlist:
+        return space.fromcache(IntegerListStrategy)
+    minval = maxval = intlist[0]
+    for intval in intlist:
+        if intval < minval:
+            minval = intval
+        elif intval > maxval:
+            maxval = intval
+    return get_int_strategy_for_range(space, minval, maxval)
+
+def _switch_to_int_strategy(w_list, strategy):
+    intlist = w_list.getitems_int()
+    w_list.lstorage = strategy.storage_from_ints(intlist)
+    w_list.strategy = strategy
+
+def _switch_to_int_strategy_for_list(self, w_list, w_other):
+    # 'self' is one of the integer strategies
+    intlist = w_other.getitems_int()
+    if intlist is None:
+        w_other = w_other._temporarily_as_objects()
+        w_list.switch_to_object_strategy()
+        return w_other
+    space = self.space
+    strategy = get_int_strategy_for_list(space, intlist)
+    strategy = get_int_strategy_for_range(
+        space, min(strategy.minval, self.minval),
+        max(strategy.maxval, self.maxval))
+    if strategy is not self:
+        _switch_to_int_strategy(w_list, strategy)
+    if w_other.strategy is strategy:
+        return w_other
+    storage = strategy.storage_from_ints(intlist)
+    return W_ListObject.from_storage_and_strategy(space, storage, strategy)
+
 
 class FloatListStrategy(AbstractUnwrappedStrategy, ListStrategy):
     _none_value = 0.0
@@ -1543,6 +1787,9 @@ class FloatListStrategy(AbstractUnwrappedStrategy, ListStrategy):
         if reverse:
             l.reverse()
 
+    def getitems_float(self, w_list):
+        return self.unerase(w_list.lstorage)
+
 
 class StringListStrategy(AbstractUnwrappedStrategy, ListStrategy):
     _none_value = None
@@ -1641,6 +1888,11 @@ StringBaseTimSort = make_timsort_class()
 UnicodeBaseTimSort = make_timsort_class()
 
 
+IntKeyBaseTimSort = make_timsort_class()
+FloatKeyBaseTimSort = make_timsort_class()
+StringKeyBaseTimSort = make_timsort_class()
+
+
 class KeyContainer(W_Root):
     def __init__(self, w_key, w_item):
         self.w_key = w_key
@@ -1677,6 +1929,22 @@ class UnicodeSort(UnicodeBaseTimSort):
         return a < b
 
 
+# sort (key, w_item) pairs with unwrapped keys, see _sort_by_unwrapped_keys()
+class IntKeySort(IntKeyBaseTimSort):
+    def lt(self, a, b):
+        return a[0] < b[0]
+
+
+class FloatKeySort(FloatKeyBaseTimSort):
+    def lt(self, a, b):
+        return a[0] < b[0]
+
+
+class StringKeySort(StringKeyBaseTimSort):
+    def lt(self, a, b):
+        return a[0] < b[0]
+
+
 class CustomCompareSort(SimpleSort):
     def lt(self, a, b):
         space = self.space
@@ -8,11 +8,18 @@ from pypy.objspace.std.dictmultiobject import W_DictMultiObject, DictStrategy, O
 from pypy.objspace.std.dictmultiobject import BaseKeyIterator, BaseValueIterator, BaseItemIterator
 from pypy.objspace.std.dictmultiobject import _never_equal_to_string
 from pypy.objspace.std.objectobject import W_ObjectObject
+from pypy.objspace.std.intobject import W_IntObject
+from pypy.objspace.std.floatobject import W_FloatObject
 from pypy.objspace.std.typeobject import TypeCell
 
 # ____________________________________________________________
 # attribute shapes
 
+# the kinds of storage of the attributes
+BOXED = 0
+UNBOXED_INT = 1
+UNBOXED_FLOAT = 2
+
 NUM_DIGITS = 4
 NUM_DIGITS_POW2 = 1 << NUM_DIGITS
 # note: we use "x * NUM_DIGITS_POW2" instead of "x << NUM_DIGITS" because
@@ -29,42 +36,48 @@ class AbstractAttribute(object):
         self.terminator = terminator
 
     def read(self, obj, selector):
-        index = self.index(selector)
-        if index < 0:
+        attr = self.find_map_attr(selector)
+        if attr is None:
             return self.terminator._read_terminator(obj, selector)
-        return obj._mapdict_read_storage(index)
+        return attr._direct_read(obj)
 
     def write(self, obj, selector, w_value):
-        index = self.index(selector)
-        if index < 0:
+        attr = self.find_map_attr(selector)
+        if attr is None:
             return self.terminator._write_terminator(obj, selector, w_value)
-        obj._mapdict_write_storage(index, w_value)
+        attr._direct_write(obj, w_value)
         return True
 
     def delete(self, obj, selector):
         return None
 
     def index(self, selector):
+        attr = self.find_map_attr(selector)
+        if attr is None:
+            return -1
+        return attr.position
+
+    def find_map_attr(self, selector):
         if jit.we_are_jitted():
             # hack for the jit:
-            # the _index method is pure too, but its argument is never
+            # the _find_map_attr method is pure too, but its argument is never
             # constant, because it is always a new tuple
-            return self._index_jit_pure(selector[0], selector[1])
+            return self._find_map_attr_jit_pure(selector[0], selector[1])
         else:
-            return self._index_indirection(selector)
+            return self._find_map_attr_indirection(selector)
 
     @jit.elidable
-    def _index_jit_pure(self, name, index):
-        return self._index_indirection((name, index))
+    def _find_map_attr_jit_pure(self, name, index):
+        return self._find_map_attr_indirection((name, index))
 
     @jit.dont_look_inside
-    def _index_indirection(self, selector):
+    def _find_map_attr_indirection(self, selector):
         if (self.space.config.objspace.std.withmethodcache):
-            return self._index_cache(selector)
-        return self._index(selector)
+            return self._find_map_attr_cache(selector)
+        return self._find_map_attr(selector)
 
     @jit.dont_look_inside
-    def _index_cache(self, selector):
+    def _find_map_attr_cache(self, selector):
         space = self.space
         cache = space.fromcache(IndexCache)
         SHIFT2 = r_uint.BITS - space.config.objspace.std.methodcachesizeexp
@@ -80,26 +93,26 @@ class AbstractAttribute(object):
         if cached_attr is self:
             cached_selector = cache.selectors[index_hash]
             if cached_selector == selector:
-                index = cache.indices[index_hash]
+                attr = cache.cached_attrs[index_hash]
                 if space.config.objspace.std.withmethodcachecounter:
                     name = selector[0]
                     cache.hits[name] = cache.hits.get(name, 0) + 1
-                return index
-        index = self._index(selector)
+                return attr
+        attr = self._find_map_attr(selector)
         cache.attrs[index_hash] = self
         cache.selectors[index_hash] = selector
-        cache.indices[index_hash] = index
+        cache.cached_attrs[index_hash] = attr
         if space.config.objspace.std.withmethodcachecounter:
             name = selector[0]
             cache.misses[name] = cache.misses.get(name, 0) + 1
-        return index
+        return attr
 
-    def _index(self, selector):
+    def _find_map_attr(self, selector):
         while isinstance(self, PlainAttribute):
             if selector == self.selector:
-                return self.position
+                return self
             self = self.back
-        return -1
+        return None
 
     def copy(self, obj):
         raise NotImplementedError("abstract base class")
@@ -120,15 +133,18 @@ class AbstractAttribute(object):
     def search(self, attrtype):
         return None
 
+    def search_unboxed(self, kind):
+        return None
+
     @jit.elidable
-    def _get_new_attr(self, name, index):
+    def _get_new_attr(self, name, index, kind):
         selector = name, index
         cache = self.cache_attrs
         if cache is None:
             cache = self.cache_attrs = {}
         attr = cache.get(selector, None)
         if attr is None:
-            attr = PlainAttribute(selector, self)
+            attr = make_attribute(selector, self, kind)
             cache[selector] = attr
         return attr
 
@@ -138,7 +154,10 @@ class AbstractAttribute(object):
             jit.isconstant(selector[1]))
     def add_attr(self, obj, selector, w_value):
         # grumble, jit needs this
-        attr = self._get_new_attr(selector[0], selector[1])
+        kind = unboxed_kind(self.space, w_value)
+        attr = self._get_new_attr(selector[0], selector[1], kind)
+        if isinstance(attr, UnboxedPlainAttribute):
+            attr = attr.attr_for_kind(kind)
         oldattr = obj._get_mapdict_map()
         if not jit.we_are_jitted():
             size_est = (oldattr._size_estimate + attr.size_estimate()
@@ -155,7 +174,7 @@ class AbstractAttribute(object):
         # the order is important here: first change the map, then the storage,
         # for the benefit of the special subclasses
         obj._set_mapdict_map(attr)
-        obj._mapdict_write_storage(attr.position, w_value)
+        attr._direct_write_new(obj, w_value)
 
     def materialize_r_dict(self, space, obj, dict_w):
         raise NotImplementedError("abstract base class")
@@ -163,6 +182,9 @@ class AbstractAttribute(object):
     def remove_dict_entries(self, obj):
         raise NotImplementedError("abstract base class")
 
+    def _write_boxed(self, obj, selector, w_value):
+        raise NotImplementedError("abstract base class")
+
     def __repr__(self):
         return "<%s>" % (self.__class__.__name__,)
 
@@ -262,6 +284,8 @@ class DevolvedDictTerminator(Terminator):
 
 class PlainAttribute(AbstractAttribute):
     _immutable_fields_ = ['selector', 'position', 'back']
+    kind = BOXED
+
     def __init__(self, selector, back):
         AbstractAttribute.__init__(self, back.space, back.terminator)
         self.selector = selector
@@ -269,8 +293,17 @@ class PlainAttribute(AbstractAttribute):
         self.back = back
         self._size_estimate = self.length() * NUM_DIGITS_POW2
 
+    def _direct_read(self, obj):
+        return obj._mapdict_read_storage(self.position)
+
+    def _direct_write(self, obj, w_value):
+        obj._mapdict_write_storage(self.position, w_value)
+
+    def _direct_write_new(self, obj, w_value):
+        obj._mapdict_write_storage(self.position, w_value)
+
     def _copy_attr(self, obj, new_obj):
-        w_value = self.read(obj, self.selector)
+        w_value = self._direct_read(obj)
         new_obj._get_mapdict_map().add_attr(new_obj, self.selector, w_value)
 
     def delete(self, obj, selector):
@@ -282,6 +315,17 @@ class PlainAttribute(AbstractAttribute):
             self._copy_attr(obj, new_obj)
         return new_obj
 
+    def _write_boxed(self, obj, selector, w_value):
+        # return a copy of 'obj' in which the attribute 'selector' is
+        # stored boxed, with the value 'w_value'
+        if selector == self.selector:
+            new_obj = self.back.copy(obj)
+            new_obj._get_mapdict_map().add_attr(new_obj, selector, w_value)
+            return new_obj
+        new_obj = self.back._write_boxed(obj, selector, w_value)
+        self._copy_attr(obj, new_obj)
+        return new_obj
+
     def copy(self, obj):
         new_obj = self.back.copy(obj)
         self._copy_attr(obj, new_obj)
@@ -300,11 +344,14 @@ class PlainAttribute(AbstractAttribute):
             return self
         return self.back.search(attrtype)
 
+    def search_unboxed(self, kind):
+        return self.back.search_unboxed(kind)
+
     def materialize_r_dict(self, space, obj, dict_w):
         new_obj = self.back.materialize_r_dict(space, obj, dict_w)
         if self.selector[1] == DICT:
             w_attr = space.wrap(self.selector[0])
-            dict_w[w_attr] = obj._mapdict_read_storage(self.position)
+            dict_w[w_attr] = self._direct_read(obj)
         else:
             self._copy_attr(obj, new_obj)
         return new_obj
@@ -318,6 +365,163 @@ class PlainAttribute(AbstractAttribute):
     def __repr__(self):
         return "<PlainAttribute %s %s %r>" % (self.selector, self.position, self.back)
 
+
+class UnboxedPlainAttribute(PlainAttribute):
+    """ An attribute whose values are all ints, or all floats, so far.  The
+    raw values of all the attributes of the same kind of an object are kept
+    in a single list, in the storage position of the first one.  Storing a
+    value of another type makes the attribute boxed (see _write_boxed).
+    """
+    _immutable_fields_ = ['listindex', 'firstunboxed', '_length',
+                          'boxed_attr?']
+    # the boxed version of this attribute, once it got a value of another
+    # type: from then on, new objects store the attribute boxed
+    boxed_attr = None
+
+    def __init__(self, selector, back):
+        AbstractAttribute.__init__(self, back.space, back.terminator)
+        self.selector = selector
+        self.back = back
+        prev = back.search_unboxed(self.kind)
+        if prev is None:
+            self.firstunboxed = True
+            self.position = back.length()
+            self.listindex = 0
+            self._length = self.position + 1
+        else:
+            self.firstunboxed = False
+            self.position = prev.position
+            self.listindex = prev.listindex + 1
+            self._length = back.length()
+        self._size_estimate = self.length() * NUM_DIGITS_POW2
+
+    def length(self):
+        return self._length
+
+    def search_unboxed(self, kind):
+        if kind == self.kind:
+            return self
+        return self.back.search_unboxed(kind)
+
+    def attr_for_kind(self, kind):
+        boxed_attr = self.boxed_attr
+        if boxed_attr is not None:
+            return boxed_attr
+        if kind == self.kind:
+            return self
+        return self._make_boxed_attr()
+
+    @jit.dont_look_inside
+    def _make_boxed_attr(self):
+        boxed_attr = PlainAttribute(self.selector, self.back)
+        self.boxed_attr = boxed_attr
+        return boxed_attr
+
+    def _grow_storage(self, obj):
+        # add an item for this attribute to the list of values of its kind,
+        # creating the list if this is the first attribute of that kind
+        raise NotImplementedError("abstract base class")
+
+    def _read_values(self, obj):
+        raise NotImplementedError("abstract base class")
+
+    def _write_unboxed(self, obj, w_value):
+        raise NotImplementedError("abstract base class")
+
+    def _direct_write(self, obj, w_value):
+        if not self._write_unboxed(obj, w_value):
+            new_obj = obj._get_mapdict_map()._write_boxed(obj, self.selector,
+                                                          w_value)
+            _become(obj, new_obj)
+
+    def _direct_write_new(self, obj, w_value):
+        # called when 'obj' just got this attribute as its map
+        self._grow_storage(obj)
+        self._direct_write(obj, w_value)
+
+    def __repr__(self):
+        return "<%s %s %s[%s] %r>" % (self.__class__.__name__, self.selector,
+                                      self.position, self.listindex,
+                                      self.back)
+
+
+class IntStorage(W_Root):
+    _immutable_fields_ = ['values']
+
+    def __init__(self):
+        self.values = []
+
+class FloatStorage(W_Root):
+    _immutable_fields_ = ['values']
+
+    def __init__(self):
+        self.values = []
+
+
+class IntAttribute(UnboxedPlainAttribute):
+    kind = UNBOXED_INT
+
+    def _grow_storage(self, obj):
+        if self.firstunboxed:
+            obj._mapdict_write_storage(self.position, IntStorage())
+        values = self._read_values(obj)
+        assert len(values) == self.listindex
+        values.append(0)
+
+    def _read_values(self, obj):
+        w_storage = obj._mapdict_read_storage(self.position)
+        assert isinstance(w_storage, IntStorage)
+        return w_storage.values
+
+    def _direct_read(self, obj):
+        return self.space.newint(self._read_values(obj)[self.listindex])
+
+    def _write_unboxed(self, obj, w_value):
+        if type(w_value) is not W_IntObject:
+            return False
+        self._read_values(obj)[self.listindex] = w_value.intval
+        return True
+
+class FloatAttribute(UnboxedPlainAttribute):
+    kind = UNBOXED_FLOAT
+
+    def _grow_storage(self, obj):
+        if self.firstunboxed:
+            obj._mapdict_write_storage(self.position, FloatStorage())
+        values = self._read_values(obj)
+        assert len(values) == self.listindex
+        values.append(0.0)
+
+    def _read_values(self, obj):
+        w_storage = obj._mapdict_read_storage(self.position)
+        assert isinstance(w_storage, FloatStorage)
+        return w_storage.values
+
+    def _direct_read(self, obj):
+        return self.space.newfloat(self._read_values(obj)[self.listindex])
+
+    def _write_unboxed(self, obj, w_value):
+        if type(w_value) is not W_FloatObject:
+            return False
+        self._read_values(obj)[self.listindex] = w_value.floatval
+        return True
+
+
+def unboxed_kind(space, w_value):
+    if space.config.objspace.std.withunboxedattrs:
+        if type(w_value) is W_IntObject:
+            return UNBOXED_INT
+        if type(w_value) is W_FloatObject:
+            return UNBOXED_FLOAT
+    return BOXED
+
+def make_attribute(selector, back, kind):
+    if kind == UNBOXED_INT:
+        return IntAttribute(selector, back)
+    if kind == UNBOXED_FLOAT:
+        return FloatAttribute(selector, back)
+    return PlainAttribute(selector, back)
+
 def _become(w_obj, new_obj):
     # this is like the _become method, really, but we cannot use that due to
     # RPython reasons
@@ -330,7 +534,7 @@ class IndexCache(object):
         self.attrs = [None] * SIZE
         self._empty_selector = (None, INVALID)
         self.selectors = [self._empty_selector] * SIZE
-        self.indices = [0] * SIZE
+        self.cached_attrs = [None] * SIZE
         if space.config.objspace.std.withmethodcachecounter:
             self.hits = {}
             self.misses = {}
@@ -677,13 +881,7 @@ class MapDictStrategy(DictStrategy):
             w_dict.delitem(w_key)
 
     def length(self, w_dict):
-        res = 0
-        curr = self.unerase(w_dict.dstorage)._get_mapdict_map().search(DICT)
-        while curr is not None:
-            curr = curr.back
-            curr = curr.search(DICT)
-            res += 1
-        return res
+        return _count_dict_keys(self.unerase(w_dict.dstorage)._get_mapdict_map())
 
     def clear(self, w_dict):
         w_obj = self.unerase(w_dict.dstorage)
@@ -710,74 +908,288 @@ class MapDictStrategy(DictStrategy):
         return MapDictIteratorItems(self.space, self, w_dict)
 
 
+def _count_dict_keys(map):
+    res = 0
+    curr = map.search(DICT)
+    while curr is not None:
+        curr = curr.back
+        curr = curr.search(DICT)
+        res += 1
+    return res
+
 def materialize_r_dict(space, obj, dict_w):
     map = obj._get_mapdict_map()
     new_obj = map.materialize_r_dict(space, obj, dict_w)
     _become(obj, new_obj)
 
-class MapDictIteratorKeys(BaseKeyIterator):
-    def __init__(self, space, strategy, dictimplementation):
-        BaseKeyIterator.__init__(self, space, strategy, dictimplementation)
+def _same_selectors(map1, map2):
+    while isinstance(map1, PlainAttribute):
+        if not isinstance(map2, PlainAttribute):
+            return False
+        if map1.selector != map2.selector:
+            return False
+        map1 = map1.back
+        map2 = map2.back
+    return map1 is map2
+
+class MapDictIteratorMixin(object):
+    _mixin_ = True
+
+    def _init_map(self, strategy, dictimplementation):
         w_obj = strategy.unerase(dictimplementation.dstorage)
         self.w_obj = w_obj
         self.orig_map = self.curr_map = w_obj._get_mapdict_map()
 
-    def next_key_entry(self):
+    def _follow_new_map(self, new_map):
+        # The map of the object changed, e.g. because an unboxed attribute
+        # got a value of another type.  If it still has the same attributes
+        # in the same order, continue at the same place in the new map.
+        if not _same_selectors(self.orig_map, new_map):
+            return False
+        map = self.orig_map
+        curr_map = new_map
+        while map is not self.curr_map:
+            assert isinstance(map, PlainAttribute)
+            assert isinstance(curr_map, PlainAttribute)
+            map = map.back
+            curr_map = curr_map.back
+        self.orig_map = new_map
+        self.curr_map = curr_map
+        return True
+
+    def _next_dict_attr(self):
         implementation = self.dictimplementation
         assert isinstance(implementation.strategy, MapDictStrategy)
-        if self.orig_map is not self.w_obj._get_mapdict_map():
-            return None
+        new_map = self.w_obj._get_mapdict_map()
+        if self.orig_map is not new_map:
+            if not self._follow_new_map(new_map):
+                return None
         if self.curr_map:
             curr_map = self.curr_map.search(DICT)
             if curr_map:
                 self.curr_map = curr_map.back
-                attr = curr_map.selector[0]
-                w_attr = self.space.wrap(attr)
-                return w_attr
+                return curr_map
         return None
 
+class MapDictIteratorKeys(MapDictIteratorMixin, BaseKeyIterator):
+    def __init__(self, space, strategy, dictimplementation):
+        BaseKeyIterator.__init__(self, space, strategy, dictimplementation)
+        self._init_map(strategy, dictimplementation)
+
+    def next_key_entry(self):
+        curr_map = self._next_dict_attr()
+        if curr_map is None:
+            return None
+        return self.space.wrap(curr_map.selector[0])
+
 
-class MapDictIteratorValues(BaseValueIterator):
+class MapDictIteratorValues(MapDictIteratorMixin, BaseValueIterator):
     def __init__(self, space, strategy, dictimplementation):
         BaseValueIterator.__init__(self, space, strategy, dictimplementation)
-        w_obj = strategy.unerase(dictimplementation.dstorage)
-        self.w_obj = w_obj
-        self.orig_map = self.curr_map = w_obj._get_mapdict_map()
+        self._init_map(strategy, dictimplementation)
 
     def next_value_entry(self):
-        implementation = self.dictimplementation
-        assert isinstance(implementation.strategy, MapDictStrategy)
-        if self.orig_map is not self.w_obj._get_mapdict_map():
+        curr_map = self._next_dict_attr()
+        if curr_map is None:
             return None
-        if self.curr_map:
-            curr_map = self.curr_map.search(DICT)
-            if curr_map:
-                self.curr_map = curr_map.back
-                attr = curr_map.selector[0]
-                return self.w_obj.getdictvalue(self.space, attr)
-        return None
+        return self.w_obj.getdictvalue(self.space, curr_map.selector[0])
 
 
-class MapDictIteratorItems(BaseItemIterator):
+class MapDictIteratorItems(MapDictIteratorMixin, BaseItemIterator):
     def __init__(self, space, strategy, dictimplementation):
         BaseItemIterator.__init__(self, space, strategy, dictimplementation)
+        self._init_map(strategy, dictimplementation)
+
+    def next_item_entry(self):
+        curr_map = self._next_dict_attr()
+        if curr_map is None:
+            return None, None
+        attr = curr_map.selector[0]
+        w_attr = self.space.wrap(attr)
+        return w_attr, self.w_obj.getdictvalue(self.space, attr)
+
+
+# ____________________________________________________________
+# shared-key dicts
+
+# a shared dict with more keys than this switches to the StringDictStrategy
+MAX_SHARED_DICT_KEYS = 32
+
+# a shared dict also switches to the StringDictStrategy when it gets a new
+# key after keys whose map already has that many transitions, so that dicts
+# with random keys do not fill the tree of maps
+MAX_SHARED_DICT_TRANSITIONS = 8
+
+# the same for the first key of the dicts.  All the shared dicts start from
+# the same terminator, so it needs many more transitions: otherwise the
+# first keys used at startup would be the only ones ever shared
+MAX_SHARED_DICT_FIRST_KEYS = 1000
+
+def get_terminator_for_shared_dicts(space):
+    return DictTerminator(space, None)
+
+class SharedDictStrategy(MapDictStrategy):
+    """ Strategy for string-keyed dicts that are not the __dict__ of an
+    instance.  As for instances, the keys are stored in a chain of maps
+    shared by all the dicts that got the same keys in the same order, and
+    each dict only stores its values.  Dicts with too many keys, or with
+    keys that are not strings, switch to a normal strategy. """
+
+    def get_empty_storage(self):
+        w_result = Object()
+        terminator = self.space.fromcache(get_terminator_for_shared_dicts)
+        w_result._init_empty(terminator)
+        return self.erase(w_result)
+
+    def can_add_key(self, map, key):
+        """ Can a dict whose map is 'map' get the key 'key' and stay
+        shared? """
+        selector = (key, DICT)
+        if map.find_map_attr(selector) is not None:
+            return True
+        cache = map.cache_attrs
+        if cache is not None and selector in cache:
+            return True
+        if isinstance(map, Terminator):
+            max_transitions = MAX_SHARED_DICT_FIRST_KEYS
+        else:
+            max_transitions = MAX_SHARED_DICT_TRANSITIONS
+            if _count_dict_keys(map) >= MAX_SHARED_DICT_KEYS:
+                return False
+        return cache is None or len(cache) < max_transitions
+
+    def can_start_with_key(self, key):
+        """ Should an empty dict getting the key 'key' use this strategy? """
+        terminator = self.space.fromcache(get_terminator_for_shared_dicts)
+        return self.can_add_key(terminator, key)
+
+    def setitem_str(self, w_dict, key, w_value):
+        w_obj = self.unerase(w_dict.dstorage)
+        if not self.can_add_key(w_obj._get_mapdict_map(), key):
+            self.switch_to_string_strategy(w_dict)
+            w_dict.setitem_str(key, w_value)
+            return
+        MapDictStrategy.setitem_str(self, w_dict, key, w_value)
+
+    def _get_attrs(self, w_dict):
+        # the attributes of the keys of w_dict, in insertion order
+        return _get_dict_attrs(self.unerase(w_dict.dstorage)._get_mapdict_map())
+
+    def switch_to_string_strategy(self, w_dict):
+        from pypy.objspace.std.dictmultiobject import StringDictStrategy
+        w_obj = self.unerase(w_dict.dstorage)
+        strategy = self.space.fromcache(StringDictStrategy)
+        storage = strategy.get_empty_storage()
+        d_new = strategy.unerase(storage)
+        for attr in self._get_attrs(w_dict):
+            d_new[attr.selector[0]] = attr._direct_read(w_obj)
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
+    def switch_to_object_strategy(self, w_dict):
+        space = self.space
+        w_obj = self.unerase(w_dict.dstorage)
+        strategy = space.fromcache(ObjectDictStrategy)
+        storage = strategy.get_empty_storage()
+        d_new = strategy.unerase(storage)
+        for attr in self._get_attrs(w_dict):
+            d_new[space.wrap(attr.selector[0])] = attr._direct_read(w_obj)
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
+    def listview_str(self, w_dict):
+        return [attr.selector[0] for attr in self._get_attrs(w_dict)]
+
+    def iterkeys(self, w_dict):
+        return SharedDictIteratorKeys(self.space, self, w_dict)
+    def itervalues(self, w_dict):
+        return SharedDictIteratorValues(self.space, self, w_dict)
+    def iteritems(self, w_dict):
+        return SharedDictIteratorItems(self.space, self, w_dict)
+
+    def view_as_kwargs(self, w_dict):
+        w_obj = self.unerase(w_dict.dstorage)
+        attrs = self._get_attrs(w_dict)
+        keys = [attr.selector[0] for attr in attrs]
+        values_w = [attr._direct_read(w_obj) for attr in attrs]
+        return keys, values_w
+
+
+def _get_dict_attrs(map):
+    attrs = []
+    curr = map.search(DICT)
+    while curr is not None:
+        attrs.append(curr)
+        curr = curr.back.search(DICT)
+    attrs.reverse()
+    return attrs
+
+# unlike the MapDictIterators, these iterate in insertion order
+
+class SharedDictIteratorMixin(object):
+    _mixin_ = True
+
+    def _init_attrs(self, strategy, dictimplementation):
         w_obj = strategy.unerase(dictimplementation.dstorage)
         self.w_obj = w_obj
-        self.orig_map = self.curr_map = w_obj._get_mapdict_map()
+        self.orig_map = w_obj._get_mapdict_map()
+        self.attrs = _get_dict_attrs(self.orig_map)
+        self.index = 0
+
+    def _next_attr(self):
+        new_map = self.w_obj._get_mapdict_map()
+        if self.orig_map is not new_map:
+            # the map changes without changing the keys when an unboxed
+            # value gets a value of another type
+            if not _same_selectors(self.orig_map, new_map):
+                from pypy.interpreter.error import OperationError
+                space = self.space
+                self.len = -1   # Make this error state sticky
+                msg = "dictionary changed during iteration"
+                raise OperationError(space.w_RuntimeError, space.wrap(msg))
+            self.orig_map = new_map
+            self.attrs = _get_dict_attrs(new_map)
+        if self.index < len(self.attrs):
+            attr = self.attrs[self.index]
+            self.index += 1
+            return attr
+        return None
+
+class SharedDictIteratorKeys(SharedDictIteratorMixin, BaseKeyIterator):
+    def __init__(self, space, strategy, dictimplementation):
+        BaseKeyIterator.__init__(self, space, strategy, dictimplementation)
+        self._init_attrs(strategy, dictimplementation)
+
+    def next_key_entry(self):
+        attr = self._next_attr()
+        if attr is None:
+            return None
+        return self.space.wrap(attr.selector[0])
+
+
+class SharedDictIteratorValues(SharedDictIteratorMixin, BaseValueIterator):
+    def __init__(self, space, strategy, dictimplementation):
+        BaseValueIterator.__init__(self, space, strategy, dictimplementation)
+        self._init_attrs(strategy, dictimplementation)
+
+    def next_value_entry(self):
+        attr = self._next_attr()
+        if attr is None:
+            return None
+        return attr._direct_read(self.w_obj)
+
+
+class SharedDictIteratorItems(SharedDictIteratorMixin, BaseItemIterator):
+    def __init__(self, space, strategy, dictimplementation):
+        BaseItemIterator.__init__(self, space, strategy, dictimplementation)
+        self._init_attrs(strategy, dictimplementation)
 
     def next_item_entry(self):
-        implementation = self.dictimplementation
-        assert isinstance(implementation.strategy, MapDictStrategy)
-        if self.orig_map is not self.w_obj._get_mapdict_map():
+        attr = self._next_attr()
+        if attr is None:
             return None, None
-        if self.curr_map:
-            curr_map = self.curr_map.search(DICT)
-            if curr_map:
-                self.curr_map = curr_map.back
-                attr = curr_map.selector[0]
-                w_attr = self.space.wrap(attr)
-                return w_attr, self.w_obj.getdictvalue(self.space, attr)
-        return None, None
+        w_key = self.space.wrap(attr.selector[0])
+        return w_key, attr._direct_read(self.w_obj)
 
 
 # ____________________________________________________________
@@ -785,7 +1197,7 @@ class MapDictIteratorItems(BaseItemIterator):
 
 class CacheEntry(object):
     version_tag = None
-    index = 0
+    attr = None
     w_method = None # for callmethod
     success_counter = 0
     failure_counter = 0
@@ -818,14 +1230,14 @@ def init_mapdict_cache(pycode):
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
-def _fill_cache(pycode, nameindex, map, version_tag, index, w_method=None):
+def _fill_cache(pycode, nameindex, map, version_tag, attr, w_method=None):
     entry = pycode._mapdict_caches[nameindex]
     if entry is INVALID_CACHE_ENTRY:
         entry = CacheEntry()
         pycode._mapdict_caches[nameindex] = entry
     entry.map_wref = weakref.ref(map)
     entry.version_tag = version_tag
-    entry.index = index
+    entry.attr = attr
     entry.w_method = w_method
     if pycode.space.config.objspace.std.withmethodcachecounter:
         entry.failure_counter += 1
@@ -837,7 +1249,7 @@ def LOAD_ATTR_caching(pycode, w_obj, nameindex):
     map = w_obj._get_mapdict_map()
     if entry.is_valid_for_map(map) and entry.w_method is None:
         # everything matches, it's incredibly fast
-        return w_obj._mapdict_read_storage(entry.index)
+        return entry.attr._direct_read(w_obj)
     return LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map)
 LOAD_ATTR_caching._always_inline_ = True
 
@@ -878,12 +1290,13 @@ def LOAD_ATTR_slowpath(pycode, w_obj, nameindex, map):
                 selector = (name, DICT)
             #
             if selector[1] != INVALID:
-                index = map.index(selector)
-                if index >= 0:
+                attr = map.find_map_attr(selector)
+                if attr is not None:
                     # Note that if map.terminator is a DevolvedDictTerminator,
-                    # map.index() will always return -1 if selector[1]==DICT.
-                    _fill_cache(pycode, nameindex, map, version_tag, index)
-                    return w_obj._mapdict_read_storage(index)
+                    # map.find_map_attr() will always return None if
+                    # selector[1]==DICT.
+                    _fill_cache(pycode, nameindex, map, version_tag, attr)
+                    return attr._direct_read(w_obj)
     if space.config.objspace.std.withmethodcachecounter:
         INVALID_CACHE_ENTRY.failure_counter += 1
     return space.getattr(w_obj, w_name)
@@ -918,7 +1331,7 @@ def LOOKUP_METHOD_mapdict_fill_cache_method(space, pycode, name, nameindex,
                                                               version_tag)
     if w_method is None or isinstance(w_method, TypeCell):
         return
-    _fill_cache(pycode, nameindex, map, version_tag, -1, w_method)
+    _fill_cache(pycode, nameindex, map, version_tag, None, w_method)
 
 # XXX fix me: if a function contains a loop with both LOAD_ATTR and
 # XXX LOOKUP_METHOD on the same attribute name, it keeps trashing and
@@ -17,6 +17,8 @@ def registerimplementation(implcls):
 option_to_typename = {
     "withsmalllong"  : ["smalllongobject.W_SmallLongObject"],
     "withstrbuf"     : ["strbufobject.W_StringBufferObject"],
+    "withstrslice"   : ["strsliceobject.W_StringSliceObject"],
+    "withrope"       : ["ropeobject.W_RopeObject"],
 }
 
 IDTAG_INT     = 1
@@ -182,6 +184,22 @@ class StdTypeModel:
                 (unicodeobject.W_UnicodeObject,
                                        strbufobject.delegate_buf2unicode)
                 ]
+        if config.objspace.std.withstrslice:
+            from pypy.objspace.std import strsliceobject
+            self.typeorder[strsliceobject.W_StringSliceObject] += [
+                (stringobject.W_StringObject,
+                                       strsliceobject.delegate_slice2str),
+                (unicodeobject.W_UnicodeObject,
+                                       strsliceobject.delegate_slice2unicode)
+                ]
+        if config.objspace.std.withrope:
+            from pypy.objspace.std import ropeobject
+            self.typeorder[ropeobject.W_RopeObject] += [
+                (stringobject.W_StringObject,
+                                       ropeobject.delegate_rope2str),
+                (unicodeobject.W_UnicodeObject,
+                                       ropeobject.delegate_rope2unicode)
+                ]
 
         # put W_Root everywhere
         self.typeorder[W_Root] = []
@@ -0,0 +1,122 @@
+"""Strings represented as ropes, see rpython/rlib/rope.py.
+
+Concatenating strings whose result is long enough gives a W_RopeObject,
+which concatenates, slices and indexes in a time that depends on the depth
+of the rope instead of on the length of the string.  The rope is flattened,
+once, when an interp-level string is needed: str_w() (e.g. for I/O),
+hashing, and the operations not implemented here, which delegate to
+W_StringObject.
+"""
+
+from pypy.interpreter.error import OperationError
+from pypy.objspace.std.inttype import wrapint
+from pypy.objspace.std.model import registerimplementation
+from pypy.objspace.std.register_all import register_all
+from pypy.objspace.std.sliceobject import W_SliceObject, normalize_simple_slice
+from pypy.objspace.std.stringobject import (W_AbstractStringObject,
+    W_StringObject)
+from pypy.objspace.std.stringtype import wrapchar, wrapstr
+from pypy.objspace.std.unicodeobject import delegate_String2Unicode
+from rpython.rlib import rope
+from rpython.rlib.objectmodel import compute_hash
+
+# concatenations and slices shorter than that give a W_StringObject
+MIN_ROPE_LENGTH = 256
+
+
+class W_RopeObject(W_AbstractStringObject):
+    from pypy.objspace.std.stringtype import str_typedef as typedef
+
+    def __init__(w_self, node):
+        w_self._node = node
+
+    def flatten(w_self):
+        node = w_self._node
+        if isinstance(node, rope.LiteralStringNode):
+            return node.s
+        s = node.flatten_string()
+        w_self._node = rope.LiteralStringNode(s)
+        return s
+
+    def __repr__(w_self):
+        """ representation for debugging purposes """
+        return "%s(%r)" % (w_self.__class__.__name__, w_self._node)
+
+    def unwrap(w_self, space):
+        return w_self.flatten()
+
+    def str_w(w_self, space):
+        return w_self.flatten()
+
+registerimplementation(W_RopeObject)
+
+# ____________________________________________________________
+
+def joined2(str1, str2):
+    return W_RopeObject(rope.concatenate(rope.LiteralStringNode(str1),
+                                         rope.LiteralStringNode(str2)))
+
+def _wrap_node(space, node):
+    if node.length() < MIN_ROPE_LENGTH:
+        return wrapstr(space, node.flatten_string())
+    return W_RopeObject(node)
+
+def delegate_rope2str(space, w_rope):
+    return wrapstr(space, w_rope.flatten())
+
+def delegate_rope2unicode(space, w_rope):
+    w_str = wrapstr(space, w_rope.flatten())
+    return delegate_String2Unicode(space, w_str)
+
+# ____________________________________________________________
+
+def len__Rope(space, w_self):
+    return space.wrap(w_self._node.length())
+
+def str__Rope(space, w_self):
+    # you cannot get subclasses of W_RopeObject here
+    assert type(w_self) is W_RopeObject
+    return w_self
+
+def hash__Rope(space, w_self):
+    x = compute_hash(w_self.flatten())
+    return wrapint(space, x)
+
+def add__Rope_Rope(space, w_left, w_right):
+    return W_RopeObject(rope.concatenate(w_left._node, w_right._node))
+
+def add__Rope_String(space, w_left, w_right):
+    right = rope.LiteralStringNode(w_right._value)
+    return W_RopeObject(rope.concatenate(w_left._node, right))
+
+def add__String_Rope(space, w_left, w_right):
+    left = rope.LiteralStringNode(w_left._value)
+    return W_RopeObject(rope.concatenate(left, w_right._node))
+
+def getitem__Rope_ANY(space, w_self, w_index):
+    ival = space.getindex_w(w_index, space.w_IndexError, "string index")
+    node = w_self._node
+    slen = node.length()
+    if ival < 0:
+        ival += slen
+    if ival < 0 or ival >= slen:
+        raise OperationError(space.w_IndexError,
+                             space.wrap("string index out of range"))
+    return wrapchar(space, node.getchar(ival))
+
+def getitem__Rope_Slice(space, w_self, w_slice):
+    node = w_self._node
+    start, stop, step, sl = w_slice.indices4(space, node.length())
+    if sl == 0:
+        return W_StringObject.EMPTY
+    return _wrap_node(space, rope.getslice(node, start, stop, step, sl))
+
+def getslice__Rope_ANY_ANY(space, w_self, w_start, w_stop):
+    node = w_self._node
+    start, stop = normalize_simple_slice(space, node.length(), w_start, w_stop)
+    if start == stop:
+        return W_StringObject.EMPTY
+    return _wrap_node(space, rope.getslice_one(node, start, stop))
+
+from pypy.objspace.std import stringtype
+register_all(vars(), stringtype)
@@ -7,8 +7,8 @@ from pypy.objspace.std.stdtypedef import StdTypeDef
 from pypy.objspace.std.stringobject import W_StringObject
 from pypy.objspace.std.unicodeobject import W_UnicodeObject
 
-from rpython.rlib.objectmodel import r_dict
-from rpython.rlib.rarithmetic import intmask, r_uint
+from rpython.rlib.objectmodel import r_dict, specialize
+from rpython.rlib.rarithmetic import intmask, r_uint, LONG_BIT
 from rpython.rlib import rerased, jit
 
 
@@ -774,7 +774,10 @@ class EmptySetStrategy(SetStrategy):
 
     def add(self, w_set, w_key):
         if type(w_key) is W_IntObject:
-            strategy = self.space.fromcache(IntegerSetStrategy)
+            if self.space.config.objspace.std.withbitmapset:
+                strategy = self.space.fromcache(IntegerBitmapSetStrategy)
+            else:
+                strategy = self.space.fromcache(IntegerSetStrategy)
         elif type(w_key) is W_StringObject:
             strategy = self.space.fromcache(StringSetStrategy)
         elif type(w_key) is W_UnicodeObject:
@@ -953,6 +956,11 @@ class AbstractUnwrappedSetStrategy(object):
                 return False
         return True
 
+    def _as_same_strategy(self, w_other):
+        """ Returns w_other, or a copy of it using this strategy if it
+        stores the same kind of items in another way. """
+        return w_other
+
     def _difference_wrapped(self, w_set, w_other):
         iterator = self.unerase(w_set.sstorage).iterkeys()
         result_dict = self.get_empty_dict()
@@ -1051,6 +1059,7 @@ class AbstractUnwrappedSetStrategy(object):
         return strategy.erase(newsetdata)
 
     def _symmetric_difference_base(self, w_set, w_other):
+        w_other = self._as_same_strategy(w_other)
         if self is w_other.strategy:
             strategy = w_set.strategy
             storage = self._symmetric_difference_unwrapped(w_set, w_other)
@@ -1069,6 +1078,7 @@ class AbstractUnwrappedSetStrategy(object):
         w_set.sstorage = storage
 
     def _intersect_base(self, w_set, w_other):
+        w_other = self._as_same_strategy(w_other)
         if self is w_other.strategy:
             strategy = self
             if w_set.length() > w_other.length():
@@ -1216,6 +1226,8 @@ class StringSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(IntegerBitmapSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1252,6 +1264,8 @@ class UnicodeSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def may_contain_equal_elements(self, strategy):
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        elif strategy is self.space.fromcache(IntegerBitmapSetStrategy):
+            return False
         elif strategy is self.space.fromcache(EmptySetStrategy):
             return False
         elif strategy is self.space.fromcache(IdentitySetStrategy):
@@ -1305,6 +1319,249 @@ class IntegerSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     def iter(self, w_set):
         return IntegerIteratorImplementation(self.space, self, w_set)
 
+    def _as_same_strategy(self, w_other):
+        strategy = w_other.strategy
+        if strategy is self.space.fromcache(IntegerBitmapSetStrategy):
+            assert isinstance(strategy, IntegerBitmapSetStrategy)
+            return strategy._as_integer_set(w_other)
+        return w_other
+
+    def update(self, w_set, w_other):
+        if self is w_other.strategy:
+            d_set = self.unerase(w_set.sstorage)
+            d_other = self.unerase(w_other.sstorage)
+            d_set.update(d_other)
+            return
+        if w_other.strategy is self.space.fromcache(IntegerBitmapSetStrategy):
+            d_set = self.unerase(w_set.sstorage)
+            for key in w_other.listview_int():
+                d_set[key] = None
+            return
+
+        w_set.switch_to_object_strategy(self.space)
+        w_set.update(w_other)
+
+
+class IntegerBitmapSetStrategy(SetStrategy):
+    """ Sets of ints that are dense enough, stored as an IntBitmap.  The set
+    switches to the IntegerSetStrategy when it would become too sparse. """
+    erase, unerase = rerased.new_erasing_pair("intbitmap")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def get_empty_storage(self):
+        return self.erase(IntBitmap(0, [], 0))
+
+    def listview_int(self, w_set):
+        return self.unerase(w_set.sstorage).tolist()
+
+    def is_correct_type(self, w_key):
+        return type(w_key) is W_IntObject
+
+    def may_contain_equal_elements(self, strategy):
+        if strategy is self.space.fromcache(StringSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(UnicodeSetStrategy):
+            return False
+        elif strategy is self.space.fromcache(EmptySetStrategy):
+            return False
+        elif strategy is self.space.fromcache(IdentitySetStrategy):
+            return False
+        return True
+
+    def switch_to_integer_strategy(self, w_set):
+        strategy = self.space.fromcache(IntegerSetStrategy)
+        intlist = self.unerase(w_set.sstorage).tolist()
+        w_set.sstorage = strategy.get_storage_from_unwrapped_list(intlist)
+        w_set.strategy = strategy
+
+    def _as_integer_set(self, w_set):
+        # a copy of w_set that uses the IntegerSetStrategy, used when the
+        # other set of a binary operation is not a bitmap
+        strategy = self.space.fromcache(IntegerSetStrategy)
+        intlist = self.unerase(w_set.sstorage).tolist()
+        storage = strategy.get_storage_from_unwrapped_list(intlist)
+        return w_set.from_storage_and_strategy(storage, strategy)
+
+    def _from_bitmap(self, w_set, bitmap):
+        # the result of an operation between two bitmaps: check that it
+        # is still dense enough
+        if bitmap.is_dense():
+            return self.erase(bitmap), self
+        strategy = self.space.fromcache(IntegerSetStrategy)
+        storage = strategy.get_storage_from_unwrapped_list(bitmap.tolist())
+        return storage, strategy
+
+    def _set_bitmap(self, w_set, bitmap):
+        w_set.sstorage, w_set.strategy = self._from_bitmap(w_set, bitmap)
+
+    def _new_set(self, w_set, bitmap):
+        storage, strategy = self._from_bitmap(w_set, bitmap)
+        return w_set.from_storage_and_strategy(storage, strategy)
+
+    def length(self, w_set):
+        return self.unerase(w_set.sstorage).count
+
+    def clear(self, w_set):
+        w_set.switch_to_empty_strategy()
+
+    def copy_real(self, w_set):
+        storage = self.get_storage_copy(w_set)
+        return w_set.from_storage_and_strategy(storage, self)
+
+    def get_storage_copy(self, w_set):
+        return self.erase(self.unerase(w_set.sstorage).copy())
+
+    def add(self, w_set, w_key):
+        if not self.is_correct_type(w_key):
+            w_set.switch_to_object_strategy(self.space)
+            w_set.add(w_key)
+            return
+        if not self.unerase(w_set.sstorage).add(self.space.int_w(w_key)):
+            self.switch_to_integer_strategy(w_set)
+            w_set.add(w_key)
+
+    def remove(self, w_set, w_item):
+        if not self.is_correct_type(w_item):
+            w_set.switch_to_object_strategy(self.space)
+            return w_set.remove(w_item)
+        return self.unerase(w_set.sstorage).remove(self.space.int_w(w_item))
+
+    def getdict_w(self, w_set):
+        result = newset(self.space)
+        for key in self.unerase(w_set.sstorage).tolist():
+            result[self.space.wrap(key)] = None
+        return result
+
+    def getkeys(self, w_set):
+        keys = self.unerase(w_set.sstorage).tolist()
+        return [self.space.wrap(key) for key in keys]
+
+    def has_key(self, w_set, w_key):
+        if not self.is_correct_type(w_key):
+            w_set.switch_to_object_strategy(self.space)
+            return w_set.has_key(w_key)
+        return self.unerase(w_set.sstorage).contains(self.space.int_w(w_key))
+
+    def equals(self, w_set, w_other):
+        if w_set.length() != w_other.length():
+            return False
+        if w_set.length() == 0:
+            return True
+        if w_other.strategy is self:
+            return self.unerase(w_set.sstorage).issubset(
+                self.unerase(w_other.sstorage))
+        return self._as_integer_set(w_set).equals(w_other)
+
+    def difference(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).difference(
+                self.unerase(w_other.sstorage))
+            return self._new_set(w_set, bitmap)
+        return self._as_integer_set(w_set).difference(w_other)
+
+    def difference_update(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).difference(
+                self.unerase(w_other.sstorage))
+            self._set_bitmap(w_set, bitmap)
+            return
+        intlist = w_other.listview_int()
+        if intlist is not None:
+            bitmap = self.unerase(w_set.sstorage)
+            for key in intlist:
+                bitmap.remove(key)
+        elif self.may_contain_equal_elements(w_other.strategy):
+            self.switch_to_integer_strategy(w_set)
+            w_set.difference_update(w_other)
+
+    def symmetric_difference(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).symmetric_difference(
+                self.unerase(w_other.sstorage))
+            return self._new_set(w_set, bitmap)
+        return self._as_integer_set(w_set).symmetric_difference(w_other)
+
+    def symmetric_difference_update(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).symmetric_difference(
+                self.unerase(w_other.sstorage))
+            self._set_bitmap(w_set, bitmap)
+            return
+        self.switch_to_integer_strategy(w_set)
+        w_set.symmetric_difference_update(w_other)
+
+    def intersect(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).intersect(
+                self.unerase(w_other.sstorage))
+            return self._new_set(w_set, bitmap)
+        return self._as_integer_set(w_set).intersect(w_other)
+
+    def intersect_update(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).intersect(
+                self.unerase(w_other.sstorage))
+            self._set_bitmap(w_set, bitmap)
+            return
+        self.switch_to_integer_strategy(w_set)
+        w_set.intersect_update(w_other)
+
+    def _intersect_wrapped(self, w_set, w_other):
+        result = newset(self.space)
+        for key in self.unerase(w_set.sstorage).tolist():
+            w_key = self.space.wrap(key)
+            if w_other.has_key(w_key):
+                result[w_key] = None
+        strategy = self.space.fromcache(ObjectSetStrategy)
+        return strategy.erase(result)
+
+    def issubset(self, w_set, w_other):
+        if w_set.length() == 0:
+            return True
+        if w_other.strategy is self:
+            return self.unerase(w_set.sstorage).issubset(
+                self.unerase(w_other.sstorage))
+        return self._as_integer_set(w_set).issubset(w_other)
+
+    def isdisjoint(self, w_set, w_other):
+        if w_other.strategy is self:
+            return self.unerase(w_set.sstorage).isdisjoint(
+                self.unerase(w_other.sstorage))
+        return self._as_integer_set(w_set).isdisjoint(w_other)
+
+    def update(self, w_set, w_other):
+        if w_other.strategy is self:
+            bitmap = self.unerase(w_set.sstorage).union(
+                self.unerase(w_other.sstorage))
+            if bitmap is not None:
+                w_set.sstorage = self.erase(bitmap)
+                return
+        else:
+            intlist = w_other.listview_int()
+            if intlist is not None:
+                bitmap = self.unerase(w_set.sstorage)
+                for i in range(len(intlist)):
+                    if not bitmap.add(intlist[i]):
+                        self.switch_to_integer_strategy(w_set)
+                        w_set.update(w_other)
+                        return
+                return
+            if w_other.length() == 0:
+                return
+        self.switch_to_integer_strategy(w_set)
+        w_set.update(w_other)
+
+    def iter(self, w_set):
+        return IntegerBitmapIteratorImplementation(self.space, self, w_set)
+
+    def popitem(self, w_set):
+        bitmap = self.unerase(w_set.sstorage)
+        if bitmap.count == 0:
+            raise OperationError(self.space.w_KeyError,
+                            self.space.wrap('pop from an empty set'))
+        return self.space.wrap(bitmap.pop_smallest())
+
 
 class ObjectSetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
     erase, unerase = rerased.new_erasing_pair("object")
@@ -1371,6 +1628,8 @@ class IdentitySetStrategy(AbstractUnwrappedSetStrategy, SetStrategy):
             return False
         if strategy is self.space.fromcache(IntegerSetStrategy):
             return False
+        if strategy is self.space.fromcache(IntegerBitmapSetStrategy):
+            return False
         if strategy is self.space.fromcache(StringSetStrategy):
             return False
         if strategy is self.space.fromcache(UnicodeSetStrategy):
@@ -1476,6 +1735,26 @@ class IntegerIteratorImplementation(IteratorImplementation):
         else:
             return None
 
+class IntegerBitmapIteratorImplementation(IteratorImplementation):
+    def __init__(self, space, strategy, w_set):
+        IteratorImplementation.__init__(self, space, strategy, w_set)
+        self.bitmap = strategy.unerase(w_set.sstorage)
+        self.wordindex = 0
+        self.bits = r_uint(0)     # the bits of the current word not seen yet
+
+    def next_entry(self):
+        words = self.bitmap.words
+        bits = self.bits
+        while not bits:
+            if self.wordindex >= len(words):
+                return None
+            bits = words[self.wordindex]
+            self.wordindex += 1
+        lowest = bits & (~bits + 1)
+        self.bits = bits ^ lowest
+        base = (self.bitmap.start + self.wordindex - 1) * LONG_BIT
+        return self.space.wrap(base + _popcount(lowest - 1))
+
 class IdentityIteratorImplementation(IteratorImplementation):
     def __init__(self, space, strategy, w_set):
         IteratorImplementation.__init__(self, space, strategy, w_set)
@@ -1530,6 +1809,223 @@ setiter_typedef = W_SetIterObject.typedef
 
 
 
+# ____________________________________________________________
+# bitmaps of ints, for the IntegerBitmapSetStrategy
+
+BITMAP_SHIFT = {32: 5, 64: 6}[LONG_BIT]
+BITMAP_MASK = LONG_BIT - 1
+# a bitmap is dense enough if it uses at most this many words per item,
+# plus a few words; the hash-based IntegerSetStrategy needs more than that
+BITMAP_WORDS_PER_ITEM = 2
+BITMAP_EXTRA_WORDS = 4
+
+_M1 = r_uint(-1) // 3         # 0x5555...
+_M2 = r_uint(-1) // 5         # 0x3333...
+_M4 = r_uint(-1) // 17        # 0x0f0f...
+_H01 = r_uint(-1) // 255      # 0x0101...
+
+def _popcount(x):
+    x -= (x >> 1) & _M1
+    x = (x & _M2) + ((x >> 2) & _M2)
+    x = (x + (x >> 4)) & _M4
+    return intmask((x * _H01) >> (LONG_BIT - 8))
+
+def _is_dense(nwords, count):
+    return nwords <= BITMAP_EXTRA_WORDS + count * BITMAP_WORDS_PER_ITEM
+
+def _bits_or(word1, word2):
+    return word1 | word2
+
+def _bits_and(word1, word2):
+    return word1 & word2
+
+def _bits_andnot(word1, word2):
+    return word1 & ~word2
+
+def _bits_xor(word1, word2):
+    return word1 ^ word2
+
+
+class IntBitmap(object):
+    """ A set of ints: the bit 'i' of 'words[k]' is set if the int
+    '(start + k) * LONG_BIT + i' is in the set.  There are no zero words at
+    either end of 'words'; an empty bitmap has no words at all. """
+
+    def __init__(self, start, words, count):
+        self.start = start
+        self.words = words
+        self.count = count
+
+    @staticmethod
+    def from_list(items):
+        """ Returns None if the bitmap would be too sparse. """
+        if not items:
+            return IntBitmap(0, [], 0)
+        lo = hi = items[0]
+        for item in items:
+            if item < lo:
+                lo = item
+            elif item > hi:
+                hi = item
+        start = lo >> BITMAP_SHIFT
+        nwords = (hi >> BITMAP_SHIFT) - start + 1
+        if not _is_dense(nwords, len(items)):
+            return None
+        bitmap = IntBitmap(start, [r_uint(0)] * nwords, 0)
+        for item in items:
+            bitmap._setbit(item)
+        return bitmap
+
+    def copy(self):
+        return IntBitmap(self.start, self.words[:], self.count)
+
+    def is_dense(self):
+        return _is_dense(len(self.words), self.count)
+
+    def stop(self):
+        return self.start + len(self.words)
+
+    def word_at(self, wordindex):
+        index = wordindex - self.start
+        if 0 <= index < len(self.words):
+            return self.words[index]
+        return r_uint(0)
+
+    def contains(self, n):
+        mask = r_uint(1) << (n & BITMAP_MASK)
+        return (self.word_at(n >> BITMAP_SHIFT) & mask) != 0
+
+    def _setbit(self, n):
+        index = (n >> BITMAP_SHIFT) - self.start
+        mask = r_uint(1) << (n & BITMAP_MASK)
+        word = self.words[index]
+        if not (word & mask):
+            self.words[index] = word | mask
+            self.count += 1
+
+    def add(self, n):
+        """ Returns False if the bitmap would become too sparse, in which
+        case it is left unmodified. """
+        wordindex = n >> BITMAP_SHIFT
+        if not self.words:
+            self.start = wordindex
+            self.words = [r_uint(0)]
+        elif wordindex < self.start:
+            extra = self.start - wordindex
+            if not _is_dense(len(self.words) + extra, self.count + 1):
+                return False
+            self.words = [r_uint(0)] * extra + self.words
+            self.start = wordindex
+        elif wordindex >= self.stop():
+            extra = wordindex - self.stop() + 1
+            if not _is_dense(len(self.words) + extra, self.count + 1):
+                return False
+            self.words.extend([r_uint(0)] * extra)
+        self._setbit(n)
+        return True
+
+    def remove(self, n):
+        index = (n >> BITMAP_SHIFT) - self.start
+        if not (0 <= index < len(self.words)):
+            return False
+        mask = r_uint(1) << (n & BITMAP_MASK)
+        word = self.words[index]
+        if not (word & mask):
+            return False
+        self.words[index] = word & ~mask
+        self.count -= 1
+        self._strip()
+        return True
+
+    def pop_smallest(self):
+        # there are no zero words at the start
+        word = self.words[0]
+        lowest = word & (~word + 1)
+        self.words[0] = word ^ lowest
+        self.count -= 1
+        n = self.start * LONG_BIT + _popcount(lowest - 1)
+        self._strip()
+        return n
+
+    def _strip(self):
+        words = self.words
+        i = 0
+        while i < len(words) and not words[i]:
+            i += 1
+        j = len(words)
+        while j > i and not words[j - 1]:
+            j -= 1
+        if i > 0 or j < len(words):
+            assert j >= 0
+            self.words = words[i:j]
+            self.start += i
+
+    def tolist(self):
+        result = [0] * self.count
+        i = 0
+        base = self.start * LONG_BIT
+        for word in self.words:
+            while word:
+                lowest = word & (~word + 1)
+                word ^= lowest
+                result[i] = base + _popcount(lowest - 1)
+                i += 1
+            base += LONG_BIT
+        return result
+
+    @specialize.arg(4)
+    def _combine(self, other, start, stop, bits_op):
+        if stop <= start:
+            return IntBitmap(0, [], 0)
+        words = [r_uint(0)] * (stop - start)
+        count = 0
+        for i in range(stop - start):
+            word = bits_op(self.word_at(start + i), other.word_at(start + i))
+            words[i] = word
+            count += _popcount(word)
+        result = IntBitmap(start, words, count)
+        result._strip()
+        return result
+
+    def _union_range(self, other):
+        if not self.words:
+            return other.start, other.stop()
+        if not other.words:
+            return self.start, self.stop()
+        return min(self.start, other.start), max(self.stop(), other.stop())
+
+    def union(self, other):
+        """ Returns None if the result would be too sparse. """
+        start, stop = self._union_range(other)
+        if not _is_dense(stop - start, self.count + other.count):
+            return None
+        return self._combine(other, start, stop, _bits_or)
+
+    def intersect(self, other):
+        start = max(self.start, other.start)
+        stop = min(self.stop(), other.stop())
+        return self._combine(other, start, stop, _bits_and)
+
+    def difference(self, other):
+        return self._combine(other, self.start, self.stop(), _bits_andnot)
+
+    def symmetric_difference(self, other):
+        start, stop = self._union_range(other)
+        return self._combine(other, start, stop, _bits_xor)
+
+    def issubset(self, other):
+        for i in range(len(self.words)):
+            if self.words[i] & ~other.word_at(self.start + i):
+                return False
+        return True
+
+    def isdisjoint(self, other):
+        for i in range(len(self.words)):
+            if self.words[i] & other.word_at(self.start + i):
+                return False
+        return True
+
+
 # some helper functions
 
 def newset(space):
@@ -1562,9 +2058,7 @@ def set_strategy_and_setdata(space, w_set, w_iterable):
 
     intlist = space.listview_int(w_iterable)
     if intlist is not None:
-        strategy = space.fromcache(IntegerSetStrategy)
-        w_set.strategy = strategy
-        w_set.sstorage = strategy.get_storage_from_unwrapped_list(intlist)
+        _set_integer_strategy(space, w_set, intlist)
         return
 
     iterable_w = space.listview(w_iterable)
@@ -1576,6 +2070,18 @@ def set_strategy_and_setdata(space, w_set, w_iterable):
 
     _pick_correct_strategy(space, w_set, iterable_w)
 
+def _set_integer_strategy(space, w_set, intlist):
+    if space.config.objspace.std.withbitmapset:
+        bitmap = IntBitmap.from_list(intlist)
+        if bitmap is not None:     # else, too sparse
+            strategy = space.fromcache(IntegerBitmapSetStrategy)
+            w_set.strategy = strategy
+            w_set.sstorage = strategy.erase(bitmap)
+            return
+    strategy = space.fromcache(IntegerSetStrategy)
+    w_set.strategy = strategy
+    w_set.sstorage = strategy.get_storage_from_unwrapped_list(intlist)
+
 @jit.look_inside_iff(lambda space, w_set, iterable_w:
         jit.loop_unrolling_heuristic(iterable_w, len(iterable_w), UNROLL_CUTOFF))
 def _pick_correct_strategy(space, w_set, iterable_w):
@@ -1584,6 +2090,10 @@ def _pick_correct_strategy(space, w_set, iterable_w):
         if type(w_item) is not W_IntObject:
             break
     else:
+        if space.config.objspace.std.withbitmapset:
+            intlist = [space.int_w(w_item) for w_item in iterable_w]
+            _set_integer_strategy(space, w_set, intlist)
+            return
         w_set.strategy = space.fromcache(IntegerSetStrategy)
         w_set.sstorage = w_set.strategy.get_storage_from_list(iterable_w)
         return
@@ -251,6 +251,9 @@ def str_title__String(space, w_self):
 
 def str_split__String_None_ANY(space, w_self, w_none, w_maxsplit=-1):
     maxsplit = space.int_w(w_maxsplit)
+    if space.config.objspace.std.withstrslice:
+        from pypy.objspace.std.strsliceobject import split_none
+        return split_none(space, w_self, w_self._value, maxsplit)
     res = []
     value = w_self._value
     length = len(value)
@@ -288,6 +291,9 @@ def str_split__String_String_ANY(space, w_self, w_by, w_maxsplit=-1):
     bylen = len(by)
     if bylen == 0:
         raise OperationError(space.w_ValueError, space.wrap("empty separator"))
+    if space.config.objspace.std.withstrslice:
+        from pypy.objspace.std.strsliceobject import split_by
+        return split_by(space, w_self, value, by, maxsplit)
     res = split(value, by, maxsplit)
     return space.newlist_str(res)
 
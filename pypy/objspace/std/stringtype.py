@@ -38,9 +38,19 @@ def sliced(space, s, start, stop, orig_obj):
     assert stop >= 0
     if start == 0 and stop == len(s) and space.is_w(space.type(orig_obj), space.w_str):
         return orig_obj
+    if space.config.objspace.std.withstrslice:
+        from pypy.objspace.std.strsliceobject import (W_StringSliceObject,
+            MIN_SLICE_LENGTH)
+        if stop - start >= MIN_SLICE_LENGTH:
+            return W_StringSliceObject(s, start, stop)
     return wrapstr(space, s[start:stop])
 
 def joined2(space, str1, str2):
+    if space.config.objspace.std.withrope:
+        from pypy.objspace.std.ropeobject import joined2, MIN_ROPE_LENGTH
+        if len(str1) + len(str2) >= MIN_ROPE_LENGTH:
+            return joined2(str1, str2)
+        return wrapstr(space, str1 + str2)
     if space.config.objspace.std.withstrbuf:
         from pypy.objspace.std.strbufobject import joined2
         return joined2(str1, str2)
@@ -0,0 +1,323 @@
+"""Strings that are slices of another string, sharing its characters.
+
+Slicing, splitting, partitioning or stripping a string returns a
+W_StringSliceObject instead of copying the characters, if the result is long
+enough.  The characters are only copied ("forced") when an interp-level
+string is needed: str_w(), delegation to W_StringObject for the operations
+not implemented here, and hashing.  Forcing also drops the reference to the
+parent string; hashing forces because a string used as a dict key or in a
+set is likely to outlive the (often big) string it was sliced from.
+"""
+
+from pypy.interpreter.error import OperationError
+from pypy.objspace.std import slicetype
+from pypy.objspace.std.inttype import wrapint
+from pypy.objspace.std.model import registerimplementation
+from pypy.objspace.std.noneobject import W_NoneObject
+from pypy.objspace.std.register_all import register_all
+from pypy.objspace.std.sliceobject import W_SliceObject, normalize_simple_slice
+from pypy.objspace.std.stringobject import (W_AbstractStringObject,
+    W_StringObject)
+from pypy.objspace.std.stringtype import sliced, wrapchar, wrapstr
+from pypy.objspace.std.unicodeobject import delegate_String2Unicode
+from rpython.rlib.objectmodel import compute_hash, specialize
+from rpython.rlib.rstring import endswith, startswith
+
+# shorter slices are copied: it is not slower than allocating a
+# W_StringSliceObject, and it does not keep the parent string alive
+MIN_SLICE_LENGTH = 40
+
+
+class W_StringSliceObject(W_AbstractStringObject):
+    from pypy.objspace.std.stringtype import str_typedef as typedef
+
+    def __init__(w_self, str, start, stop):
+        assert start >= 0
+        assert stop >= 0
+        w_self.str = str
+        w_self.start = start
+        w_self.stop = stop
+
+    def force(w_self):
+        if w_self.start == 0 and w_self.stop == len(w_self.str):
+            return w_self.str
+        str = w_self.str[w_self.start:w_self.stop]
+        w_self.str = str
+        w_self.start = 0
+        w_self.stop = len(str)
+        return str
+
+    def length(w_self):
+        length = w_self.stop - w_self.start
+        # the helpers of slicetype.py that get this length are shared with
+        # the other types, which rely on it being non-negative
+        assert length >= 0
+        return length
+
+    def __repr__(w_self):
+        """ representation for debugging purposes """
+        return "%s(%r[%d:%d])" % (w_self.__class__.__name__,
+                                  w_self.str, w_self.start, w_self.stop)
+
+    def unwrap(w_self, space):
+        return w_self.force()
+
+    def str_w(w_self, space):
+        return w_self.force()
+
+registerimplementation(W_StringSliceObject)
+
+# ____________________________________________________________
+
+def delegate_slice2str(space, w_strslice):
+    return wrapstr(space, w_strslice.force())
+
+def delegate_slice2unicode(space, w_strslice):
+    w_str = wrapstr(space, w_strslice.force())
+    return delegate_String2Unicode(space, w_str)
+
+# ____________________________________________________________
+
+@specialize.arg(4)
+def _convert_idx_params(space, w_self, w_start, w_end, upper_bound=False):
+    length = w_self.length()
+    start, end = slicetype.unwrap_start_stop(
+            space, length, w_start, w_end, upper_bound=upper_bound)
+    # offsets in w_self.str
+    start += w_self.start
+    end += w_self.start
+    assert start >= 0 and end >= 0    # annotator hint, don't remove
+    return (w_self.str, start, end)
+
+def _newlist_of_pieces(space, w_self, s, starts, stops):
+    # returns the list of the pieces s[starts[i]:stops[i]].  If they are all
+    # short, it is a list with the str strategy; otherwise the long pieces
+    # are slices of s
+    for i in range(len(starts)):
+        if stops[i] - starts[i] >= MIN_SLICE_LENGTH:
+            break
+    else:
+        return space.newlist_str([s[starts[i]:stops[i]]
+                                  for i in range(len(starts))])
+    list_w = [sliced(space, s, starts[i], stops[i], w_self)
+              for i in range(len(starts))]
+    return space.newlist(list_w)
+
+def _split_none(space, w_self, s, start, stop, maxsplit):
+    # returns the words of s[start:stop], as slices of s if they are long
+    starts = []
+    stops = []
+    i = start
+    while True:
+        # find the beginning of the next word
+        while i < stop:
+            if not s[i].isspace():
+                break   # found
+            i += 1
+        else:
+            break  # end of string, finished
+
+        # find the end of the word
+        if maxsplit == 0:
+            j = stop   # take all the rest of the string
+        else:
+            j = i + 1
+            while j < stop and not s[j].isspace():
+                j += 1
+            maxsplit -= 1   # NB. if it's already < 0, it stays < 0
+
+        # the word is s[i:j]
+        starts.append(i)
+        stops.append(j)
+
+        # continue to look from the character following the space after the word
+        i = j + 1
+    return _newlist_of_pieces(space, w_self, s, starts, stops)
+
+def _split_by(space, w_self, s, start, stop, by, maxsplit):
+    bylen = len(by)
+    if bylen == 0:
+        raise OperationError(space.w_ValueError, space.wrap("empty separator"))
+    starts = []
+    stops = []
+    while maxsplit != 0:
+        next = s.find(by, start, stop)
+        if next < 0:
+            break
+        starts.append(start)
+        stops.append(next)
+        start = next + bylen
+        maxsplit -= 1   # NB. if it's already < 0, it stays < 0
+    starts.append(start)
+    stops.append(stop)
+    return _newlist_of_pieces(space, w_self, s, starts, stops)
+
+def split_none(space, w_self, s, maxsplit):
+    """ str.split() for the W_StringObject w_self, whose value is s. """
+    return _split_none(space, w_self, s, 0, len(s), maxsplit)
+
+def split_by(space, w_self, s, by, maxsplit):
+    """ str.split(by) for the W_StringObject w_self, whose value is s. """
+    return _split_by(space, w_self, s, 0, len(s), by, maxsplit)
+
+def _strip_none(space, w_self, left, right):
+    s = w_self.str
+    lpos = w_self.start
+    rpos = w_self.stop
+    if left:
+        while lpos < rpos and s[lpos].isspace():
+            lpos += 1
+    if right:
+        while rpos > lpos and s[rpos - 1].isspace():
+            rpos -= 1
+    assert rpos >= lpos    # annotator hint, don't remove
+    return sliced(space, s, lpos, rpos, w_self)
+
+# ____________________________________________________________
+
+def len__StringSlice(space, w_self):
+    return space.wrap(w_self.length())
+
+def str__StringSlice(space, w_self):
+    # you cannot get subclasses of W_StringSliceObject here
+    assert type(w_self) is W_StringSliceObject
+    return w_self
+
+def hash__StringSlice(space, w_self):
+    x = compute_hash(w_self.force())
+    return wrapint(space, x)
+
+def eq__StringSlice_String(space, w_self, w_other):
+    other = w_other._value
+    return space.newbool(w_self.length() == len(other) and
+                         startswith(w_self.str, other, w_self.start,
+                                    w_self.stop))
+
+def ne__StringSlice_String(space, w_self, w_other):
+    other = w_other._value
+    return space.newbool(w_self.length() != len(other) or
+                         not startswith(w_self.str, other, w_self.start,
+                                        w_self.stop))
+
+def eq__String_StringSlice(space, w_other, w_self):
+    return eq__StringSlice_String(space, w_self, w_other)
+
+def ne__String_StringSlice(space, w_other, w_self):
+    return ne__StringSlice_String(space, w_self, w_other)
+
+def getitem__StringSlice_ANY(space, w_self, w_index):
+    ival = space.getindex_w(w_index, space.w_IndexError, "string index")
+    slen = w_self.length()
+    if ival < 0:
+        ival += slen
+    if ival < 0 or ival >= slen:
+        raise OperationError(space.w_IndexError,
+                             space.wrap("string index out of range"))
+    return wrapchar(space, w_self.str[w_self.start + ival])
+
+def getitem__StringSlice_Slice(space, w_self, w_slice):
+    length = w_self.length()
+    start, stop, step, sl = w_slice.indices4(space, length)
+    if sl == 0:
+        return W_StringObject.EMPTY
+    elif step == 1:
+        assert start >= 0 and stop >= 0
+        return sliced(space, w_self.str, w_self.start + start,
+                      w_self.start + stop, w_self)
+    s = w_self.str
+    start += w_self.start
+    str = "".join([s[start + i*step] for i in range(sl)])
+    return wrapstr(space, str)
+
+def getslice__StringSlice_ANY_ANY(space, w_self, w_start, w_stop):
+    length = w_self.length()
+    start, stop = normalize_simple_slice(space, length, w_start, w_stop)
+    if start == stop:
+        return W_StringObject.EMPTY
+    return sliced(space, w_self.str, w_self.start + start,
+                  w_self.start + stop, w_self)
+
+def contains__StringSlice_String(space, w_self, w_sub):
+    res = w_self.str.find(w_sub._value, w_self.start, w_self.stop)
+    return space.newbool(res >= 0)
+
+def str_find__StringSlice_String_ANY_ANY(space, w_self, w_sub, w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end)
+    res = s.find(w_sub._value, start, end)
+    if res >= 0:
+        res -= w_self.start
+    return space.wrap(res)
+
+def str_rfind__StringSlice_String_ANY_ANY(space, w_self, w_sub, w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end)
+    res = s.rfind(w_sub._value, start, end)
+    if res >= 0:
+        res -= w_self.start
+    return space.wrap(res)
+
+def str_index__StringSlice_String_ANY_ANY(space, w_self, w_sub, w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end)
+    res = s.find(w_sub._value, start, end)
+    if res < 0:
+        raise OperationError(space.w_ValueError,
+                             space.wrap("substring not found in string.index"))
+    return space.wrap(res - w_self.start)
+
+def str_rindex__StringSlice_String_ANY_ANY(space, w_self, w_sub, w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end)
+    res = s.rfind(w_sub._value, start, end)
+    if res < 0:
+        raise OperationError(space.w_ValueError,
+                             space.wrap("substring not found in string.rindex"))
+    return space.wrap(res - w_self.start)
+
+def str_count__StringSlice_String_ANY_ANY(space, w_self, w_arg, w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end)
+    return wrapint(space, s.count(w_arg._value, start, end))
+
+def str_startswith__StringSlice_String_ANY_ANY(space, w_self, w_prefix,
+                                               w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end, True)
+    return space.newbool(startswith(s, w_prefix._value, start, end))
+
+def str_endswith__StringSlice_String_ANY_ANY(space, w_self, w_suffix,
+                                             w_start, w_end):
+    (s, start, end) = _convert_idx_params(space, w_self, w_start, w_end, True)
+    return space.newbool(endswith(s, w_suffix._value, start, end))
+
+def str_split__StringSlice_None_ANY(space, w_self, w_none, w_maxsplit=-1):
+    maxsplit = space.int_w(w_maxsplit)
+    return _split_none(space, w_self, w_self.str, w_self.start, w_self.stop,
+                       maxsplit)
+
+def str_split__StringSlice_String_ANY(space, w_self, w_by, w_maxsplit=-1):
+    maxsplit = space.int_w(w_maxsplit)
+    return _split_by(space, w_self, w_self.str, w_self.start, w_self.stop,
+                     w_by._value, maxsplit)
+
+def str_partition__StringSlice_String(space, w_self, w_sub):
+    s = w_self.str
+    sub = w_sub._value
+    if not sub:
+        raise OperationError(space.w_ValueError,
+                             space.wrap("empty separator"))
+    pos = s.find(sub, w_self.start, w_self.stop)
+    if pos == -1:
+        return space.newtuple([w_self, space.wrap(''), space.wrap('')])
+    else:
+        return space.newtuple([sliced(space, s, w_self.start, pos, w_self),
+                               w_sub,
+                               sliced(space, s, pos + len(sub), w_self.stop,
+                                      w_self)])
+
+def str_strip__StringSlice_None(space, w_self, w_chars):
+    return _strip_none(space, w_self, left=1, right=1)
+
+def str_rstrip__StringSlice_None(space, w_self, w_chars):
+    return _strip_none(space, w_self, left=0, right=1)
+
+def str_lstrip__StringSlice_None(space, w_self, w_chars):
+    return _strip_none(space, w_self, left=1, right=0)
+
+from pypy.objspace.std import stringtype
+register_all(vars(), stringtype)
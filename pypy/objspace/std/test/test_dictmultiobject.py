@@ -668,6 +668,31 @@ class AppTest_DictMultiObject(AppTest_DictObject):
         setattr(a, s, 123)
         assert holder.seen is s
 
+class AppTest_DictOrdered(AppTest_DictObject):
+    spaceconfig = {"objspace.std.withordereddict": True}
+
+    def test_insertion_order(self):
+        for keys in [range(100, 0, -7), ['c', 'a', 'b', 'aa'],
+                     [u'z', u'y', u'x'], [5.5, 2.5, 1.5, (1, 2)]]:
+            d = {}
+            for key in keys:
+                d[key] = key
+            assert d.keys() == keys
+            assert list(d) == keys
+            assert d.values() == keys
+            del d[keys[0]]
+            d[keys[0]] = 42
+            assert d.keys() == keys[1:] + keys[:1]
+            assert d.popitem() == (keys[0], 42)
+
+    def test_order_kept_by_strategy_switch(self):
+        d = {}
+        d['b'] = 1
+        d['a'] = 2
+        d[3] = 3
+        d['c'] = 4
+        assert d.keys() == ['b', 'a', 3, 'c']
+
 class AppTestDictViews:
     def test_dictview(self):
         d = {1: 2, 3: 4}
@@ -999,6 +1024,86 @@ class AppTestStrategies(object):
         raises(RuntimeError, list, it)
 
 
+class AppTestTypedKeyStrategies(AppTestStrategies):
+    spaceconfig = {"objspace.std.withtypedkeydict": True}
+
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "a"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        d[-0.0] = "b"
+        assert d[1.5] == "a"
+        assert d[0.0] == "b"
+        assert d.keys() == [1.5, -0.0] or d.keys() == [-0.0, 1.5]
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d.get("x") is None
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        d[3.0] = "c"
+        assert d[3] == "c"
+        assert d[3L] == "c"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+
+    def test_float_nan(self):
+        nan = float("nan")
+        d = {}
+        d[nan] = 1
+        assert "FloatDictStrategy" not in self.get_strategy(d)
+        assert d[nan] == 1
+        d = {1.5: 2}
+        d[nan] = 3
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[nan] == 3
+        assert d[1.5] == 2
+
+    def test_empty_to_tuple(self):
+        d = {}
+        d[(1, 2)] = "a"
+        assert "TupleIntIntDictStrategy" in self.get_strategy(d)
+        d[(3, 4)] = "b"
+        assert d[(1, 2)] == "a"
+        assert sorted(d) == [(1, 2), (3, 4)]
+        assert d.get(1) is None
+        assert "TupleIntIntDictStrategy" in self.get_strategy(d)
+        assert d[(1.0, 2)] == "a"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d.get((1, 2, 3)) is None
+
+        d = {(1, 2, 3): 1}
+        assert "TupleIntIntIntDictStrategy" in self.get_strategy(d)
+        d = {("a", "b"): 1}
+        assert "TupleStrStrDictStrategy" in self.get_strategy(d)
+        d = {("a", 5): 1}
+        assert "TupleStrIntDictStrategy" in self.get_strategy(d)
+        assert d[("a", 5)] == 1
+        assert d[(u"a", 5)] == 1
+        d = {(5, "a"): 1}
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+
+    def test_tuple_keys_aggregate(self):
+        d = {}
+        for i in range(100):
+            key = (str(i % 7), i % 3)
+            d[key] = d.get(key, 0) + i
+        assert "TupleStrIntDictStrategy" in self.get_strategy(d)
+        assert len(d) == 21
+        assert sum(d.values()) == sum(range(100))
+        assert d[("0", 0)] == sum([i for i in range(100)
+                                   if i % 7 == 0 and i % 3 == 0])
+        for key, value in d.iteritems():
+            assert type(key) is tuple
+            assert len(key) == 2
+        del d[("0", 0)]
+        assert ("0", 0) not in d
+        assert len(d) == 20
+
+    def test_tuple_subclass_key(self):
+        class T(tuple):
+            pass
+        d = {(1, 2): 1}
+        d[T((3, 4))] = 2
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d[(3, 4)] == 2
+
 class FakeWrapper(object):
     hash_count = 0
     def unwrap(self, space):
@@ -1102,7 +1207,11 @@ class Config:
             withcelldict = False
             withmethodcache = False
             withidentitydict = False
+            withordereddict = False
             withmapdict = False
+            withunboxedattrs = False
+            withtypedkeydict = False
+            withshareddict = False
 
 FakeSpace.config = Config()
 
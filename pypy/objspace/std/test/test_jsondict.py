@@ -0,0 +1,78 @@
+from pypy.objspace.std.jsondict import (JSONMap, JSONDictStrategy,
+    from_jsonmap_and_values, MAX_SHARED_KEYS, MAX_TRANSITIONS,
+    INDEX_DICT_CUTOFF)
+
+
+class TestJSONDict(object):
+    def make_map(self, *keys):
+        space = self.space
+        jsonmap = JSONMap(space, None, None)
+        for key in keys:
+            jsonmap = jsonmap.get_next(space.wrap(key))
+        return jsonmap
+
+    def test_map_transitions(self):
+        space = self.space
+        m1 = self.make_map(u"a", u"b")
+        m2 = m1.prev.prev.get_next(space.wrap(u"a")).get_next(space.wrap(u"b"))
+        assert m1 is m2
+        assert m1.length == 2
+        assert m1.index(u"a") == 0
+        assert m1.index(u"b") == 1
+        assert m1.index(u"c") == -1
+        assert m1.get_next(space.wrap(u"a")) is None
+        assert m1.get_strategy() is m2.get_strategy()
+
+    def test_map_long(self):
+        space = self.space
+        keys = [unicode(i) for i in range(MAX_SHARED_KEYS)]
+        jsonmap = self.make_map(*keys)
+        assert jsonmap.length > INDEX_DICT_CUTOFF
+        for i, key in enumerate(keys):
+            assert jsonmap.index(key) == i
+        assert jsonmap.index(u"x") == -1
+        assert jsonmap.get_next(space.wrap(u"x")) is None
+
+    def test_map_transitions_limit(self):
+        space = self.space
+        root = JSONMap(space, None, None)
+        for i in range(MAX_TRANSITIONS):
+            assert root.get_next(space.wrap(unicode(i))) is not None
+        assert root.get_next(space.wrap(u"x")) is None
+        assert len(root.transitions) == MAX_TRANSITIONS
+        # the existing transitions are still followed
+        assert root.get_next(space.wrap(u"0")) is root.transitions[u"0"]
+
+    def test_dict(self):
+        space = self.space
+        jsonmap = self.make_map(u"a", u"b")
+        w_d = from_jsonmap_and_values(space, jsonmap,
+                                      [space.wrap(1), space.wrap(2)])
+        assert isinstance(w_d.strategy, JSONDictStrategy)
+        assert space.unwrap(w_d) == {u"a": 1, u"b": 2}
+        assert space.int_w(space.len(w_d)) == 2
+        assert space.listview_unicode(w_d) == [u"a", u"b"]
+        w_d2 = from_jsonmap_and_values(space, jsonmap,
+                                       [space.wrap(3), space.wrap(4)])
+        assert w_d2.strategy is w_d.strategy
+        space.setitem(w_d2, space.wrap(u"a"), space.wrap(5))
+        assert w_d2.strategy is w_d.strategy
+        assert space.unwrap(w_d2) == {u"a": 5, u"b": 4}
+        space.setitem(w_d2, space.wrap(u"c"), space.wrap(6))
+        assert not isinstance(w_d2.strategy, JSONDictStrategy)
+        assert space.unwrap(w_d2) == {u"a": 5, u"b": 4, u"c": 6}
+        assert space.unwrap(w_d) == {u"a": 1, u"b": 2}
+
+    def test_iteration_while_changing(self):
+        space = self.space
+        jsonmap = self.make_map(u"a", u"b")
+        w_d = from_jsonmap_and_values(space, jsonmap,
+                                      [space.wrap(1), space.wrap(2)])
+        it = w_d.iteritems()
+        w_key, w_value = it.next_item()
+        assert space.unwrap(w_key) == u"a"
+        space.delitem(w_d, space.wrap(u"a"))
+        space.setitem(w_d, space.wrap(u"c"), space.wrap(3))
+        w_key, w_value = it.next_item()
+        assert space.unwrap(w_key) == u"b"
+        assert space.unwrap(w_value) == 2
@@ -633,6 +633,38 @@ class AppTestW_ListObject(object):
         l.sort(reverse = True, key = lower)
         assert l == ['C', 'b', 'a']
 
+    def test_sort_unwrapped_keys(self):
+        l = [(i * 7) % 20 for i in range(20)]
+        assert sorted(l, key=lambda x: -x) == range(19, -1, -1)
+        l = ["%d-%s" % (i, "abcd"[i % 4]) for i in range(40)]
+        l.sort(key=lambda x: x[-1])
+        assert l == sorted(l, cmp=lambda x, y: cmp(x[-1], y[-1]))
+        assert l[:3] == ["0-a", "4-a", "8-a"]     # the sort is stable
+        l = [3, 1, 2]
+        l.sort(key=lambda x: x * 0.5, reverse=True)
+        assert l == [3, 2, 1]
+        l = [(1, 'b'), (2, 'a'), (3, 'b'), (4, 'a')]
+        l.sort(key=lambda x: x[1], reverse=True)
+        assert l == [(1, 'b'), (3, 'b'), (2, 'a'), (4, 'a')]
+
+    def test_sort_mixed_keys(self):
+        class MyInt(int):
+            def __lt__(self, other):
+                return int(self) > int(other)
+        l = [1, 2, 3]
+        l.sort(key=MyInt)
+        assert l == [3, 2, 1]
+        l = [1, 2.5, 2]
+        l.sort(key=lambda x: x)
+        assert l == [1, 2, 2.5]
+        l = [1, 'a', 2]
+        l.sort(key=lambda x: -x if isinstance(x, int) else x)
+        assert l == [2, 1, 'a']
+        def key(x):
+            l.append(x)
+            return x
+        raises(ValueError, l.sort, key=key)
+
     def test_sort_simple_string(self):
         l = ["a", "d", "c", "b"]
         l.sort()
@@ -1432,6 +1464,57 @@ class AppTestForRangeLists(AppTestW_ListObject):
         assert item11 in l[::11]
 
 
+class AppTestNarrowIntLists(AppTestW_ListObject):
+    spaceconfig = {"objspace.std.withnarrowintlist": True}
+
+    def test_strategies(self):
+        import sys
+        from __pypy__ import list_strategy
+        l = [1, 2, 3]
+        assert list_strategy(l) == "int8"
+        l.append(300)
+        assert list_strategy(l) == "int16"
+        l.append(sys.maxint)
+        assert list_strategy(l) == "int"
+        assert l == [1, 2, 3, 300, sys.maxint]
+        l = list((-5, 100))
+        assert list_strategy(l) == "int8"
+        l = [0] * 10
+        assert list_strategy(l) == "int8"
+        l[3] = -40000
+        assert l[3] == -40000
+        assert l.count(0) == 9
+        l.append('x')
+        assert list_strategy(l) == "object"
+
+    def test_slice_and_contains(self):
+        l = range(-100, 100)
+        assert l[10:13] == [-90, -89, -88]
+        assert l[::50] == [-100, -50, 0, 50]
+        assert 99 in l
+        assert 100 not in l
+        assert 1 << 40 not in l
+        assert 5.0 in l
+        assert l.index(-1) == 99
+        raises(ValueError, l.index, 1000)
+
+    def test_sort_narrow(self):
+        l = [(i * 31) % 200 - 100 for i in range(500)]
+        l.sort()
+        assert l == sorted(l, key=lambda x: x)
+        assert l[0] == -100 and l[-1] == 99
+        l.sort(reverse=True)
+        assert l[0] == 99
+
+    def test_sum_min_max(self):
+        l = [3, -7, 100, 5]
+        assert sum(l) == 101
+        assert min(l) == -7
+        assert max(l) == 100
+        l = [30000] * 100000
+        assert sum(l) == 3000000000
+
+
 class AppTestWithoutStrategies(object):
     spaceconfig = {"objspace.std.withliststrategies": False}
 
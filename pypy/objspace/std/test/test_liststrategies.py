@@ -1,4 +1,5 @@
 import sys
+import py
 from pypy.objspace.std.listobject import W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy, FloatListStrategy, StringListStrategy, RangeListStrategy, make_range_list, UnicodeListStrategy
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
@@ -630,6 +631,13 @@ class TestW_ListStrategies(TestW_ListObject):
         w_l = W_ListObject(space, [space.wrap(1), space.wrap(2), space.wrap(3)])
         assert self.space.listview_int(w_l) == [1, 2, 3]
 
+    def test_listview_float_list(self):
+        space = self.space
+        w_l = W_ListObject(space, [space.wrap(1.5), space.wrap(2.5)])
+        assert self.space.listview_float(w_l) == [1.5, 2.5]
+        w_l = W_ListObject(space, [space.wrap(1), space.wrap(2)])
+        assert self.space.listview_float(w_l) is None
+
 
 class TestW_ListStrategiesDisabled:
     spaceconfig = {"objspace.std.withliststrategies": False}
@@ -639,3 +647,79 @@ class TestW_ListStrategiesDisabled:
         assert isinstance(W_ListObject(self.space, [self.space.wrap(1),self.space.wrap('a')]).strategy, ObjectListStrategy)
         assert isinstance(W_ListObject(self.space, [self.space.wrap(1),self.space.wrap(2),self.space.wrap(3)]).strategy, ObjectListStrategy)
         assert isinstance(W_ListObject(self.space, [self.space.wrap('a'), self.space.wrap('b')]).strategy, ObjectListStrategy)
+
+
+class TestW_NarrowIntListStrategies:
+    spaceconfig = {"objspace.std.withnarrowintlist": True}
+
+    def test_check_strategy(self):
+        space = self.space
+        w = space.wrap
+        for values, strategy in [
+                ([1, 2, 3], listobject.Int8ListStrategy),
+                ([-128, 127], listobject.Int8ListStrategy),
+                ([-129, 127], listobject.Int16ListStrategy),
+                ([0, 1000], listobject.Int16ListStrategy),
+                ([0, 1 << 20], listobject.Int32ListStrategy),
+                ([0, -sys.maxint-1], IntegerListStrategy)]:
+            if strategy is listobject.Int32ListStrategy and sys.maxint < 2**32:
+                strategy = IntegerListStrategy
+            w_l = W_ListObject(space, [w(value) for value in values])
+            assert isinstance(w_l.strategy, strategy)
+            assert space.unwrap(w_l) == values
+            assert space.listview_int(w_l) == values
+
+    def test_widen(self):
+        space = self.space
+        w = space.wrap
+        w_l = W_ListObject(space, [])
+        w_l.append(w(5))
+        assert isinstance(w_l.strategy, listobject.Int8ListStrategy)
+        w_l.append(w(-200))
+        assert isinstance(w_l.strategy, listobject.Int16ListStrategy)
+        w_l.insert(0, w(sys.maxint))
+        assert isinstance(w_l.strategy, IntegerListStrategy)
+        assert space.unwrap(w_l) == [sys.maxint, 5, -200]
+        w_l.setitem(1, w('a'))
+        assert isinstance(w_l.strategy, ObjectListStrategy)
+        assert space.unwrap(w_l) == [sys.maxint, 'a', -200]
+
+    def test_extend_and_setslice(self):
+        space = self.space
+        w = space.wrap
+        w_l = W_ListObject(space, [w(1), w(2)])
+        w_l.extend(W_ListObject(space, [w(3), w(4)]))
+        assert isinstance(w_l.strategy, listobject.Int8ListStrategy)
+        w_l.extend(W_ListObject(space, [w(30000)]))
+        assert isinstance(w_l.strategy, listobject.Int16ListStrategy)
+        assert space.unwrap(w_l) == [1, 2, 3, 4, 30000]
+        w_l.setslice(0, 1, 2, W_ListObject(space, [w(sys.maxint), w(7)]))
+        assert isinstance(w_l.strategy, IntegerListStrategy)
+        assert space.unwrap(w_l) == [sys.maxint, 7, 3, 4, 30000]
+        w_l = W_ListObject(space, [w(1), w(2)])
+        w_l.extend(W_ListObject(space, [w(1.5)]))
+        assert isinstance(w_l.strategy, ObjectListStrategy)
+        assert space.unwrap(w_l) == [1, 2, 1.5]
+
+    def test_find(self):
+        space = self.space
+        w = space.wrap
+        w_l = W_ListObject(space, [w(1), w(2), w(-3)])
+        assert w_l.find(w(-3)) == 2
+        assert w_l.find(w(2.0)) == 1
+        py.test.raises(ValueError, w_l.find, w(1000))
+        py.test.raises(ValueError, w_l.find, w(4))
+
+    def test_sort(self):
+        space = self.space
+        w = space.wrap
+        values = [(i * 7919) % 251 - 125 for i in range(1000)]
+        w_l = W_ListObject(space, [w(value) for value in values])
+        assert isinstance(w_l.strategy, listobject.Int8ListStrategy)
+        w_l.sort(False)
+        assert space.unwrap(w_l) == sorted(values)
+        w_l.sort(True)
+        assert space.unwrap(w_l) == sorted(values, reverse=True)
+        w_l = W_ListObject(space, [w(300), w(-5), w(12)])
+        w_l.sort(False)
+        assert space.unwrap(w_l) == [-5, 12, 300]
@@ -1,3 +1,4 @@
+import py
 from pypy.objspace.std.test.test_dictmultiobject import FakeSpace, W_DictMultiObject
 from pypy.objspace.std.mapdict import *
 
@@ -8,7 +9,11 @@ class Config:
             withcelldict = False
             withmethodcache = False
             withidentitydict = False
+            withordereddict = False
             withmapdict = True
+            withunboxedattrs = False
+            withtypedkeydict = False
+            withshareddict = False
 
 space = FakeSpace()
 space.config = Config
@@ -107,6 +112,20 @@ def test_add_attribute():
     assert obj2.getdictvalue(space, "b") == 60
     assert obj2.map is obj.map
 
+def test_unboxed_attribute_becomes_boxed():
+    cls = Class()
+    attr = cls.terminator._get_new_attr("a", DICT, UNBOXED_INT)
+    assert isinstance(attr, IntAttribute)
+    assert attr.attr_for_kind(UNBOXED_INT) is attr
+    boxed = attr.attr_for_kind(UNBOXED_FLOAT)
+    assert type(boxed) is PlainAttribute
+    assert boxed.selector == ("a", DICT)
+    # _get_new_attr() is elidable: it keeps returning the same attribute,
+    # and the boxed version is found from there
+    assert cls.terminator._get_new_attr("a", DICT, UNBOXED_INT) is attr
+    assert attr.attr_for_kind(UNBOXED_INT) is boxed
+    assert attr.attr_for_kind(BOXED) is boxed
+
 def test_delete():
     for i, dattr in enumerate(["a", "b", "c"]):
         c = Class()
@@ -999,6 +1018,127 @@ class AppTestWithMapDictAndCounters(object):
         got = x.a
         assert got == 'd'
 
+class AppTestWithUnboxedAttributes(AppTestWithMapDict):
+    spaceconfig = {"objspace.std.withmapdict": True,
+                   "objspace.std.withunboxedattrs": True}
+
+    def setup_class(cls):
+        from pypy.interpreter import gateway
+        if cls.runappdirect:
+            py.test.skip("can only be run on py.py")
+        def attr_kind(space, w_obj, name):
+            attr = w_obj._get_mapdict_map().find_map_attr((name, DICT))
+            return space.wrap(attr.__class__.__name__)
+        attr_kind.unwrap_spec = [gateway.ObjSpace, gateway.W_Root, str]
+        cls.w_attr_kind = cls.space.wrap(gateway.interp2app(attr_kind))
+
+    def test_unboxed(self):
+        class Point(object):
+            def __init__(self, x, y, z):
+                self.x = x
+                self.y = y
+                self.z = z
+        p = Point(1.5, 2.5, 7)
+        assert self.attr_kind(p, "x") == "FloatAttribute"
+        assert self.attr_kind(p, "y") == "FloatAttribute"
+        assert self.attr_kind(p, "z") == "IntAttribute"
+        assert (p.x, p.y, p.z) == (1.5, 2.5, 7)
+        p.x += 1.0
+        p.z -= 1
+        assert (p.x, p.y, p.z) == (2.5, 2.5, 6)
+        assert p.__dict__ == {"x": 2.5, "y": 2.5, "z": 6}
+
+    def test_type_change(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2
+        a.z = 3
+        a.y = "foo"
+        assert self.attr_kind(a, "x") == "IntAttribute"
+        assert self.attr_kind(a, "y") == "PlainAttribute"
+        assert self.attr_kind(a, "z") == "IntAttribute"
+        assert (a.x, a.y, a.z) == (1, "foo", 3)
+        a.y = 5
+        assert a.y == 5
+        # new instances store 'y' boxed from the start
+        b = A()
+        b.x = 1
+        b.y = 2
+        assert self.attr_kind(b, "y") == "PlainAttribute"
+        # an int attribute receiving a float
+        b.x = 1.5
+        assert b.x == 1.5
+        assert type(b.x) is float
+
+    def test_type_change_during_iteration(self):
+        class A(object):
+            pass
+        a = A()
+        a.a = 1
+        a.b = 2
+        a.c = 3.5
+        keys = []
+        for k in a.__dict__:
+            keys.append(k)
+            setattr(a, k, "x")
+        assert sorted(keys) == ["a", "b", "c"]
+        assert a.__dict__ == {"a": "x", "b": "x", "c": "x"}
+        a = A()
+        a.a = 1
+        a.b = 2
+        a.c = 3
+        keys = []
+        for k, v in a.__dict__.iteritems():
+            keys.append(k)
+            a.b = 2.5
+        assert sorted(keys) == ["a", "b", "c"]
+        assert a.__dict__ == {"a": 1, "b": 2.5, "c": 3}
+
+    def test_many_unboxed_attributes(self):
+        class A(object):
+            pass
+        a = A()
+        for i in range(20):
+            setattr(a, "i%d" % i, i)
+            setattr(a, "f%d" % i, i + 0.5)
+        for i in range(20):
+            assert getattr(a, "i%d" % i) == i
+            assert getattr(a, "f%d" % i) == i + 0.5
+        assert self.attr_kind(a, "i19") == "IntAttribute"
+        assert self.attr_kind(a, "f19") == "FloatAttribute"
+
+    def test_subclasses_stay_boxed(self):
+        class myint(int):
+            pass
+        class A(object):
+            pass
+        a = A()
+        a.x = myint(5)
+        a.y = True
+        assert self.attr_kind(a, "x") == "PlainAttribute"
+        assert self.attr_kind(a, "y") == "PlainAttribute"
+        assert type(a.x) is myint
+        assert a.y is True
+
+    def test_delete_and_class_change(self):
+        class A(object):
+            pass
+        class B(object):
+            pass
+        a = A()
+        for i, name in enumerate("abcdefgh"):
+            setattr(a, name, i)
+        del a.c
+        assert a.__dict__ == dict(a=0, b=1, d=3, e=4, f=5, g=6, h=7)
+        a.__class__ = B
+        assert a.h == 7
+        a.h = 8.5
+        del a.a
+        assert a.__dict__ == dict(b=1, d=3, e=4, f=5, g=6, h=8.5)
+
+
 class AppTestGlobalCaching(AppTestWithMapDict):
     spaceconfig = {"objspace.std.withmethodcachecounter": True,
                    "objspace.std.withmapdict": True,
@@ -1079,3 +1219,189 @@ def test_newdict_instance():
 class TestMapDictImplementationUsingnewdict(BaseTestRDictImplementation):
     StrategyClass = MapDictStrategy
     # NB: the get_impl method is not overwritten here, as opposed to above
+
+class TestSharedDictImplementation(BaseTestRDictImplementation):
+    StrategyClass = SharedDictStrategy
+
+class TestDevolvedSharedDictImplementation(BaseTestDevolvedDictImplementation):
+    StrategyClass = SharedDictStrategy
+
+def make_shared_dict(terminator):
+    # the fake space has no cache: share the terminator explicitly
+    strategy = SharedDictStrategy(space)
+    w_obj = Object()
+    w_obj._init_empty(terminator)
+    return W_DictMultiObject(space, strategy, strategy.erase(w_obj))
+
+def test_shared_dict_shares_maps():
+    terminator = get_terminator_for_shared_dicts(space)
+    w_d1 = make_shared_dict(terminator)
+    w_d2 = make_shared_dict(terminator)
+    for w_d in [w_d1, w_d2]:
+        w_d.setitem_str("name", 1)
+        w_d.setitem_str("age", 2)
+    map1 = w_d1.strategy.unerase(w_d1.dstorage)._get_mapdict_map()
+    map2 = w_d2.strategy.unerase(w_d2.dstorage)._get_mapdict_map()
+    assert map1 is map2
+    assert w_d1.strategy.listview_str(w_d1) == ["name", "age"]
+    assert w_d1.strategy.view_as_kwargs(w_d1) == (["name", "age"], [1, 2])
+
+def test_shared_dict_too_many_keys():
+    w_d = make_shared_dict(get_terminator_for_shared_dicts(space))
+    for i in range(MAX_SHARED_DICT_KEYS):
+        w_d.setitem_str("key%d" % i, i)
+    assert isinstance(w_d.strategy, SharedDictStrategy)
+    w_d.setitem_str("key0", -1)
+    assert isinstance(w_d.strategy, SharedDictStrategy)
+    w_d.setitem_str("one more", 42)
+    assert not isinstance(w_d.strategy, MapDictStrategy)
+    assert w_d.length() == MAX_SHARED_DICT_KEYS + 1
+    assert w_d.getitem_str("key0") == -1
+    assert w_d.getitem_str("key5") == 5
+    assert w_d.getitem_str("one more") == 42
+
+def test_shared_dict_random_keys():
+    terminator = get_terminator_for_shared_dicts(space)
+    for i in range(MAX_SHARED_DICT_TRANSITIONS):
+        w_d = make_shared_dict(terminator)
+        w_d.setitem_str("random", 0)
+        w_d.setitem_str("random key %d" % i, i)
+        assert isinstance(w_d.strategy, SharedDictStrategy)
+    w_d = make_shared_dict(terminator)
+    w_d.setitem_str("random", 0)
+    w_d.setitem_str("random key 0", 1)
+    assert isinstance(w_d.strategy, SharedDictStrategy)
+    w_d.setitem_str("random", 5)
+    assert isinstance(w_d.strategy, SharedDictStrategy)
+    w_d = make_shared_dict(terminator)
+    w_d.setitem_str("random", 0)
+    w_d.setitem_str("yet another random key", 1)
+    assert not isinstance(w_d.strategy, MapDictStrategy)
+    assert w_d.getitem_str("random") == 0
+    assert w_d.getitem_str("yet another random key") == 1
+
+def test_shared_dict_first_keys():
+    terminator = get_terminator_for_shared_dicts(space)
+    strategy = SharedDictStrategy(space)
+    for i in range(MAX_SHARED_DICT_TRANSITIONS * 2):
+        w_d = make_shared_dict(terminator)
+        w_d.setitem_str("first key %d" % i, i)
+        assert isinstance(w_d.strategy, SharedDictStrategy)
+    assert strategy.can_add_key(terminator, "first key 0")
+    assert strategy.can_add_key(terminator, "another first key")
+    for i in range(MAX_SHARED_DICT_FIRST_KEYS):
+        terminator._get_new_attr("key %d" % i, DICT, BOXED)
+    assert strategy.can_add_key(terminator, "first key 0")
+    assert not strategy.can_add_key(terminator, "another first key")
+
+class AppTestSharedDict(object):
+    spaceconfig = {"objspace.std.withmapdict": True,
+                   "objspace.std.withshareddict": True}
+
+    def setup_class(cls):
+        if cls.runappdirect:
+            py.test.skip("__repr__ doesn't work on appdirect")
+
+    def w_get_strategy(self, obj):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        return r[r.find("(") + 1: r.find(")")]
+
+    def test_rows(self):
+        rows = []
+        for i in range(10):
+            rows.append({"id": i, "name": str(i), "score": i * 1.5})
+        for i, row in enumerate(rows):
+            assert "SharedDictStrategy" in self.get_strategy(row)
+            assert row["id"] == i
+            assert row == {"id": i, "name": str(i), "score": i * 1.5}
+            assert sorted(row) == ["id", "name", "score"]
+        row = rows[0]
+        assert row.keys() == ["id", "name", "score"]
+        assert row.values() == [0, "0", 0.0]
+        assert row.items() == [("id", 0), ("name", "0"), ("score", 0.0)]
+        assert row.get("missing") is None
+        assert row.get(5) is None
+        assert "SharedDictStrategy" in self.get_strategy(row)
+        del row["name"]
+        assert row == {"id": 0, "score": 0.0}
+        assert "SharedDictStrategy" in self.get_strategy(row)
+        row["name"] = "x"
+        assert row.keys() == ["id", "score", "name"]
+        assert row.pop("id") == 0
+        assert row.setdefault("id", 7) == 7
+        assert len(row) == 3
+        row.clear()
+        assert row == {}
+
+    def test_kwargs(self):
+        def f(**kwargs):
+            return kwargs
+        d = {"a": 1, "b": 2}
+        assert "SharedDictStrategy" in self.get_strategy(d)
+        assert f(**d) == {"a": 1, "b": 2}
+        assert set(d) == set(["a", "b"])
+
+    def test_devolve(self):
+        d = {"a": 1, "b": 2}
+        d[3] = 4
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {"a": 1, "b": 2, 3: 4}
+        d = {"a": 1, "b": 2}
+        assert d[u"a"] == 1
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        d = {}
+        for i in range(100):
+            d["key%d" % i] = i
+        assert "StringDictStrategy" in self.get_strategy(d)
+        assert len(d) == 100
+        assert d["key0"] == 0
+        assert d["key99"] == 99
+
+    def test_many_dicts(self):
+        # the first keys of many different dicts do not use up the
+        # transitions of the terminator shared by all the dicts
+        for i in range(100):
+            d = {"many_dicts_%d" % i: i}
+            assert "SharedDictStrategy" in self.get_strategy(d)
+        d = {}
+        d["zzz"] = 1
+        assert "SharedDictStrategy" in self.get_strategy(d)
+        d = {"x": 1, "y": 2}
+        assert "SharedDictStrategy" in self.get_strategy(d)
+
+    def test_iteration(self):
+        d = {"x": 1, "y": 2}
+        it = d.iteritems()
+        assert it.next() == ("x", 1)
+        d["z"] = 3
+        raises(RuntimeError, it.next)
+        d = {"x": 1, "y": 2}
+        it = iter(d)
+        assert it.next() == "x"
+        del d["x"]
+        d["z"] = 3
+        raises(RuntimeError, it.next)
+        d = {"x": 1, "y": 2}
+        assert list(d.itervalues()) == [1, 2]
+
+
+class AppTestSharedDictUnboxed(AppTestSharedDict):
+    spaceconfig = {"objspace.std.withmapdict": True,
+                   "objspace.std.withshareddict": True,
+                   "objspace.std.withunboxedattrs": True}
+
+    def test_type_change_during_iteration(self):
+        d = {"a": 1, "b": 2, "c": 3.5}
+        keys = []
+        for k in d:
+            keys.append(k)
+            d[k] = "x"
+        assert keys == ["a", "b", "c"]
+        assert d == {"a": "x", "b": "x", "c": "x"}
+        d = {"a": 1, "b": 2, "c": 3}
+        items = []
+        for k, v in d.iteritems():
+            items.append((k, v))
+            d["c"] = 3.5
+        assert items == [("a", 1), ("b", 2), ("c", 3.5)]
@@ -0,0 +1,60 @@
+from pypy.objspace.std.test import test_stringobject
+
+
+class AppTestStringObject(test_stringobject.AppTestStringObject):
+    spaceconfig = {"objspace.std.withrope": True}
+
+    def w_isrope(self, s):
+        import __pypy__
+        return 'W_RopeObject' in __pypy__.internal_repr(s)
+
+    def test_basic(self):
+        a = "a" * 200
+        b = "b" * 100
+        s = a + b
+        assert type(s) is str
+        assert self.isrope(s)
+        assert len(s) == 300
+        assert s == "a" * 200 + "b" * 100
+        assert not self.isrope("a" * 10 + "b")
+
+    def test_add(self):
+        s = ""
+        for i in range(1000):
+            s += str(i)
+        assert self.isrope(s)
+        assert s == "".join([str(i) for i in range(1000)])
+        t = "x" * 300
+        assert self.isrope(s + t)
+        assert self.isrope(t + s)
+        assert self.isrope(s + s)
+        assert (t + s)[297:304] == "xxx0123"
+
+    def test_getitem_and_slice(self):
+        s = "0123456789" * 20 + "abcdefghij" * 20
+        r = ("0123456789" * 20).__add__("abcdefghij" * 20)
+        assert self.isrope(r)
+        for i in [0, 5, 199, 200, 201, 399, -1, -400]:
+            assert r[i] == s[i]
+        raises(IndexError, "r[400]")
+        raises(IndexError, "r[-401]")
+        assert r[195:205] == s[195:205]
+        assert not self.isrope(r[195:205])
+        assert r[10:-10] == s[10:-10]
+        assert self.isrope(r[10:-10])
+        assert r[::7] == s[::7]
+        assert r[300:100:-3] == s[300:100:-3]
+        assert r[5:5] == ""
+
+    def test_hash_and_methods(self):
+        s = "a" * 150 + "b" * 150
+        r = ("a" * 150).__add__("b" * 150)
+        assert hash(r) == hash(s)
+        d = {r: 5}
+        assert d[s] == 5
+        r = ("a" * 150).__add__("b" * 150)
+        assert r.upper() == s.upper()
+        assert r.find("ab") == 149
+        assert r.split("ab") == ["a" * 149, "b" * 149]
+        assert u"c" + r == u"c" + s
+        assert r == s
@@ -960,3 +960,29 @@ class AppTestAppSetTest:
         # did not work before because of an optimization that swaps both
         # operands when the first set is larger than the second
         assert type(frozenset([1, 2]) & set([2])) is frozenset
+
+
+class AppTestBitmapSet(AppTestAppSetTest):
+    spaceconfig = {"objspace.std.withbitmapset": True}
+
+    def test_dense_ints(self):
+        s1 = set(range(0, 1000, 2))
+        s2 = set(range(-9, 1000, 3))
+        assert s1 & s2 == set([x for x in range(0, 1000, 6)])
+        assert len(s1 | s2) == len(set(range(0, 1000, 2) + range(-9, 1000, 3)))
+        assert (s1 - s2) | (s1 & s2) == s1
+        assert (s1 ^ s2) == (s1 | s2) - (s1 & s2)
+        assert sorted(s1 - s2)[:4] == [2, 4, 8, 10]
+        s1.add(-10 ** 9)
+        assert -10 ** 9 in s1 and 0 in s1 and 1 not in s1
+        s1.add("foo")
+        assert "foo" in s1 and 998 in s1
+
+    def test_mixed_numbers(self):
+        s = set([1, 2, 3])
+        assert 1.0 in s
+        assert 2L in s
+        s = set([1, 2, 3])
+        assert s == set([1.0, 2L, 3])
+        assert frozenset([1, 2]) == frozenset([2.0, 1])
+        assert hash(frozenset([1, 2])) == hash(frozenset([2.0, 1]))
@@ -1,10 +1,15 @@
+import sys
+
 from pypy.objspace.std.setobject import W_SetObject
 from pypy.objspace.std.setobject import (IntegerSetStrategy, ObjectSetStrategy,
                                          EmptySetStrategy, StringSetStrategy,
                                          UnicodeSetStrategy,
+                                         IntegerBitmapSetStrategy, IntBitmap,
                                          IntegerIteratorImplementation,
                                          StringIteratorImplementation,
-                                         UnicodeIteratorImplementation)
+                                         UnicodeIteratorImplementation,
+                                         IntegerBitmapIteratorImplementation)
+from rpython.rlib.rarithmetic import LONG_BIT
 from pypy.objspace.std.listobject import W_ListObject
 
 class TestW_SetStrategies:
@@ -146,3 +151,150 @@ class TestW_SetStrategies:
         #
         s = W_SetObject(space, self.wrapped([u"a", u"b"]))
         assert sorted(space.listview_unicode(s)) == [u"a", u"b"]
+
+
+class TestW_BitmapSetStrategy:
+    spaceconfig = {"objspace.std.withbitmapset": True}
+
+    def wrapped(self, l):
+        return W_ListObject(self.space, [self.space.wrap(x) for x in l])
+
+    def test_from_list(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([1, 2, 3, 4, 5]))
+        assert s.strategy is space.fromcache(IntegerBitmapSetStrategy)
+        s = W_SetObject(space, self.wrapped(range(-1000, 1000, 7)))
+        assert s.strategy is space.fromcache(IntegerBitmapSetStrategy)
+        s = W_SetObject(space, self.wrapped([1, 10 ** 6]))
+        assert s.strategy is space.fromcache(IntegerSetStrategy)
+        s = W_SetObject(space, W_ListObject(space, []))
+        s.add(space.wrap(5))
+        assert s.strategy is space.fromcache(IntegerBitmapSetStrategy)
+
+    def test_switch_to_sparse(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([1, 2, 3]))
+        s.add(space.wrap(100))
+        assert s.strategy is space.fromcache(IntegerBitmapSetStrategy)
+        s.add(space.wrap(-10 ** 6))
+        assert s.strategy is space.fromcache(IntegerSetStrategy)
+        assert sorted(space.listview_int(s)) == [-10 ** 6, 1, 2, 3, 100]
+        s = W_SetObject(space, self.wrapped([1, 2, 3]))
+        s.add(space.wrap("four"))
+        assert s.strategy is space.fromcache(ObjectSetStrategy)
+
+    def test_binary_operations(self):
+        space = self.space
+        s1 = W_SetObject(space, self.wrapped(range(0, 200, 2)))
+        s2 = W_SetObject(space, self.wrapped(range(0, 300, 3)))
+        bitmap = space.fromcache(IntegerBitmapSetStrategy)
+        for w_res, expected in [
+                (s1.intersect(s2), set(range(0, 200, 6))),
+                (s1.difference(s2), set(range(0, 200, 2)) -
+                                    set(range(0, 300, 3))),
+                (s1.symmetric_difference(s2), set(range(0, 200, 2)) ^
+                                              set(range(0, 300, 3)))]:
+            assert w_res.strategy is bitmap
+            assert set(space.listview_int(w_res)) == expected
+        assert not s1.issubset(s2)
+        assert s1.intersect(s2).issubset(s2)
+        assert not s1.isdisjoint(s2)
+        s1.update(s2)
+        assert s1.strategy is bitmap
+        assert s1.length() == len(set(range(0, 200, 2)) | set(range(0, 300, 3)))
+
+    def test_binary_operations_with_other_strategies(self):
+        space = self.space
+        s1 = W_SetObject(space, self.wrapped([1, 2, 3, 4]))
+        s2 = W_SetObject(space, self.wrapped([3, 4, 10 ** 6]))
+        assert s2.strategy is space.fromcache(IntegerSetStrategy)
+        assert sorted(space.listview_int(s1.intersect(s2))) == [3, 4]
+        assert sorted(space.listview_int(s2.intersect(s1))) == [3, 4]
+        assert sorted(space.listview_int(s1.difference(s2))) == [1, 2]
+        assert sorted(space.listview_int(s2.difference(s1))) == [10 ** 6]
+        s2.update(s1)
+        assert s2.strategy is space.fromcache(IntegerSetStrategy)
+        assert s2.length() == 5
+        s1.difference_update(W_SetObject(space, self.wrapped(["a"])))
+        assert s1.strategy is space.fromcache(IntegerBitmapSetStrategy)
+        s1.update(W_SetObject(space, self.wrapped([10 ** 6])))
+        assert s1.strategy is space.fromcache(IntegerSetStrategy)
+        assert s1.equals(s2)
+
+    def test_iter(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([-65, 70, 3, 2]))
+        it = s.iter()
+        assert isinstance(it, IntegerBitmapIteratorImplementation)
+        assert [space.unwrap(it.next()) for i in range(4)] == [-65, 2, 3, 70]
+        assert it.next() is None
+
+    def test_popitem(self):
+        space = self.space
+        s = W_SetObject(space, self.wrapped([300, 5, 7]))
+        assert space.unwrap(s.popitem()) == 5
+        assert space.unwrap(s.popitem()) == 7
+        assert space.unwrap(s.popitem()) == 300
+        assert s.length() == 0
+
+
+class TestIntBitmap:
+
+    def check(self, bitmap, expected):
+        assert bitmap.tolist() == sorted(expected)
+        assert bitmap.count == len(expected)
+        if bitmap.words:
+            assert bitmap.words[0] and bitmap.words[-1]
+        for n in expected:
+            assert bitmap.contains(n)
+
+    def test_add_remove(self):
+        import random
+        r = random.Random(42)
+        bitmap = IntBitmap(0, [], 0)
+        expected = set()
+        for i in range(300):
+            n = r.randrange(-300, 300)
+            if r.random() < 0.6:
+                if bitmap.add(n):
+                    expected.add(n)
+                else:
+                    assert not bitmap.contains(n)
+            else:
+                assert bitmap.remove(n) == (n in expected)
+                expected.discard(n)
+            self.check(bitmap, expected)
+        assert not bitmap.contains(1000)
+        assert not bitmap.remove(-sys.maxint - 1)
+
+    def test_too_sparse(self):
+        bitmap = IntBitmap.from_list([5])
+        assert not bitmap.add(LONG_BIT * 100)
+        self.check(bitmap, [5])
+        assert IntBitmap.from_list([1, 2, LONG_BIT * 100]) is None
+        assert IntBitmap.from_list([-sys.maxint - 1, sys.maxint]) is None
+        bitmap = IntBitmap.from_list([sys.maxint, sys.maxint - 100])
+        self.check(bitmap, [sys.maxint, sys.maxint - 100])
+
+    def test_operations(self):
+        import random
+        r = random.Random(43)
+        for i in range(50):
+            l1 = [r.randrange(-300, 300) for j in range(r.randrange(30))]
+            l2 = [r.randrange(-300, 300) for j in range(r.randrange(30))]
+            b1 = IntBitmap.from_list(l1)
+            b2 = IntBitmap.from_list(l2)
+            if b1 is None or b2 is None:
+                continue
+            s1 = set(l1)
+            s2 = set(l2)
+            self.check(b1.intersect(b2), s1 & s2)
+            self.check(b1.difference(b2), s1 - s2)
+            self.check(b1.symmetric_difference(b2), s1 ^ s2)
+            union = b1.union(b2)
+            if union is not None:
+                self.check(union, s1 | s2)
+            assert b1.issubset(b2) == (s1 <= s2)
+            assert b1.isdisjoint(b2) == (not (s1 & s2))
+            self.check(b1, s1)
+            self.check(b2, s2)
@@ -0,0 +1,119 @@
+from pypy.interpreter import gateway
+from pypy.objspace.std.test import test_stringobject
+
+
+class AppTestStringObject(test_stringobject.AppTestStringObject):
+    spaceconfig = {"objspace.std.withstrslice": True}
+
+    def setup_class(cls):
+        def not_forced(space, w_s):
+            return space.wrap(w_s.start != 0 or w_s.stop != len(w_s.str))
+        cls.w_not_forced = cls.space.wrap(
+            gateway.interp2app(not_forced))
+
+    def w_isslice(self, s):
+        import __pypy__
+        return 'W_StringSliceObject' in __pypy__.internal_repr(s)
+
+    def test_basic(self):
+        s = "abcdefghij" * 10
+        t = s[5:95]
+        assert type(t) is str
+        assert self.isslice(t)
+        assert t == "fghij" + "abcdefghij" * 8 + "abcde"
+        assert not self.isslice(s[5:10])
+        assert s[:] is s
+
+    def test_slice_of_slice(self):
+        s = "0123456789" * 10
+        t = s[10:90]
+        u = t[10:-10]
+        assert self.isslice(u)
+        assert u == s[20:80]
+        assert u[::3] == s[20:80:3]
+        assert u[5] == s[25]
+        assert u[-1] == s[79]
+        raises(IndexError, "u[60]")
+        assert len(u) == 60
+
+    def test_find(self):
+        s = "x" * 50 + "abcabc" + "y" * 50
+        t = s[45:]
+        assert self.isslice(t)
+        assert t.find("abc") == 5
+        assert t.rfind("abc") == 8
+        assert t.find("abc", 6) == 8
+        assert t.find("zzz") == -1
+        assert t.find("x", 10) == -1
+        assert t.index("y") == 11
+        assert t.rindex("x") == 4
+        raises(ValueError, t.index, "z")
+        assert t.count("abc") == 2
+        assert t.count("y", 0, 20) == 9
+        assert "cab" in t
+        assert "xxxxxxx" not in t
+        assert t.startswith("xxxxxa")
+        assert t.startswith("abc", 5)
+        assert t.endswith("yy")
+        assert t.endswith("abc", 0, 11)
+        assert not t.endswith("x")
+
+    def test_split(self):
+        s = ("a" * 45 + " ") * 3 + "b"
+        l = s.split()
+        assert l == ["a" * 45] * 3 + ["b"]
+        assert self.isslice(l[0])
+        assert not self.isslice(l[3])
+        assert s.split(" ", 1) == ["a" * 45, s[46:]]
+        l = s[46:].split(" ")
+        assert l == ["a" * 45] * 2 + ["b"]
+        assert s[46:].split() == ["a" * 45] * 2 + ["b"]
+        assert s[46:].split(None, 1) == ["a" * 45, s[92:]]
+        raises(ValueError, s[46:].split, "")
+
+    def test_split_short_words(self):
+        import __pypy__
+        s = "the quick brown fox " * 10
+        assert __pypy__.list_strategy(s.split()) == "str"
+        assert __pypy__.list_strategy(s.split(" ")) == "str"
+        assert __pypy__.list_strategy(s[4:].split()) == "str"
+        l = (s + "x" * 50).split()
+        assert __pypy__.list_strategy(l) == "object"
+        assert self.isslice(l[-1])
+
+    def test_partition_and_strip(self):
+        s = "  " + "k" * 50 + "=" + "v" * 50 + "  "
+        key, sep, value = s.strip().partition("=")
+        assert self.isslice(key) and self.isslice(value)
+        assert key == "k" * 50
+        assert sep == "="
+        assert value == "v" * 50
+        assert s.lstrip() == s[2:]
+        assert s.rstrip() == s[:-2]
+        t = s[:60]
+        assert t.partition("#") == (t, "", "")
+        assert t.strip() == s[2:60]
+
+    def test_hash_and_eq(self):
+        s = "0123456789" * 10
+        t = s[10:60]
+        assert t == s[:50]
+        assert s[:50] == t
+        assert not t != s[:50]
+        assert t != s[:49]
+        assert t != s[1:51]
+        assert self.isslice(t)
+        d = {t: 42}
+        assert d[s[:50]] == 42
+        assert hash(t) == hash(s[:50])
+
+    def test_forced(self):
+        s = "0123456789" * 10
+        t = s[10:60]
+        assert self.not_forced(t)
+        assert t.upper() == s[10:60]
+        assert not self.not_forced(t)
+        assert t == s[:50]
+        t = s[10:60]
+        hash(t)
+        assert not self.not_forced(t)
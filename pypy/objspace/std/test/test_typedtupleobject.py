@@ -0,0 +1,149 @@
+import sys
+
+from pypy.objspace.std.listobject import (IntegerListStrategy,
+    FloatListStrategy, StringListStrategy)
+from pypy.objspace.std.test import test_tupleobject
+from pypy.objspace.std.tupleobject import W_TupleObject
+from pypy.objspace.std.typedtupleobject import (W_IntTupleObject,
+    W_FloatTupleObject, W_StrTupleObject)
+
+
+class TestW_TypedTupleObject:
+    spaceconfig = {"objspace.std.withtypedtuple": True}
+
+    def test_istypedtupleobject(self):
+        space = self.space
+        w_tuple = space.newtuple([space.wrap(1), space.wrap(2),
+                                  space.wrap(3)])
+        assert isinstance(w_tuple, W_IntTupleObject)
+        assert w_tuple.values == [1, 2, 3]
+        w_tuple = space.newtuple([space.wrap(1.5), space.wrap(2.0)])
+        assert isinstance(w_tuple, W_FloatTupleObject)
+        w_tuple = space.newtuple([space.wrap('a'), space.wrap('b')])
+        assert isinstance(w_tuple, W_StrTupleObject)
+
+    def test_isnottypedtupleobject(self):
+        space = self.space
+        for values in [[1], [], [1, 2.0], [1, 'a', 3], [1.0, 2, 3],
+                       [True, False], [1.0, float('nan')]]:
+            w_tuple = space.newtuple([space.wrap(value)
+                                      for value in values])
+            assert type(w_tuple) is W_TupleObject
+
+    def test_hash_against_normal_tuple(self):
+        space = self.space
+        def hash_test(values):
+            N_w_tuple = W_TupleObject([space.wrap(value) for value in values])
+            T_w_tuple = space.newtuple([space.wrap(value) for value in values])
+            assert type(T_w_tuple) is not W_TupleObject
+            assert space.is_true(space.eq(N_w_tuple, T_w_tuple))
+            assert space.is_true(space.eq(T_w_tuple, N_w_tuple))
+            assert space.is_true(
+                    space.eq(space.hash(N_w_tuple), space.hash(T_w_tuple)))
+
+        hash_test([1, 2, 3])
+        hash_test([-1, -2, -sys.maxint])
+        hash_test([1.5, 2.8, 1e300, -0.0])
+        hash_test([1.0, 2.0])
+        hash_test(['arbitrary', 'strings', ''])
+
+    def test_listview(self):
+        space = self.space
+        w_tuple = space.newtuple([space.wrap(i) for i in range(5)])
+        assert space.listview_int(w_tuple) == range(5)
+        assert space.listview_float(w_tuple) is None
+        assert space.listview_str(w_tuple) is None
+        w_tuple = space.newtuple([space.wrap('a'), space.wrap('b')])
+        assert space.listview_str(w_tuple) == ['a', 'b']
+        assert space.listview_int(w_tuple) is None
+
+    def test_list_from_typed_tuple(self):
+        space = self.space
+        for values, strategy in [([1, 2, 3], IntegerListStrategy),
+                                 ([1.5, 2.5], FloatListStrategy),
+                                 (['a', 'b'], StringListStrategy)]:
+            w_tuple = space.newtuple([space.wrap(value) for value in values])
+            w_list = space.call_function(space.w_list, w_tuple)
+            assert isinstance(w_list.strategy, strategy)
+            assert space.unwrap(w_list) == values
+            # the tuple's storage is not shared with the list
+            space.call_method(w_list, 'append', space.wrap(values[0]))
+            assert space.len_w(w_tuple) == len(values)
+
+
+class AppTestW_TypedTupleObject:
+    spaceconfig = {"objspace.std.withtypedtuple": True}
+
+    def w_istyped(self, obj, expected=''):
+        import __pypy__
+        r = __pypy__.internal_repr(obj)
+        print obj, '==>', r, '   (expected: %r)' % expected
+        return (expected + "TupleObject") in r and "W_TupleObject" not in r
+
+    def test_createtypedtuple(self):
+        assert self.istyped(tuple(range(100)), 'Int')
+        assert self.istyped((1.5, 2.5, 3.5), 'Float')
+        assert self.istyped(tuple('hello'), 'Str')
+        assert not self.istyped((1, 2.5, 3))
+        assert not self.istyped((1,))
+        assert not self.istyped(([], []))
+
+    def test_slicing(self):
+        t = tuple(range(10))
+        assert t[2:5] == (2, 3, 4)
+        assert self.istyped(t[2:5], 'Int')
+        assert t[::3] == (0, 3, 6, 9)
+        assert t[::-4] == (9, 5, 1)
+        assert t[3:4] == (3,)
+        assert t[5:2] == ()
+        assert t[1:3:-1] == ()
+
+    def test_eq_against_other_tuples(self):
+        a = tuple(range(5))
+        assert a == (0, 1, 2, 3, 4)
+        assert a == (0, 1.0, 2L, 3, 4)
+        assert a == (0.0, 1.0, 2.0, 3.0, 4.0)
+        assert (0, 1.0, 2L, 3, 4) == a
+        assert a != (0, 1, 2, 3)
+        assert a != (0, 1, 2, 3, 5)
+        assert a != (0, 1, 2, 3, 4.5)
+        assert not a == (0, 1, 2, 3, '4')
+        assert ('a', 'b', 'c') == tuple('abc')
+        assert ('a', 'b', 'c') != ('a', 'b', u'd')
+
+    def test_hash(self):
+        a = tuple(range(5))
+        assert hash(a) == hash((0, 1, 2L, 3, 4))
+        assert hash(a) == hash((0.0, 1.0, 2.0, 3.0, 4.0))
+        assert hash(a) != hash((0, 1, 2, 3, 5))
+        assert hash(('a', 'b')) == hash(('a',) + ('b',))
+        assert hash((-1, -2, -3)) == hash((-1L, -2L, -3.0))
+
+    def test_nan(self):
+        nan = float('nan')
+        t = (nan, nan, 1.5)
+        assert t == t
+        assert t.count(nan) == 2
+        assert nan in t
+
+    def test_getitem(self):
+        t = (5, 3, 1)
+        assert t[0] == 5
+        assert t[-1] == 1
+        assert t[-3] == 5
+        raises(IndexError, "t[3]")
+        raises(IndexError, "t[-4]")
+
+    def test_list_and_set(self):
+        t = tuple(range(10))
+        l = list(t)
+        l.append(10)
+        assert l == range(11)
+        assert len(t) == 10
+        assert set(t) == set(range(10))
+        assert sorted((2.5, 1.5, 3.5)) == [1.5, 2.5, 3.5]
+        assert list(('x', 'y', 'z')) == ['x', 'y', 'z']
+
+
+class AppTestAll(test_tupleobject.AppTestW_TupleObject):
+    spaceconfig = {"objspace.std.withtypedtuple": True}
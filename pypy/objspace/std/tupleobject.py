@@ -54,6 +54,17 @@ class W_AbstractTupleObject(W_Root):
     def getitem(self, space, item):
         raise NotImplementedError
 
+    def listview_int(self):
+        """Returns the items as a list of unwrapped ints, if the tuple
+        stores them this way, or None.  Same for floats and strings."""
+        return None
+
+    def listview_float(self):
+        return None
+
+    def listview_str(self):
+        return None
+
     def descr_len(self, space):
         result = self.length()
         return wrapint(space, result)
@@ -71,6 +82,8 @@ class W_AbstractTupleObject(W_Root):
             return w_sequence
         else:
             tuple_w = space.fixedview(w_sequence)
+        if space.is_w(w_tupletype, space.w_tuple):
+            return space.newtuple(tuple_w)
         w_obj = space.allocate_instance(W_TupleObject, w_tupletype)
         W_TupleObject.__init__(w_obj, tuple_w)
         return w_obj
@@ -296,4 +309,9 @@ def wraptuple(space, list_w):
             return makespecialisedtuple(space, list_w)
         except NotSpecialised:
             pass
+    if space.config.objspace.std.withtypedtuple:
+        from typedtupleobject import maketypedtuple
+        w_tuple = maketypedtuple(space, list_w)
+        if w_tuple is not None:
+            return w_tuple
     return W_TupleObject(list_w)
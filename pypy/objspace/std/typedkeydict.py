@@ -0,0 +1,159 @@
+## ----------------------------------------------------------------------------
+## dict strategies for float keys and for small tuples of ints and strings
+## (see dictmultiobject.py)
+
+from collections import OrderedDict
+
+from pypy.objspace.std.dictmultiobject import (AbstractTypedStrategy,
+                                               DictStrategy,
+                                               create_iterator_classes)
+from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+from rpython.rlib import rerased
+from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rfloat import isnan
+from rpython.rlib.unroll import unrolling_iterable
+
+
+# these strategies are selected by EmptyDictStrategy.switch_to_correct_strategy
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    """ Strategy for dicts whose keys are all floats, stored unboxed.  NaNs
+    are never stored: a NaN is only found in a dict by identity. """
+
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.wrap(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        if self.space.config.objspace.std.withordereddict:
+            return self.erase(OrderedDict())
+        return self.erase({})
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return (space.is_w(space.type(w_obj), space.w_float) and
+                not isnan(space.float_w(w_obj)))
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_str) or
+                space.is_w(w_lookup_type, space.w_unicode)
+                )
+
+    def wrapkey(space, key):
+        return space.wrap(key)
+
+create_iterator_classes(FloatDictStrategy)
+
+
+def make_tuple_dict_strategy(itemtypes):
+    """ Makes a strategy for dicts whose keys are all tuples of the length
+    of 'itemtypes', with items of exactly these types (int or str), stored
+    as RPython tuples. """
+    name = "tuple_%s" % ("_".join([t.__name__ for t in itemtypes]),)
+    iteritems = unrolling_iterable(enumerate(itemtypes))
+    length = len(itemtypes)
+
+    def wrapkey(space, key):
+        items_w = [None] * length
+        for i, itemtype in iteritems:
+            items_w[i] = space.wrap(key[i])
+        return space.newtuple(items_w)
+
+    class TupleDictStrategy(AbstractTypedStrategy, DictStrategy):
+        erase, unerase = rerased.new_erasing_pair(name)
+        erase = staticmethod(erase)
+        unerase = staticmethod(unerase)
+
+        def wrap(self, unwrapped):
+            return wrapkey(self.space, unwrapped)
+
+        def unwrap(self, wrapped):
+            space = self.space
+            assert isinstance(wrapped, W_AbstractTupleObject)
+            if length == 2:
+                return (unwrap_item(space, itemtypes[0],
+                                    wrapped.getitem(space, 0)),
+                        unwrap_item(space, itemtypes[1],
+                                    wrapped.getitem(space, 1)))
+            else:
+                return (unwrap_item(space, itemtypes[0],
+                                    wrapped.getitem(space, 0)),
+                        unwrap_item(space, itemtypes[1],
+                                    wrapped.getitem(space, 1)),
+                        unwrap_item(space, itemtypes[2],
+                                    wrapped.getitem(space, 2)))
+
+        def get_empty_storage(self):
+            if self.space.config.objspace.std.withordereddict:
+                return self.erase(OrderedDict())
+            return self.erase({})
+
+        def is_correct_type(self, w_obj):
+            space = self.space
+            if not space.is_w(space.type(w_obj), space.w_tuple):
+                return False
+            assert isinstance(w_obj, W_AbstractTupleObject)
+            if w_obj.length() != length:
+                return False
+            for i, itemtype in iteritems:
+                if not space.is_w(space.type(w_obj.getitem(space, i)),
+                                  type_w(space, itemtype)):
+                    return False
+            return True
+
+        def _never_equal_to(self, w_lookup_type):
+            space = self.space
+            # XXX there are many more types
+            return (space.is_w(w_lookup_type, space.w_NoneType) or
+                    space.is_w(w_lookup_type, space.w_int) or
+                    space.is_w(w_lookup_type, space.w_float) or
+                    space.is_w(w_lookup_type, space.w_str) or
+                    space.is_w(w_lookup_type, space.w_unicode)
+                    )
+
+    TupleDictStrategy.wrapkey = wrapkey
+    TupleDictStrategy.__name__ = "Tuple%sDictStrategy" % (
+        "".join([t.__name__.capitalize() for t in itemtypes]),)
+    TupleDictStrategy.itemtypes = itemtypes
+    create_iterator_classes(TupleDictStrategy)
+    return TupleDictStrategy
+
+@specialize.arg(1)
+def unwrap_item(space, itemtype, w_item):
+    if itemtype is int:
+        return space.int_w(w_item)
+    else:
+        return space.str_w(w_item)
+
+@specialize.arg(1)
+def type_w(space, itemtype):
+    if itemtype is int:
+        return space.w_int
+    else:
+        return space.w_str
+
+TupleIntIntDictStrategy = make_tuple_dict_strategy((int, int))
+TupleIntIntIntDictStrategy = make_tuple_dict_strategy((int, int, int))
+TupleStrStrDictStrategy = make_tuple_dict_strategy((str, str))
+TupleStrIntDictStrategy = make_tuple_dict_strategy((str, int))
+
+tuple_strategies = unrolling_iterable([
+    TupleIntIntDictStrategy, TupleIntIntIntDictStrategy,
+    TupleStrStrDictStrategy, TupleStrIntDictStrategy])
+
+def get_tuple_strategy(space, w_key):
+    """ Returns the tuple strategy for dicts with keys like w_key, or None.
+    """
+    for strategycls in tuple_strategies:
+        strategy = space.fromcache(strategycls)
+        if strategy.is_correct_type(w_key):
+            return strategy
+    return None
@@ -0,0 +1,187 @@
+""" Tuples whose items are all ints, all floats or all strings, of any
+length, stored unboxed in a list of the corresponding RPython type.
+"""
+
+from pypy.interpreter.error import OperationError
+from pypy.objspace.std.tupleobject import (W_AbstractTupleObject,
+    _unroll_condition, _unroll_condition_cmp)
+from pypy.objspace.std.util import negate
+from rpython.rlib import jit
+from rpython.rlib.objectmodel import compute_hash, specialize
+from rpython.rlib.rarithmetic import intmask
+from rpython.rlib.rfloat import isnan
+from rpython.tool.sourcetools import func_with_new_name
+
+
+# tuples shorter than that are not worth it, or handled by
+# specialisedtupleobject.py
+MIN_LENGTH = 2
+
+
+def make_typed_class(itemtype):
+    name = itemtype.__name__.capitalize()
+
+    if itemtype is int:
+        def wrap(space, value):
+            return space.newint(value)
+        def unwrap(space, w_item):
+            return space.int_w(w_item)
+        def hash_item(space, value):
+            return value     # see hash__Int()
+        def accept(value):
+            return True
+    elif itemtype is float:
+        def wrap(space, value):
+            return space.newfloat(value)
+        def unwrap(space, w_item):
+            return space.float_w(w_item)
+        def hash_item(space, value):
+            # the same hash as the one of the float objects, which is
+            # also the one of the ints and longs for integral values
+            from pypy.objspace.std.floatobject import _hash_float
+            return _hash_float(space, value)
+        def accept(value):
+            # a tuple containing NaNs must compare equal to itself, which
+            # relies on the identity of the float objects it contains
+            return not isnan(value)
+    elif itemtype is str:
+        def wrap(space, value):
+            return space.wrap(value)
+        def unwrap(space, w_item):
+            return space.str_w(w_item)
+        def hash_item(space, value):
+            return compute_hash(value)
+        def accept(value):
+            return True
+    else:
+        raise AssertionError
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['space', 'values[*]']
+
+        def __init__(self, space, values):
+            self.space = space
+            self.values = values
+
+        def length(self):
+            return len(self.values)
+
+        @jit.look_inside_iff(lambda self: _unroll_condition(self))
+        def tolist(self):
+            values = self.values
+            list_w = [None] * len(values)
+            for i in range(len(values)):
+                list_w[i] = wrap(self.space, values[i])
+            return list_w
+
+        # same source code, but builds and returns a resizable list
+        getitems_copy = func_with_new_name(tolist, 'getitems_copy')
+
+        @jit.look_inside_iff(lambda self, _1: _unroll_condition(self))
+        def descr_hash(self, space):
+            mult = 1000003
+            x = 0x345678
+            z = len(self.values)
+            for value in self.values:
+                y = hash_item(space, value)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return space.wrap(intmask(x))
+
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            if not isinstance(w_other, cls):
+                return self._descr_eq_generic(space, w_other)
+            return self._descr_eq_same_type(space, w_other)
+
+        @jit.look_inside_iff(_unroll_condition_cmp)
+        def _descr_eq_same_type(self, space, w_other):
+            values1 = self.values
+            values2 = w_other.values
+            if len(values1) != len(values2):
+                return space.w_False
+            for i in range(len(values1)):
+                if values1[i] != values2[i]:
+                    return space.w_False
+            return space.w_True
+
+        @jit.look_inside_iff(_unroll_condition_cmp)
+        def _descr_eq_generic(self, space, w_other):
+            values = self.values
+            if len(values) != w_other.length():
+                return space.w_False
+            items_w = w_other.tolist()
+            for i in range(len(values)):
+                if not space.eq_w(wrap(space, values[i]), items_w[i]):
+                    return space.w_False
+            return space.w_True
+
+        descr_ne = negate(descr_eq)
+
+        def getitem(self, space, index):
+            try:
+                value = self.values[index]
+            except IndexError:
+                raise OperationError(space.w_IndexError,
+                                     space.wrap("tuple index out of range"))
+            return wrap(space, value)
+
+        def _getslice(self, space, w_index):
+            values = self.values
+            start, stop, step, slicelength = w_index.indices4(space,
+                                                              len(values))
+            assert slicelength >= 0
+            if slicelength < MIN_LENGTH:
+                return W_AbstractTupleObject._getslice(self, space, w_index)
+            subvalues = [values[0]] * slicelength
+            for i in range(slicelength):
+                subvalues[i] = values[start]
+                start += step
+            return cls(space, subvalues)
+
+    def listview(self):
+        # a copy, because the list returned by space.listview_*() may be
+        # a resizable one
+        return self.values[:]
+
+    cls.__name__ = 'W_%sTupleObject' % (name,)
+    setattr(cls, 'listview_%s' % (itemtype.__name__,), listview)
+    cls.itemtype = itemtype
+    cls.unwrap_item = staticmethod(unwrap)
+    cls.accept_item = staticmethod(accept)
+    return cls
+
+W_IntTupleObject = make_typed_class(int)
+W_FloatTupleObject = make_typed_class(float)
+W_StrTupleObject = make_typed_class(str)
+
+
+def maketypedtuple(space, list_w):
+    """ Return a typed tuple with the items of 'list_w', if they are all
+    ints, all floats or all strings, or None. """
+    if len(list_w) < MIN_LENGTH:
+        return None
+    w_type = space.type(list_w[0])
+    if w_type is space.w_int:
+        return _maketypedtuple(space, W_IntTupleObject, w_type, list_w)
+    elif w_type is space.w_float:
+        return _maketypedtuple(space, W_FloatTupleObject, w_type, list_w)
+    elif w_type is space.w_str:
+        return _maketypedtuple(space, W_StrTupleObject, w_type, list_w)
+    return None
+
+@specialize.arg(1)
+@jit.look_inside_iff(lambda space, cls, w_type, list_w:
+        jit.loop_unrolling_heuristic(list_w, len(list_w), 10))
+def _maketypedtuple(space, cls, w_type, list_w):
+    for w_item in list_w:
+        if space.type(w_item) is not w_type:
+            return None
+    values = [cls.unwrap_item(space, w_item) for w_item in list_w]
+    for value in values:
+        if not cls.accept_item(value):
+            return None
+    return cls(space, values)
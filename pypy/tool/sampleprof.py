@@ -0,0 +1,191 @@
+#! /usr/bin/env python
+"""
+Decodes a log file written by the _sampleprof module, see
+pypy/module/_sampleprof/interp_sampleprof.py for the format.
+
+Syntax:  sampleprof.py  [--collapsed]  <logfile>
+
+By default, prints the functions that were seen the most in the samples,
+both as the innermost frame ('self') and anywhere in the stack ('total').
+With --collapsed, prints one line per distinct stack, outermost frame
+first, in the format of the flamegraph.pl script:
+
+    func1 (file.py:12);func2 (file.py:30) <count>
+"""
+import sys
+
+MAGIC = "PYPYSAMP"
+TAG_CODE = '\x01'
+TAG_SAMPLE = '\x02'
+TAG_END = '\x03'
+
+
+class BadLogFile(Exception):
+    pass
+
+
+class Code(object):
+    def __init__(self, name, filename, firstlineno):
+        self.name = name
+        self.filename = filename
+        self.firstlineno = firstlineno
+
+    def __repr__(self):
+        return '%s (%s:%d)' % (self.name, self.filename, self.firstlineno)
+
+
+class Profile(object):
+    """The content of a log file: 'samples' is a list of
+    (count, [(code, lineno), ...]) with the innermost frame first."""
+
+    def __init__(self, period, codes, samples, complete):
+        self.period = period
+        self.codes = codes
+        self.samples = samples
+        self.complete = complete
+
+    def total_count(self):
+        return sum([count for count, stack in self.samples])
+
+    def summary(self):
+        """Returns a list of (code, self_count, total_count), sorted by
+        decreasing self_count."""
+        self_counts = {}
+        total_counts = {}
+        for count, stack in self.samples:
+            if stack:
+                code = stack[0][0]
+                self_counts[code] = self_counts.get(code, 0) + count
+            for code in set([code for code, lineno in stack]):
+                total_counts[code] = total_counts.get(code, 0) + count
+        result = [(code, self_counts.get(code, 0), total)
+                  for code, total in total_counts.items()]
+        result.sort(key=lambda (code, self, total): (-self, -total))
+        return result
+
+    def collapsed(self):
+        """Returns a dict {'f1;f2;f3': count}, outermost frame first."""
+        result = {}
+        for count, stack in self.samples:
+            key = ';'.join([repr(code) for code, lineno in reversed(stack)])
+            result[key] = result.get(key, 0) + count
+        return result
+
+
+class Reader(object):
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read_byte(self):
+        if self.pos >= len(self.data):
+            raise EOFError
+        c = self.data[self.pos]
+        self.pos += 1
+        return c
+
+    def read_varint(self):
+        result = 0
+        shift = 0
+        while True:
+            c = ord(self.read_byte())
+            result |= (c & 0x7f) << shift
+            if c < 0x80:
+                return result
+            shift += 7
+
+    def read_string(self):
+        length = self.read_varint()
+        if self.pos + length > len(self.data):
+            raise EOFError
+        s = self.data[self.pos:self.pos + length]
+        self.pos += length
+        return s
+
+
+def parse(data):
+    """Parses the content of a log file.  A truncated file, e.g. of a
+    process that is still running, gives the samples up to the last
+    complete one."""
+    if not data.startswith(MAGIC):
+        raise BadLogFile("not a sampleprof log file")
+    reader = Reader(data)
+    reader.pos = len(MAGIC)
+    codes = {}
+    samples = []
+    period = 0.0
+    complete = False
+    try:
+        version = ord(reader.read_byte())
+        if version != 1:
+            raise BadLogFile("unsupported version %d" % (version,))
+        period = reader.read_varint() / 1000000.0
+        while True:
+            tag = reader.read_byte()
+            if tag == TAG_CODE:
+                code_id = reader.read_varint()
+                name = reader.read_string()
+                filename = reader.read_string()
+                firstlineno = reader.read_varint()
+                codes[code_id] = Code(name, filename, firstlineno)
+            elif tag == TAG_SAMPLE:
+                count = reader.read_varint()
+                depth = reader.read_varint()
+                stack = []
+                for i in range(depth):
+                    code_id = reader.read_varint()
+                    lineno = reader.read_varint()
+                    stack.append((codes[code_id], lineno))
+                samples.append((count, stack))
+            elif tag == TAG_END:
+                complete = True
+                break
+            else:
+                raise BadLogFile("unknown record %r at offset %d" % (
+                    tag, reader.pos - 1))
+    except EOFError:
+        pass
+    return Profile(period, codes.values(), samples, complete)
+
+def read_file(filename):
+    f = open(filename, 'rb')
+    try:
+        return parse(f.read())
+    finally:
+        f.close()
+
+
+def print_summary(profile, out, limit=40):
+    total = profile.total_count() or 1
+    print >> out, '%d samples, every %g seconds%s' % (
+        profile.total_count(), profile.period,
+        ('' if profile.complete else ' (log file incomplete)'))
+    print >> out, '%7s %7s  %s' % ('self%', 'total%', 'function')
+    for code, self_count, total_count in profile.summary()[:limit]:
+        print >> out, '%6.1f%% %6.1f%%  %r' % (100.0 * self_count / total,
+                                              100.0 * total_count / total,
+                                              code)
+
+def print_collapsed(profile, out):
+    items = profile.collapsed().items()
+    items.sort()
+    for key, count in items:
+        print >> out, '%s %d' % (key, count)
+
+def main(argv):
+    collapsed = False
+    if argv and argv[0] == '--collapsed':
+        collapsed = True
+        del argv[0]
+    if len(argv) != 1:
+        print >> sys.stderr, __doc__
+        sys.exit(2)
+    profile = read_file(argv[0])
+    if collapsed:
+        print_collapsed(profile, sys.stdout)
+    else:
+        print_summary(profile, sys.stdout)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
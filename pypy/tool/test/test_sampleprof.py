@@ -0,0 +1,88 @@
+import py
+from cStringIO import StringIO
+from pypy.tool import sampleprof
+
+
+def varint(n):
+    result = ''
+    while n >= 0x80:
+        result += chr((n & 0x7f) | 0x80)
+        n >>= 7
+    return result + chr(n)
+
+def string(s):
+    return varint(len(s)) + s
+
+def code(code_id, name, filename, firstlineno):
+    return '\x01' + varint(code_id) + string(name) + string(filename) + \
+           varint(firstlineno)
+
+def sample(count, *frames):
+    result = '\x02' + varint(count) + varint(len(frames))
+    for code_id, lineno in frames:
+        result += varint(code_id) + varint(lineno)
+    return result
+
+LOG = ('PYPYSAMP\x01' + varint(1000) +
+       code(0, 'main', 'x.py', 1) +
+       code(1, 'f', 'x.py', 10) +
+       sample(1, (1, 12), (0, 3)) +
+       sample(2, (0, 4)) +
+       code(2, 'g', 'y.py', 200) +
+       sample(1, (2, 300), (1, 11), (0, 3)) +
+       sample(1, (1, 12), (0, 3)) +
+       '\x03')
+
+
+def test_parse():
+    profile = sampleprof.parse(LOG)
+    assert profile.complete
+    assert profile.period == 0.001
+    assert profile.total_count() == 5
+    assert len(profile.samples) == 4
+    count, stack = profile.samples[2]
+    assert count == 1
+    assert [(code.name, code.filename, code.firstlineno, lineno)
+            for code, lineno in stack] == [('g', 'y.py', 200, 300),
+                                           ('f', 'x.py', 10, 11),
+                                           ('main', 'x.py', 1, 3)]
+
+def test_truncated():
+    for end in range(len('PYPYSAMP'), len(LOG) - 1):
+        profile = sampleprof.parse(LOG[:end])
+        assert not profile.complete
+        assert len(profile.samples) <= 4
+    profile = sampleprof.parse(LOG[:-1])
+    assert not profile.complete
+    assert profile.total_count() == 5
+
+def test_bad_file():
+    py.test.raises(sampleprof.BadLogFile, sampleprof.parse, 'foo')
+    py.test.raises(sampleprof.BadLogFile, sampleprof.parse,
+                   'PYPYSAMP\x02' + varint(1000))
+    py.test.raises(sampleprof.BadLogFile, sampleprof.parse,
+                   'PYPYSAMP\x01' + varint(1000) + '\x07')
+
+def test_summary():
+    profile = sampleprof.parse(LOG)
+    summary = [(code.name, self_count, total)
+               for code, self_count, total in profile.summary()]
+    assert summary == [('main', 2, 5), ('f', 2, 3), ('g', 1, 1)]
+    out = StringIO()
+    sampleprof.print_summary(profile, out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == '5 samples, every 0.001 seconds'
+    assert lines[2].split() == ['40.0%', '100.0%', 'main', '(x.py:1)']
+    assert lines[3].split() == ['40.0%', '60.0%', 'f', '(x.py:10)']
+
+def test_collapsed():
+    profile = sampleprof.parse(LOG)
+    assert profile.collapsed() == {
+        'main (x.py:1);f (x.py:10)': 2,
+        'main (x.py:1)': 2,
+        'main (x.py:1);f (x.py:10);g (y.py:200)': 1}
+    out = StringIO()
+    sampleprof.print_collapsed(profile, out)
+    assert out.getvalue() == ('main (x.py:1) 2\n'
+                              'main (x.py:1);f (x.py:10) 2\n'
+                              'main (x.py:1);f (x.py:10);g (y.py:200) 1\n')
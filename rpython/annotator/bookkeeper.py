@@ -5,6 +5,7 @@ The Bookkeeper class.
 from __future__ import absolute_import
 
 import sys, types, inspect, weakref
+from collections import OrderedDict
 
 from rpython.flowspace.model import Constant
 from rpython.annotator.model import (
@@ -12,14 +13,15 @@ from rpython.annotator.model import (
     SomeBuiltin, SomePBC, SomeInteger, TLS, SomeAddress, SomeUnicodeCodePoint,
     s_None, s_ImpossibleValue, SomeLLADTMeth, SomeBool, SomeTuple,
     SomeImpossibleValue, SomeUnicodeString, SomeList, HarmlesslyBlocked,
-    SomeWeakRef, lltype_to_annotation, SomeType, SomeByteArray)
+    SomeWeakRef, lltype_to_annotation, SomeType, SomeByteArray,
+    SomeOrderedDict)
 from rpython.annotator.classdef import InstanceSource, ClassDef
 from rpython.annotator.listdef import ListDef, ListItem
 from rpython.annotator.dictdef import DictDef
 from rpython.annotator import description
 from rpython.annotator.signature import annotationoftype
 from rpython.annotator.argument import ArgumentsForTranslation, RPythonCallsSpace
-from rpython.rlib.objectmodel import r_dict, Symbolic
+from rpython.rlib.objectmodel import r_dict, r_ordereddict, Symbolic
 from rpython.tool.algo.unionfind import UnionFind
 from rpython.rtyper.lltypesystem import lltype, llmemory
 from rpython.rtyper import extregistry
@@ -370,18 +372,24 @@ class Bookkeeper(object):
                 for e in x:
                     listdef.generalize(self.immutablevalue(e, False))
                 result = SomeList(listdef)
-        elif tp is dict or tp is r_dict:
+        elif (tp is dict or tp is r_dict or
+              tp is OrderedDict or tp is r_ordereddict):
+            if tp is OrderedDict or tp is r_ordereddict:
+                cls = SomeOrderedDict
+            else:
+                cls = SomeDict
+            is_r_dict = issubclass(tp, r_dict)
             if need_const:
                 key = Constant(x)
                 try:
                     return self.immutable_cache[key]
                 except KeyError:
-                    result = SomeDict(DictDef(self,
-                                              s_ImpossibleValue,
-                                              s_ImpossibleValue,
-                                              is_r_dict = tp is r_dict))
+                    result = cls(DictDef(self,
+                                         s_ImpossibleValue,
+                                         s_ImpossibleValue,
+                                         is_r_dict = is_r_dict))
                     self.immutable_cache[key] = result
-                    if tp is r_dict:
+                    if is_r_dict:
                         s_eqfn = self.immutablevalue(x.key_eq)
                         s_hashfn = self.immutablevalue(x.key_hash)
                         result.dictdef.dictkey.update_rdict_annotations(s_eqfn,
@@ -402,8 +410,8 @@ class Bookkeeper(object):
                 dictdef = DictDef(self,
                 s_ImpossibleValue,
                 s_ImpossibleValue,
-                is_r_dict = tp is r_dict)
-                if tp is r_dict:
+                is_r_dict = is_r_dict)
+                if is_r_dict:
                     s_eqfn = self.immutablevalue(x.key_eq)
                     s_hashfn = self.immutablevalue(x.key_hash)
                     dictdef.dictkey.update_rdict_annotations(s_eqfn,
@@ -412,7 +420,7 @@ class Bookkeeper(object):
                     dictdef.generalize_key(self.immutablevalue(ek, False))
                     dictdef.generalize_value(self.immutablevalue(ev, False))
                     dictdef.seen_prebuilt_key(ek)
-                result = SomeDict(dictdef)
+                result = cls(dictdef)
         elif tp is weakref.ReferenceType:
             x1 = x()
             if x1 is None:
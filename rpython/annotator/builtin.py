@@ -2,12 +2,13 @@
 Built-in functions.
 """
 import sys
+import collections
 
 from rpython.annotator.model import (
     SomeInteger, SomeObject, SomeChar, SomeBool, SomeString, SomeTuple, s_Bool,
     SomeUnicodeCodePoint, SomeAddress, SomeFloat, unionof, SomeUnicodeString,
     SomePBC, SomeInstance, SomeDict, SomeList, SomeWeakRef, SomeIterator,
-    SomeByteArray, annotation_to_lltype, lltype_to_annotation,
+    SomeOrderedDict, SomeByteArray, annotation_to_lltype, lltype_to_annotation,
     ll_to_annotation, add_knowntypedata, s_ImpossibleValue,)
 from rpython.annotator.bookkeeper import getbookkeeper
 from rpython.annotator import description
@@ -298,6 +299,13 @@ def robjmodel_r_dict(s_eqfn, s_hashfn, s_force_non_null=None):
     dictdef.dictkey.update_rdict_annotations(s_eqfn, s_hashfn)
     return SomeDict(dictdef)
 
+def robjmodel_r_ordereddict(s_eqfn, s_hashfn, s_force_non_null=None):
+    s_dict = robjmodel_r_dict(s_eqfn, s_hashfn, s_force_non_null)
+    return SomeOrderedDict(s_dict.dictdef)
+
+def collections_OrderedDict():
+    return SomeOrderedDict(getbookkeeper().getdictdef())
+
 
 def robjmodel_hlinvoke(s_repr, s_llcallable, *args_s):
     from rpython.rtyper import rmodel
@@ -357,6 +365,8 @@ BUILTIN_ANALYZERS[rpython.rlib.rarithmetic.intmask] = rarith_intmask
 BUILTIN_ANALYZERS[rpython.rlib.rarithmetic.longlongmask] = rarith_longlongmask
 BUILTIN_ANALYZERS[rpython.rlib.objectmodel.instantiate] = robjmodel_instantiate
 BUILTIN_ANALYZERS[rpython.rlib.objectmodel.r_dict] = robjmodel_r_dict
+BUILTIN_ANALYZERS[rpython.rlib.objectmodel.r_ordereddict] = robjmodel_r_ordereddict
+BUILTIN_ANALYZERS[collections.OrderedDict] = collections_OrderedDict
 BUILTIN_ANALYZERS[rpython.rlib.objectmodel.hlinvoke] = robjmodel_hlinvoke
 BUILTIN_ANALYZERS[rpython.rlib.objectmodel.keepalive_until_here] = robjmodel_keepalive_until_here
 BUILTIN_ANALYZERS[rpython.rtyper.lltypesystem.llmemory.cast_ptr_to_adr] = llmemory_cast_ptr_to_adr
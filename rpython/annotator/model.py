@@ -31,6 +31,7 @@ from __future__ import absolute_import
 
 import inspect
 import weakref
+from collections import OrderedDict
 from types import BuiltinFunctionType, MethodType
 
 import rpython
@@ -356,6 +357,11 @@ class SomeDict(SomeObject):
             return '{...%s...}' % (len(const),)
 
 
+class SomeOrderedDict(SomeDict):
+    "Stands for a dict that remembers the insertion order of its keys."
+    knowntype = OrderedDict
+
+
 class SomeIterator(SomeObject):
     "Stands for an iterator returning objects from a given container."
     knowntype = type(iter([]))  # arbitrarily chose seqiter as the type
@@ -388,7 +388,7 @@ class __extend__(SomeDict):
     method_setdefault = method_get
 
     def method_copy(dct):
-        return SomeDict(dct.dictdef)
+        return dct.__class__(dct.dictdef)
 
     def method_update(dct1, dct2):
         if s_None.contains(dct2):
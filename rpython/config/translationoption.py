@@ -115,7 +115,7 @@ translation_optiondescription = OptionDescription(
                  ["auto", "x86", "x86-without-sse2", 'arm'],
                  default="auto", cmdline="--jit-backend"),
     ChoiceOption("jit_profiler", "integrate profiler support into the JIT",
-                 ["off", "oprofile"],
+                 ["off", "oprofile", "perf"],
                  default="off"),
     BoolOption("check_str_without_nul",
                "Forbid NUL chars in strings in some external function calls",
@@ -62,7 +62,7 @@ class AbstractARMCPU(AbstractLLCPU):
                                                     looptoken, log=log)
 
     def compile_bridge(self, faildescr, inputargs, operations,
-                                       original_loop_token, log=True):
+                                       original_loop_token, log=True, name=''):
         clt = original_loop_token.compiled_loop_token
         clt.compiling_a_bridge()
         return self.assembler.assemble_bridge(faildescr, inputargs, operations,
@@ -188,7 +188,7 @@ class LLGraphCPU(model.AbstractCPU):
         self._record_labels(lltrace)
 
     def compile_bridge(self, faildescr, inputargs, operations,
-                       original_loop_token, log=True):
+                       original_loop_token, log=True, name=''):
         clt = original_loop_token.compiled_loop_token
         clt.compiling_a_bridge()
         lltrace = LLTrace(inputargs, operations)
@@ -7,6 +7,7 @@ class CPUTotalTracker(object):
     total_compiled_bridges = 0
     total_freed_loops = 0
     total_freed_bridges = 0    
+    loop_memory = 0     # machine code and resume data of the loops not freed
 
     # for heaptracker
     # _all_size_descrs_with_vtable = None
@@ -21,6 +22,7 @@ class AbstractCPU(object):
     supports_singlefloats = False
 
     propagate_exception_descr = None
+    profile_agent = None    # set by the backends that support profilers
 
     def __init__(self):
         self.tracker = CPUTotalTracker()
@@ -68,9 +70,10 @@ class AbstractCPU(object):
         raise NotImplementedError
 
     def compile_bridge(self, faildescr, inputargs, operations,
-                       original_loop_token, log=True):
+                       original_loop_token, log=True, name=''):
         """Assemble the bridge.
         The FailDescr is the descr of the original guard that failed.
+        The name is the location where the bridge starts, if known.
 
         Optionally, return a ``ops_offset`` dictionary.  See the docstring of
         ``compiled_loop`` for more information about it.
@@ -302,6 +305,7 @@ class AbstractCPU(object):
 class CompiledLoopToken(object):
     asmmemmgr_blocks = None
     asmmemmgr_gcroots = 0
+    memory_size = 0
 
     def __init__(self, cpu, number):
         cpu.tracker.total_compiled_loops += 1
@@ -323,6 +327,19 @@ class CompiledLoopToken(object):
         debug_print("allocating Bridge #", self.bridges_count, "of Loop #", self.number)
         debug_stop("jit-mem-looptoken-alloc")
 
+    def get_code_size(self):
+        """The size of the machine code and data blocks allocated so far
+        for the loop and its bridges."""
+        size = 0
+        if self.asmmemmgr_blocks is not None:
+            for rawstart, rawstop in self.asmmemmgr_blocks:
+                size += rawstop - rawstart
+        return size
+
+    def record_memory_size(self, size):
+        self.memory_size += size
+        self.cpu.tracker.loop_memory += size
+
     def update_frame_info(self, oldlooptoken, baseofs):
         new_fi = self.frame_info
         new_loop_tokens = []
@@ -345,4 +362,5 @@ class CompiledLoopToken(object):
         self.cpu.free_loop_and_bridges(self)
         self.cpu.tracker.total_freed_loops += 1
         self.cpu.tracker.total_freed_bridges += self.bridges_count
+        self.cpu.tracker.loop_memory -= self.memory_size
         #debug_stop("jit-mem-looptoken-free")
@@ -502,7 +502,7 @@ class Assembler386(BaseAssembler):
                        size_excluding_failure_stuff - looppos)
 
     def assemble_bridge(self, faildescr, inputargs, operations,
-                        original_loop_token, log):
+                        original_loop_token, log, name=''):
         if not we_are_translated():
             # Arguments should be unique
             assert len(set(inputargs)) == len(inputargs)
@@ -541,7 +541,10 @@ class Assembler386(BaseAssembler):
         self.teardown()
         # oprofile support
         if self.cpu.profile_agent is not None:
-            name = "Bridge # %s" % (descr_number,)
+            if name:
+                name = "Bridge # %s: %s" % (descr_number, name)
+            else:
+                name = "Bridge # %s" % (descr_number,)
             self.cpu.profile_agent.native_code_written(name,
                                                        rawstart, fullsize)
         return AsmInfo(ops_offset, startpos + rawstart, codeendpos - startpos)
@@ -0,0 +1,54 @@
+import os
+from rpython.rlib.rarithmetic import r_uint
+from rpython.jit.backend.x86 import profagent
+
+# Linux 'perf' looks for the symbols of the code that is not in any ELF
+# file in /tmp/perf-<pid>.map, one line per function:
+#
+#     <start address in hex> <size in hex> <name>
+#
+# The names of the loops and bridges are the locations given by the
+# jitdriver, which for PyPy contain the name, file and line of the Python
+# code object.  The file is only ever appended to: perf does not support
+# removing an entry, so the memory of a freed loop may later appear under
+# the name of the next loop compiled at the same address.
+
+class PerfMapAgent(profagent.ProfileAgent):
+
+    def __init__(self, directory='/tmp'):
+        self.directory = directory
+        self.fd = -1
+        self.pid = 0
+
+    def _open(self):
+        self.pid = os.getpid()
+        filename = '%s/perf-%d.map' % (self.directory, self.pid)
+        try:
+            self.fd = os.open(filename,
+                              os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0666)
+        except OSError:
+            self.fd = -1     # no profiling then, but don't crash
+
+    def startup(self):
+        self._open()
+
+    def shutdown(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+    def native_code_written(self, name, address, size):
+        assert size > 0
+        if os.getpid() != self.pid:
+            # we are in a child process: the file of the parent is open,
+            # but perf looks for the one named after our pid
+            self.shutdown()
+            self._open()
+        if self.fd < 0:
+            return
+        line = '%x %x %s\n' % (r_uint(address), r_uint(size),
+                               name.replace('\n', ' '))
+        try:
+            os.write(self.fd, line)
+        except OSError:
+            pass
@@ -3,7 +3,6 @@ from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
 from rpython.rlib.jit_hooks import LOOP_RUN_CONTAINER
 from rpython.jit.backend.x86.assembler import Assembler386
 from rpython.jit.backend.x86.regalloc import gpr_reg_mgr_cls, xmm_reg_mgr_cls
-from rpython.jit.backend.x86.profagent import ProfileAgent
 from rpython.jit.backend.llsupport.llmodel import AbstractLLCPU
 from rpython.jit.backend.x86 import regloc
 
@@ -33,7 +32,7 @@ class AbstractX86CPU(AbstractLLCPU):
         AbstractLLCPU.__init__(self, rtyper, stats, opts,
                                translate_support_code, gcdescr)
 
-        profile_agent = ProfileAgent()
+        profile_agent = None
         if rtyper is not None:
             config = rtyper.annotator.translator.config
             if config.translation.jit_profiler == "oprofile":
@@ -41,6 +40,9 @@ class AbstractX86CPU(AbstractLLCPU):
                 if not oprofile.OPROFILE_AVAILABLE:
                     log.WARNING('oprofile support was explicitly enabled, but oprofile headers seem not to be available')
                 profile_agent = oprofile.OProfileAgent()
+            elif config.translation.jit_profiler == "perf":
+                from rpython.jit.backend.x86 import perfmap
+                profile_agent = perfmap.PerfMapAgent()
             self.with_threads = config.translation.thread
 
         self.profile_agent = profile_agent
@@ -64,12 +66,14 @@ class AbstractX86CPU(AbstractLLCPU):
         return RegAlloc(self.assembler, False)
 
     def setup_once(self):
-        self.profile_agent.startup()
+        if self.profile_agent is not None:
+            self.profile_agent.startup()
         self.assembler.setup_once()
 
     def finish_once(self):
         self.assembler.finish_once()
-        self.profile_agent.shutdown()
+        if self.profile_agent is not None:
+            self.profile_agent.shutdown()
 
     def dump_loop_token(self, looptoken):
         """
@@ -93,11 +97,12 @@ class AbstractX86CPU(AbstractLLCPU):
                                             looptoken, log=log)
 
     def compile_bridge(self, faildescr, inputargs, operations,
-                       original_loop_token, log=True):
+                       original_loop_token, log=True, name=''):
         clt = original_loop_token.compiled_loop_token
         clt.compiling_a_bridge()
         return self.assembler.assemble_bridge(faildescr, inputargs, operations,
-                                              original_loop_token, log=log)
+                                              original_loop_token, log=log,
+                                              name=name)
 
     def clear_latest_values(self, count):
         setitem = self.assembler.fail_boxes_ptr.setitem
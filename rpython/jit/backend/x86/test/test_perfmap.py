@@ -0,0 +1,91 @@
+import os
+from rpython.jit.backend.x86 import perfmap
+from rpython.jit.backend.x86.perfmap import PerfMapAgent
+from rpython.jit.backend.detect_cpu import getcpuclass
+from rpython.jit.backend.x86.test.test_runner import FakeStats
+from rpython.jit.metainterp.history import (BasicFailDescr, JitCellToken,
+                                            BasicFinalDescr, TargetToken)
+from rpython.jit.tool.oparser import parse
+
+CPU = getcpuclass()
+
+
+def read_map(tmpdir, pid):
+    f = tmpdir.join('perf-%d.map' % pid)
+    return [line.split(' ', 2) for line in f.read().splitlines()]
+
+def test_native_code_written(tmpdir):
+    agent = PerfMapAgent(str(tmpdir))
+    agent.startup()
+    agent.native_code_written("Loop # 1: <code object f. file 'x.py'. line 3>",
+                              0x7f0012345000, 0x120)
+    agent.native_code_written("Bridge # 42: two\nlines", 0x7f0012345200, 16)
+    agent.shutdown()
+    assert read_map(tmpdir, os.getpid()) == [
+        ['7f0012345000', '120', "Loop # 1: <code object f. file 'x.py'. line 3>"],
+        ['7f0012345200', '10', "Bridge # 42: two lines"]]
+
+def test_appends(tmpdir):
+    for address in [0x1000, 0x2000]:
+        agent = PerfMapAgent(str(tmpdir))
+        agent.startup()
+        agent.native_code_written("foo", address, 8)
+        agent.shutdown()
+    assert read_map(tmpdir, os.getpid()) == [['1000', '8', 'foo'],
+                                             ['2000', '8', 'foo']]
+
+def test_forked(tmpdir, monkeypatch):
+    agent = PerfMapAgent(str(tmpdir))
+    agent.startup()
+    agent.native_code_written("parent", 0x1000, 8)
+    monkeypatch.setattr(perfmap.os, 'getpid', lambda: 123456789)
+    agent.native_code_written("child", 0x2000, 8)
+    agent.shutdown()
+    monkeypatch.undo()
+    assert read_map(tmpdir, os.getpid()) == [['1000', '8', 'parent']]
+    assert read_map(tmpdir, 123456789) == [['2000', '8', 'child']]
+
+def test_cannot_open(tmpdir):
+    agent = PerfMapAgent(str(tmpdir.join('does_not_exist')))
+    agent.startup()
+    agent.native_code_written("foo", 0x1000, 8)
+    agent.shutdown()
+
+def test_loop_and_bridge_names(tmpdir):
+    cpu = CPU(rtyper=None, stats=FakeStats())
+    cpu.setup_once()
+    cpu.profile_agent = agent = PerfMapAgent(str(tmpdir))
+    agent.startup()
+    loop = parse("""
+    [i0]
+    label(i0, descr=targettoken)
+    i1 = int_add(i0, 1)
+    i2 = int_le(i1, 9)
+    guard_true(i2, descr=faildescr1) [i1]
+    jump(i1, descr=targettoken)
+    """, namespace={'targettoken': TargetToken(),
+                    'faildescr1': BasicFailDescr(1)})
+    looptoken = JitCellToken()
+    looptoken.number = 17
+    cpu.compile_loop(loop.inputargs, loop.operations, looptoken, log=False,
+                     name="<code object f. file 'x.py'. line 3>")
+    bridge = parse("""
+    [i1]
+    i3 = int_le(i1, 19)
+    guard_true(i3, descr=faildescr2) [i1]
+    finish(i1, descr=faildescr3)
+    """, namespace={'faildescr2': BasicFailDescr(2),
+                    'faildescr3': BasicFinalDescr(3)})
+    faildescr1 = loop.operations[3].getdescr()
+    cpu.compile_bridge(faildescr1, bridge.inputargs, bridge.operations,
+                       looptoken, log=False,
+                       name="<code object g. file 'y.py'. line 7>")
+    agent.shutdown()
+    entries = read_map(tmpdir, os.getpid())
+    assert len(entries) == 2
+    assert entries[0][2] == "Loop # 17: <code object f. file 'x.py'. line 3>"
+    assert entries[1][2].startswith("Bridge # ")
+    assert entries[1][2].endswith(": <code object g. file 'y.py'. line 7>")
+    loopaddress = int(entries[0][0], 16)
+    assert loopaddress == looptoken._ll_function_addr
+    assert int(entries[1][0], 16) >= loopaddress + int(entries[0][1], 16)
@@ -14,6 +14,7 @@ from rpython.rtyper.annlowlevel import MixLevelHelperAnnotator
 from rpython.rtyper.extregistry import ExtRegistryEntry
 from rpython.rtyper.llinterp import LLInterpreter
 from rpython.rtyper.lltypesystem import lltype, rclass, rffi, llmemory, rstr as ll_rstr, rdict as ll_rdict
+from rpython.rtyper.lltypesystem import rordereddict as ll_rordereddict
 from rpython.rtyper.lltypesystem.lloperation import llop
 from rpython.rtyper.lltypesystem.module import ll_math
 from rpython.translator.translator import TranslationContext
@@ -524,6 +525,20 @@ class LLtypeHelpers:
 
     _ll_1_dict_resize = ll_rdict.ll_dict_resize
 
+    # ---------- ordered dict ----------
+
+    _ll_1_odict_copy = ll_rordereddict.ll_copy
+    _ll_1_odict_clear = ll_rordereddict.ll_clear
+    _ll_2_odict_update = ll_rordereddict.ll_update
+    _ll_1_odict_resize = ll_rordereddict.ll_dict_resize
+
+    _ll_1_odict_keys   = ll_rordereddict.ll_dict_keys
+    _ll_1_odict_values = ll_rordereddict.ll_dict_values
+    _ll_1_odict_items  = ll_rordereddict.ll_dict_items
+    _ll_1_odict_keys  .need_result_type = True
+    _ll_1_odict_values.need_result_type = True
+    _ll_1_odict_items .need_result_type = True
+
     # ---------- strings and unicode ----------
 
     _ll_1_str_str2unicode = ll_rstr.LLHelpers.ll_str2unicode
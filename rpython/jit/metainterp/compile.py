@@ -15,6 +15,7 @@ from rpython.jit.metainterp import history, jitexc
 from rpython.jit.metainterp.optimize import InvalidLoop
 from rpython.jit.metainterp.inliner import Inliner
 from rpython.jit.metainterp.resume import NUMBERING, PENDINGFIELDSP, ResumeDataDirectReader
+from rpython.jit.metainterp import resume
 from rpython.jit.codewriter import heaptracker, longlong
 
 
@@ -306,11 +307,46 @@ def do_compile_loop(metainterp_sd, inputargs, operations, looptoken,
                                           log=log, name=name)
 
 def do_compile_bridge(metainterp_sd, faildescr, inputargs, operations,
-                      original_loop_token, log=True):
+                      original_loop_token, log=True, name=''):
     metainterp_sd.logger_ops.log_bridge(inputargs, operations, "compiling")
     assert isinstance(faildescr, AbstractFailDescr)
     return metainterp_sd.cpu.compile_bridge(faildescr, inputargs, operations,
-                                            original_loop_token, log=log)
+                                            original_loop_token, log=log,
+                                            name=name)
+
+def get_bridge_name(metainterp_sd, operations):
+    """ The location of the first debug_merge_point of the bridge, which is
+    the closest thing to the loopname of a loop. """
+    for op in operations:
+        if op.getopnum() == rop.DEBUG_MERGE_POINT:
+            jd_sd = metainterp_sd.jitdrivers_sd[op.getarg(0).getint()]
+            return jd_sd.warmstate.get_location_str(op.getarglist()[3:])
+    return ''
+
+def get_code_size(jitcell_token):
+    clt = jitcell_token.compiled_loop_token
+    if clt is None:     # for tests
+        return 0
+    return clt.get_code_size()
+
+def record_memory_size(metainterp_sd, jitcell_token, operations,
+                       old_code_size):
+    """Record the machine code and resume data of the loop or bridge
+    that was just compiled, for the statistics and for the memory budget
+    of the memory manager."""
+    clt = jitcell_token.compiled_loop_token
+    if clt is None:     # for tests
+        return
+    size = clt.get_code_size() - old_code_size
+    for op in operations:
+        descr = op.getdescr()
+        if isinstance(descr, ResumeGuardDescr):
+            size += resume.estimate_size(descr)
+    clt.record_memory_size(size)
+    if metainterp_sd.warmrunnerdesc is not None:    # for tests
+        memmgr = metainterp_sd.warmrunnerdesc.memory_manager
+        evicted = memmgr.record_memory_size(jitcell_token, size)
+        metainterp_sd.profiler.count(Counters.EVICTED_LOOPS, evicted)
 
 def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type):
     vinfo = jitdriver_sd.virtualizable_info
@@ -364,6 +400,7 @@ def send_loop_to_backend(greenkey, jitdriver_sd, metainterp_sd, loop, type):
     #
     if metainterp_sd.warmrunnerdesc is not None:    # for tests
         metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(original_jitcell_token)
+    record_memory_size(metainterp_sd, original_jitcell_token, operations, 0)
 
 def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
                            operations, original_loop_token):
@@ -381,12 +418,16 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
         hooks = None
         debug_info = None
     operations = get_deep_immutable_oplist(operations)
+    old_code_size = get_code_size(original_loop_token)
+    name = ''
+    if metainterp_sd.cpu.profile_agent is not None:
+        name = get_bridge_name(metainterp_sd, operations)
     metainterp_sd.profiler.start_backend()
     debug_start("jit-backend")
     try:
         asminfo = do_compile_bridge(metainterp_sd, faildescr, inputargs,
                                     operations,
-                                    original_loop_token)
+                                    original_loop_token, name=name)
     finally:
         debug_stop("jit-backend")
     metainterp_sd.profiler.end_backend()
@@ -403,6 +444,8 @@ def send_bridge_to_backend(jitdriver_sd, metainterp_sd, faildescr, inputargs,
         ops_offset = None
     metainterp_sd.logger_ops.log_bridge(inputargs, operations, None, faildescr,
                                         ops_offset)
+    record_memory_size(metainterp_sd, original_loop_token, operations,
+                       old_code_size)
     #
     #if metainterp_sd.warmrunnerdesc is not None:    # for tests
     #    metainterp_sd.warmrunnerdesc.memory_manager.keep_loop_alive(
@@ -531,12 +574,21 @@ class ResumeGuardDescr(ResumeDescr):
             self._counter = cnt | i
 
     def handle_fail(self, deadframe, metainterp_sd, jitdriver_sd):
-        if self.must_compile(deadframe, metainterp_sd, jitdriver_sd):
+        memmgr = None
+        if metainterp_sd.warmrunnerdesc is not None:    # for tests
+            memmgr = metainterp_sd.warmrunnerdesc.memory_manager
+        if (self.must_compile(deadframe, metainterp_sd, jitdriver_sd) and
+                (memmgr is None or memmgr.may_start_compiling())):
             self.start_compiling()
+            starttime = 0.0
+            if memmgr is not None:
+                starttime = memmgr.start_compiling()
             try:
                 self._trace_and_compile_from_bridge(deadframe, metainterp_sd,
                                                     jitdriver_sd)
             finally:
+                if memmgr is not None:
+                    memmgr.done_compiling(starttime)
                 self.done_compiling()
         else:
             from rpython.jit.metainterp.blackhole import resume_in_blackhole
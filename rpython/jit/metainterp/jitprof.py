@@ -11,7 +11,7 @@ from rpython.rlib.jit import Counters
 
 JITPROF_LINES = Counters.ncounters + 1 + 1
 # one for TOTAL, 1 for calls, update if needed
-_CPU_LINES = 4       # the last 4 lines are stored on the cpu
+_CPU_LINES = 5       # the last 5 lines are stored on the cpu
 
 class BaseProfiler(object):
     pass
@@ -107,6 +107,8 @@ class Profiler(BaseProfiler):
             return self.cpu.tracker.total_freed_loops
         elif num == Counters.TOTAL_FREED_BRIDGES:
             return self.cpu.tracker.total_freed_bridges
+        elif num == Counters.LOOP_MEMORY:
+            return self.cpu.tracker.loop_memory
         return self.counters[num]
 
     def count_ops(self, opnum, kind=Counters.OPS):
@@ -148,6 +150,7 @@ class Profiler(BaseProfiler):
         self._print_intline("nvirtuals", cnt[Counters.NVIRTUALS])
         self._print_intline("nvholes", cnt[Counters.NVHOLES])
         self._print_intline("nvreused", cnt[Counters.NVREUSED])
+        self._print_intline("evicted loops", cnt[Counters.EVICTED_LOOPS])
         cpu = self.cpu
         if cpu is not None:   # for some tests
             self._print_intline("Total # of loops",
@@ -158,6 +161,7 @@ class Profiler(BaseProfiler):
                                 cpu.tracker.total_freed_loops)
             self._print_intline("Freed # of bridges",
                                 cpu.tracker.total_freed_bridges)
+            self._print_intline("Loop memory", cpu.tracker.loop_memory)
 
     def _print_line_time(self, string, i, tim):
         final = "%s:%s\t%d\t%f" % (string, " " * max(0, 13-len(string)), i, tim)
@@ -1,7 +1,9 @@
 import math
+import time
 from rpython.rlib.rarithmetic import r_int64
 from rpython.rlib.debug import debug_start, debug_print, debug_stop
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rlib.listsort import make_timsort_class
 
 #
 # Logic to decide which loops are old and not used any more.
@@ -20,7 +22,31 @@ from rpython.rlib.objectmodel import we_are_translated
 # removed from the set.
 #
 
+#
+# The MemoryManager can also keep the loops within a memory budget.  The
+# machine code and resume data of each loop and its bridges is counted
+# in 'looptoken.memory_size', and 'memory_used' is the total for the
+# loops in 'alive_loops'.  When it goes over 'memory_budget', the least
+# recently entered loops are removed from 'alive_loops' until it is below
+# three quarters of the budget.  Recency is given by the generation in
+# which the loop was last entered, and within the same generation by
+# 'looptoken.entry_count', the number of times it was entered during that
+# generation.  Note that a loop which is still referenced by another one
+# (see record_jump_to() in history.py) is not freed, but it is no longer
+# counted in 'memory_used' until it is entered again.
+#
+
+#
+# The MemoryManager also implements the 'compile_ratio' parameter, to
+# spread the tracing and compilation work over time during warm-up: if
+# it is N percent, a tracing and compilation that took D seconds is
+# followed by D * (100 - N) / N seconds during which no new loop or bridge
+# is traced.  The hot loops and guards keep counting during that time and
+# are traced as soon as it is over.
+#
+
 class MemoryManager(object):
+    timer = time.time
 
     def __init__(self):
         self.check_frequency = -1
@@ -38,6 +64,10 @@ class MemoryManager(object):
         self.current_generation = r_int64(1)
         self.next_check = r_int64(-1)
         self.alive_loops = {}
+        self.compile_ratio = 0
+        self.no_compiling_until = 0.0
+        self.memory_budget = 0
+        self.memory_used = 0
 
     def set_max_age(self, max_age, check_frequency=0):
         if max_age <= 0:
@@ -49,16 +79,57 @@ class MemoryManager(object):
             self.check_frequency = check_frequency
             self.next_check = self.current_generation + 1
 
+    def set_memory_budget(self, memory_budget):
+        self.memory_budget = memory_budget
+
     def next_generation(self):
         self.current_generation += 1
         if self.current_generation == self.next_check:
             self._kill_old_loops_now()
             self.next_check = self.current_generation + self.check_frequency
 
+    def may_start_compiling(self):
+        return (self.compile_ratio <= 0 or
+                self.timer() >= self.no_compiling_until)
+
+    def start_compiling(self):
+        if self.compile_ratio <= 0:
+            return 0.0
+        return self.timer()
+
+    def done_compiling(self, starttime):
+        ratio = self.compile_ratio
+        if ratio <= 0:
+            return
+        if ratio > 100:
+            ratio = 100
+        now = self.timer()
+        self.no_compiling_until = now + (now - starttime) * (100 - ratio) / ratio
+
     def keep_loop_alive(self, looptoken):
         if looptoken.generation != self.current_generation:
             looptoken.generation = self.current_generation
-            self.alive_loops[looptoken] = None
+            looptoken.entry_count = 0
+            if looptoken not in self.alive_loops:
+                self.alive_loops[looptoken] = None
+                self.memory_used += looptoken.memory_size
+        looptoken.entry_count += 1
+
+    def record_memory_size(self, looptoken, size):
+        """Record that 'size' more bytes of machine code and resume data
+        belong to 'looptoken', and free the least recently entered loops
+        if we are now over the memory budget.  Returns the number of
+        loops removed."""
+        looptoken.memory_size += size
+        if looptoken in self.alive_loops:
+            self.memory_used += size
+        if 0 < self.memory_budget < self.memory_used:
+            return self._evict_loops_now()
+        return 0
+
+    def _forget_loop(self, looptoken):
+        del self.alive_loops[looptoken]
+        self.memory_used -= looptoken.memory_size
 
     def _kill_old_loops_now(self):
         debug_start("jit-mem-collect")
@@ -70,14 +141,53 @@ class MemoryManager(object):
         for looptoken in self.alive_loops.keys():
             if (0 <= looptoken.generation < max_generation or
                 looptoken.invalidated):
-                del self.alive_loops[looptoken]
+                self._forget_loop(looptoken)
         newtotal = len(self.alive_loops)
         debug_print("Loop tokens freed: ", oldtotal - newtotal)
         debug_print("Loop tokens left:  ", newtotal)
         #print self.alive_loops.keys()
         if not we_are_translated() and oldtotal != newtotal:
             looptoken = None
-            from rpython.rlib import rgc
-            # a single one is not enough for all tests :-(
-            rgc.collect(); rgc.collect(); rgc.collect()
+            _collect_for_tests()
         debug_stop("jit-mem-collect")
+
+    def _evict_loops_now(self):
+        debug_start("jit-mem-evict")
+        oldtotal = len(self.alive_loops)
+        debug_print("Current generation:", self.current_generation)
+        debug_print("Memory used before:", self.memory_used)
+        target = self.memory_budget - self.memory_budget // 4
+        # never evict the loops entered or compiled in this generation
+        candidates = []
+        for looptoken in self.alive_loops.keys():
+            if looptoken.invalidated:
+                self._forget_loop(looptoken)
+            elif 0 <= looptoken.generation < self.current_generation:
+                candidates.append(looptoken)
+        LeastRecentlyEnteredSort(candidates).sort()
+        i = 0
+        while self.memory_used > target and i < len(candidates):
+            self._forget_loop(candidates[i])
+            i += 1
+        newtotal = len(self.alive_loops)
+        debug_print("Loop tokens evicted:", oldtotal - newtotal)
+        debug_print("Memory used after: ", self.memory_used)
+        if not we_are_translated() and oldtotal != newtotal:
+            looptoken = None
+            candidates = None
+            _collect_for_tests()
+        debug_stop("jit-mem-evict")
+        return oldtotal - newtotal
+
+
+def _collect_for_tests():
+    from rpython.rlib import rgc
+    # a single one is not enough for all tests :-(
+    rgc.collect(); rgc.collect(); rgc.collect()
+
+def _entered_before(looptoken1, looptoken2):
+    if looptoken1.generation != looptoken2.generation:
+        return looptoken1.generation < looptoken2.generation
+    return looptoken1.entry_count < looptoken2.entry_count
+
+LeastRecentlyEnteredSort = make_timsort_class(lt=_entered_before)
@@ -56,6 +56,8 @@ class MIFrame(object):
         # for resume.py operation
         self.parent_resumedata_snapshot = None
         self.parent_resumedata_frame_info_list = None
+        self.last_resumedata_snapshot = None
+        self.last_resumedata_frame_info_list = None
         # counter for unrolling inlined loops
         self.unroll_iterations = 1
 
@@ -49,39 +49,114 @@ def _ensure_parent_resumedata(framestack, n):
                                          back.parent_resumedata_snapshot,
                                          back.get_list_of_active_boxes(True))
 
+def _same_boxes(boxes1, boxes2):
+    if len(boxes1) != len(boxes2):
+        return False
+    for i in range(len(boxes1)):
+        if boxes1[i] is not boxes2[i]:
+            return False
+    return True
+
 def capture_resumedata(framestack, virtualizable_boxes, virtualref_boxes,
                        storage):
     n = len(framestack)-1
     top = framestack[n]
     _ensure_parent_resumedata(framestack, n)
-    frame_info_list = FrameInfo(top.parent_resumedata_frame_info_list,
-                                top.jitcode, top.pc)
+    # Consecutive guards in the same frame often have the same resume
+    # data.  In this case, share the FrameInfo and the Snapshots of the
+    # previous guard: ResumeDataLoopMemo.number() then gives them the
+    # same numbering too.
+    frame_info_list = top.last_resumedata_frame_info_list
+    if frame_info_list is None or frame_info_list.pc != top.pc:
+        frame_info_list = FrameInfo(top.parent_resumedata_frame_info_list,
+                                    top.jitcode, top.pc)
+        top.last_resumedata_frame_info_list = frame_info_list
     storage.rd_frame_info_list = frame_info_list
-    snapshot = Snapshot(top.parent_resumedata_snapshot,
-                        top.get_list_of_active_boxes(False))
+    last = top.last_resumedata_snapshot
+    boxes = top.get_list_of_active_boxes(False)
+    if last is not None and _same_boxes(last.prev.boxes, boxes):
+        snapshot = last.prev
+    else:
+        snapshot = Snapshot(top.parent_resumedata_snapshot, boxes)
     if virtualizable_boxes is not None:
         boxes = virtualref_boxes + virtualizable_boxes
     else:
         boxes = virtualref_boxes[:]
-    snapshot = Snapshot(snapshot, boxes)
+    if (last is not None and last.prev is snapshot and
+            _same_boxes(last.boxes, boxes)):
+        snapshot = last
+    else:
+        snapshot = Snapshot(snapshot, boxes)
+        top.last_resumedata_snapshot = snapshot
     storage.rd_snapshot = snapshot
 
 #
 # The following is equivalent to the RPython-level declaration:
 #
-#     class Numbering: __slots__ = ['prev', 'nums']
+#     class Numbering: __slots__ = ['prev', 'code']
 #
 # except that it is more compact in translated programs, because the
-# array 'nums' is inlined in the single NUMBERING object.  This is
+# array 'code' is inlined in the single NUMBERING object.  This is
 # important because this is often the biggest single consumer of memory
-# in a pypy-c-jit.
+# in a pypy-c-jit.  For the same reason, the tagged numbers (see tag()
+# below) are not stored as an array of shorts but byte-packed in 'code':
+# each one is zigzag-encoded (0, -1, 1, -2... become 0, 1, 2, 3...) and
+# written as an unsigned varint, 7 bits per byte with the high bit set
+# on all bytes but the last.  Most of them are small and take one byte
+# instead of two.  Use create_numbering() and numbering_items(), or
+# decode them one by one with decode_next_tagged().
 #
 NUMBERINGP = lltype.Ptr(lltype.GcForwardReference())
 NUMBERING = lltype.GcStruct('Numbering',
                             ('prev', NUMBERINGP),
-                            ('nums', lltype.Array(rffi.SHORT)))
+                            ('code', lltype.Array(lltype.Char)))
 NUMBERINGP.TO.become(NUMBERING)
 
+def create_numbering(items, prev):
+    code = []
+    for tagged in items:
+        value = rarithmetic.widen(tagged)
+        if value >= 0:
+            value = value << 1
+        else:
+            value = ((-value) << 1) - 1
+        while value >= 0x80:
+            code.append(chr((value & 0x7f) | 0x80))
+            value >>= 7
+        code.append(chr(value))
+    numb = lltype.malloc(NUMBERING, len(code))
+    numb.prev = prev
+    for i in range(len(code)):
+        numb.code[i] = code[i]
+    return numb
+
+def decode_next_tagged(numb, index):
+    """Decodes the tagged number that starts at 'index' in numb.code.
+    Returns it together with the index of the next one."""
+    value = 0
+    shift = 0
+    while True:
+        byte = ord(numb.code[index])
+        index += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    if value & 1:
+        value = -((value + 1) >> 1)
+    else:
+        value = value >> 1
+    return rffi.r_short(value), index
+
+def numbering_items(numb):
+    """Returns the list of the tagged numbers in 'numb'."""
+    result = []
+    index = 0
+    while index < len(numb.code):
+        tagged, index = decode_next_tagged(numb, index)
+        result.append(tagged)
+    return result
+
 PENDINGFIELDSTRUCT = lltype.Struct('PendingField',
                                    ('lldescr', OBJECTPTR),
                                    ('num', rffi.SHORT),
@@ -191,7 +266,7 @@ class ResumeDataLoopMemo(object):
         n = len(liveboxes) - v
         boxes = snapshot.boxes
         length = len(boxes)
-        numb = lltype.malloc(NUMBERING, length)
+        nums = [UNASSIGNED] * length
         for i in range(length):
             box = boxes[i]
             value = optimizer.getvalue(box)
@@ -209,9 +284,9 @@ class ResumeDataLoopMemo(object):
                     tagged = tag(n, TAGBOX)
                     n += 1
                 liveboxes[box] = tagged
-            numb.nums[i] = tagged
+            nums[i] = tagged
         #
-        numb.prev = numb1
+        numb = create_numbering(nums, numb1)
         self.numberings[snapshot] = numb, liveboxes, v
         return numb, liveboxes.copy(), v
 
@@ -751,6 +826,7 @@ class AbstractResumeDataReader(object):
     def _init(self, cpu, storage):
         self.cpu = cpu
         self.cur_numb = storage.rd_numb
+        self.cur_index = 0
         self.count = storage.rd_count
         self.consts = storage.rd_consts
 
@@ -832,22 +908,30 @@ class AbstractResumeDataReader(object):
     def _prepare_next_section(self, info):
         # Use info.enumerate_vars(), normally dispatching to
         # rpython.jit.codewriter.jitcode.  Some tests give a different 'info'.
+        # The callbacks are called with consecutive indexes, so they can
+        # decode the tagged numbers of 'cur_numb' one after the other.
+        self.cur_index = 0
         info.enumerate_vars(self._callback_i,
                             self._callback_r,
                             self._callback_f,
                             self.unique_id)    # <-- annotation hack
         self.cur_numb = self.cur_numb.prev
 
+    def _next_tagged(self):
+        tagged, self.cur_index = decode_next_tagged(self.cur_numb,
+                                                    self.cur_index)
+        return tagged
+
     def _callback_i(self, index, register_index):
-        value = self.decode_int(self.cur_numb.nums[index])
+        value = self.decode_int(self._next_tagged())
         self.write_an_int(register_index, value)
 
     def _callback_r(self, index, register_index):
-        value = self.decode_ref(self.cur_numb.nums[index])
+        value = self.decode_ref(self._next_tagged())
         self.write_a_ref(register_index, value)
 
     def _callback_f(self, index, register_index):
-        value = self.decode_float(self.cur_numb.nums[index])
+        value = self.decode_float(self._next_tagged())
         self.write_a_float(register_index, value)
 
 # ---------- when resuming for pyjitpl.py, make boxes ----------
@@ -888,36 +972,36 @@ class ResumeDataBoxReader(AbstractResumeDataReader):
         self.boxes_f = boxes_f
         self._prepare_next_section(info)
 
-    def consume_virtualizable_boxes(self, vinfo, numb):
+    def consume_virtualizable_boxes(self, vinfo, nums):
         # we have to ignore the initial part of 'nums' (containing vrefs),
         # find the virtualizable from nums[-1], and use it to know how many
         # boxes of which type we have to return.  This does not write
         # anything into the virtualizable.
-        index = len(numb.nums) - 1
-        virtualizablebox = self.decode_ref(numb.nums[index])
+        index = len(nums) - 1
+        virtualizablebox = self.decode_ref(nums[index])
         virtualizable = vinfo.unwrap_virtualizable_box(virtualizablebox)
-        return vinfo.load_list_of_boxes(virtualizable, self, numb)
+        return vinfo.load_list_of_boxes(virtualizable, self, nums)
 
-    def consume_virtualref_boxes(self, numb, end):
+    def consume_virtualref_boxes(self, nums, end):
         # Returns a list of boxes, assumed to be all BoxPtrs.
         # We leave up to the caller to call vrefinfo.continue_tracing().
         assert (end & 1) == 0
-        return [self.decode_ref(numb.nums[i]) for i in range(end)]
+        return [self.decode_ref(nums[i]) for i in range(end)]
 
     def consume_vref_and_vable_boxes(self, vinfo, ginfo):
-        numb = self.cur_numb
-        self.cur_numb = numb.prev
+        nums = numbering_items(self.cur_numb)
+        self.cur_numb = self.cur_numb.prev
         if vinfo is not None:
-            virtualizable_boxes = self.consume_virtualizable_boxes(vinfo, numb)
-            end = len(numb.nums) - len(virtualizable_boxes)
+            virtualizable_boxes = self.consume_virtualizable_boxes(vinfo, nums)
+            end = len(nums) - len(virtualizable_boxes)
         elif ginfo is not None:
-            index = len(numb.nums) - 1
-            virtualizable_boxes = [self.decode_ref(numb.nums[index])]
-            end = len(numb.nums) - 1
+            index = len(nums) - 1
+            virtualizable_boxes = [self.decode_ref(nums[index])]
+            end = len(nums) - 1
         else:
             virtualizable_boxes = None
-            end = len(numb.nums)
-        virtualref_boxes = self.consume_virtualref_boxes(numb, end)
+            end = len(nums)
+        virtualref_boxes = self.consume_virtualref_boxes(nums, end)
         return virtualizable_boxes, virtualref_boxes
 
     def allocate_with_vtable(self, known_class):
@@ -1193,7 +1277,7 @@ class ResumeDataDirectReader(AbstractResumeDataReader):
         info = blackholeinterp.get_current_position_info()
         self._prepare_next_section(info)
 
-    def consume_virtualref_info(self, vrefinfo, numb, end):
+    def consume_virtualref_info(self, vrefinfo, nums, end):
         # we have to decode a list of references containing pairs
         # [..., virtual, vref, ...]  stopping at 'end'
         if vrefinfo is None:
@@ -1201,19 +1285,19 @@ class ResumeDataDirectReader(AbstractResumeDataReader):
             return
         assert (end & 1) == 0
         for i in range(0, end, 2):
-            virtual = self.decode_ref(numb.nums[i])
-            vref = self.decode_ref(numb.nums[i + 1])
+            virtual = self.decode_ref(nums[i])
+            vref = self.decode_ref(nums[i + 1])
             # For each pair, we store the virtual inside the vref.
             vrefinfo.continue_tracing(vref, virtual)
 
-    def consume_vable_info(self, vinfo, numb):
+    def consume_vable_info(self, vinfo, nums):
         # we have to ignore the initial part of 'nums' (containing vrefs),
         # find the virtualizable from nums[-1], load all other values
         # from the CPU stack, and copy them into the virtualizable
         if vinfo is None:
-            return len(numb.nums)
-        index = len(numb.nums) - 1
-        virtualizable = self.decode_ref(numb.nums[index])
+            return len(nums)
+        index = len(nums) - 1
+        virtualizable = self.decode_ref(nums[index])
         if self.resume_after_guard_not_forced == 1:
             # in the middle of handle_async_forcing()
             assert vinfo.is_token_nonnull_gcref(virtualizable)
@@ -1224,7 +1308,7 @@ class ResumeDataDirectReader(AbstractResumeDataReader):
             # is and stays NULL.  Note the call to reset_vable_token() in
             # warmstate.py.
             assert not vinfo.is_token_nonnull_gcref(virtualizable)
-        return vinfo.write_from_resume_data_partial(virtualizable, self, numb)
+        return vinfo.write_from_resume_data_partial(virtualizable, self, nums)
 
     def load_value_of_type(self, TYPE, tagged):
         from rpython.jit.metainterp.warmstate import specialize_value
@@ -1244,10 +1328,11 @@ class ResumeDataDirectReader(AbstractResumeDataReader):
         numb = self.cur_numb
         self.cur_numb = numb.prev
         if self.resume_after_guard_not_forced != 2:
-            end_vref = self.consume_vable_info(vinfo, numb)
+            nums = numbering_items(numb)
+            end_vref = self.consume_vable_info(vinfo, nums)
             if ginfo is not None:
                 end_vref -= 1
-            self.consume_virtualref_info(vrefinfo, numb, end_vref)
+            self.consume_virtualref_info(vrefinfo, nums, end_vref)
 
     def allocate_with_vtable(self, known_class):
         from rpython.jit.metainterp.executor import exec_new_with_vtable
@@ -1410,6 +1495,23 @@ class ResumeDataDirectReader(AbstractResumeDataReader):
 
 # ____________________________________________________________
 
+_WORD = rarithmetic.LONG_BIT // 8
+
+def estimate_size(storage):
+    """An estimate of the memory used by the resume data of 'storage',
+    in bytes.  The previous numberings, the virtual infos and the
+    constants are usually shared with the other guards of the same loop,
+    so they are not counted."""
+    size = 8 * _WORD          # the descr itself
+    numb = storage.rd_numb
+    if numb:
+        size += 3 * _WORD + len(numb.code)
+    if storage.rd_virtuals is not None:
+        size += (2 + len(storage.rd_virtuals)) * _WORD
+    if storage.rd_pendingfields:
+        size += (2 + 2 * len(storage.rd_pendingfields)) * _WORD
+    return size
+
 def dump_storage(storage, liveboxes):
     "For profiling only."
     debug_start("jit-resume")
@@ -1427,8 +1529,8 @@ def dump_storage(storage, liveboxes):
             frameinfo = frameinfo.prev
         numb = storage.rd_numb
         while numb:
-            debug_print('\tnumb', str([untag(numb.nums[i])
-                                       for i in range(len(numb.nums))]),
+            debug_print('\tnumb', str([untag(tagged)
+                                       for tagged in numbering_items(numb)]),
                         'at', compute_unique_id(numb))
             numb = numb.prev
         for const in storage.rd_consts:
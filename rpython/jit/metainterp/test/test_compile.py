@@ -1,3 +1,4 @@
+import py
 from rpython.config.translationoption import get_combined_translation_config
 from rpython.jit.metainterp.history import ConstInt, History, Stats
 from rpython.jit.metainterp.history import INT
@@ -147,6 +148,21 @@ def test_resume_guard_counters():
     assert count == 1
     assert rgc.counters == [1, 1, 7, 6, 1]
 
+def test_handle_fail_without_warmrunnerdesc():
+    class Traced(Exception):
+        pass
+    class MyResumeGuardDescr(compile.ResumeGuardDescr):
+        def must_compile(self, deadframe, metainterp_sd, jitdriver_sd):
+            return True
+        def _trace_and_compile_from_bridge(self, deadframe, metainterp_sd,
+                                           jitdriver_sd):
+            assert self._counter & self.CNT_BUSY_FLAG
+            raise Traced
+    descr = MyResumeGuardDescr()
+    staticdata = FakeMetaInterpStaticData()
+    py.test.raises(Traced, descr.handle_fail, None, staticdata, None)
+    assert descr._counter == 0
+
 
 def test_compile_tmp_callback():
     from rpython.jit.codewriter import heaptracker
@@ -202,3 +218,21 @@ def test_compile_tmp_callback():
         assert lltype.cast_opaque_ptr(lltype.Ptr(EXC), e.value) == llexc
     else:
         assert 0, "should have raised"
+
+def test_get_bridge_name():
+    class FakeLocationState(object):
+        def get_location_str(self, args):
+            return 'location %s' % ([arg.getint() for arg in args],)
+    class FakeJitDriverSD:
+        warmstate = FakeLocationState()
+    staticdata = FakeMetaInterpStaticData()
+    staticdata.jitdrivers_sd = [None, FakeJitDriverSD()]
+    ops = parse('''
+    [i0]
+    i1 = int_add(i0, 1)
+    debug_merge_point(1, 0, 0, 5, 6)
+    debug_merge_point(1, 1, 0, 7, 8)
+    finish(i1)
+    ''').operations
+    assert compile.get_bridge_name(staticdata, ops) == 'location [5, 6]'
+    assert compile.get_bridge_name(staticdata, ops[:1]) == ''
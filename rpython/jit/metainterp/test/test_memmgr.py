@@ -20,6 +20,8 @@ from rpython.rlib import rgc
 
 class FakeLoopToken:
     generation = 0
+    entry_count = 0
+    memory_size = 0
     invalidated = False
 
 
@@ -79,6 +81,85 @@ class _TestMemoryManager:
                 assert tokens[i] in memmgr.alive_loops
 
 
+    def test_compile_ratio(self):
+        memmgr = MemoryManager()
+        now = [100.0]
+        memmgr.timer = lambda: now[0]
+        assert memmgr.may_start_compiling()
+        starttime = memmgr.start_compiling()
+        now[0] += 2.0
+        memmgr.done_compiling(starttime)
+        assert memmgr.may_start_compiling()     # no limit by default
+        #
+        memmgr.compile_ratio = 20
+        starttime = memmgr.start_compiling()
+        now[0] += 2.0
+        memmgr.done_compiling(starttime)
+        assert not memmgr.may_start_compiling()
+        now[0] += 7.9
+        assert not memmgr.may_start_compiling()
+        now[0] += 0.2
+        assert memmgr.may_start_compiling()
+
+    def test_memory_used(self):
+        memmgr = MemoryManager()
+        memmgr.set_max_age(3, 1)
+        tokens = [FakeLoopToken() for i in range(3)]
+        for token in tokens:
+            memmgr.keep_loop_alive(token)
+            assert memmgr.record_memory_size(token, 100) == 0
+        memmgr.record_memory_size(tokens[0], 50)       # a bridge
+        assert memmgr.memory_used == 350
+        memmgr.next_generation()
+        memmgr.keep_loop_alive(tokens[1])
+        memmgr.next_generation()
+        memmgr.next_generation()
+        assert memmgr.alive_loops == {tokens[1]: None}
+        assert memmgr.memory_used == 100
+        # a loop that was kept alive elsewhere is counted again
+        memmgr.keep_loop_alive(tokens[0])
+        assert memmgr.memory_used == 250
+
+    def test_memory_budget(self):
+        memmgr = MemoryManager()
+        memmgr.set_memory_budget(1000)
+        tokens = [FakeLoopToken() for i in range(6)]
+        for token in tokens[:4]:
+            memmgr.keep_loop_alive(token)
+            assert memmgr.record_memory_size(token, 200) == 0
+            memmgr.next_generation()
+        # tokens[0] is entered often, tokens[1] once, in the same generation
+        for i in range(10):
+            memmgr.keep_loop_alive(tokens[0])
+        memmgr.keep_loop_alive(tokens[1])
+        memmgr.next_generation()
+        memmgr.keep_loop_alive(tokens[4])
+        assert memmgr.record_memory_size(tokens[4], 200) == 0
+        assert memmgr.memory_used == 1000
+        memmgr.keep_loop_alive(tokens[5])
+        # over the budget: free down to 750, least recently entered first
+        assert memmgr.record_memory_size(tokens[5], 200) == 3
+        assert memmgr.alive_loops == dict.fromkeys([tokens[0], tokens[4],
+                                                    tokens[5]])
+        assert memmgr.memory_used == 600
+
+    def test_memory_budget_current_generation(self):
+        memmgr = MemoryManager()
+        memmgr.set_memory_budget(1000)
+        token1 = FakeLoopToken()
+        memmgr.keep_loop_alive(token1)
+        memmgr.record_memory_size(token1, 600)
+        token2 = FakeLoopToken()
+        memmgr.keep_loop_alive(token2)
+        # both were entered in the current generation: none is freed
+        assert memmgr.record_memory_size(token2, 600) == 0
+        assert memmgr.memory_used == 1200
+        memmgr.next_generation()
+        memmgr.keep_loop_alive(token2)
+        assert memmgr.record_memory_size(token2, 10) == 1
+        assert memmgr.alive_loops == {token2: None}
+
+
 class _TestIntegration(LLJitMixin):
     # See comments in TestMemoryManager.  To get temporarily the normal
     # behavior just rename this class to TestIntegration.
@@ -224,6 +305,32 @@ class _TestIntegration(LLJitMixin):
         # Loop with number 0, h(), has not been freed
         assert 0 in [t.number for t in tokens if t]
 
+    def test_loop_memory_budget(self):
+        myjitdriver = JitDriver(greens=['m'], reds=['n'])
+        def g(m):
+            n = 10
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, m=m)
+                myjitdriver.jit_merge_point(n=n, m=m)
+                n = n - 1
+            return 21
+        def f():
+            for i in range(10):
+                for m in range(8):
+                    g(m)
+            return 42
+
+        # no budget: a loop and an entry bridge for each of g(0) to g(7)
+        res = self.meta_interp(f, [])
+        assert res == 42
+        self.check_enter_count(8 * 2)
+
+        # a budget of 1KB is too small for the resume data of 8 loops:
+        # the least recently entered loops are thrown away and traced again
+        res = self.meta_interp(f, [], loop_memory_budget=1)
+        assert res == 42
+        assert get_stats().enter_count > 8 * 2 * 2
+
 # ____________________________________________________________
 
 def test_all():
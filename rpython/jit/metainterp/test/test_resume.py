@@ -162,11 +162,7 @@ def _next_section(reader, *expected):
 
 
 def Numbering(prev, nums):
-    numb = lltype.malloc(NUMBERING, len(nums))
-    numb.prev = prev or lltype.nullptr(NUMBERING)
-    for i in range(len(nums)):
-        numb.nums[i] = nums[i]
-    return numb
+    return create_numbering(nums, prev or lltype.nullptr(NUMBERING))
 
 def test_simple_read():
     #b1, b2, b3 = [BoxInt(), BoxPtr(), BoxInt()]
@@ -387,6 +383,8 @@ def test_vunisliceinfo():
 class FakeFrame(object):
     parent_resumedata_snapshot = None
     parent_resumedata_frame_info_list = None
+    last_resumedata_snapshot = None
+    last_resumedata_frame_info_list = None
 
     def __init__(self, code, pc, *boxes):
         self.jitcode = code
@@ -434,12 +432,26 @@ def test_Numbering_create():
     l = [rffi.r_short(1), rffi.r_short(2)]
     numb = Numbering(None, l)
     assert not numb.prev
-    assert list(numb.nums) == l
+    assert numbering_items(numb) == l
 
     l1 = [rffi.r_short(3)]
     numb1 = Numbering(numb, l1)
     assert numb1.prev == numb
-    assert list(numb1.nums) == l1
+    assert numbering_items(numb1) == l1
+
+def test_Numbering_encoding():
+    l = [tag(0, TAGBOX), tag(15, TAGBOX), tag(-16, TAGINT), tag(16, TAGBOX),
+         tag(-17, TAGINT), NULLREF, UNINITIALIZED, UNASSIGNED,
+         tag((1 << 13) - 1, TAGVIRTUAL), tag(-1 << 13, TAGINT)]
+    numb = Numbering(None, l)
+    assert numbering_items(numb) == l
+    # the small ones take one byte, the others two or three
+    assert len(numb.code) == 5 * 1 + 2 * 2 + 3 * 3
+    assert len(Numbering(None, []).code) == 0
+    tagged, index = decode_next_tagged(numb, 0)
+    assert tagged == l[0] and index == 1
+    tagged, index = decode_next_tagged(numb, 3)
+    assert tagged == l[3] and index == 5
 
 def test_capture_resumedata():
     b1, b2, b3 = [BoxInt(), BoxPtr(), BoxInt()]
@@ -507,6 +519,46 @@ def test_capture_resumedata():
     assert snapshot.prev is fs[2].parent_resumedata_snapshot
     assert snapshot.boxes == fs[2]._env
 
+def test_capture_resumedata_shared_with_previous_guard():
+    b1, b2, b3 = [BoxInt(), BoxPtr(), BoxInt()]
+    c1 = ConstInt(1)
+    fs = [FakeFrame("code0", 0, b1, c1, b2),
+          FakeFrame("code1", 3, b3, b1)]
+    storage1 = Storage()
+    capture_resumedata(fs, None, [], storage1)
+    storage2 = Storage()
+    capture_resumedata(fs, None, [], storage2)
+    assert storage2.rd_frame_info_list is storage1.rd_frame_info_list
+    assert storage2.rd_snapshot is storage1.rd_snapshot
+    # same boxes, another pc
+    fs[1].pc = 5
+    storage3 = Storage()
+    capture_resumedata(fs, None, [], storage3)
+    assert storage3.rd_frame_info_list is not storage1.rd_frame_info_list
+    assert storage3.rd_frame_info_list.pc == 5
+    assert storage3.rd_snapshot is storage1.rd_snapshot
+    # other virtualrefs
+    storage4 = Storage()
+    capture_resumedata(fs, None, [b2, b2], storage4)
+    assert storage4.rd_frame_info_list is storage3.rd_frame_info_list
+    assert storage4.rd_snapshot is not storage1.rd_snapshot
+    assert storage4.rd_snapshot.prev is storage1.rd_snapshot.prev
+    # other boxes in the frame, equal but not identical
+    fs[1]._env = [b3, BoxInt()]
+    storage5 = Storage()
+    capture_resumedata(fs, None, [b2, b2], storage5)
+    assert storage5.rd_snapshot.prev is not storage4.rd_snapshot.prev
+    assert storage5.rd_snapshot.prev.boxes == fs[1]._env
+    assert storage5.rd_snapshot.prev.prev is fs[1].parent_resumedata_snapshot
+    # the shared snapshots get the same numbering
+    memo = ResumeDataLoopMemo(FakeMetaInterpStaticData())
+    modifier = ResumeDataVirtualAdder(storage1, memo)
+    liveboxes1 = modifier.finish(FakeOptimizer({}))
+    modifier = ResumeDataVirtualAdder(storage2, memo)
+    liveboxes2 = modifier.finish(FakeOptimizer({}))
+    assert storage2.rd_numb == storage1.rd_numb
+    assert liveboxes2 == liveboxes1
+
 class FakeMetaInterpStaticData:
     cpu = LLtypeMixin.cpu
 
@@ -805,9 +857,9 @@ def test_ResumeDataLoopMemo_number():
 
     assert liveboxes == {b1: tag(0, TAGBOX), b2: tag(1, TAGBOX),
                          b3: tag(2, TAGBOX)}
-    assert list(numb.nums) == [tag(3, TAGINT), tag(2, TAGBOX), tag(0, TAGBOX),
+    assert numbering_items(numb) == [tag(3, TAGINT), tag(2, TAGBOX), tag(0, TAGBOX),
                                tag(1, TAGINT)]
-    assert list(numb.prev.nums) == [tag(0, TAGBOX), tag(1, TAGINT),
+    assert numbering_items(numb.prev) == [tag(0, TAGBOX), tag(1, TAGINT),
                                     tag(1, TAGBOX),
                                     tag(0, TAGBOX), tag(2, TAGINT)]
     assert not numb.prev.prev
@@ -818,7 +870,7 @@ def test_ResumeDataLoopMemo_number():
     assert liveboxes2 == {b1: tag(0, TAGBOX), b2: tag(1, TAGBOX),
                          b3: tag(2, TAGBOX)}
     assert liveboxes2 is not liveboxes
-    assert list(numb2.nums) == [tag(3, TAGINT), tag(2, TAGBOX), tag(0, TAGBOX),
+    assert numbering_items(numb2) == [tag(3, TAGINT), tag(2, TAGBOX), tag(0, TAGBOX),
                                 tag(3, TAGINT)]
     assert numb2.prev == numb.prev
 
@@ -842,7 +894,7 @@ def test_ResumeDataLoopMemo_number():
     assert v == 0
     
     assert liveboxes3 == {b1: tag(0, TAGBOX), b2: tag(1, TAGBOX)}
-    assert list(numb3.nums) == [tag(3, TAGINT), tag(4, TAGINT), tag(0, TAGBOX),
+    assert numbering_items(numb3) == [tag(3, TAGINT), tag(4, TAGINT), tag(0, TAGBOX),
                                 tag(3, TAGINT)]
     assert numb3.prev == numb.prev
 
@@ -856,7 +908,7 @@ def test_ResumeDataLoopMemo_number():
     
     assert liveboxes4 == {b1: tag(0, TAGBOX), b2: tag(1, TAGBOX),
                           b4: tag(0, TAGVIRTUAL)}
-    assert list(numb4.nums) == [tag(3, TAGINT), tag(0, TAGVIRTUAL),
+    assert numbering_items(numb4) == [tag(3, TAGINT), tag(0, TAGVIRTUAL),
                                 tag(0, TAGBOX), tag(3, TAGINT)]
     assert numb4.prev == numb.prev
 
@@ -870,7 +922,7 @@ def test_ResumeDataLoopMemo_number():
     
     assert liveboxes5 == {b1: tag(0, TAGBOX), b2: tag(1, TAGBOX),
                           b4: tag(0, TAGVIRTUAL), b5: tag(1, TAGVIRTUAL)}
-    assert list(numb5.nums) == [tag(0, TAGBOX), tag(0, TAGVIRTUAL),
+    assert numbering_items(numb5) == [tag(0, TAGBOX), tag(0, TAGVIRTUAL),
                                                 tag(1, TAGVIRTUAL)]
     assert numb5.prev == numb4
 
@@ -1009,7 +1061,8 @@ class ResumeDataFakeReader(ResumeDataBoxReader):
         class MyInfo:
             @staticmethod
             def enumerate_vars(callback_i, callback_r, callback_f, _):
-                for index, tagged in enumerate(self.cur_numb.nums):
+                for index, tagged in enumerate(
+                        numbering_items(self.cur_numb)):
                     _, tag = untag(tagged)
                     if tag == TAGVIRTUAL:
                         kind = REF
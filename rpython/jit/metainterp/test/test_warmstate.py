@@ -140,6 +140,24 @@ def test_make_jitcell_getter_custom():
     assert get_jitcell(False, 42, 0.25) is cell4
     assert cell1 is not cell3 is not cell4 is not cell1
 
+def test_make_jitcell_getter_is_hot_at():
+    def is_hot_at(x, y):
+        return x == 5
+    IS_HOT_AT = lltype.Ptr(lltype.FuncType([lltype.Signed, lltype.Float],
+                                           lltype.Bool))
+    class FakeWarmRunnerDesc:
+        rtyper = None
+        cpu = None
+        memory_manager = None
+    class FakeJitDriverSD:
+        _green_args_spec = [lltype.Signed, lltype.Float]
+        _get_jitcell_at_ptr = None
+        _is_hot_at_ptr = llhelper(IS_HOT_AT, is_hot_at)
+    state = WarmEnterState(FakeWarmRunnerDesc(), FakeJitDriverSD())
+    get_jitcell = state.make_jitcell_getter()
+    assert get_jitcell(True, 5, 42.5).counter == state.THRESHOLD_LIMIT
+    assert get_jitcell(True, 6, 42.5).counter == 0
+
 def test_make_unwrap_greenkey():
     class FakeJitDriverSD:
         _green_args_spec = [lltype.Signed, lltype.Float]
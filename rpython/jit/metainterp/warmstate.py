@@ -229,6 +229,17 @@ class WarmEnterState(object):
             if self.warmrunnerdesc.memory_manager:
                 self.warmrunnerdesc.memory_manager.max_unroll_loops = value
 
+    def set_param_compile_ratio(self, value):
+        if self.warmrunnerdesc:
+            if self.warmrunnerdesc.memory_manager:
+                self.warmrunnerdesc.memory_manager.compile_ratio = value
+
+    def set_param_loop_memory_budget(self, value):
+        if self.warmrunnerdesc:
+            if self.warmrunnerdesc.memory_manager:
+                self.warmrunnerdesc.memory_manager.set_memory_budget(
+                    value * 1024)
+
     def disable_noninlinable_function(self, greenkey):
         cell = self.jit_cell_at_key(greenkey)
         cell.dont_trace_here = True
@@ -312,12 +323,17 @@ class WarmEnterState(object):
             # where we suddenly compile more than one loop because all
             # counters reach the bound at the same time, but where
             # compiling all but the first one is pointless.
-            curgen = warmrunnerdesc.memory_manager.current_generation
+            memmgr = warmrunnerdesc.memory_manager
+            curgen = memmgr.current_generation
             curgen = chr(intmask(curgen) & 0xFF)    # only use 8 bits
             if we_are_translated() and curgen != cell.extra_delay:
                 cell.counter = int(self.THRESHOLD_LIMIT * 0.98)
                 cell.extra_delay = curgen
                 return
+            # same if we are over the 'compile_ratio'
+            if not memmgr.may_start_compiling():
+                cell.counter = int(self.THRESHOLD_LIMIT * 0.98)
+                return
             #
             if not confirm_enter_jit(*args):
                 cell.counter = 0
@@ -327,9 +343,11 @@ class WarmEnterState(object):
             metainterp = MetaInterp(metainterp_sd, jitdriver_sd)
             # set counter to -2, to mean "tracing in effect"
             cell.counter = -2
+            starttime = memmgr.start_compiling()
             try:
                 metainterp.compile_and_run_once(jitdriver_sd, *args)
             finally:
+                memmgr.done_compiling(starttime)
                 if cell.counter == -2:
                     cell.counter = 0
 
@@ -480,6 +498,7 @@ class WarmEnterState(object):
         #
         self._trigger_automatic_cleanup = 0
         self._jitcell_dict = jitcell_dict       # for tests
+        is_hot_at = self._make_is_hot_at()
         #
         def get_jitcell(build, *greenargs):
             try:
@@ -489,6 +508,8 @@ class WarmEnterState(object):
                     return None
                 _maybe_cleanup_dict()
                 cell = JitCell()
+                if is_hot_at(*greenargs):
+                    cell.counter = self.THRESHOLD_LIMIT
                 jitcell_dict[greenargs] = cell
             return cell
         return get_jitcell
@@ -499,6 +520,7 @@ class WarmEnterState(object):
         get_jitcell_at_ptr = self.jitdriver_sd._get_jitcell_at_ptr
         set_jitcell_at_ptr = self.jitdriver_sd._set_jitcell_at_ptr
         lltohlhack = {}
+        is_hot_at = self._make_is_hot_at()
         # note that there is no equivalent of _maybe_cleanup_dict()
         # in the case of custom getters.  We assume that the interpreter
         # stores the JitCells on some objects that can go away by GC,
@@ -525,6 +547,8 @@ class WarmEnterState(object):
                 return cell
             if cell is None:
                 cell = JitCell()
+                if is_hot_at(*greenargs):
+                    cell.counter = self.THRESHOLD_LIMIT
                 # <hacks>
                 if we_are_translated():
                     cellref = cast_object_to_ptr(BASEJITCELL, cell)
@@ -544,6 +568,28 @@ class WarmEnterState(object):
             return cell
         return get_jitcell
 
+    def _make_is_hot_at(self):
+        "NOT_RPYTHON"
+        # jitdriver.is_hot_at(*greenargs) lets the interpreter say that a
+        # new cell is known to be hot, e.g. because the same loop was
+        # compiled by a previous process: the cell then starts with its
+        # counter at the threshold, and tracing starts the next time the
+        # cell is reached instead of after 'threshold' iterations.
+        try:
+            is_hot_at_ptr = self.jitdriver_sd._is_hot_at_ptr
+        except AttributeError:     # for tests
+            is_hot_at_ptr = None
+        if is_hot_at_ptr is None:
+            def is_hot_at(*greenargs):
+                return False
+        else:
+            rtyper = self.warmrunnerdesc.rtyper
+            #
+            def is_hot_at(*greenargs):
+                fn = support.maybe_on_top_of_llinterp(rtyper, is_hot_at_ptr)
+                return fn(*greenargs)
+        return is_hot_at
+
     # ----------
 
     def make_jitdriver_callbacks(self):
@@ -61,10 +61,12 @@ abort: force quasi-immut: 3
 nvirtuals:              13
 nvholes:                14
 nvreused:               15
+evicted loops:          16
 Total # of loops:       100
 Total # of bridges:     300
 Freed # of loops:       99
 Freed # of bridges:     299
+Loop memory:            123456
 '''
 
 def test_parse():
@@ -88,3 +90,5 @@ def test_parse():
     assert info.nvirtuals == 13
     assert info.nvholes == 14
     assert info.nvreused == 15
+    assert info.evicted_loops == 16
+    assert info.loop_memory == 123456
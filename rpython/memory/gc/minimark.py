@@ -38,6 +38,16 @@ Environment variables can be used to fine-tune the following parameters:
                          the GC in very small programs.  Defaults to 8
                          times the nursery.
 
+ PYPY_GC_INCREMENT_STEP  Enable incremental major collections: the
+                         marking and the sweeping are then done in steps,
+                         one after each minor collection, each tracing
+                         about this amount of objects (or sweeping this
+                         amount of pages).  Defaults to 0, which means
+                         that a major collection is done in one go.  Try
+                         values like 4 times the nursery size.  If the
+                         program allocates too quickly, the major
+                         collection in progress is finished in one go.
+
  PYPY_GC_DEBUG           Enable extra checks around collections that are
                          too slow for normal use.  Values are 0 (off),
                          1 (on major collections) or 2 (also on minor
@@ -126,6 +136,18 @@ GCFLAG_CARDS_SET    = first_gcflag << 7     # <- at least one card bit is set
 
 TID_MASK            = (first_gcflag << 8) - 1
 
+# The states of an incremental major collection (see 'increment_step').
+# Between major collections, we are in STATE_SCANNING.  In STATE_MARKING,
+# the objects with GCFLAG_VISITED are the black ones: they have been
+# traced, and the objects they point to are either black too or listed in
+# 'objects_to_trace' (the gray ones).  As the write barrier also catches
+# the old pointers written in that state, a black object that is modified
+# is traced again by the next minor collection.  In STATE_SWEEPING, the
+# objects without GCFLAG_VISITED are freed, a few pages at a time.
+STATE_SCANNING = 0
+STATE_MARKING = 1
+STATE_SWEEPING = 2
+
 
 FORWARDSTUB = lltype.GcStruct('forwarding_stub',
                               ('forw', llmemory.Address))
@@ -220,6 +242,12 @@ class MiniMarkGC(MovingGCBase):
         # so we trade it by cleaning it bit-by-bit, as we progress through
         # nursery. Has to fit at least one large object
         "nursery_cleanup": 32768 * WORD,
+
+        # The amount of objects traced by every step of an incremental
+        # major collection, in bytes.  The default value of 0 means that
+        # major collections are not incremental.  See also the
+        # PYPY_GC_INCREMENT_STEP environment variable.
+        "increment_step": 0,
         }
 
     def __init__(self, config,
@@ -233,6 +261,7 @@ class MiniMarkGC(MovingGCBase):
                  growth_rate_max=2.5,   # for tests
                  card_page_indices=0,
                  large_object=8*WORD,
+                 increment_step=0,
                  ArenaCollectionClass=None,
                  **kwds):
         MovingGCBase.__init__(self, config, **kwds)
@@ -259,6 +288,12 @@ class MiniMarkGC(MovingGCBase):
         # it gives a lower bound on the allowed size of the nursery.
         self.nonlarge_max = large_object - 1
         #
+        # The state of the incremental major collection, if enabled
+        self.increment_step = increment_step
+        self.gc_state = STATE_SCANNING
+        self.incremental_memory_limit = 0.0
+        self.external_malloced_since_step = 0
+        #
         self.nursery      = NULL
         self.nursery_free = NULL
         self.nursery_top  = NULL
@@ -386,6 +421,10 @@ class MiniMarkGC(MovingGCBase):
             else:
                 self.max_delta = 0.125 * env.get_total_memory()
             #
+            increment_step = env.read_from_env('PYPY_GC_INCREMENT_STEP')
+            if increment_step > 0:
+                self.increment_step = increment_step
+            #
             self.minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
@@ -644,8 +683,10 @@ class MiniMarkGC(MovingGCBase):
             return prev_result
         self.minor_collection()
         #
-        if self.get_total_memory_used() > self.next_major_collection_threshold:
-            self.major_collection()
+        if (self.gc_state != STATE_SCANNING or
+                self.get_total_memory_used() >
+                    self.next_major_collection_threshold):
+            self.major_collection_step()
             #
             # The nursery might not be empty now, because of
             # execute_finalizers().  If it is almost full again,
@@ -704,11 +745,22 @@ class MiniMarkGC(MovingGCBase):
             raise MemoryError
         #
         # If somebody calls this function a lot, we must eventually
-        # force a full collection.
-        if (float(self.get_total_memory_used()) + raw_malloc_usage(totalsize) >
-                self.next_major_collection_threshold):
+        # force a full collection.  If an incremental major collection
+        # is already in progress, it is normally driven by the steps done
+        # after the minor collections; we only do a step here once
+        # a nursery's worth of objects have been allocated outside the
+        # nursery, in case the program allocates nothing else.
+        if self.gc_state == STATE_SCANNING:
+            must_step = (float(self.get_total_memory_used()) +
+                         raw_malloc_usage(totalsize) >
+                             self.next_major_collection_threshold)
+        else:
+            self.external_malloced_since_step += raw_malloc_usage(totalsize)
+            must_step = (self.external_malloced_since_step >
+                         self.nursery_size)
+        if must_step:
             self.minor_collection()
-            self.major_collection(raw_malloc_usage(totalsize))
+            self.major_collection_step(raw_malloc_usage(totalsize))
         #
         # Check if the object would fit in the ArenaCollection.
         if raw_malloc_usage(totalsize) <= self.small_request_threshold:
@@ -994,9 +1046,11 @@ class MiniMarkGC(MovingGCBase):
         # similarily, all objects should have this flag:
         ll_assert(self.header(obj).tid & GCFLAG_TRACK_YOUNG_PTRS != 0,
                   "missing GCFLAG_TRACK_YOUNG_PTRS")
-        # the GCFLAG_VISITED should not be set between collections
-        ll_assert(self.header(obj).tid & GCFLAG_VISITED == 0,
-                  "unexpected GCFLAG_VISITED")
+        # the GCFLAG_VISITED should not be set between collections,
+        # unless an incremental major collection is in progress
+        if self.gc_state == STATE_SCANNING:
+            ll_assert(self.header(obj).tid & GCFLAG_VISITED == 0,
+                      "unexpected GCFLAG_VISITED")
         # the GCFLAG_FINALIZATION_ORDERING should not be set between coll.
         ll_assert(self.header(obj).tid & GCFLAG_FINALIZATION_ORDERING == 0,
                   "unexpected GCFLAG_FINALIZATION_ORDERING")
@@ -1089,8 +1143,12 @@ class MiniMarkGC(MovingGCBase):
             # to the list 'old_objects_pointing_to_young'.  We know that
             # 'addr_struct' cannot be in the nursery, because nursery objects
             # never have the flag GCFLAG_TRACK_YOUNG_PTRS to start with.
+            # During an incremental marking, we need to do the same even
+            # if we are writing a pointer to an old object: the object
+            # 'addr_struct' might be black already.
             objhdr = self.header(addr_struct)
-            if self.appears_to_be_young(newvalue):
+            if (self.gc_state == STATE_MARKING or
+                    self.appears_to_be_young(newvalue)):
                 self.old_objects_pointing_to_young.append(addr_struct)
                 objhdr.tid &= ~GCFLAG_TRACK_YOUNG_PTRS
             #
@@ -1219,6 +1277,19 @@ class MiniMarkGC(MovingGCBase):
             return True
         # ^^^ a fast path of write-barrier
         #
+        if self.gc_state == STATE_MARKING:
+            # During an incremental marking, even copying old pointers
+            # must make 'dest' gray again.
+            if dest_hdr.tid & GCFLAG_HAS_CARDS != 0:
+                # Do it manually, setting the cards.
+                return False
+            self.old_objects_pointing_to_young.append(dest_addr)
+            dest_hdr.tid &= ~GCFLAG_TRACK_YOUNG_PTRS
+            if dest_hdr.tid & GCFLAG_NO_HEAP_PTRS:
+                dest_hdr.tid &= ~GCFLAG_NO_HEAP_PTRS
+                self.prebuilt_root_objects.append(dest_addr)
+            return True
+        #
         if source_hdr.tid & GCFLAG_HAS_CARDS != 0:
             #
             if source_hdr.tid & GCFLAG_TRACK_YOUNG_PTRS == 0:
@@ -1390,6 +1461,11 @@ class MiniMarkGC(MovingGCBase):
                     bytes -= 1
                 #
             else:
+                # During an incremental marking, if 'obj' is already black,
+                # we must also trace again the parts that were modified.
+                retrace = (self.gc_state == STATE_MARKING and
+                           self.header(obj).tid & GCFLAG_VISITED != 0)
+                #
                 # Walk the bytes encoding the card marker bits, and for
                 # each bit set, call trace_and_drag_out_of_nursery_partial().
                 interval_start = 0
@@ -1410,6 +1486,11 @@ class MiniMarkGC(MovingGCBase):
                                           "premature end of object")
                             self.trace_and_drag_out_of_nursery_partial(
                                 obj, interval_start, interval_stop)
+                            if retrace:
+                                self.trace_partial(obj, interval_start,
+                                                   interval_stop,
+                                                   self._collect_ref_rec,
+                                                   None)
                         #
                         interval_start = interval_stop
                         cardbyte >>= 1
@@ -1437,6 +1518,13 @@ class MiniMarkGC(MovingGCBase):
             # outside the nursery, possibly forcing nursery objects out
             # and adding them to 'old_objects_pointing_to_young' as well.
             self.trace_and_drag_out_of_nursery(obj)
+            #
+            # During an incremental marking, 'obj' may be a black object
+            # in which we wrote a pointer to a white object.  Trace it
+            # again to make the objects it points to gray.
+            if (self.gc_state == STATE_MARKING and
+                    self.header(obj).tid & GCFLAG_VISITED != 0):
+                self.trace(obj, self._collect_ref_rec, None)
 
     def trace_and_drag_out_of_nursery(self, obj):
         """obj must not be in the nursery.  This copies all the
@@ -1618,6 +1706,95 @@ class MiniMarkGC(MovingGCBase):
         """Do a major collection.  Only for when the nursery is empty."""
         #
         debug_start("gc-collect")
+        #
+        # If an incremental major collection is in progress, finish it
+        # first; it may have kept alive objects that died in the meantime.
+        if self.gc_state != STATE_SCANNING:
+            self.finish_incremental_major_collection()
+        #
+        # Note that a major collection is non-moving.  The goal is only to
+        # find and free some of the objects allocated by the ArenaCollection.
+        # We first visit all objects and toggle the flag GCFLAG_VISITED on
+        # them, starting from the roots.
+        self.start_major_collection()
+        self.visit_all_objects()
+        self.end_marking()
+        #
+        # Ask the ArenaCollection to visit all objects.  Free the ones
+        # that have not been visited above, and reset GCFLAG_VISITED on
+        # the others.
+        self.ac.mass_free_incremental(self._free_if_unvisited, sys.maxint)
+        self.end_major_collection()
+        debug_stop("gc-collect")
+        #
+        self.set_major_threshold_after_collection(reserving_size)
+        #
+        # At the end, we can execute the finalizers of the objects
+        # listed in 'run_finalizers'.  Note that this will typically do
+        # more allocations.
+        self.execute_finalizers()
+
+    def major_collection_step(self, reserving_size=0):
+        """Do the next step of the incremental major collection, starting
+        a new one if none is in progress.  Only for when the nursery is
+        empty.  If 'increment_step' is 0, do a complete major collection.
+        """
+        if self.increment_step <= 0:
+            self.major_collection(reserving_size)
+            return
+        #
+        debug_start("gc-collect-step")
+        debug_print("starting gc state: ", self.gc_state)
+        self.external_malloced_since_step = 0
+        #
+        if self.gc_state == STATE_SCANNING:
+            self.start_major_collection()
+            # If the total memory used goes over this limit before the
+            # marking is done, then we finish it in one go.
+            limit = (self.next_major_collection_threshold *
+                     self.major_collection_threshold)
+            if self.max_heap_size > 0.0 and limit > self.max_heap_size:
+                limit = self.max_heap_size
+            self.incremental_memory_limit = limit
+        #
+        if self.gc_state == STATE_MARKING:
+            if (float(self.get_total_memory_used()) >
+                    self.incremental_memory_limit or
+                    self.visit_objects_incrementally(self.increment_step)):
+                # No more gray objects (or the program allocates too
+                # quickly for us).  Walk the roots again, as they may
+                # point to white objects, and finish the marking.
+                self.collect_roots()
+                self.visit_all_objects()
+                self.end_marking()
+            #
+        elif self.gc_state == STATE_SWEEPING:
+            max_pages = self.increment_step // self.ac.page_size + 1
+            if self.ac.mass_free_incremental(self._free_if_unvisited,
+                                             max_pages):
+                self.end_major_collection()
+        #
+        debug_print("stopping, now in gc state: ", self.gc_state)
+        debug_stop("gc-collect-step")
+        #
+        if self.gc_state == STATE_SCANNING:
+            # the major collection just finished
+            self.set_major_threshold_after_collection(reserving_size)
+            self.execute_finalizers()
+
+    def finish_incremental_major_collection(self):
+        # Finish in one go the incremental major collection in progress,
+        # but without running the finalizers.  Only for when the nursery
+        # is empty.
+        if self.gc_state == STATE_MARKING:
+            self.collect_roots()
+            self.visit_all_objects()
+            self.end_marking()
+        ll_assert(self.gc_state == STATE_SWEEPING, "bad gc state")
+        self.ac.mass_free_incremental(self._free_if_unvisited, sys.maxint)
+        self.end_major_collection()
+
+    def start_major_collection(self):
         debug_print()
         debug_print(".----------- Full collection ------------------")
         debug_print("| used before collection:")
@@ -1627,17 +1804,20 @@ class MiniMarkGC(MovingGCBase):
                     self.rawmalloced_total_size, "bytes")
         #
         # Debugging checks
+        ll_assert(self.gc_state == STATE_SCANNING,
+                  "major collection already in progress")
         ll_assert(self.nursery_free == self.nursery,
                   "nursery not empty in major_collection()")
         self.debug_check_consistency()
         #
-        # Note that a major collection is non-moving.  The goal is only to
-        # find and free some of the objects allocated by the ArenaCollection.
-        # We first visit all objects and toggle the flag GCFLAG_VISITED on
-        # them, starting from the roots.
+        # The roots are the first gray objects.
         self.objects_to_trace = self.AddressStack()
         self.collect_roots()
-        self.visit_all_objects()
+        self.gc_state = STATE_MARKING
+
+    def end_marking(self):
+        # Called when the marking is done, i.e. all surviving objects
+        # have the flag GCFLAG_VISITED.
         #
         # Finalizer support: adds the flag GCFLAG_VISITED to all objects
         # with a finalizer and all objects reachable from there (and also
@@ -1659,14 +1839,17 @@ class MiniMarkGC(MovingGCBase):
         # have the GCFLAG_VISITED flag.
         self.free_unvisited_rawmalloc_objects()
         #
-        # Ask the ArenaCollection to visit all objects.  Free the ones
-        # that have not been visited above, and reset GCFLAG_VISITED on
-        # the others.
-        self.ac.mass_free(self._free_if_unvisited)
-        #
         # We also need to reset the GCFLAG_VISITED on prebuilt GC objects.
         self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
         #
+        # The pages of the ArenaCollection are now swept, in one go or
+        # in several steps.  The objects allocated from now on go to other
+        # pages, so they don't need the GCFLAG_VISITED.
+        self.ac.mass_free_prepare()
+        self.gc_state = STATE_SWEEPING
+
+    def end_major_collection(self):
+        self.gc_state = STATE_SCANNING
         self.debug_check_consistency()
         #
         self.num_major_collects += 1
@@ -1678,7 +1861,8 @@ class MiniMarkGC(MovingGCBase):
         debug_print("| number of major collects:        ",
                     self.num_major_collects)
         debug_print("`----------------------------------------------")
-        debug_stop("gc-collect")
+
+    def set_major_threshold_after_collection(self, reserving_size):
         #
         # Set the threshold for the next major collection to be when we
         # have allocated 'major_collection_threshold' times more than
@@ -1706,11 +1890,6 @@ class MiniMarkGC(MovingGCBase):
                                       "Using too much memory, aborting")
             self.max_heap_size_already_raised = True
             raise MemoryError
-        #
-        # At the end, we can execute the finalizers of the objects
-        # listed in 'run_finalizers'.  Note that this will typically do
-        # more allocations.
-        self.execute_finalizers()
 
 
     def _free_if_unvisited(self, hdr):
@@ -1801,6 +1980,22 @@ class MiniMarkGC(MovingGCBase):
             obj = pending.pop()
             self.visit(obj)
 
+    def visit_objects_incrementally(self, size_to_trace):
+        """Visit the objects from 'objects_to_trace' until roughly
+        'size_to_trace' bytes of objects have been traced.  Returns True
+        if there are no more gray objects."""
+        pending = self.objects_to_trace
+        size_gc_header = self.gcheaderbuilder.size_gc_header
+        while pending.non_empty():
+            if size_to_trace <= 0:
+                return False
+            obj = pending.pop()
+            if self.header(obj).tid & (GCFLAG_VISITED|GCFLAG_NO_HEAP_PTRS)==0:
+                size_to_trace -= raw_malloc_usage(size_gc_header +
+                                                  self.get_size(obj))
+            self.visit(obj)
+        return True
+
     def visit(self, obj):
         #
         # 'obj' is a live object.  Check GCFLAG_VISITED to know if we
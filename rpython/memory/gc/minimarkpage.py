@@ -1,3 +1,4 @@
+import sys
 from rpython.rtyper.lltypesystem import lltype, llmemory, llarena, rffi
 from rpython.rlib.rarithmetic import LONG_BIT, r_uint
 from rpython.rlib.objectmodel import we_are_translated
@@ -119,7 +120,17 @@ class ArenaCollection(object):
                                           self.max_pages_per_arena,
                                           flavor='raw', zero=True,
                                           immortal=True)
-        # this is used in mass_free() only
+        # these are used in mass_free_incremental() only: the pages that
+        # are still to be walked, moved away by mass_free_prepare()
+        self.old_page_for_size = lltype.malloc(rffi.CArray(PAGE_PTR), length,
+                                               flavor='raw', zero=True,
+                                               immortal=True)
+        self.old_full_page_for_size = lltype.malloc(rffi.CArray(PAGE_PTR),
+                                                    length, flavor='raw',
+                                                    zero=True, immortal=True)
+        self.size_class_with_old_pages = -1
+        #
+        # this is used in mass_free_incremental() only
         self.old_arenas_lists = lltype.malloc(rffi.CArray(ARENA_PTR),
                                               self.max_pages_per_arena,
                                               flavor='raw', zero=True,
@@ -268,7 +279,9 @@ class ArenaCollection(object):
             self.min_empty_nfreepages = i
         #
         # No more arena with any free page.  We must allocate a new arena.
-        if not we_are_translated():
+        # (During an incremental mass_free, some arenas may have gained
+        # free pages, but they are only rehashed at the end.)
+        if not we_are_translated() and self.size_class_with_old_pages < 0:
             for a in self._all_arenas():
                 assert a.nfreepages == 0
         #
@@ -301,22 +314,62 @@ class ArenaCollection(object):
         """For each object, if ok_to_free_func(obj) returns True, then free
         the object.
         """
+        self.mass_free_prepare()
+        res = self.mass_free_incremental(ok_to_free_func, sys.maxint)
+        ll_assert(res, "non-finished mass_free")
+
+
+    def mass_free_prepare(self):
+        """Prepare calls to mass_free_incremental(): moves the chained lists
+        of pages away, so that they can be walked in several steps while
+        new objects are allocated in other pages.
+        """
         self.total_memory_used = r_uint(0)
         #
-        # For each size class:
         size_class = self.small_request_threshold >> WORD_POWER_2
+        self.size_class_with_old_pages = size_class
+        while size_class >= 1:
+            self.old_page_for_size[size_class] = (
+                self.page_for_size[size_class])
+            self.old_full_page_for_size[size_class] = (
+                self.full_page_for_size[size_class])
+            self.page_for_size[size_class] = PAGE_NULL
+            self.full_page_for_size[size_class] = PAGE_NULL
+            size_class -= 1
+
+
+    def mass_free_incremental(self, ok_to_free_func, max_pages):
+        """For each object, if ok_to_free_func(obj) returns True, then free
+        the object.  This returns True if complete, or False if it stopped
+        after walking 'max_pages' pages; in that case, call it again later.
+        Between the calls, 'total_memory_used' only counts the pages that
+        have already been walked and the objects allocated since then.
+        """
+        ll_assert(max_pages > 0, "mass_free_incremental: max_pages <= 0")
+        size_class = self.size_class_with_old_pages
+        ll_assert(size_class >= 0, "mass_free_incremental without prepare")
+        #
+        # For each size class:
         while size_class >= 1:
             #
-            # Walk the pages in 'page_for_size[size_class]' and
-            # 'full_page_for_size[size_class]' and free some objects.
+            # Walk the pages in 'old_page_for_size[size_class]' and
+            # 'old_full_page_for_size[size_class]' and free some objects.
             # Pages completely freed are added to 'page.arena.freepages',
             # and become available for reuse by any size class.  Pages
             # not completely freed are re-chained either in
             # 'full_page_for_size[]' or 'page_for_size[]'.
-            self.mass_free_in_pages(size_class, ok_to_free_func)
+            max_pages = self.mass_free_in_pages(size_class, ok_to_free_func,
+                                                max_pages)
+            if (self.old_page_for_size[size_class] != PAGE_NULL or
+                self.old_full_page_for_size[size_class] != PAGE_NULL):
+                # ran out of budget: stop here for now
+                self.size_class_with_old_pages = size_class
+                return False
             #
             size_class -= 1
         #
+        self.size_class_with_old_pages = -1
+        #
         # Rehash arenas into the correct arenas_lists[i].  If
         # 'self.current_arena' contains an arena too, it remains there.
         (self.old_arenas_lists, self.arenas_lists) = (
@@ -351,22 +404,23 @@ class ArenaCollection(object):
             i += 1
         #
         self.min_empty_nfreepages = 1
+        return True
 
 
-    def mass_free_in_pages(self, size_class, ok_to_free_func):
+    def mass_free_in_pages(self, size_class, ok_to_free_func, max_pages):
         nblocks = self.nblocks_for_size[size_class]
         block_size = size_class * WORD
-        remaining_partial_pages = PAGE_NULL
-        remaining_full_pages = PAGE_NULL
+        remaining_partial_pages = self.page_for_size[size_class]
+        remaining_full_pages = self.full_page_for_size[size_class]
         #
         step = 0
         while step < 2:
             if step == 0:
-                page = self.full_page_for_size[size_class]
+                page = self.old_full_page_for_size[size_class]
             else:
-                page = self.page_for_size[size_class]
+                page = self.old_page_for_size[size_class]
             #
-            while page != PAGE_NULL:
+            while page != PAGE_NULL and max_pages > 0:
                 #
                 # Collect the page.
                 surviving = self.walk_page(page, block_size, ok_to_free_func)
@@ -393,11 +447,20 @@ class ArenaCollection(object):
                     self.free_page(page)
 
                 page = nextpage
+                max_pages -= 1
             #
+            # Store back the pages not walked yet, if we ran out of budget
+            if step == 0:
+                self.old_full_page_for_size[size_class] = page
+            else:
+                self.old_page_for_size[size_class] = page
+            if page != PAGE_NULL:
+                break
             step += 1
         #
         self.page_for_size[size_class] = remaining_partial_pages
         self.full_page_for_size[size_class] = remaining_full_pages
+        return max_pages
 
 
     def free_page(self, page):
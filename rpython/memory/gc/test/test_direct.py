@@ -580,6 +580,95 @@ class TestMiniMarkGCSimple(DirectGCTest):
     test_writebarrier_before_copy_preserving_cards.GC_PARAMS = {
         "card_page_indices": 4}
 
+    def test_incremental_marking_write_barrier(self):
+        from rpython.memory.gc import minimark
+        b = self.malloc(S)
+        b.next = self.malloc(S)
+        b.next.x = 42
+        self.stackroots.append(b)
+        self.stackroots.append(self.malloc(S))
+        self.gc.collect()      # make them old
+        #
+        # start an incremental major collection, which only traces the
+        # last root, 'a'
+        self.gc.major_collection_step()
+        assert self.gc.gc_state == minimark.STATE_MARKING
+        b, a = self.stackroots
+        c = b.next
+        def visited(p):
+            hdr = self.gc.header(llmemory.cast_ptr_to_adr(p))
+            return hdr.tid & minimark.GCFLAG_VISITED != 0
+        assert visited(a)
+        assert not visited(b)
+        assert not visited(c)
+        #
+        # move 'c' from the gray 'b' to the black 'a'
+        self.write(a, 'next', c)
+        self.write(b, 'next', lltype.nullptr(S))
+        while self.gc.gc_state != minimark.STATE_SCANNING:
+            self.gc.minor_collection()
+            self.gc.major_collection_step()
+        assert self.stackroots[1].next.x == 42
+    test_incremental_marking_write_barrier.GC_PARAMS = {"increment_step": 1}
+
+    def test_incremental_major_collection_finished_by_collect(self):
+        from rpython.memory.gc import minimark
+        self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        self.gc.major_collection_step()
+        assert self.gc.gc_state != minimark.STATE_SCANNING
+        p = self.stackroots.pop()
+        self.gc.collect()
+        assert self.gc.gc_state == minimark.STATE_SCANNING
+        py.test.raises(RuntimeError, 'p.x')
+    test_incremental_major_collection_finished_by_collect.GC_PARAMS = {
+        "increment_step": 1}
+
+    def test_incremental_external_malloc_no_minor_collections(self):
+        from rpython.memory.gc import minimark
+        for i in range(40):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()      # make them old, in several pages
+        del self.stackroots[::2]
+        forced = []
+        orig_minor_collection = self.gc.minor_collection
+        def minor_collection():
+            forced.append(self.gc.gc_state)
+            orig_minor_collection()
+        self.gc.minor_collection = minor_collection
+        #
+        seen_states = set()
+        self.gc.major_collection_step()
+        while self.gc.gc_state != minimark.STATE_SCANNING:
+            # as if the threshold was exceeded by the large objects
+            self.gc.next_major_collection_threshold = 0.0
+            seen_states.add(self.gc.gc_state)
+            for i in range(20):
+                self.stackroots.append(self.malloc(VAR, 20))
+            orig_minor_collection()
+            self.gc.major_collection_step()
+        assert seen_states == set([minimark.STATE_MARKING,
+                                   minimark.STATE_SWEEPING])
+        # less than a nursery's worth of large objects were allocated
+        # between two steps, so they didn't force any step of their own
+        assert forced == []
+        #
+        # but if the program allocates only large objects, they still
+        # drive the major collection, with one step per nursery's worth
+        del self.stackroots[20:]
+        self.gc.collect()
+        del forced[:]
+        self.gc.major_collection_step()
+        count = 0
+        while self.gc.gc_state != minimark.STATE_SCANNING:
+            self.malloc(VAR, 20)
+            count += 1
+        nbytes = llmemory.raw_malloc_usage(
+            llmemory.sizeof(VAR, 20) + self.gc.gcheaderbuilder.size_gc_header)
+        assert 0 < len(forced) <= count * nbytes // self.gc.nursery_size
+    test_incremental_external_malloc_no_minor_collections.GC_PARAMS = {
+        "increment_step": 1, "nursery_size": 1024 * WORD}
+
 
 class TestMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.minimark import MiniMarkGC as GCClass
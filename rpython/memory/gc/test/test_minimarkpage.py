@@ -400,6 +400,30 @@ def test_mass_free_half_page_becomes_more_free():
     assert freepages(ac) == NULL
     assert ac.full_page_for_size[2] == PAGE_NULL
 
+def test_mass_free_incremental():
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "#2 ", fill_with_objects=2)
+    ok_to_free = OkToFree(ac, False)
+    ac.mass_free_prepare()
+    assert ac.page_for_size[2] == PAGE_NULL
+    assert ac.full_page_for_size[2] == PAGE_NULL
+    #
+    # new objects go to a new page, which is not walked
+    obj = ac.malloc(2*WORD); chkob(ac, 2, 0*WORD, obj)
+    #
+    assert not ac.mass_free_incremental(ok_to_free, 1)
+    assert ok_to_free.seen == {hdrsize + 0*WORD: False,
+                               hdrsize + 2*WORD: False,
+                               hdrsize + 4*WORD: False}
+    checkpage(ac, ac.full_page_for_size[2], 0)
+    checkpage(ac, ac.page_for_size[2], 2)
+    #
+    assert ac.mass_free_incremental(ok_to_free, 1)
+    assert len(ok_to_free.seen) == 5
+    checkpage(ac, ac.page_for_size[2], 1)
+    checkpage(ac, ac.page_for_size[2].nextpage, 2)
+    assert ac.total_memory_used == 6*2*WORD
+
 # ____________________________________________________________
 
 def test_random():
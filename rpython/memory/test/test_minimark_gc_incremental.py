@@ -0,0 +1,5 @@
+from rpython.memory.test import test_minimark_gc
+
+class TestMiniMarkGCIncremental(test_minimark_gc.TestMiniMarkGC):
+    GC_PARAMS = {'card_page_indices': 4,
+                 'increment_step': 64}
@@ -446,6 +446,8 @@ PARAMETER_DOCS = {
     'retrace_limit': 'how many times we can try retracing before giving up',
     'max_retrace_guards': 'number of extra guards a retrace can cause',
     'max_unroll_loops': 'number of extra unrollings a loop can cause',
+    'compile_ratio': 'maximum percentage of the time spent tracing and compiling, to spread the warm-up pauses (0: no limit)',
+    'loop_memory_budget': 'maximum memory in KB for the machine code and resume data of the loops; the least recently entered loops are freed first (0: no limit)',
     'enable_opts': 'INTERNAL USE ONLY (MAY NOT WORK OR LEAD TO CRASHES): '
                    'optimizations to enable, or all = %s' % ENABLE_ALL_OPTS,
     }
@@ -459,6 +461,8 @@ PARAMETERS = {'threshold': 1039, # just above 1024, prime
               'retrace_limit': 5,
               'max_retrace_guards': 15,
               'max_unroll_loops': 0,
+              'compile_ratio': 0,
+              'loop_memory_budget': 0,
               'enable_opts': 'all',
               }
 unroll_parameters = unrolling_iterable(PARAMETERS.items())
@@ -481,7 +485,7 @@ class JitDriver(object):
                  get_jitcell_at=None, set_jitcell_at=None,
                  get_printable_location=None, confirm_enter_jit=None,
                  can_never_inline=None, should_unroll_one_iteration=None,
-                 name='jitdriver', check_untranslated=True):
+                 is_hot_at=None, name='jitdriver', check_untranslated=True):
         if greens is not None:
             self.greens = greens
         self.name = name
@@ -516,6 +520,7 @@ class JitDriver(object):
         self.confirm_enter_jit = confirm_enter_jit
         self.can_never_inline = can_never_inline
         self.should_unroll_one_iteration = should_unroll_one_iteration
+        self.is_hot_at = is_hot_at
         self.check_untranslated = check_untranslated
 
     def _freeze_(self):
@@ -1035,10 +1040,12 @@ class Counters(object):
     NVIRTUALS
     NVHOLES
     NVREUSED
+    EVICTED_LOOPS
     TOTAL_COMPILED_LOOPS
     TOTAL_COMPILED_BRIDGES
     TOTAL_FREED_LOOPS
     TOTAL_FREED_BRIDGES
+    LOOP_MEMORY
     """
 
     counter_names = []
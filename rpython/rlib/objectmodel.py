@@ -9,6 +9,7 @@ import sys
 import types
 import math
 import inspect
+from collections import OrderedDict
 from rpython.tool.sourcetools import rpython_wrapper
 
 # specialize is a decorator factory for attaching _annspecialcase_
@@ -623,11 +624,14 @@ class r_dict(object):
     algorithm."""
 
     def __init__(self, key_eq, key_hash, force_non_null=False):
-        self._dict = {}
+        self._dict = self._newdict()
         self.key_eq = key_eq
         self.key_hash = key_hash
         self.force_non_null = force_non_null
 
+    def _newdict(self):
+        return {}
+
     def __getitem__(self, key):
         return self._dict[_r_dictkey(self, key)]
 
@@ -658,7 +662,7 @@ class r_dict(object):
         return dk.key, value
 
     def copy(self):
-        result = r_dict(self.key_eq, self.key_hash)
+        result = self.__class__(self.key_eq, self.key_hash)
         result.update(self)
         return result
 
@@ -689,11 +693,18 @@ class r_dict(object):
 
     def __repr__(self):
         "Representation for debugging purposes."
-        return 'r_dict(%r)' % (self._dict,)
+        return '%s(%r)' % (self.__class__.__name__, self._dict,)
 
     def __hash__(self):
         raise TypeError("cannot hash r_dict instances")
 
+class r_ordereddict(r_dict):
+    """An RPython dict-like object that remembers the insertion order
+    of its keys, like collections.OrderedDict."""
+
+    def _newdict(self):
+        return OrderedDict()
+
 
 class _r_dictkey(object):
     __slots__ = ['dic', 'key', 'hash']
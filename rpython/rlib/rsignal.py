@@ -44,6 +44,7 @@ eci = ExternalCompilationInfo(
     export_symbols = ['pypysig_poll', 'pypysig_default',
                       'pypysig_ignore', 'pypysig_setflag',
                       'pypysig_reinstall',
+                      'pypysig_setcounted', 'pypysig_poll_counted',
                       'pypysig_set_wakeup_fd',
                       'pypysig_getaddr_occurred'],
 )
@@ -82,6 +83,9 @@ pypysig_poll = external('pypysig_poll', [], rffi.INT, threadsafe=False)
 # pointless and a performance issue
 pypysig_pushback = external('pypysig_pushback', [rffi.INT], lltype.Void,
                             threadsafe=False)
+pypysig_setcounted = external('pypysig_setcounted', [rffi.INT], lltype.Void)
+pypysig_poll_counted = external('pypysig_poll_counted', [], lltype.Signed,
+                                threadsafe=False)
 
 # don't use rffi.LONGP because the JIT doesn't support raw arrays so far
 struct_name = 'pypysig_long_struct'
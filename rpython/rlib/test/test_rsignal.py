@@ -33,7 +33,24 @@ def test_simple():
     rsignal.pypysig_default(rsignal.SIGUSR1)
     check(-1)
 
+def test_counted():
+    assert rsignal.pypysig_poll_counted() == 0
+    rsignal.pypysig_setcounted(rsignal.SIGUSR1)
+    p = rsignal.pypysig_getaddr_occurred()
+    p.c_value = 100
+    for i in range(3):
+        os.kill(os.getpid(), rsignal.SIGUSR1)
+    assert p.c_value == -1
+    check(-1)     # not reported by pypysig_poll()
+    assert rsignal.pypysig_poll_counted() == 3
+    assert rsignal.pypysig_poll_counted() == 0
+    rsignal.pypysig_default(rsignal.SIGUSR1)
+
 
 def test_compile():
     fn = compile(test_simple, [])
     fn()
+
+def test_compile_counted():
+    fn = compile(test_counted, [])
+    fn()
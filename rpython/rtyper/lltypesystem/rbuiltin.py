@@ -1,7 +1,11 @@
+import collections
+
 from rpython.annotator import model as annmodel
 from rpython.rlib import objectmodel
 from rpython.rtyper.lltypesystem import lltype, rclass
 from rpython.rtyper.lltypesystem.rdict import rtype_r_dict
+from rpython.rtyper.lltypesystem.rordereddict import (rtype_r_ordereddict,
+    rtype_ordereddict)
 from rpython.rtyper.rmodel import TyperError
 
 
@@ -51,6 +55,8 @@ BUILTIN_TYPER[objectmodel.instantiate] = rtype_instantiate
 BUILTIN_TYPER[isinstance] = rtype_builtin_isinstance
 BUILTIN_TYPER[hasattr] = rtype_builtin_hasattr
 BUILTIN_TYPER[objectmodel.r_dict] = rtype_r_dict
+BUILTIN_TYPER[objectmodel.r_ordereddict] = rtype_r_ordereddict
+BUILTIN_TYPER[collections.OrderedDict] = rtype_ordereddict
 
 # _________________________________________________________________
 # weakrefs
@@ -0,0 +1,940 @@
+from rpython.tool.pairtype import pairtype
+from rpython.flowspace.model import Constant
+from rpython.rtyper.rdict import AbstractDictRepr, AbstractDictIteratorRepr
+from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
+from rpython.rtyper.lltypesystem.rdict import (ll_hash_from_cache,
+    ll_hash_recomputed, ll_keyhash_custom, ll_keyeq_custom, recast)
+from rpython.rlib import objectmodel, jit, rgc
+from rpython.rlib.debug import ll_assert
+from rpython.rlib.rarithmetic import r_uint, intmask, LONG_BIT
+from rpython.rtyper import rmodel
+from rpython.rtyper.error import TyperError
+
+
+# ____________________________________________________________
+#
+#  Implementation of the RPython ordered dictionary, a compact layout
+#  similar to the one of rdict.py but with the entries stored densely, in
+#  insertion order, and a separate table of indexes for the hashing:
+#
+#    struct dictentry {
+#        DICTKEY key;
+#        bool f_valid;      # (optional) the entry is filled
+#        DICTVALUE value;
+#        int f_hash;        # (optional) key hash, if hard to recompute
+#    }
+#
+#    struct dicttable {
+#        int num_live_items;
+#        int num_ever_used_items;
+#        int lookup_function_no;     # one of the FUNC_* below
+#        GCREF indexes;              # array of bytes, shorts, ints or longs
+#        Array *entries;
+#        (Function DICTKEY, DICTKEY -> bool) *fnkeyeq;
+#        (Function DICTKEY -> int) *fnkeyhash;
+#    }
+#
+#  The entries 0 to num_ever_used_items-1 are either live or deleted;
+#  the others are free.  The indexes are a hash table of size 2**n in
+#  which FREE and DELETED mark the empty slots, and the other values are
+#  an entry index plus VALID_OFFSET.  The size of the items of this table
+#  is the smallest one that can store all the entry indexes.  As the
+#  table is at most 2/3 full, there are that many entries.
+#
+
+DICTINDEX_BYTE = lltype.Ptr(lltype.GcArray(rffi.UCHAR))
+DICTINDEX_SHORT = lltype.Ptr(lltype.GcArray(rffi.USHORT))
+DICTINDEX_INT = lltype.Ptr(lltype.GcArray(rffi.UINT))
+DICTINDEX_LONG = lltype.Ptr(lltype.GcArray(lltype.Unsigned))
+
+IS_64BIT = LONG_BIT == 64
+
+FUNC_BYTE, FUNC_SHORT, FUNC_INT, FUNC_LONG = range(4)
+
+FREE = 0
+DELETED = 1
+VALID_OFFSET = 2
+
+FLAG_LOOKUP = 0
+FLAG_DELETE = 1
+
+DICT_INITSIZE = 8
+
+
+class OrderedDictRepr(AbstractDictRepr):
+
+    def __init__(self, rtyper, key_repr, value_repr, dictkey, dictvalue,
+                 custom_eq_hash=None, force_non_null=False):
+        self.rtyper = rtyper
+        self.DICT = lltype.GcForwardReference()
+        self.lowleveltype = lltype.Ptr(self.DICT)
+        self.custom_eq_hash = custom_eq_hash is not None
+        if not isinstance(key_repr, rmodel.Repr):  # not computed yet, done by setup()
+            assert callable(key_repr)
+            self._key_repr_computer = key_repr
+        else:
+            self.external_key_repr, self.key_repr = self.pickkeyrepr(key_repr)
+        if not isinstance(value_repr, rmodel.Repr):  # not computed yet, done by setup()
+            assert callable(value_repr)
+            self._value_repr_computer = value_repr
+        else:
+            self.external_value_repr, self.value_repr = self.pickrepr(value_repr)
+        self.dictkey = dictkey
+        self.dictvalue = dictvalue
+        self.dict_cache = {}
+        self._custom_eq_hash_repr = custom_eq_hash
+        self.force_non_null = force_non_null
+        # setup() needs to be called to finish this initialization
+
+    def _externalvsinternal(self, rtyper, item_repr):
+        return rmodel.externalvsinternal(self.rtyper, item_repr)
+
+    def compact_repr(self):
+        return 'OrderedDictR %s %s' % (self.key_repr.compact_repr(),
+                                       self.value_repr.compact_repr())
+
+    def _setup_repr(self):
+        if 'key_repr' not in self.__dict__:
+            key_repr = self._key_repr_computer()
+            self.external_key_repr, self.key_repr = self.pickkeyrepr(key_repr)
+        if 'value_repr' not in self.__dict__:
+            self.external_value_repr, self.value_repr = self.pickrepr(self._value_repr_computer())
+        if isinstance(self.DICT, lltype.GcForwardReference):
+            self.DICTKEY = self.key_repr.lowleveltype
+            self.DICTVALUE = self.value_repr.lowleveltype
+
+            # compute the shape of the DICTENTRY structure
+            entryfields = []
+            entrymeths = {
+                'allocate': lltype.typeMethod(_ll_malloc_entries),
+                'must_clear_key':   (isinstance(self.DICTKEY, lltype.Ptr)
+                                     and self.DICTKEY._needsgc()),
+                'must_clear_value': (isinstance(self.DICTVALUE, lltype.Ptr)
+                                     and self.DICTVALUE._needsgc()),
+                }
+
+            # * the key
+            entryfields.append(("key", self.DICTKEY))
+
+            # * the entries that are not free are either live or deleted.
+            #   Unlike in rdict.py, there are no never-used entries to
+            #   distinguish, so a NULL key or value or a dummy object is
+            #   enough to mark the deleted ones.  Otherwise, we need a flag.
+            s_key   = self.dictkey.s_value
+            s_value = self.dictvalue.s_value
+            nullkeymarker = not self.key_repr.can_ll_be_null(s_key)
+            nullvaluemarker = not self.value_repr.can_ll_be_null(s_value)
+            if self.force_non_null:
+                if not nullkeymarker:
+                    rmodel.warning("%s can be null, but forcing non-null in dict key" % s_key)
+                    nullkeymarker = True
+                if not nullvaluemarker:
+                    rmodel.warning("%s can be null, but forcing non-null in dict value" % s_value)
+                    nullvaluemarker = True
+            dummykeyobj = self.key_repr.get_ll_dummyval_obj(self.rtyper,
+                                                            s_key)
+            dummyvalueobj = self.value_repr.get_ll_dummyval_obj(self.rtyper,
+                                                                s_value)
+
+            if nullkeymarker:
+                entrymeths['valid'] = ll_valid_from_key_not_null
+                entrymeths['mark_deleted'] = ll_mark_deleted_in_key_null
+                entrymeths['must_clear_key'] = False
+            elif nullvaluemarker:
+                entrymeths['valid'] = ll_valid_from_value_not_null
+                entrymeths['mark_deleted'] = ll_mark_deleted_in_value_null
+                entrymeths['must_clear_value'] = False
+            elif dummykeyobj:
+                entrymeths['dummy_obj'] = dummykeyobj
+                entrymeths['valid'] = ll_valid_from_key
+                entrymeths['mark_deleted'] = ll_mark_deleted_in_key
+                # key is overwritten by 'dummy' when entry is deleted
+                entrymeths['must_clear_key'] = False
+            elif dummyvalueobj:
+                entrymeths['dummy_obj'] = dummyvalueobj
+                entrymeths['valid'] = ll_valid_from_value
+                entrymeths['mark_deleted'] = ll_mark_deleted_in_value
+                # value is overwritten by 'dummy' when entry is deleted
+                entrymeths['must_clear_value'] = False
+            else:
+                entryfields.append(("f_valid", lltype.Bool))
+                entrymeths['valid'] = ll_valid_from_flag
+                entrymeths['mark_deleted'] = ll_mark_deleted_in_flag
+
+            # * the value
+            entryfields.append(("value", self.DICTVALUE))
+
+            # * the hash, if needed
+            if self.custom_eq_hash:
+                fasthashfn = None
+            else:
+                fasthashfn = self.key_repr.get_ll_fasthash_function()
+            if fasthashfn is None:
+                entryfields.append(("f_hash", lltype.Signed))
+                entrymeths['hash'] = ll_hash_from_cache
+            else:
+                entrymeths['hash'] = ll_hash_recomputed
+                entrymeths['fasthashfn'] = fasthashfn
+
+            # Build the lltype data structures
+            self.DICTENTRY = lltype.Struct("odictentry", *entryfields)
+            self.DICTENTRYARRAY = lltype.GcArray(self.DICTENTRY,
+                                                 adtmeths=entrymeths)
+            fields =          [ ("num_live_items", lltype.Signed),
+                                ("num_ever_used_items", lltype.Signed),
+                                ("lookup_function_no", lltype.Signed),
+                                ("indexes", llmemory.GCREF),
+                                ("entries", lltype.Ptr(self.DICTENTRYARRAY)) ]
+            if self.custom_eq_hash:
+                self.r_rdict_eqfn, self.r_rdict_hashfn = self._custom_eq_hash_repr()
+                fields.extend([ ("fnkeyeq", self.r_rdict_eqfn.lowleveltype),
+                                ("fnkeyhash", self.r_rdict_hashfn.lowleveltype) ])
+                adtmeths = {
+                    'keyhash':        ll_keyhash_custom,
+                    'keyeq':          ll_keyeq_custom,
+                    'r_rdict_eqfn':   self.r_rdict_eqfn,
+                    'r_rdict_hashfn': self.r_rdict_hashfn,
+                    'paranoia':       True,
+                    }
+            else:
+                # figure out which functions must be used to hash and compare
+                ll_keyhash = self.key_repr.get_ll_hash_function()
+                ll_keyeq = self.key_repr.get_ll_eq_function()  # can be None
+                ll_keyhash = lltype.staticAdtMethod(ll_keyhash)
+                if ll_keyeq is not None:
+                    ll_keyeq = lltype.staticAdtMethod(ll_keyeq)
+                adtmeths = {
+                    'keyhash':  ll_keyhash,
+                    'keyeq':    ll_keyeq,
+                    'paranoia': False,
+                    }
+            adtmeths['KEY']   = self.DICTKEY
+            adtmeths['VALUE'] = self.DICTVALUE
+            adtmeths['allocate'] = lltype.typeMethod(_ll_malloc_dict)
+            self.DICT.become(lltype.GcStruct("odicttable", adtmeths=adtmeths,
+                                             *fields))
+
+    def convert_const(self, dictobj):
+        from rpython.rtyper.lltypesystem import llmemory
+        # get object from bound dict methods
+        #dictobj = getattr(dictobj, '__self__', dictobj)
+        if dictobj is None:
+            return lltype.nullptr(self.DICT)
+        if not isinstance(dictobj, (dict, objectmodel.r_dict)):
+            raise TypeError("expected a dict: %r" % (dictobj,))
+        try:
+            key = Constant(dictobj)
+            return self.dict_cache[key]
+        except KeyError:
+            self.setup()
+            l_dict = ll_newdict_size(self.DICT, len(dictobj))
+            self.dict_cache[key] = l_dict
+            r_key = self.key_repr
+            if r_key.lowleveltype == llmemory.Address:
+                raise TypeError("No prebuilt dicts of address keys")
+            r_value = self.value_repr
+            if isinstance(dictobj, objectmodel.r_dict):
+                if self.r_rdict_eqfn.lowleveltype != lltype.Void:
+                    l_fn = self.r_rdict_eqfn.convert_const(dictobj.key_eq)
+                    l_dict.fnkeyeq = l_fn
+                if self.r_rdict_hashfn.lowleveltype != lltype.Void:
+                    l_fn = self.r_rdict_hashfn.convert_const(dictobj.key_hash)
+                    l_dict.fnkeyhash = l_fn
+
+                for dictkeycontainer, dictvalue in dictobj._dict.items():
+                    llkey = r_key.convert_const(dictkeycontainer.key)
+                    llvalue = r_value.convert_const(dictvalue)
+                    _ll_dict_insert_new(l_dict, llkey, llvalue,
+                                        dictkeycontainer.hash)
+                return l_dict
+
+            else:
+                for dictkey, dictvalue in dictobj.items():
+                    llkey = r_key.convert_const(dictkey)
+                    llvalue = r_value.convert_const(dictvalue)
+                    _ll_dict_insert_new(l_dict, llkey, llvalue,
+                                        l_dict.keyhash(llkey))
+                return l_dict
+
+    def rtype_len(self, hop):
+        v_dict, = hop.inputargs(self)
+        return hop.gendirectcall(ll_dict_len, v_dict)
+
+    def rtype_is_true(self, hop):
+        v_dict, = hop.inputargs(self)
+        return hop.gendirectcall(ll_dict_is_true, v_dict)
+
+    def make_iterator_repr(self, *variant):
+        return OrderedDictIteratorRepr(self, *variant)
+
+    def rtype_method_get(self, hop):
+        v_dict, v_key, v_default = hop.inputargs(self, self.key_repr,
+                                                 self.value_repr)
+        hop.exception_cannot_occur()
+        v_res = hop.gendirectcall(ll_get, v_dict, v_key, v_default)
+        return self.recast_value(hop.llops, v_res)
+
+    def rtype_method_setdefault(self, hop):
+        v_dict, v_key, v_default = hop.inputargs(self, self.key_repr,
+                                                 self.value_repr)
+        hop.exception_cannot_occur()
+        v_res = hop.gendirectcall(ll_setdefault, v_dict, v_key, v_default)
+        return self.recast_value(hop.llops, v_res)
+
+    def rtype_method_copy(self, hop):
+        v_dict, = hop.inputargs(self)
+        hop.exception_cannot_occur()
+        return hop.gendirectcall(ll_copy, v_dict)
+
+    def rtype_method_update(self, hop):
+        v_dic1, v_dic2 = hop.inputargs(self, self)
+        hop.exception_cannot_occur()
+        return hop.gendirectcall(ll_update, v_dic1, v_dic2)
+
+    def _rtype_method_kvi(self, hop, ll_func):
+        v_dic, = hop.inputargs(self)
+        r_list = hop.r_result
+        cLIST = hop.inputconst(lltype.Void, r_list.lowleveltype.TO)
+        hop.exception_cannot_occur()
+        return hop.gendirectcall(ll_func, cLIST, v_dic)
+
+    def rtype_method_keys(self, hop):
+        return self._rtype_method_kvi(hop, ll_dict_keys)
+
+    def rtype_method_values(self, hop):
+        return self._rtype_method_kvi(hop, ll_dict_values)
+
+    def rtype_method_items(self, hop):
+        return self._rtype_method_kvi(hop, ll_dict_items)
+
+    def rtype_method_iterkeys(self, hop):
+        hop.exception_cannot_occur()
+        return OrderedDictIteratorRepr(self, "keys").newiter(hop)
+
+    def rtype_method_itervalues(self, hop):
+        hop.exception_cannot_occur()
+        return OrderedDictIteratorRepr(self, "values").newiter(hop)
+
+    def rtype_method_iteritems(self, hop):
+        hop.exception_cannot_occur()
+        return OrderedDictIteratorRepr(self, "items").newiter(hop)
+
+    def rtype_method_clear(self, hop):
+        v_dict, = hop.inputargs(self)
+        hop.exception_cannot_occur()
+        return hop.gendirectcall(ll_clear, v_dict)
+
+    def rtype_method_popitem(self, hop):
+        v_dict, = hop.inputargs(self)
+        r_tuple = hop.r_result
+        cTUPLE = hop.inputconst(lltype.Void, r_tuple.lowleveltype)
+        hop.exception_is_here()
+        return hop.gendirectcall(ll_popitem, cTUPLE, v_dict)
+
+    def rtype_method_pop(self, hop):
+        if hop.nb_args == 2:
+            v_args = hop.inputargs(self, self.key_repr)
+            target = ll_pop
+        elif hop.nb_args == 3:
+            v_args = hop.inputargs(self, self.key_repr, self.value_repr)
+            target = ll_pop_default
+        hop.exception_is_here()
+        v_res = hop.gendirectcall(target, *v_args)
+        return self.recast_value(hop.llops, v_res)
+
+class __extend__(pairtype(OrderedDictRepr, rmodel.Repr)):
+
+    def rtype_getitem((r_dict, r_key), hop):
+        v_dict, v_key = hop.inputargs(r_dict, r_dict.key_repr)
+        if not r_dict.custom_eq_hash:
+            hop.has_implicit_exception(KeyError)   # record that we know about it
+        hop.exception_is_here()
+        v_res = hop.gendirectcall(ll_dict_getitem, v_dict, v_key)
+        return r_dict.recast_value(hop.llops, v_res)
+
+    def rtype_delitem((r_dict, r_key), hop):
+        v_dict, v_key = hop.inputargs(r_dict, r_dict.key_repr)
+        if not r_dict.custom_eq_hash:
+            hop.has_implicit_exception(KeyError)   # record that we know about it
+        hop.exception_is_here()
+        return hop.gendirectcall(ll_dict_delitem, v_dict, v_key)
+
+    def rtype_setitem((r_dict, r_key), hop):
+        v_dict, v_key, v_value = hop.inputargs(r_dict, r_dict.key_repr, r_dict.value_repr)
+        if r_dict.custom_eq_hash:
+            hop.exception_is_here()
+        else:
+            hop.exception_cannot_occur()
+        hop.gendirectcall(ll_dict_setitem, v_dict, v_key, v_value)
+
+    def rtype_contains((r_dict, r_key), hop):
+        v_dict, v_key = hop.inputargs(r_dict, r_dict.key_repr)
+        hop.exception_is_here()
+        return hop.gendirectcall(ll_contains, v_dict, v_key)
+
+class __extend__(pairtype(OrderedDictRepr, OrderedDictRepr)):
+    def convert_from_to((r_dict1, r_dict2), v, llops):
+        # check that we don't convert from Dicts with
+        # different key/value types
+        if r_dict1.dictkey is None or r_dict2.dictkey is None:
+            return NotImplemented
+        if r_dict1.dictkey is not r_dict2.dictkey:
+            return NotImplemented
+        if r_dict1.dictvalue is None or r_dict2.dictvalue is None:
+            return NotImplemented
+        if r_dict1.dictvalue is not r_dict2.dictvalue:
+            return NotImplemented
+        return v
+
+# ____________________________________________________________
+#
+#  Low-level methods.  These can be run for testing, but are meant to
+#  be direct_call'ed from rtyped flow graphs, which means that they will
+#  get flowed and annotated, mostly with SomePtr.
+
+def ll_valid_from_flag(entries, i):
+    return entries[i].f_valid
+
+def ll_mark_deleted_in_flag(entries, i):
+    entries[i].f_valid = False
+
+def ll_valid_from_key_not_null(entries, i):
+    return bool(entries[i].key)
+
+def ll_mark_deleted_in_key_null(entries, i):
+    ENTRY = lltype.typeOf(entries).TO.OF
+    entries[i].key = lltype.nullptr(ENTRY.key.TO)
+
+def ll_valid_from_value_not_null(entries, i):
+    return bool(entries[i].value)
+
+def ll_mark_deleted_in_value_null(entries, i):
+    ENTRY = lltype.typeOf(entries).TO.OF
+    entries[i].value = lltype.nullptr(ENTRY.value.TO)
+
+def ll_valid_from_key(entries, i):
+    ENTRIES = lltype.typeOf(entries).TO
+    dummy = ENTRIES.dummy_obj.ll_dummy_value
+    return entries[i].key != dummy
+
+def ll_mark_deleted_in_key(entries, i):
+    ENTRIES = lltype.typeOf(entries).TO
+    dummy = ENTRIES.dummy_obj.ll_dummy_value
+    entries[i].key = dummy
+
+def ll_valid_from_value(entries, i):
+    ENTRIES = lltype.typeOf(entries).TO
+    dummy = ENTRIES.dummy_obj.ll_dummy_value
+    return entries[i].value != dummy
+
+def ll_mark_deleted_in_value(entries, i):
+    ENTRIES = lltype.typeOf(entries).TO
+    dummy = ENTRIES.dummy_obj.ll_dummy_value
+    entries[i].value = dummy
+
+def ll_dict_len(d):
+    return d.num_live_items
+
+def ll_dict_is_true(d):
+    # check if a dict is True, allowing for None
+    return bool(d) and d.num_live_items != 0
+
+def ll_dict_getitem(d, key):
+    index = ll_call_lookup_function(d, key, d.keyhash(key), FLAG_LOOKUP)
+    if index >= 0:
+        return d.entries[index].value
+    else:
+        raise KeyError
+
+def ll_dict_setitem(d, key, value):
+    hash = d.keyhash(key)
+    index = ll_call_lookup_function(d, key, hash, FLAG_LOOKUP)
+    return _ll_dict_setitem_lookup_done(d, key, value, hash, index)
+
+@jit.look_inside_iff(lambda d, key, value, hash, i: jit.isvirtual(d) and jit.isconstant(key))
+def _ll_dict_setitem_lookup_done(d, key, value, hash, i):
+    if i >= 0:
+        d.entries[i].value = value
+    else:
+        if len(d.entries) == d.num_ever_used_items:
+            # if needed, resize the dict -- before the insertion
+            ll_dict_resize(d)
+        _ll_dict_insert_new(d, key, value, hash)
+
+def _ll_dict_insert_new(d, key, value, hash):
+    # Internal routine used to insert an item which is known to be
+    # absent from the dict, when there is room for one more entry.
+    # It never calls d.keyhash() and d.keyeq(), so it cannot call back
+    # to user code.
+    index = d.num_ever_used_items
+    ll_assert(index < len(d.entries), "no room for a new entry")
+    ENTRY = lltype.typeOf(d.entries).TO.OF
+    entry = d.entries[index]
+    entry.key = key
+    entry.value = value
+    if hasattr(ENTRY, 'f_hash'):  entry.f_hash = hash
+    if hasattr(ENTRY, 'f_valid'): entry.f_valid = True
+    ll_call_insert_clean_function(d, hash, index)
+    d.num_ever_used_items = index + 1
+    d.num_live_items += 1
+
+def ll_dict_delitem(d, key):
+    index = ll_call_lookup_function(d, key, d.keyhash(key), FLAG_DELETE)
+    if index < 0:
+        raise KeyError
+    _ll_dict_del(d, index)
+
+@jit.look_inside_iff(lambda d, i: jit.isvirtual(d) and jit.isconstant(i))
+def _ll_dict_del(d, index):
+    # the slot of the index was already marked as DELETED
+    d.entries.mark_deleted(index)
+    d.num_live_items -= 1
+    # clear the key and the value if they are GC pointers
+    ENTRIES = lltype.typeOf(d.entries).TO
+    ENTRY = ENTRIES.OF
+    entry = d.entries[index]
+    if ENTRIES.must_clear_key:
+        entry.key = lltype.nullptr(ENTRY.key.TO)
+    if ENTRIES.must_clear_value:
+        entry.value = lltype.nullptr(ENTRY.value.TO)
+    #
+    # if we deleted the last entries, they are free again; this makes
+    # a series of popitem() cheap
+    if index == d.num_ever_used_items - 1:
+        while index > 0 and not d.entries.valid(index - 1):
+            index -= 1
+        d.num_ever_used_items = index
+    #
+    # Like rdict.py and CPython, we don't shrink the dictionary here.
+    # The deleted entries are removed the next time the entries are full.
+
+def ll_dict_resize(d):
+    # Make room for at least one more entry.  The live entries are
+    # moved, in order, to a new array of entries, forgetting the deleted
+    # ones; it has room for about as many new entries, unless there
+    # were a lot of deleted entries, in which case the dict may shrink.
+    num_items = d.num_live_items
+    new_size = DICT_INITSIZE
+    while _ll_entries_for_size(new_size) <= num_items * 2:
+        new_size *= 2
+    _ll_dict_rebuild(d, new_size)
+ll_dict_resize.oopspec = 'odict.resize(d)'
+
+def _ll_entries_for_size(size):
+    # the index table of this size is at most 2/3 full
+    return (size * 2) // 3
+
+def _ll_dict_rebuild(d, new_size):
+    old_entries = d.entries
+    num_items = d.num_live_items
+    new_entries = lltype.typeOf(old_entries).TO.allocate(
+        _ll_entries_for_size(new_size))
+    if num_items == d.num_ever_used_items:
+        rgc.ll_arraycopy(old_entries, new_entries, 0, 0, num_items)
+    else:
+        i = 0
+        j = 0
+        while j < num_items:
+            if old_entries.valid(i):
+                rgc.copy_struct_item(old_entries, new_entries, i, j)
+                j += 1
+            i += 1
+    d.entries = new_entries
+    d.num_ever_used_items = num_items
+    ll_dict_reindex(d, new_size)
+
+def ll_dict_reindex(d, new_size):
+    ll_malloc_indexes_and_choose_lookup(d, new_size)
+    entries = d.entries
+    i = 0
+    while i < d.num_ever_used_items:
+        ll_call_insert_clean_function(d, entries.hash(i), i)
+        i += 1
+
+def ll_malloc_indexes_and_choose_lookup(d, n):
+    # the largest index stored is _ll_entries_for_size(n) - 1 + VALID_OFFSET
+    if n <= 256:
+        d.indexes = lltype.cast_opaque_ptr(llmemory.GCREF,
+                        lltype.malloc(DICTINDEX_BYTE.TO, n, zero=True))
+        d.lookup_function_no = FUNC_BYTE
+    elif n <= 65536:
+        d.indexes = lltype.cast_opaque_ptr(llmemory.GCREF,
+                        lltype.malloc(DICTINDEX_SHORT.TO, n, zero=True))
+        d.lookup_function_no = FUNC_SHORT
+    elif IS_64BIT and n <= 2 ** 32:
+        d.indexes = lltype.cast_opaque_ptr(llmemory.GCREF,
+                        lltype.malloc(DICTINDEX_INT.TO, n, zero=True))
+        d.lookup_function_no = FUNC_INT
+    else:
+        d.indexes = lltype.cast_opaque_ptr(llmemory.GCREF,
+                        lltype.malloc(DICTINDEX_LONG.TO, n, zero=True))
+        d.lookup_function_no = FUNC_LONG
+
+def ll_call_lookup_function(d, key, hash, flag):
+    fun = d.lookup_function_no
+    if fun == FUNC_BYTE:
+        return ll_dict_lookup(d, key, hash, flag, DICTINDEX_BYTE)
+    elif fun == FUNC_SHORT:
+        return ll_dict_lookup(d, key, hash, flag, DICTINDEX_SHORT)
+    elif IS_64BIT and fun == FUNC_INT:
+        return ll_dict_lookup(d, key, hash, flag, DICTINDEX_INT)
+    else:
+        ll_assert(fun == FUNC_LONG, "bad lookup_function_no")
+        return ll_dict_lookup(d, key, hash, flag, DICTINDEX_LONG)
+
+def ll_call_insert_clean_function(d, hash, i):
+    fun = d.lookup_function_no
+    if fun == FUNC_BYTE:
+        ll_dict_store_clean(d, hash, i, DICTINDEX_BYTE)
+    elif fun == FUNC_SHORT:
+        ll_dict_store_clean(d, hash, i, DICTINDEX_SHORT)
+    elif IS_64BIT and fun == FUNC_INT:
+        ll_dict_store_clean(d, hash, i, DICTINDEX_INT)
+    else:
+        ll_assert(fun == FUNC_LONG, "bad lookup_function_no")
+        ll_dict_store_clean(d, hash, i, DICTINDEX_LONG)
+
+def ll_call_delete_by_entry_index(d, hash, i):
+    fun = d.lookup_function_no
+    if fun == FUNC_BYTE:
+        ll_dict_delete_by_entry_index(d, hash, i, DICTINDEX_BYTE)
+    elif fun == FUNC_SHORT:
+        ll_dict_delete_by_entry_index(d, hash, i, DICTINDEX_SHORT)
+    elif IS_64BIT and fun == FUNC_INT:
+        ll_dict_delete_by_entry_index(d, hash, i, DICTINDEX_INT)
+    else:
+        ll_assert(fun == FUNC_LONG, "bad lookup_function_no")
+        ll_dict_delete_by_entry_index(d, hash, i, DICTINDEX_LONG)
+
+# ------- a port of CPython's dictobject.c's lookdict implementation -------
+PERTURB_SHIFT = 5
+
+@jit.look_inside_iff(lambda d, key, hash, flag, T:
+                     jit.isvirtual(d) and jit.isconstant(key))
+def ll_dict_lookup(d, key, hash, flag, T):
+    # Return the index of the entry of 'key', or -1.  With FLAG_DELETE,
+    # the slot of the entry found in the indexes is marked as DELETED.
+    entries = d.entries
+    indexes = lltype.cast_opaque_ptr(T, d.indexes)
+    ENTRIES = lltype.typeOf(entries).TO
+    direct_compare = not hasattr(ENTRIES, 'no_direct_compare')
+    mask = len(indexes) - 1
+    i = r_uint(hash & mask)
+    perturb = r_uint(hash)
+    while True:
+        index = rffi.cast(lltype.Signed, indexes[intmask(i)])
+        if index >= VALID_OFFSET:
+            index -= VALID_OFFSET
+            checkingkey = entries[index].key
+            if direct_compare and checkingkey == key:
+                found = True
+            elif d.keyeq is not None and entries.hash(index) == hash:
+                # correct hash, maybe the key is e.g. a different pointer
+                # to an equal object
+                found = d.keyeq(checkingkey, key)
+                if d.paranoia:
+                    if (entries != d.entries or
+                        lltype.cast_opaque_ptr(T, d.indexes) != indexes or
+                        not entries.valid(index) or
+                        entries[index].key != checkingkey):
+                        # the compare did major nasty stuff to the dict:
+                        # start over
+                        return ll_call_lookup_function(d, key, hash, flag)
+            else:
+                found = False
+            if found:
+                if flag == FLAG_DELETE:
+                    indexes[intmask(i)] = rffi.cast(T.TO.OF, DELETED)
+                return index
+        elif index == FREE:
+            return -1
+        # compute the next index using unsigned arithmetic
+        i = (i << 2) + i + perturb + 1
+        i = i & mask
+        perturb >>= PERTURB_SHIFT
+
+def ll_dict_store_clean(d, hash, index, T):
+    # Store 'index' in the first empty slot (FREE or DELETED) for the
+    # given hash.  The key must not be in the dict already.
+    indexes = lltype.cast_opaque_ptr(T, d.indexes)
+    mask = len(indexes) - 1
+    i = r_uint(hash & mask)
+    perturb = r_uint(hash)
+    while rffi.cast(lltype.Signed, indexes[intmask(i)]) >= VALID_OFFSET:
+        i = (i << 2) + i + perturb + 1
+        i = i & mask
+        perturb >>= PERTURB_SHIFT
+    indexes[intmask(i)] = rffi.cast(T.TO.OF, index + VALID_OFFSET)
+
+def ll_dict_delete_by_entry_index(d, hash, index, T):
+    # Mark as DELETED the slot that contains 'index', without comparing
+    # any key.
+    indexes = lltype.cast_opaque_ptr(T, d.indexes)
+    mask = len(indexes) - 1
+    i = r_uint(hash & mask)
+    perturb = r_uint(hash)
+    index += VALID_OFFSET
+    while rffi.cast(lltype.Signed, indexes[intmask(i)]) != index:
+        i = (i << 2) + i + perturb + 1
+        i = i & mask
+        perturb >>= PERTURB_SHIFT
+    indexes[intmask(i)] = rffi.cast(T.TO.OF, DELETED)
+
+# ____________________________________________________________
+#
+#  Irregular operations.
+
+def ll_newdict(DICT):
+    d = DICT.allocate()
+    d.entries = DICT.entries.TO.allocate(_ll_entries_for_size(DICT_INITSIZE))
+    ll_malloc_indexes_and_choose_lookup(d, DICT_INITSIZE)
+    d.num_live_items = 0
+    d.num_ever_used_items = 0
+    return d
+
+def ll_newdict_size(DICT, length_estimate):
+    n = DICT_INITSIZE
+    while _ll_entries_for_size(n) < length_estimate:
+        n *= 2
+    d = DICT.allocate()
+    d.entries = DICT.entries.TO.allocate(_ll_entries_for_size(n))
+    ll_malloc_indexes_and_choose_lookup(d, n)
+    d.num_live_items = 0
+    d.num_ever_used_items = 0
+    return d
+
+def _ll_malloc_dict(DICT):
+    return lltype.malloc(DICT)
+def _ll_malloc_entries(ENTRIES, n):
+    return lltype.malloc(ENTRIES, n, zero=True)
+
+
+def rtype_r_ordereddict(hop, i_force_non_null=None):
+    r_dict = hop.r_result
+    if not r_dict.custom_eq_hash:
+        raise TyperError("r_ordereddict() call does not return an "
+                         "r_ordereddict instance")
+    v_eqfn = hop.inputarg(r_dict.r_rdict_eqfn, arg=0)
+    v_hashfn = hop.inputarg(r_dict.r_rdict_hashfn, arg=1)
+    if i_force_non_null is not None:
+        assert i_force_non_null == 2
+        hop.inputarg(lltype.Void, arg=2)
+    cDICT = hop.inputconst(lltype.Void, r_dict.DICT)
+    hop.exception_cannot_occur()
+    v_result = hop.gendirectcall(ll_newdict, cDICT)
+    if r_dict.r_rdict_eqfn.lowleveltype != lltype.Void:
+        cname = hop.inputconst(lltype.Void, 'fnkeyeq')
+        hop.genop('setfield', [v_result, cname, v_eqfn])
+    if r_dict.r_rdict_hashfn.lowleveltype != lltype.Void:
+        cname = hop.inputconst(lltype.Void, 'fnkeyhash')
+        hop.genop('setfield', [v_result, cname, v_hashfn])
+    return v_result
+
+def rtype_ordereddict(hop):
+    hop.inputargs()    # no arguments expected
+    r_dict = hop.r_result
+    cDICT = hop.inputconst(lltype.Void, r_dict.DICT)
+    hop.exception_cannot_occur()
+    return hop.gendirectcall(ll_newdict, cDICT)
+
+# ____________________________________________________________
+#
+#  Iteration.
+
+class OrderedDictIteratorRepr(AbstractDictIteratorRepr):
+
+    def __init__(self, r_dict, variant="keys"):
+        self.r_dict = r_dict
+        self.variant = variant
+        self.lowleveltype = lltype.Ptr(lltype.GcStruct('odictiter',
+                                         ('dict', r_dict.lowleveltype),
+                                         ('index', lltype.Signed)))
+        self.ll_dictiter = ll_dictiter
+        self.ll_dictnext = ll_dictnext_group[variant]
+
+
+def ll_dictiter(ITERPTR, d):
+    iter = lltype.malloc(ITERPTR.TO)
+    iter.dict = d
+    iter.index = 0
+    return iter
+
+def _make_ll_dictnext(kind):
+    # make three versions of the following function: keys, values, items
+    @jit.look_inside_iff(lambda RETURNTYPE, iter: jit.isvirtual(iter)
+                         and (iter.dict is None or
+                              jit.isvirtual(iter.dict)))
+    def ll_dictnext(RETURNTYPE, iter):
+        # note that RETURNTYPE is None for keys and values
+        dict = iter.dict
+        if dict:
+            entries = dict.entries
+            index = iter.index
+            assert index >= 0
+            entries_len = dict.num_ever_used_items
+            while index < entries_len:
+                entry = entries[index]
+                is_valid = entries.valid(index)
+                index = index + 1
+                if is_valid:
+                    iter.index = index
+                    if RETURNTYPE is lltype.Void:
+                        return None
+                    elif kind == 'items':
+                        r = lltype.malloc(RETURNTYPE.TO)
+                        r.item0 = recast(RETURNTYPE.TO.item0, entry.key)
+                        r.item1 = recast(RETURNTYPE.TO.item1, entry.value)
+                        return r
+                    elif kind == 'keys':
+                        return entry.key
+                    elif kind == 'values':
+                        return entry.value
+            # clear the reference to the dict and prevent restarts
+            iter.dict = lltype.nullptr(lltype.typeOf(iter).TO.dict.TO)
+        raise StopIteration
+    return ll_dictnext
+
+ll_dictnext_group = {'keys'  : _make_ll_dictnext('keys'),
+                     'values': _make_ll_dictnext('values'),
+                     'items' : _make_ll_dictnext('items')}
+
+# _____________________________________________________________
+# methods
+
+def ll_get(dict, key, default):
+    index = ll_call_lookup_function(dict, key, dict.keyhash(key), FLAG_LOOKUP)
+    if index >= 0:
+        return dict.entries[index].value
+    else:
+        return default
+
+def ll_setdefault(dict, key, default):
+    hash = dict.keyhash(key)
+    index = ll_call_lookup_function(dict, key, hash, FLAG_LOOKUP)
+    if index >= 0:
+        return dict.entries[index].value
+    else:
+        _ll_dict_setitem_lookup_done(dict, key, default, hash, index)
+        return default
+
+def ll_copy(dict):
+    DICT = lltype.typeOf(dict).TO
+    d = DICT.allocate()
+    d.entries = DICT.entries.TO.allocate(len(dict.entries))
+    rgc.ll_arraycopy(dict.entries, d.entries, 0, 0,
+                     dict.num_ever_used_items)
+    d.num_live_items = dict.num_live_items
+    d.num_ever_used_items = dict.num_ever_used_items
+    if hasattr(DICT, 'fnkeyeq'):   d.fnkeyeq   = dict.fnkeyeq
+    if hasattr(DICT, 'fnkeyhash'): d.fnkeyhash = dict.fnkeyhash
+    ll_dict_reindex(d, _ll_index_size(dict))
+    return d
+ll_copy.oopspec = 'odict.copy(dict)'
+
+def _ll_index_size(d):
+    fun = d.lookup_function_no
+    if fun == FUNC_BYTE:
+        return len(lltype.cast_opaque_ptr(DICTINDEX_BYTE, d.indexes))
+    elif fun == FUNC_SHORT:
+        return len(lltype.cast_opaque_ptr(DICTINDEX_SHORT, d.indexes))
+    elif IS_64BIT and fun == FUNC_INT:
+        return len(lltype.cast_opaque_ptr(DICTINDEX_INT, d.indexes))
+    else:
+        return len(lltype.cast_opaque_ptr(DICTINDEX_LONG, d.indexes))
+
+def ll_clear(d):
+    if (d.num_ever_used_items == 0 and
+            len(d.entries) == _ll_entries_for_size(DICT_INITSIZE)):
+        return
+    DICT = lltype.typeOf(d).TO
+    d.entries = DICT.entries.TO.allocate(_ll_entries_for_size(DICT_INITSIZE))
+    ll_malloc_indexes_and_choose_lookup(d, DICT_INITSIZE)
+    d.num_live_items = 0
+    d.num_ever_used_items = 0
+ll_clear.oopspec = 'odict.clear(d)'
+
+def ll_update(dic1, dic2):
+    entries = dic2.entries
+    d2len = dic2.num_ever_used_items
+    i = 0
+    while i < d2len:
+        if entries.valid(i):
+            entry = entries[i]
+            hash = entries.hash(i)
+            key = entry.key
+            value = entry.value
+            j = ll_call_lookup_function(dic1, key, hash, FLAG_LOOKUP)
+            _ll_dict_setitem_lookup_done(dic1, key, value, hash, j)
+        i += 1
+ll_update.oopspec = 'odict.update(dic1, dic2)'
+
+# this is an implementation of keys(), values() and items()
+# in a single function.
+# note that by specialization on func, three different
+# and very efficient functions are created.
+
+def _make_ll_keys_values_items(kind):
+    def ll_kvi(LIST, dic):
+        res = LIST.ll_newlist(dic.num_live_items)
+        entries = dic.entries
+        dlen = dic.num_ever_used_items
+        items = res.ll_items()
+        i = 0
+        p = 0
+        while i < dlen:
+            if entries.valid(i):
+                ELEM = lltype.typeOf(items).TO.OF
+                if ELEM is not lltype.Void:
+                    entry = entries[i]
+                    if kind == 'items':
+                        r = lltype.malloc(ELEM.TO)
+                        r.item0 = recast(ELEM.TO.item0, entry.key)
+                        r.item1 = recast(ELEM.TO.item1, entry.value)
+                        items[p] = r
+                    elif kind == 'keys':
+                        items[p] = recast(ELEM, entry.key)
+                    elif kind == 'values':
+                        items[p] = recast(ELEM, entry.value)
+                p += 1
+            i += 1
+        assert p == res.ll_length()
+        return res
+    ll_kvi.oopspec = 'odict.%s(dic)' % kind
+    return ll_kvi
+
+ll_dict_keys   = _make_ll_keys_values_items('keys')
+ll_dict_values = _make_ll_keys_values_items('values')
+ll_dict_items  = _make_ll_keys_values_items('items')
+
+def ll_contains(d, key):
+    index = ll_call_lookup_function(d, key, d.keyhash(key), FLAG_LOOKUP)
+    return index >= 0
+
+def ll_popitem(ELEM, dic):
+    # like OrderedDict.popitem(), remove the last item
+    i = dic.num_ever_used_items - 1
+    if i < 0:
+        raise KeyError
+    entries = dic.entries
+    ll_assert(entries.valid(i), "the last entry is not valid")
+    entry = entries[i]
+    r = lltype.malloc(ELEM.TO)
+    r.item0 = recast(ELEM.TO.item0, entry.key)
+    r.item1 = recast(ELEM.TO.item1, entry.value)
+    ll_call_delete_by_entry_index(dic, entries.hash(i), i)
+    _ll_dict_del(dic, i)
+    return r
+
+def ll_pop(dic, key):
+    index = ll_call_lookup_function(dic, key, dic.keyhash(key), FLAG_DELETE)
+    if index < 0:
+        raise KeyError
+    value = dic.entries[index].value
+    _ll_dict_del(dic, index)
+    return value
+
+def ll_pop_default(dic, key, dfl):
+    try:
+        return ll_pop(dic, key)
+    except KeyError:
+        return dfl
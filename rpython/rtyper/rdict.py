@@ -28,6 +28,27 @@ class __extend__(annmodel.SomeDict):
         self.dictdef.dictvalue.dont_change_any_more = True
         return (self.__class__, self.dictdef.dictkey, self.dictdef.dictvalue)
 
+class __extend__(annmodel.SomeOrderedDict):
+    def rtyper_makerepr(self, rtyper):
+        from rpython.rtyper.lltypesystem.rordereddict import OrderedDictRepr
+        dictkey   = self.dictdef.dictkey
+        dictvalue = self.dictdef.dictvalue
+        s_key     = dictkey  .s_value
+        s_value   = dictvalue.s_value
+        force_non_null = self.dictdef.force_non_null
+        if dictkey.custom_eq_hash:
+            custom_eq_hash = lambda: (rtyper.getrepr(dictkey.s_rdict_eqfn),
+                                      rtyper.getrepr(dictkey.s_rdict_hashfn))
+        else:
+            custom_eq_hash = None
+        return OrderedDictRepr(rtyper,
+                               lambda: rtyper.getrepr(s_key),
+                               lambda: rtyper.getrepr(s_value),
+                               dictkey,
+                               dictvalue,
+                               custom_eq_hash,
+                               force_non_null)
+
 
 
 class AbstractDictRepr(rmodel.Repr):
@@ -0,0 +1,335 @@
+from collections import OrderedDict
+
+import py
+
+from rpython.rtyper.lltypesystem import lltype, rffi
+from rpython.rtyper import rint
+from rpython.rtyper.lltypesystem import rordereddict
+from rpython.rtyper.test.tool import BaseRtypingTest
+from rpython.rtyper.test.test_rdict import not_really_random
+from rpython.rlib.objectmodel import r_ordereddict
+
+
+def get_indexes(ll_d):
+    T = [rordereddict.DICTINDEX_BYTE, rordereddict.DICTINDEX_SHORT,
+         rordereddict.DICTINDEX_INT,
+         rordereddict.DICTINDEX_LONG][ll_d.lookup_function_no]
+    return lltype.cast_opaque_ptr(T, ll_d.indexes)
+
+def count_items(ll_d, ITEM):
+    c = 0
+    indexes = get_indexes(ll_d)
+    for i in range(len(indexes)):
+        if rffi.cast(lltype.Signed, indexes[i]) == ITEM:
+            c += 1
+    return c
+
+
+class TestRordereddict(BaseRtypingTest):
+
+    def test_dict_creation(self):
+        def func(i):
+            d = OrderedDict()
+            d['hello'] = i
+            return d['hello']
+        res = self.interpret(func, [42])
+        assert res == 42
+
+    def test_dict_getitem_setitem_delitem(self):
+        def func(i):
+            d = OrderedDict()
+            d['hello'] = i
+            d['world'] = i + 1
+            del d['hello']
+            try:
+                d['hello']
+            except KeyError:
+                pass
+            else:
+                return -1
+            return d['world'] * len(d)
+        res = self.interpret(func, [6])
+        assert res == 7
+
+    def test_insertion_order(self):
+        def func(n):
+            d = OrderedDict()
+            for i in range(n):
+                d[(i * 7) % n] = i
+            del d[3]
+            d[3] = 100     # goes at the end
+            d[0] = 42      # keeps its position
+            total = 0
+            for key, value in d.iteritems():
+                total = total * 13 + key
+            return total
+        n = 11
+        expected = 0
+        keys = [(i * 7) % n for i in range(n)]
+        keys.remove(3)
+        keys.append(3)
+        for key in keys:
+            expected = expected * 13 + key
+        res = self.interpret(func, [n])
+        assert res == expected
+
+    def test_keys_values_items(self):
+        def func(n):
+            d = OrderedDict()
+            for i in range(n, 0, -1):
+                d[i] = i * 10
+            del d[n - 1]
+            keys = d.keys()
+            values = d.values()
+            items = d.items()
+            assert len(keys) == len(values) == len(items) == n - 1
+            for i in range(n - 1):
+                assert keys[i] * 10 == values[i]
+                assert items[i][0] == keys[i]
+                assert items[i][1] == values[i]
+            return keys[0] * 1000 + keys[1] * 10 + keys[-1]
+        res = self.interpret(func, [10])
+        assert res == 10000 + 80 + 1
+
+    def test_many_items(self):
+        # grows the index table from bytes to shorts
+        def func(n):
+            d = OrderedDict()
+            for i in range(n):
+                d[i] = i + 1
+            for i in range(0, n, 2):
+                del d[i]
+            total = 0
+            for key in d:
+                assert d[key] == key + 1
+                total += key
+            return total
+        res = self.interpret(func, [600])
+        assert res == sum(range(1, 600, 2))
+
+    def test_popitem(self):
+        def func():
+            d = OrderedDict()
+            d[5] = 2
+            d[6] = 3
+            d[7] = 4
+            k1, v1 = d.popitem()
+            k2, v2 = d.popitem()
+            d[8] = 5
+            k3, v3 = d.popitem()
+            assert len(d) == 1
+            try:
+                d.popitem()
+                d.popitem()
+            except KeyError:
+                pass
+            else:
+                return -1
+            return k1 * 100000 + k2 * 1000 + k3 * 10 + len(d)
+        res = self.interpret(func, [])
+        assert res == 7 * 100000 + 6 * 1000 + 8 * 10 + 0
+
+    def test_pop_get_setdefault_contains(self):
+        def func(n):
+            d = OrderedDict()
+            d[1] = 10
+            d[2] = 20
+            a = d.pop(1)
+            b = d.pop(5, -1)
+            c = d.get(2, -2)
+            e = d.setdefault(3, 30)
+            f = d.setdefault(3, 31)
+            return (a + b + c + e + f) * 10 + (n in d)
+        res = self.interpret(func, [3])
+        assert res == (10 - 1 + 20 + 30 + 30) * 10 + 1
+
+    def test_copy_clear_update(self):
+        def func():
+            d = OrderedDict()
+            for i in range(5):
+                d[i] = i
+            d2 = d.copy()
+            del d[0]
+            d2[10] = 10
+            d3 = OrderedDict()
+            d3[42] = 0
+            d3.update(d2)
+            d.clear()
+            d[7] = 7
+            res = 0
+            for key in d3:
+                res = res * 100 + key
+            return res * 10 + len(d)
+        res = self.interpret(func, [])
+        assert res == 42000102030410 * 10 + 1
+
+    def test_prebuilt(self):
+        d = OrderedDict()
+        d[5] = 1
+        d[3] = 2
+        d[4] = 3
+        def func(k):
+            total = 0
+            for key in d:
+                total = total * 10 + key
+            return total * 10 + d[k]
+        res = self.interpret(func, [3])
+        assert res == 5342
+
+    def test_r_ordereddict(self):
+        def myeq(n, m):
+            return n % 10 == m % 10
+        def myhash(n):
+            return n % 10
+        d = r_ordereddict(myeq, myhash)
+        d[3] = 3
+        def func(n):
+            d1 = r_ordereddict(myeq, myhash)
+            d1[n] = 1
+            d1[n + 20] = 2
+            d[n] = 4
+            total = 0
+            for key in d:
+                total = total * 10 + key
+            return total * 100 + d1[n] * 10 + len(d1)
+        res = self.interpret(func, [5])
+        assert res == 35 * 100 + 2 * 10 + 1
+
+    def test_resize_during_iteration(self):
+        def func():
+            d = OrderedDict()
+            d[5] = 1
+            d[6] = 2
+            d[7] = 3
+            for key, value in d.iteritems():
+                d[key ^ 16] = value * 2
+                if len(d) > 100:
+                    break
+            total = 0
+            for key in d:
+                total += key
+            return total
+        res = self.interpret(func, [])
+        assert 5 + 6 + 7 <= res
+
+    def test_deleted_flag(self):
+        # keys and values that can be None: no NULL marker for deletions
+        def func(n):
+            d = OrderedDict()
+            for i in range(n):
+                if i == 3:
+                    d[None] = None
+                else:
+                    d[str(i)] = str(i)
+            del d[None]
+            del d['1']
+            d[None] = 'x'
+            res = ''
+            for key, value in d.iteritems():
+                res += '%s:%s,' % (key, value)
+            return res
+        res = self.interpret(func, [5])
+        assert self.ll_to_string(res) == '0:0,2:2,4:4,None:x,'
+
+    def test_index_slots(self):
+        def func(n):
+            d = OrderedDict()
+            for i in range(n):
+                d[i] = i
+            return d
+        ll_d = self.interpret(func, [5])
+        assert count_items(ll_d, rordereddict.FREE) == 8 - 5
+        assert ll_d.lookup_function_no == rordereddict.FUNC_BYTE
+        ll_d = self.interpret(func, [300])
+        assert ll_d.lookup_function_no == rordereddict.FUNC_SHORT
+        assert len(ll_d.entries) >= 300
+
+    def test_union_with_dict_fails(self):
+        from rpython.annotator.model import UnionError
+        def func(n):
+            if n:
+                d = OrderedDict()
+            else:
+                d = {}
+            d[n] = n
+            return len(d)
+        py.test.raises(UnionError, self.interpret, func, [1])
+
+
+class TestStress:
+
+    def test_stress(self):
+        from rpython.annotator.dictdef import DictKey, DictValue
+        from rpython.annotator import model as annmodel
+        dictrepr = rordereddict.OrderedDictRepr(
+            None, rint.signed_repr, rint.signed_repr,
+            DictKey(None, annmodel.SomeInteger()),
+            DictValue(None, annmodel.SomeInteger()))
+        dictrepr.setup()
+        l_dict = rordereddict.ll_newdict(dictrepr.DICT)
+        reference = OrderedDict()
+        value = 0
+
+        def complete_check():
+            for n in range(400):
+                try:
+                    gotvalue = rordereddict.ll_dict_getitem(l_dict, n)
+                except KeyError:
+                    assert n not in reference
+                else:
+                    assert gotvalue == reference[n]
+            ll_iter = rordereddict.ll_dictiter(
+                lltype.Ptr(dictrepr.make_iterator_repr().lowleveltype.TO),
+                l_dict)
+            keys = []
+            while True:
+                try:
+                    keys.append(rordereddict.ll_dictnext_group['keys'](
+                        None, ll_iter))
+                except StopIteration:
+                    break
+            assert keys == reference.keys()
+
+        for x in not_really_random():
+            n = int(x*100.0)    # 0 <= x < 400
+            op = repr(x)[-1]
+            if op <= '2' and n in reference:
+                rordereddict.ll_dict_delitem(l_dict, n)
+                del reference[n]
+            elif op <= '6':
+                rordereddict.ll_dict_setitem(l_dict, n, value)
+                reference[n] = value
+                value += 1
+            else:
+                try:
+                    gotvalue = rordereddict.ll_dict_getitem(l_dict, n)
+                except KeyError:
+                    assert n not in reference
+                else:
+                    assert gotvalue == reference[n]
+            if 1.38 <= x <= 1.39:
+                complete_check()
+                print 'current dict length:', len(reference)
+            assert l_dict.num_live_items == len(reference)
+        complete_check()
+
+    def test_index_sizes(self):
+        from rpython.rlib.rarithmetic import LONG_BIT
+        from rpython.annotator.dictdef import DictKey, DictValue
+        from rpython.annotator import model as annmodel
+        dictrepr = rordereddict.OrderedDictRepr(
+            None, rint.signed_repr, rint.signed_repr,
+            DictKey(None, annmodel.SomeInteger()),
+            DictValue(None, annmodel.SomeInteger()))
+        dictrepr.setup()
+        l_dict = rordereddict.ll_newdict(dictrepr.DICT)
+        for size, expected in [(8, rordereddict.FUNC_BYTE),
+                               (256, rordereddict.FUNC_BYTE),
+                               (512, rordereddict.FUNC_SHORT),
+                               (65536, rordereddict.FUNC_SHORT),
+                               (131072, rordereddict.FUNC_INT
+                                        if LONG_BIT == 64
+                                        else rordereddict.FUNC_LONG)]:
+            rordereddict.ll_malloc_indexes_and_choose_lookup(l_dict, size)
+            assert l_dict.lookup_function_no == expected
+            assert len(get_indexes(l_dict)) == size
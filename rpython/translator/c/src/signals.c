@@ -36,6 +36,7 @@ static int volatile pypysig_occurred = 0;
 /* pypysig_occurred is only an optimization: it tells if any
    pypysig_flags could be set. */
 static int wakeup_fd = -1;
+static long volatile pypysig_counted = 0;
 
 #undef pypysig_getaddr_occurred
 void *pypysig_getaddr_occurred(void)
@@ -111,6 +112,35 @@ void pypysig_setflag(int signum)
 #endif
 }
 
+static void signal_counted_handler(int signum)
+{
+    pypysig_counted++;
+    pypysig_counter.value = -1;
+}
+
+void pypysig_setcounted(int signum)
+{
+#ifdef SA_RESTART
+    /* assume sigaction exists */
+    struct sigaction context;
+    context.sa_handler = signal_counted_handler;
+    sigemptyset(&context.sa_mask);
+    context.sa_flags = SA_RESTART;
+    sigaction(signum, &context, NULL);
+#else
+    signal(signum, signal_counted_handler);
+#endif
+}
+
+long pypysig_poll_counted(void)
+{
+    /* not atomic: a signal arriving in the middle may be lost, which
+       is fine for counting samples */
+    long result = pypysig_counted;
+    pypysig_counted -= result;
+    return result;
+}
+
 void pypysig_reinstall(int signum)
 {
 #ifdef SA_RESTART
@@ -13,6 +13,10 @@ int pypysig_set_wakeup_fd(int fd);
 int pypysig_poll(void);   /* => signum or -1 */
 void pypysig_pushback(int signum);
 
+/* a signal which is only counted, e.g. SIGPROF for a sampling profiler */
+void pypysig_setcounted(int signum); /* signal will increment a counter */
+long pypysig_poll_counted(void);     /* => the counter, which is reset */
+
 /* When a signal is received, pypysig_counter is set to -1. */
 /* This is a struct for the JIT. See rsignal.py. */
 struct pypysig_long_struct {
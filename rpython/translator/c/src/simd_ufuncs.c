@@ -0,0 +1,235 @@
+#include "src/simd_ufuncs.h"
+
+/* The loops below use SSE2 packed operations when the C compiler targets
+   SSE2, which is always the case on x86-64.  They start with a scalar
+   prologue until 'out' is aligned to 16 bytes, then process two vectors
+   (4 items) per iteration, and end with a scalar epilogue.
+
+   The caller makes sure that 'out' is either exactly one of the inputs
+   or does not overlap them at all: with a partial overlap, the result
+   would depend on the order in which the items are processed.
+
+   The operations on longs wrap around, like the RPython ones; they are
+   done on unsigned longs because signed overflow is undefined in C. */
+
+#ifdef __SSE2__
+#  include <emmintrin.h>
+#  define PYPY_SIMD_F64
+#  if defined(__x86_64__) && !defined(_WIN64)
+     /* 'long' is 64 bits */
+#    define PYPY_SIMD_LONG
+#  endif
+#endif
+
+#define NOT_ALIGNED(p)   ((((unsigned long)(p)) & 15) != 0)
+
+#define SCALAR_F64(x, OP, y)    ((x) OP (y))
+#define SCALAR_LONG(x, OP, y)   ((long)((unsigned long)(x) OP (unsigned long)(y)))
+
+
+#ifdef PYPY_SIMD_F64
+
+#define F64_LOOP(SCALAR, VLOAD_A, VLOAD_B, VOP)                         \
+    long i = 0;                                                         \
+    while (i < n && NOT_ALIGNED(out + i)) {                             \
+        out[i] = SCALAR;                                                \
+        i++;                                                            \
+    }                                                                   \
+    for (; i + 4 <= n; i += 4) {                                        \
+        __m128d x0 = VLOAD_A(i), y0 = VLOAD_B(i);                       \
+        __m128d x1 = VLOAD_A(i + 2), y1 = VLOAD_B(i + 2);               \
+        _mm_store_pd(out + i, VOP(x0, y0));                             \
+        _mm_store_pd(out + i + 2, VOP(x1, y1));                         \
+    }                                                                   \
+    for (; i < n; i++) {                                                \
+        out[i] = SCALAR;                                                \
+    }
+
+#define F64_ARRAY_A(j)    _mm_loadu_pd(a + (j))
+#define F64_ARRAY_B(j)    _mm_loadu_pd(b + (j))
+#define F64_SCALAR_A(j)   va
+#define F64_SCALAR_B(j)   vb
+
+#define F64_KERNELS(NAME, OP, VOP)                                      \
+void pypy_simd_##NAME##_aa(double *out, double *a, double *b, long n)  \
+{                                                                       \
+    F64_LOOP(SCALAR_F64(a[i], OP, b[i]), F64_ARRAY_A, F64_ARRAY_B, VOP) \
+}                                                                       \
+void pypy_simd_##NAME##_as(double *out, double *a, double b, long n)   \
+{                                                                       \
+    __m128d vb = _mm_set1_pd(b);                                        \
+    F64_LOOP(SCALAR_F64(a[i], OP, b), F64_ARRAY_A, F64_SCALAR_B, VOP)   \
+}                                                                       \
+void pypy_simd_##NAME##_sa(double *out, double a, double *b, long n)   \
+{                                                                       \
+    __m128d va = _mm_set1_pd(a);                                        \
+    F64_LOOP(SCALAR_F64(a, OP, b[i]), F64_SCALAR_A, F64_ARRAY_B, VOP)   \
+}
+
+F64_KERNELS(add_f64, +, _mm_add_pd)
+F64_KERNELS(sub_f64, -, _mm_sub_pd)
+F64_KERNELS(mul_f64, *, _mm_mul_pd)
+
+double pypy_simd_sum_f64(double *a, long n, double start)
+{
+    /* like numpy's pairwise summation, this does not add the items in
+       sequence: there are four partial sums */
+    long i = 0;
+    if (n >= 8) {
+        double partial[2];
+        __m128d s0 = _mm_setzero_pd(), s1 = _mm_setzero_pd();
+        for (; i + 4 <= n; i += 4) {
+            s0 = _mm_add_pd(s0, _mm_loadu_pd(a + i));
+            s1 = _mm_add_pd(s1, _mm_loadu_pd(a + i + 2));
+        }
+        _mm_storeu_pd(partial, _mm_add_pd(s0, s1));
+        start += partial[0] + partial[1];
+    }
+    for (; i < n; i++) {
+        start += a[i];
+    }
+    return start;
+}
+
+#else   /* !PYPY_SIMD_F64 */
+
+#define F64_KERNELS(NAME, OP, VOP)                                      \
+void pypy_simd_##NAME##_aa(double *out, double *a, double *b, long n)  \
+{                                                                       \
+    long i;                                                             \
+    for (i = 0; i < n; i++)                                             \
+        out[i] = SCALAR_F64(a[i], OP, b[i]);                            \
+}                                                                       \
+void pypy_simd_##NAME##_as(double *out, double *a, double b, long n)   \
+{                                                                       \
+    long i;                                                             \
+    for (i = 0; i < n; i++)                                             \
+        out[i] = SCALAR_F64(a[i], OP, b);                               \
+}                                                                       \
+void pypy_simd_##NAME##_sa(double *out, double a, double *b, long n)   \
+{                                                                       \
+    long i;                                                             \
+    for (i = 0; i < n; i++)                                             \
+        out[i] = SCALAR_F64(a, OP, b[i]);                               \
+}
+
+F64_KERNELS(add_f64, +, _)
+F64_KERNELS(sub_f64, -, _)
+F64_KERNELS(mul_f64, *, _)
+
+double pypy_simd_sum_f64(double *a, long n, double start)
+{
+    long i;
+    for (i = 0; i < n; i++)
+        start += a[i];
+    return start;
+}
+
+#endif  /* !PYPY_SIMD_F64 */
+
+
+#define SCALAR_LONG_KERNELS(NAME, OP)                                   \
+void pypy_simd_##NAME##_aa(long *out, long *a, long *b, long n)        \
+{                                                                       \
+    long i;                                                             \
+    for (i = 0; i < n; i++)                                             \
+        out[i] = SCALAR_LONG(a[i], OP, b[i]);                           \
+}                                                                       \
+void pypy_simd_##NAME##_as(long *out, long *a, long b, long n)         \
+{                                                                       \
+    long i;                                                             \
+    for (i = 0; i < n; i++)                                             \
+        out[i] = SCALAR_LONG(a[i], OP, b);                              \
+}                                                                       \
+void pypy_simd_##NAME##_sa(long *out, long a, long *b, long n)         \
+{                                                                       \
+    long i;                                                             \
+    for (i = 0; i < n; i++)                                             \
+        out[i] = SCALAR_LONG(a, OP, b[i]);                              \
+}
+
+#ifdef PYPY_SIMD_LONG
+
+#define LONG_LOOP(SCALAR, VLOAD_A, VLOAD_B, VOP)                        \
+    long i = 0;                                                         \
+    while (i < n && NOT_ALIGNED(out + i)) {                             \
+        out[i] = SCALAR;                                                \
+        i++;                                                            \
+    }                                                                   \
+    for (; i + 4 <= n; i += 4) {                                        \
+        __m128i x0 = VLOAD_A(i), y0 = VLOAD_B(i);                       \
+        __m128i x1 = VLOAD_A(i + 2), y1 = VLOAD_B(i + 2);               \
+        _mm_store_si128((__m128i *)(out + i), VOP(x0, y0));             \
+        _mm_store_si128((__m128i *)(out + i + 2), VOP(x1, y1));         \
+    }                                                                   \
+    for (; i < n; i++) {                                                \
+        out[i] = SCALAR;                                                \
+    }
+
+#define LONG_ARRAY_A(j)   _mm_loadu_si128((__m128i *)(a + (j)))
+#define LONG_ARRAY_B(j)   _mm_loadu_si128((__m128i *)(b + (j)))
+#define LONG_SCALAR_A(j)  va
+#define LONG_SCALAR_B(j)  vb
+
+#define LONG_KERNELS(NAME, OP, VOP)                                     \
+void pypy_simd_##NAME##_aa(long *out, long *a, long *b, long n)        \
+{                                                                       \
+    LONG_LOOP(SCALAR_LONG(a[i], OP, b[i]), LONG_ARRAY_A, LONG_ARRAY_B,  \
+              VOP)                                                      \
+}                                                                       \
+void pypy_simd_##NAME##_as(long *out, long *a, long b, long n)         \
+{                                                                       \
+    __m128i vb = _mm_set1_epi64x(b);                                    \
+    LONG_LOOP(SCALAR_LONG(a[i], OP, b), LONG_ARRAY_A, LONG_SCALAR_B,    \
+              VOP)                                                      \
+}                                                                       \
+void pypy_simd_##NAME##_sa(long *out, long a, long *b, long n)         \
+{                                                                       \
+    __m128i va = _mm_set1_epi64x(a);                                    \
+    LONG_LOOP(SCALAR_LONG(a, OP, b[i]), LONG_SCALAR_A, LONG_ARRAY_B,    \
+              VOP)                                                      \
+}
+
+LONG_KERNELS(add_long, +, _mm_add_epi64)
+LONG_KERNELS(sub_long, -, _mm_sub_epi64)
+
+long pypy_simd_sum_long(long *a, long n, long start)
+{
+    long i = 0;
+    if (n >= 8) {
+        long partial[2];
+        __m128i s0 = _mm_setzero_si128(), s1 = _mm_setzero_si128();
+        for (; i + 4 <= n; i += 4) {
+            s0 = _mm_add_epi64(s0, LONG_ARRAY_A(i));
+            s1 = _mm_add_epi64(s1, LONG_ARRAY_A(i + 2));
+        }
+        _mm_storeu_si128((__m128i *)partial, _mm_add_epi64(s0, s1));
+        start = SCALAR_LONG(start, +, partial[0]);
+        start = SCALAR_LONG(start, +, partial[1]);
+    }
+    for (; i < n; i++) {
+        start = SCALAR_LONG(start, +, a[i]);
+    }
+    return start;
+}
+
+#else   /* !PYPY_SIMD_LONG */
+
+SCALAR_LONG_KERNELS(add_long, +)
+SCALAR_LONG_KERNELS(sub_long, -)
+
+long pypy_simd_sum_long(long *a, long n, long start)
+{
+    long i;
+    for (i = 0; i < n; i++)
+        start = SCALAR_LONG(start, +, a[i]);
+    return start;
+}
+
+#endif  /* !PYPY_SIMD_LONG */
+
+
+/* SSE2 has no packed 64-bit multiplication: this is a plain C loop, which
+   still avoids the boxing and the dispatch of the generic loop */
+
+SCALAR_LONG_KERNELS(mul_long, *)
@@ -0,0 +1,26 @@
+#ifndef _PYPY_SIMD_UFUNCS_H
+#define _PYPY_SIMD_UFUNCS_H
+
+/* element-wise loops over contiguous arrays of doubles or longs, using
+   SSE2 packed operations when available.  The names end with:
+       _aa   out[i] = a[i] OP b[i]
+       _as   out[i] = a[i] OP b
+       _sa   out[i] = a OP b[i]
+*/
+
+#define PYPY_SIMD_DECLARE(NAME, T)                                      \
+    void pypy_simd_##NAME##_aa(T *out, T *a, T *b, long n);            \
+    void pypy_simd_##NAME##_as(T *out, T *a, T b, long n);             \
+    void pypy_simd_##NAME##_sa(T *out, T a, T *b, long n);
+
+PYPY_SIMD_DECLARE(add_f64, double)
+PYPY_SIMD_DECLARE(sub_f64, double)
+PYPY_SIMD_DECLARE(mul_f64, double)
+PYPY_SIMD_DECLARE(add_long, long)
+PYPY_SIMD_DECLARE(sub_long, long)
+PYPY_SIMD_DECLARE(mul_long, long)
+
+double pypy_simd_sum_f64(double *a, long n, double start);
+long pypy_simd_sum_long(long *a, long n, long start);
+
+#endif